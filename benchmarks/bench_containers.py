@@ -0,0 +1,230 @@
+"""container tree benchmarks
+
+Times the container tree operations on generated trees of 10 to 10,000 leaves:
+`update_structure()`, `update_geometries()` (recursive and array layout), every
+`Container.change_container()` action, `Container.change_container_view()` and
+view migration (splitting a leaf moves its view to the new first child).
+
+Runs headless: the trees share one hidden window, pyglet uses its headless EGL
+backend when there's no display.
+
+    python -m benchmarks.bench_containers                           # print and write results.json
+    python -m benchmarks.bench_containers --sizes 10 100 --repeat 3
+    python -m benchmarks.bench_containers --baseline benchmarks/baseline.json
+    python -m benchmarks.bench_containers --write-baseline benchmarks/baseline.json
+
+Each result is the best of `--repeat` runs in ms. With `--baseline`, results more
+than `--tolerance` times slower than the baseline fail the run (exit code 1).
+The growth exponent of each operation between the two largest sizes (1.0 for
+linear) is checked against `--max-exponent`, which catches O(n^2) regressions
+independently of the machine's speed.
+"""
+import argparse
+import collections
+import contextlib
+import gc
+import json
+import math
+import os
+import platform
+import sys
+import time
+
+import pyglet
+if not os.environ.get( "DISPLAY" ) and sys.platform.startswith( "linux" ):
+    pyglet.options["headless"] = True
+
+from boxer import containers
+
+DEFAULT_SIZES = ( 10, 100, 1000, 10000 )
+
+
+class BenchView( containers.ContainerView ):
+    """a view with no drawing, to time the view bookkeeping of the tree"""
+    string_name = "bench view"
+
+    def __init__( self, batch = None ):
+        super().__init__( batch = batch )
+
+
+    def update_geometries( self, container ) -> None:
+        super().update_geometries( container )
+
+
+VIEW_TYPE = [ BenchView.string_name, BenchView ]
+NO_VIEW = containers.Container.container_view_types[0]
+
+
+# trees ------------------------------------------------------------------------
+
+def build_tree( window, leaves : int, array_layout : bool = False ) -> containers.Container:
+    """a root of `leaves` leaves, split breadth first, alternating directions"""
+    root = containers.Container( name="root", window=window, width=1920, height=1080,
+                                use_explicit_dimensions=True, array_layout=array_layout )
+    with root.transaction():
+        queue = collections.deque( [ root ] )
+        for count in range( 1, leaves ):
+            leaf = queue.popleft()
+            action = containers.Container.ACTION_SPLIT_HORIZONTAL if count % 2 else containers.Container.ACTION_SPLIT_VERTICAL
+            queue.extend( containers.Container.change_container( leaf, action ) )
+    return root
+
+
+def release_tree( root : containers.Container ) -> None:
+    """dispose a benchmark tree, so trees don't pile up handlers on the shared window"""
+    for container in containers.Container.get_subtree_nodes( root ):
+        container.dispose()
+    root.dispose()
+
+
+# timing -----------------------------------------------------------------------
+
+def best_of( repeat : int, setup, run ) -> float:
+    """best time of `run( setup() )` in ms, over `repeat` runs"""
+    times = []
+    for _ in range( repeat ):
+        state = setup()
+        start = time.perf_counter()
+        run( state )
+        times.append( ( time.perf_counter() - start ) * 1000.0 )
+    return min( times )
+
+
+def leaf_at( root : containers.Container, fraction : float ) -> containers.Container:
+    return root.leaves[ int( ( len( root.leaves ) - 1 ) * fraction ) ]
+
+
+def bench_size( window, leaves : int, repeat : int ) -> dict[str, float]:
+    """{ operation : ms } on trees of `leaves` leaves"""
+    results = {}
+    root = build_tree( window, leaves )
+    array_root = build_tree( window, leaves, array_layout = True )
+
+    results["update_structure"] = best_of( repeat, lambda: root, lambda r: r.update_structure() )
+    results["update_geometries"] = best_of( repeat, lambda: root, lambda r: r.update_geometries() )
+    results["update_geometries[array]"] = best_of( repeat, lambda: array_root, lambda r: r.update_geometries() )
+
+    # actions on a leaf in the middle of the tree, a different leaf each run
+    # (the closing actions take a leaf out, they run on a fresh leaf each time)
+    fractions = iter( [ ( i + 0.5 ) / ( 6 * repeat + 1 ) for i in range( 6 * repeat + 1 ) ] )
+    for action, label in enumerate( containers.Container.container_action_labels ):
+        if action == containers.Container.ACTION_CLOSE_OTHERS:
+            continue
+        results["change_container[%s]"%label] = best_of( repeat,
+                lambda: leaf_at( root, next( fractions ) ),
+                lambda leaf, action=action: containers.Container.change_container( leaf, action ) )
+
+    results["change_container_view"] = best_of( repeat,
+            lambda: leaf_at( root, 0.5 ),
+            lambda leaf: ( containers.Container.change_container_view( leaf, VIEW_TYPE ),
+                           containers.Container.change_container_view( leaf, NO_VIEW ) ) )
+
+    def _viewed_leaf():
+        leaf = leaf_at( root, 0.25 )
+        containers.Container.change_container_view( leaf, VIEW_TYPE )
+        return leaf
+    results["view_migration[split]"] = best_of( repeat, _viewed_leaf,
+            lambda leaf: containers.Container.change_container( leaf, containers.Container.ACTION_SPLIT_VERTICAL ) )
+
+    # last, it leaves a single leaf
+    results["change_container[close others]"] = best_of( 1,
+            lambda: leaf_at( root, 0.5 ),
+            lambda leaf: containers.Container.change_container( leaf, containers.Container.ACTION_CLOSE_OTHERS ) )
+
+    release_tree( root )
+    release_tree( array_root )
+    del root, array_root
+    gc.collect()
+    return results
+
+
+def growth_exponents( results : dict[str, dict[str, float]] ) -> dict[str, float]:
+    """{ operation : exponent k of time ~ n^k } between the two largest sizes"""
+    sizes = sorted( int( size ) for size in results )
+    if len( sizes ) < 2:
+        return {}
+    n0, n1 = sizes[-2], sizes[-1]
+    exponents = {}
+    for operation, ms in results[str( n1 )].items():
+        ms0 = results[str( n0 )].get( operation )
+        if ms0 and ms > 0.0:
+            exponents[operation] = math.log( ms / ms0 ) / math.log( n1 / n0 )
+    return exponents
+
+
+def compare( results : dict, baseline : dict, tolerance : float ) -> list[str]:
+    """the operations (and sizes) more than `tolerance` times slower than `baseline`"""
+    regressions = []
+    for size, operations in results["results"].items():
+        for operation, ms in operations.items():
+            base = baseline.get( "results", {} ).get( size, {} ).get( operation )
+            if base and ms > base * tolerance:
+                regressions.append( "%s @ %s leaves: %.2f ms, baseline %.2f ms (x%.2f)"%( operation, size, ms, base, ms / base ) )
+    return regressions
+
+
+# main -------------------------------------------------------------------------
+
+def run( sizes, repeat : int ) -> dict:
+    window = pyglet.window.Window( width=1920, height=1080, visible=False )
+    results = {}
+    try:
+        for size in sizes:
+            start = time.perf_counter()
+            # the containers print their changes and tree, that's not what's measured
+            with open( os.devnull, "w" ) as devnull, contextlib.redirect_stdout( devnull ):
+                results[str( size )] = bench_size( window, size, repeat )
+            print("\033[38;5;123m%6s leaves\033[0m %.1f s"%( size, time.perf_counter() - start ), file=sys.stderr)
+    finally:
+        with open( os.devnull, "w" ) as devnull, contextlib.redirect_stdout( devnull ):
+            window.close()
+    return {
+        "machine" : { "python" : platform.python_version(), "platform" : platform.platform(), "pyglet" : pyglet.version },
+        "repeat" : repeat,
+        "results" : results,
+        "exponents" : growth_exponents( results ),
+    }
+
+
+def print_table( report : dict ) -> None:
+    results = report["results"]
+    sizes = list( results )
+    operations = list( results[sizes[0]] ) if sizes else []
+    print( "%-34s"%"ms" + "".join( "%12s"%size for size in sizes ) + "%10s"%"n^k" )
+    for operation in operations:
+        row = "".join( "%12.3f"%results[size].get( operation, float("nan") ) for size in sizes )
+        exponent = report["exponents"].get( operation )
+        print( "%-34s"%operation + row + ( "%10.2f"%exponent if exponent is not None else "%10s"%"-" ) )
+
+
+def main( argv = None ) -> int:
+    parser = argparse.ArgumentParser( description = __doc__.splitlines()[0] )
+    parser.add_argument( "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="leaf counts of the trees" )
+    parser.add_argument( "--repeat", type=int, default=5, help="runs per operation, the best is kept" )
+    parser.add_argument( "--output", default="results.json", help="results file" )
+    parser.add_argument( "--baseline", help="baseline results file to compare against" )
+    parser.add_argument( "--tolerance", type=float, default=2.0, help="slowdown against the baseline that fails" )
+    parser.add_argument( "--max-exponent", type=float, default=1.5, help="growth exponent that fails" )
+    parser.add_argument( "--write-baseline", help="also write the results as a baseline file" )
+    args = parser.parse_args( argv )
+
+    report = run( args.sizes, args.repeat )
+    print_table( report )
+    for path in filter( None, ( args.output, args.write_baseline ) ):
+        with open( path, "w" ) as f:
+            json.dump( report, f, indent=2 )
+
+    failures = []
+    for operation, exponent in report["exponents"].items():
+        if exponent > args.max_exponent:
+            failures.append( "%s grows as n^%.2f"%( operation, exponent ) )
+    if args.baseline:
+        with open( args.baseline ) as f:
+            failures += compare( report, json.load( f ), args.tolerance )
+    for failure in failures:
+        print("\033[38;5;196mregression:\033[0m %s"%failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit( main() )
@@ -2,6 +2,7 @@
 
 import os
 import math
+import time
 #import types
 import random
 import pyglet
@@ -14,10 +15,16 @@ import imgui
 import boxer.background
 import boxer.mouse
 import boxer.camera
+import boxer.events
 import boxer.ui
 import boxer.handles
+import boxer.snapping
 import boxer.containers
 import boxer.shapes
+import boxer.shaders
+import boxer.resource_manager
+import boxer.redraw
+import boxer.profiler
 
 
 #----------------
@@ -40,7 +47,11 @@ class Application(pyglet.event.EventDispatcher):
     def __init__(self,
             name = "boxer",
             res_x = 900,
-            res_y = 600):
+            res_y = 600,
+            idle_fps = 2.0,
+            continuous = False,
+            preview_drag = False,
+            profile = False):
 
         self.name = name
         print("starting %s"%self)
@@ -57,9 +68,9 @@ class Application(pyglet.event.EventDispatcher):
         print("    api: %s"%glinfo.opengl_api)
 
         self.window.set_icon(
-            pyglet.image.load(os.path.join("boxer","resources", "icon-64.png")),
-            pyglet.image.load(os.path.join("boxer","resources", "icon-32.png")),
-            pyglet.image.load(os.path.join("boxer","resources", "icon-16.png")))
+            boxer.resource_manager.load_image("icon-64.png"),
+            boxer.resource_manager.load_image("icon-32.png"),
+            boxer.resource_manager.load_image("icon-16.png"))
         self.fullscreen = False
 
 
@@ -76,17 +87,32 @@ class Application(pyglet.event.EventDispatcher):
 
         pyglet.gl.glClearColor(0.2,0.2,0.2,1)
 
+        # render on demand: the window is drawn when input, invalidate() calls
+        # or animations need a frame, see boxer.redraw
+        self.redraw = boxer.redraw.scheduler
+        self.redraw.attach( self.window )
+        self.redraw.set_idle_fps( idle_fps )
+        self.redraw.set_continuous( continuous )
+
+        # frame phase spans, see boxer.profiler
+        boxer.profiler.set_enabled( profile )
+
+        # window input events reach the app components through one routed
+        # event bus, instead of each pushing handlers onto the window, see boxer.events
+        self.events = boxer.events.for_window( self.window )
+
         # app components:
         # self.background = boxer.background.Background()
 
         self.mouse = boxer.mouse.Mouse()
-        self.window.push_handlers( self.mouse )
+        self.events.push_handlers( self.mouse )
         self.window.set_mouse_cursor(self.mouse)
         # self.system_mouse_cursor = pyglet.window.DefaultMouseCursor()
 
         self.camera = boxer.camera.Camera( self.window )
-        self.window.push_handlers( self.camera )
+        self.events.push_handlers( self.camera )
         self.camera.push_handlers(transform_changed=self.mouse.on_camera_transform_changed)
+        self.camera.push_handlers(transform_changed=self.on_camera_transform_changed)
         self.camera.start()
 
         # serialisation
@@ -96,6 +122,8 @@ class Application(pyglet.event.EventDispatcher):
         ########################################################################
         ########################################################################
         # containers
+        # split handle drags move only the split line, and relayout on release
+        boxer.containers.Container.preview_drag = preview_drag
         self.container_line_batch = pyglet.graphics.Batch()
         self.container_overlay_batch = pyglet.graphics.Batch()
 
@@ -111,6 +139,7 @@ class Application(pyglet.event.EventDispatcher):
 
         self.container.update()
         self.container.pprint_tree()
+        print("  shaders: %s"%boxer.shaders.program_cache_report())
         
         self.container.push_handlers( view_changed=self.on_container_view_changed )
         self.container.push_handlers( collapsed=self.on_container_view_changed )
@@ -178,6 +207,14 @@ class Application(pyglet.event.EventDispatcher):
         # import sys
         # print("%s %s"%(self, sys.getsizeof(self)))
 
+        # handles get their mouse events from one manager, which hit tests them
+        # through a spatial index, see boxer.handles.HandleManager
+        # dragged handles snap to each other's x / y and (screen space) to the container edges
+        self.snapper = boxer.snapping.Snapper( mouse = self.mouse )
+        self.snapper.track_containers( self.container )
+        self.handles = boxer.handles.HandleManager( mouse = self.mouse, snapper = self.snapper )
+        self.handles.attach( self.events )
+
         self.test_handles = []
         self.test_handles_batch = pyglet.graphics.Batch()
 
@@ -189,12 +226,10 @@ class Application(pyglet.event.EventDispatcher):
                 mouse = self.mouse,
                 debug = True,
                 space = boxer.handles.Handle.SPACE_WORLD,
-                batch = self.test_handles_batch )
+                batch = self.test_handles_batch,
+                instanced = True )
             self.test_handles.append( handle )
-            self.window.push_handlers( on_mouse_motion = handle.on_mouse_motion )
-            self.window.push_handlers( on_mouse_press = handle.on_mouse_press )
-            self.window.push_handlers( on_mouse_release = handle.on_mouse_release )
-            self.window.push_handlers( on_mouse_drag = handle.on_mouse_drag )
+            self.handles.add( handle )
 
 
         self.test_screen_handles = []
@@ -204,12 +239,15 @@ class Application(pyglet.event.EventDispatcher):
             mouse = self.mouse,
             debug = True,
             space = boxer.handles.Handle.SPACE_SCREEN,
-            batch = self.test_screen_handles_batch )
+            batch = self.test_screen_handles_batch,
+            instanced = True )
         self.test_screen_handles.append( handle )
-        self.window.push_handlers( on_mouse_motion = handle.on_mouse_motion )
-        self.window.push_handlers( on_mouse_press = handle.on_mouse_press )
-        self.window.push_handlers( on_mouse_release = handle.on_mouse_release )
-        self.window.push_handlers( on_mouse_drag = handle.on_mouse_drag )      
+        self.handles.add( handle )
+
+
+    def run(self) -> None:
+        """run the pyglet event loop, frames are scheduled by `self.redraw`"""
+        pyglet.app.run( interval=None )
 
 
     def save_file(self,  save_as = False, browse = True ):
@@ -253,7 +291,8 @@ class Application(pyglet.event.EventDispatcher):
                 "name": self.test_graph_name,
                 # "background": self.background.as_json(),
                 "camera": self.camera.as_json()
-                }
+                },
+            "layout": self.container.as_json(),
             }
 
         json_data = json.dumps( app_dict, indent=4)
@@ -266,6 +305,41 @@ class Application(pyglet.event.EventDispatcher):
         return True
 
 
+    def load_file(self) -> None:
+        """browse for a project file and load it"""
+        file_path = boxer.ui.browse_open_file_path()
+        self.load_from_file( file_path )
+
+
+    def load_from_file(self, file_path ) -> bool:
+        """loads a project saved by `.save_to_file()`: the camera and the container
+        layout (patched into the current one, reusing its containers and views,
+        see `Container.apply_layout()`)
+
+        Returns True if loaded, False if file_path is empty
+        """
+
+        if file_path == '':
+            return False
+
+        import json
+
+        with open(file_path, "r") as infile:
+            app_dict = json.load(infile)
+
+        start = time.perf_counter()
+        if "camera" in app_dict.get("graph", {}):
+            self.camera.from_json( app_dict["graph"]["camera"] )
+        if "layout" in app_dict:
+            self.container.apply_layout( app_dict["layout"] )
+        print("load_from_file(%s) done (%s containers, %.2f ms)"%(file_path, len(self.container.containers_by_id), (time.perf_counter() - start) * 1000.0))
+
+        self.file_path = file_path
+        self.window.set_caption(self.name + "  -  [" + self.file_path+"]")
+        boxer.redraw.invalidate()
+        return True
+
+
     def as_json(self)->dict:
         """write self as json string"""
         return{
@@ -279,6 +353,8 @@ class Application(pyglet.event.EventDispatcher):
 
 
     def on_draw(self):
+        # each phase is a span of the frame in boxer.profiler (View > Profiler)
+        boxer.profiler.begin_frame()
         self.window.clear()
 
         # drawstats
@@ -335,6 +411,7 @@ class Application(pyglet.event.EventDispatcher):
         
         # gl.glLineWidth(2.0)
         self.test_screen_handles_batch.draw()
+        self.handles.draw_band()
 
         # gl.glViewport(0,0,self.window.width, self.window.height)
 
@@ -401,19 +478,23 @@ class Application(pyglet.event.EventDispatcher):
         #----------------------
         # ui containers
         imgui.push_font(self.ui.font_small)
-        self.container.draw()
+        with boxer.profiler.span( "containers", "container" ):
+            self.container.draw()
         imgui.pop_font()
         #----------------------
         # ui
-        self.ui.draw()
+        with boxer.profiler.span( "ui", "imgui" ):
+            self.ui.draw()
         #----------------------
-        imgui.end_frame()
-        imgui.render()
-        self.ui.imgui_renderer.render(imgui.get_draw_data())
+        with boxer.profiler.span( "imgui render", "imgui" ):
+            imgui.end_frame()
+            imgui.render()
+            self.ui.imgui_renderer.render(imgui.get_draw_data())
         #----------------------
 
 
-        self.fps_display.draw()
+        with boxer.profiler.span( "fps display", "frame" ):
+            self.fps_display.draw()
         # self.graph_label.draw()
         # self.draw_stats_label.draw()
 
@@ -427,6 +508,8 @@ class Application(pyglet.event.EventDispatcher):
                         (255,190,20, 128),
                     ).draw()
 
+        boxer.profiler.end_frame()
+
 
     def on_key_press( self, symbol, modifiers ):
 
@@ -455,6 +538,11 @@ class Application(pyglet.event.EventDispatcher):
                 print("Ctrl-S : Save")
                 self.save_file()
 
+        # Open: Ctrl-O
+        if symbol == key.O and modifiers & key.MOD_CTRL:
+            print("Ctrl-O : Open")
+            self.load_file()
+
         # force breakpoint
 
         # Alt-Enter: toggle fullscreen
@@ -573,16 +661,25 @@ class Application(pyglet.event.EventDispatcher):
         """window event"""
         print("%s on_close"%self)
         self.ui.on_close()
+        self.redraw.detach()
 
 
     def on_resize(self, width, height) -> None:
-        """window event"""
+        """window event
+        Only records the new size: the layout runs once, in the next frame's
+        `Container.update_dirty_geometries()`, however many resize events arrive
+        before it."""
         # print("applicaton.window.on_resize = (%s, %s)"%(width, height))
         # print("update self.container")
         self.container.width = width
         self.container.height = height - 26
         self.container.position = pyglet.math.Vec2(0,0)
-        self.container.update_geometries()
+        self.container.invalidate_geometry()
+
+
+    def on_camera_transform_changed(self, transform : pyglet.math.Mat4) -> None:
+        """camera event, the whole world space moved"""
+        self.redraw.invalidate()
 
 
 # ------------------------------------------------------------------------------
@@ -4,6 +4,9 @@ import pyglet.image
 
 import boxer.shaders
 import boxer.shapes
+import boxer.resource_manager
+import boxer.redraw
+import boxer.leaks
 
 from  colour import Color
 
@@ -27,6 +30,8 @@ class BackgroundGroup( pyglet.graphics.Group ):
         self.width = 200
         self.height= 200
 
+        self.camera_matrix = pyglet.math.Mat4()
+
 
     def set_scissor(self, x, y, width, height) -> None:
         self.originx = x
@@ -38,7 +43,9 @@ class BackgroundGroup( pyglet.graphics.Group ):
     def set_state(self):
         # print(f"    -- {self} {self.id} {self.program}")
         self.program.use()
-        gl.glEnable(self.texture.target)
+        # the program is shared, set this background's transform for its draw
+        self.program['camera_matrix'] = self.camera_matrix
+        # (no glEnable of the texture target, that's fixed function, and an error in core profiles)
         gl.glBindTexture(self.texture.target, self.texture.id)
         gl.glEnable(gl.GL_SCISSOR_TEST)
         gl.glScissor(int(self.originx),
@@ -67,8 +74,18 @@ class BackgroundGroup( pyglet.graphics.Group ):
 
 
 
-class Background:
-    """backround object for graph sheets"""
+class Background( pyglet.event.EventDispatcher ):
+    """backround object for graph sheets
+
+    With `Background.drift = True` (or `.set_drift( True )`) the background drifts
+    in a slow circle. That's a `boxer.redraw` animation, which keeps the window
+    drawing at the active frame rate, so it's off by default and idle windows
+    stop drawing.
+
+    Dispatches "changed" when it looks different (drift, colours), for views that
+    cache it (see `boxer.plugins.graph_view.GraphCanvas`).
+    """
+    drift = False
 
     def __init__(self,
                  name="background",
@@ -84,7 +101,7 @@ class Background:
 
 
 
-        self.image = pyglet.image.load('boxer/resources/background_grid_map.png')
+        self.image = boxer.resource_manager.load_image('background_grid_map.png')
         self.texture : pyglet.image.Texture = pyglet.image.TileableTexture.create_for_image( self.image )
         #self.texture : pyglet.image.Texture = self.image.get_texture()
  
@@ -97,7 +114,8 @@ class Background:
 
         print("starting %s"%self)
 
-        _program = boxer.shaders.get_default_shader()
+        # shared program, the colours are vertex attributes and the camera
+        # matrix is set by BackgroundGroup.set_state()
         self.shader_program = boxer.shaders.get_texture_colour_mix_shader() #boxer.shaders.get_default_textured_shader()
 
         # print("boxer.background shader attributes:")
@@ -105,14 +123,12 @@ class Background:
         # print( self.shader_program.attributes )
         # print("boxer.background shader uniforms: %s"%str(self.shader_program.uniforms.items() ))
 
-        self.shader_program['color_one'] = (*self.colour_one, 1.0)
-        self.shader_program['color_two'] = (*self.colour_two, 1.0)
-
-        pyglet.clock.schedule_interval_soft(self.on_update, 1/60.0)
+        self._disposed = False
+        boxer.leaks.track(self)
         self.age = 0.0
         self.speed = (random.random() - 0.5) * 10
-        self.camera_matrix = pyglet.math.Mat4()
-        self.shader_program['camera_matrix'] = pyglet.math.Mat4.from_translation( pyglet.math.Vec3( -1.0, 1.0, 0.0 ) )
+        self._drifting = False
+        self.camera_matrix = pyglet.math.Mat4.from_translation( pyglet.math.Vec3( -1.0, 1.0, 0.0 ) )
 
 
         _bg_width = 2000000
@@ -121,6 +137,7 @@ class Background:
         _bg_tex_coords = boxer.shapes.quad_texcoords( _bg_width/self.texture.width, _bg_height/self.texture.height, 0.0, 0.0 )
 
         self.group = BackgroundGroup( 0, self.texture , self.shader_program)#, self) #, parent = self.parent_group)
+        self.group.camera_matrix = self.camera_matrix
 
         self.background_triangles = self.shader_program.vertex_list_indexed( 4, gl.GL_TRIANGLES, (0,1,2,0,2,3),
                                     self.batch,
@@ -128,7 +145,12 @@ class Background:
                                     position = ('f', _bg_verts ),
                                     #colors = ('f', self.colour * 4 ),
                                     colors = ('f', (1.0, 1.0, 1.0, 1.0) * 4 ),
-                                    tex_coords = ('f', _bg_tex_coords) )
+                                    tex_coords = ('f', _bg_tex_coords),
+                                    color_one = ('f', (*self.colour_one, 1.0) * 4 ),
+                                    color_two = ('f', (*self.colour_two, 1.0) * 4 ) )
+
+        if self.drift:
+            self.set_drift( True )
 
 
 
@@ -142,55 +164,51 @@ class Background:
         m = 50.0
         self.camera_matrix = pyglet.math.Mat4.from_translation(
             pyglet.math.Vec3( math.sin(self.age*self.speed)*m, math.cos(self.age*self.speed)*m, 0.0 ) )        
-        self.shader_program['camera_matrix'] = self.camera_matrix
+        self.group.camera_matrix = self.camera_matrix
+        self.dispatch_event( "changed" )
         # print(f"-- set matrix {self.camera_matrix}")
         # print(f"{self.speed} {hash(self.shader_program)}")
 
 
-    def __del__(self) -> None:
-        print(f"\033[38;5;52m[X]\033[0m '{self.name}' {self} ({self.__class__}) being deleted.")
-        # print("------------")
-        # print(f"DELETING BACKGROUND {self}")
-        # print(f" -> vertex list count {self.background_triangles.index_count}")
+    def set_drift(self, drift : bool) -> None:
+        """start or stop drifting, driven by the redraw scheduler's frames (not a timer
+        of its own) for as long as it drifts"""
+        if drift == self._drifting:
+            return
+        self._drifting = drift
+        if drift:
+            boxer.redraw.add_animation(self.on_update)
+        else:
+            boxer.redraw.remove_animation(self.on_update)
+            boxer.redraw.invalidate()
+
+
+    def dispose(self) -> None:
+        """delete the vertex list and texture, and stop the animation"""
+        if self._disposed:
+            return
+        self._disposed = True
+        self.set_drift( False )
         self.background_triangles.delete()
-        # self.background_triangles = None
-        # print(f" -> vertex list count {self.background_triangles.index_count}")
-        # print("------------")
-        # ref = gc.get_referrers( self.group )
-        # for i in ref:
-        #     print(f"{type(i)} : {i}")
-        #     if type(i) == type([]):
-        #         for li in i:
-        #             print(f"    {li}")
-        #     elif type(i)== type({}):
-        #         for k in i:
-        #             print(f"    {k} : {i[k]}")
-        
-        # print(f" -> {self.group}")
-        del(self.group)
-        self.group = None
-        # print(f" -> {self.group}")
-        # print(f" -> {self.background_triangles}")
-        # print(f" -> {self.background_triangles.index_count}")
-        # print("------------")
-
-
-        # ref = gc.get_referrers( self.group )
-        # for i in ref:
-        #     print(i)
-        # print("------------")
+        self.texture.delete()
 
 
+    def __del__(self) -> None:
+        print(f"\033[38;5;52m[X]\033[0m '{self.name}' {self} ({self.__class__}) being deleted.")
+        # dispose() is the owner's (see boxer.leaks), not the collector's
+        boxer.leaks.warn_undisposed(self)
 
 
     def set_colour_one(self, colour) -> None:
         self.colour_one = colour[:3]
-        self.shader_program['color_one'] = (*self.colour_one, 1.0)
+        self.background_triangles.color_one = (*self.colour_one, 1.0) * 4
+        self.dispatch_event( "changed" )
 
 
     def set_colour_two(self, colour) -> None:
         self.colour_two = colour[:3]
-        self.shader_program['color_two'] = (*self.colour_two, 1.0)
+        self.background_triangles.color_two = (*self.colour_two, 1.0) * 4
+        self.dispatch_event( "changed" )
 
 
     def draw(self):
@@ -226,4 +244,7 @@ class Background:
             "type": str(type(self)),
             "colour_one": self.colour_one,
             "colour_two": self.colour_two,
-        }
\ No newline at end of file
+        }
+
+
+Background.register_event_type("changed")
@@ -53,6 +53,15 @@ class Camera(pyglet.event.EventDispatcher):
         }
 
 
+    def from_json(self, data : dict) -> None:
+        """restore the transform and zoom written by `.as_json()`, and dispatch
+        "transform_changed" (the mouse and views follow the camera)"""
+        if "transform" in data:
+            self.transform = pyglet.math.Mat4( *data["transform"] )
+        self.zoom = data.get( "zoom", self.zoom )
+        self.dispatch_event("transform_changed", self.transform)
+
+
     def enable(self) -> None:
         """enables input for the camera"""
         self.enabled = True
@@ -3,6 +3,8 @@ For building windowareas and partitions et cetera.
 
 The root container must be a Container (non-SplitContainer-type)
 """
+import bisect
+import contextlib
 import math
 
 if __name__ == "__main__":
@@ -17,10 +19,19 @@ import pyglet.math
 from pyglet.window import Window # Pylance is getting confused
 
 import boxer.camera
+import boxer.events
 import boxer.shapes
 import boxer.shaders
 import boxer.handles
 import boxer.mouse
+import boxer.layout
+import boxer.outlines
+import boxer.resource_manager
+import boxer.redraw
+import boxer.snapping
+import boxer.viewcache
+import boxer.leaks
+import boxer.profiler
 
 import imgui as imgui
 
@@ -47,30 +58,41 @@ class Container( pyglet.event.EventDispatcher ):
 
     If window dimensions or parent dimensions change (inc. split ratios or other constraints),
     call `.update_geometries()` on a node to update all descendant dimensions.
+    For cheap, repeated changes (splitter drags) call `.invalidate_geometry()` on the
+    changed node instead, the root's `.update_dirty_geometries()` (run once per frame
+    in `.draw()`) then recomputes only the dirty subtrees.
 
     `.update_structure()` aneeds to be called if the tree structure changes due
     to adding or collapsing children.
     This updates node depths, unique id and identifies leaves in the tree.
+    On the root it also builds O(1) lookups: `.get_container_by_id()`, `.get_container_by_path()`
+    and `.get_container_by_name()`.
     This also updates pushing and popping handlers to subscribers of container events.
 
     `.update()` can be called to invoke both `.update_geometries()` and `.update_structure()`
 
-    The tree leaves are connected to the window's `on_mouse` events.
+    The root connects a single set of the window's `on_mouse` events, and routes them
+    down the split tree to the leaf under the mouse (see `.get_leaf_at()`) and to the
+    split handles along the path.
     """
 
     CONTAINER_DEBUG_LABEL = False
-    # _base_path = os.path.join(os.getcwd(), "boxer", "resources")
-    _base_path = os.path.join(os.path.dirname(__file__), "resources")
-    cog_image = pyglet.image.load(os.path.join(_base_path,"cog_16.png"))
-    window_image = pyglet.image.load(os.path.join(_base_path,"window_16.png"))
-    downarrow_image = pyglet.image.load(os.path.join(_base_path,"downarrow_16.png"))
-    diamond_image = pyglet.image.load(os.path.join(_base_path,"diamond_16.png"))
-
-    textures = {
-        "cog" : cog_image.get_texture(),
-        "window" : window_image.get_texture(),
-        "downarrow" : downarrow_image.get_texture(),
-        "view-combo" : diamond_image.get_texture(),
+    # while a split (or grid track) handle is dragged, move only its line and handle,
+    # and relayout once on release, instead of relayouting once per frame of the drag
+    preview_drag = False
+    # split ratios a dragged split handle snaps to (eg. boxer.snapping.DEFAULT_RATIOS),
+    # within snap_tolerance pixels, () for no snapping
+    snap_ratios = ()
+    snap_tolerance = 8.0
+    # leaf header chrome, see .draw_leaf_chrome()
+    CHROME_MIN_WIDTH = 60.0     # narrower leaves draw no header buttons
+    CHROME_BUTTON_SIZE = 14.0   # 12 pixel icon, 1 pixel frame
+    # { ui name : icon name }, icons are loaded lazily from the shared atlas, see boxer.resource_manager
+    icons = {
+        "cog" : "cog",
+        "window" : "window",
+        "downarrow" : "downarrow",
+        "view-combo" : "diamond",
     }
 
     # container_view_types = ["none",
@@ -90,14 +112,25 @@ class Container( pyglet.event.EventDispatcher ):
                             "split vertical",
                             "close",
                             "close split",
-                            "close others"]
+                            "close others",
+                            "split grid"]
     
     ACTION_SPLIT_HORIZONTAL = 0     # split this container into a HSplitContainer with two child Containers.
     ACTION_SPLIT_VERTICAL = 1       # split this container into a VSplitCOntainer with two child Containers.
     ACTION_CLOSE = 2                # close this container, if in a split container convert the split to a single.
     ACTION_CLOSE_SPLIT = 3          # replace the parent SplitContainer with this one.
     ACTION_CLOSE_OTHERS = 4         # close all other containers, leaving this one.
+    ACTION_SPLIT_GRID = 5           # split this container into a 2x2 GridContainer.
 
+    # how boxer.layout.LayoutStore solves this type's children
+    _array_layout_kind = boxer.layout.KIND_CONTAINER
+
+    # bumped by every change to any tree's structure (add/set/remove children),
+    # validates the cached roots of .get_root_container()
+    _structure_version = 0
+
+    # { class name : Container (sub)class }, the types `.restore_layout()` can create
+    container_types : dict[str, type['Container']] = {}
 
     def __init__(self,
             name="container",
@@ -109,9 +142,16 @@ class Container( pyglet.event.EventDispatcher ):
             color = (255, 255, 255, 60),
             batch = None,
             group = None,
-            overlay_batch = None
+            overlay_batch = None,
+            array_layout : bool = False
             ):
 
+        # see boxer.layout, set before any geometry attribute
+        self._layout_store : boxer.layout.LayoutStore | None = None
+        self._layout_row : int | None = None
+        # on a root container, solve the tree with an array backed boxer.layout.LayoutStore
+        self.array_layout = array_layout
+
         self.name = name
         self.window : Window = window or pyglet.window.Window()
         self.width = width
@@ -140,6 +180,9 @@ class Container( pyglet.event.EventDispatcher ):
         # self.container_views : dict[ Container, type[ContainerView] ] = {}
         self.container_views : dict[ Container, ContainerView ] = {}
 
+        # offscreen caches of the views with `cache_to_texture`, see .draw_view_caches()
+        self.view_caches : weakref.WeakKeyDictionary[ ContainerView, boxer.viewcache.ViewCache ] = weakref.WeakKeyDictionary()
+
         # Dictionary to hold batches for each ContainerView type
         # All ContainerViews of the same type should use the same, single batch
         # When a new container view is spawned, a dedicated batch for the ContainerView type
@@ -161,34 +204,49 @@ class Container( pyglet.event.EventDispatcher ):
         # track split containers so handles can be drawn
         self.split_containers = []
 
+        # indexes built by .update_structure() on the root, O(1) lookups
+        self.containers_by_id : list[Container] = []            # _node_id -> Container
+        self.containers_by_path : dict[str, Container] = {}     # "root/child/grandchild" -> Container
+        self.containers_by_name : dict[str, Container] = {}     # name -> first Container in preorder
+
         self.is_leaf = False
         self.is_root = False
 
         self.root_container : Container = self # either None or a Container
+        self._root_cache : tuple[Container, int] = (self, -1)   # (root, Container._structure_version)
+        self._path = self.name
 
         # state
         self.mouse_inside = False
 
+        # mouse routing, used on the root (see .connect_mouse_router())
+        self._mouse_router_window = None
+        self._mouse_router_subscriptions : list[boxer.events.Subscription] = []
+        self._mouse_leaf : Container | None = None    # leaf under the mouse
+        self._routed_split_handles = set()              # split handles hovered or selected
+
+        # layout transactions, used on the root (see .transaction())
+        self._transaction_depth = 0
+        self._transaction_pending_update = False
+        self._transaction_events : list[tuple[str, tuple]] = []
+        self._transaction_created : set[Container] = set()     # containers created inside the transaction
+
         self._depth = 0
         self._node_id = None # unique number assigned during traversal
 
-        self.lines = {}
-        self.lines["left"] = pyglet.shapes.Line( 0, 0, 1, 0,
-                                            batch = self.batch,
-                                            color = self.color )
-        self.lines["top"] = pyglet.shapes.Line( 0, 0, 1, 0,
-                                            batch = self.batch,
-                                            color = self.color )
-        self.lines["right"] = pyglet.shapes.Line( 0, 0, 1, 0,
-                                            batch = self.batch,
-                                            color = self.color )
-        self.lines["bottom"] = pyglet.shapes.Line( 0, 0, 1, 0,
-                                            batch = self.batch,
-                                            color = self.color )
-
-        # self.lines["top_bar"] = pyglet.shapes.Line( 0, 0, 1, 0,
-        #                                     batch = self.batch,
-        #                                     color = self.color )
+        # incremental layout (see .invalidate_geometry(), .update_dirty_geometries())
+        self._layout_rect = None # (x, y, width, height) at the last layout pass
+        self._geometry_dirty = True
+        self._geometry_dirty_descendants = False
+
+        # border lines, 4 segments (left, top, right, bottom) in the batch's shared
+        # boxer.outlines.OutlineRenderer
+        self._outline_renderer = boxer.outlines.OutlineRenderer.for_batch( self.batch )
+        self._outline_slot : int | None = self._outline_renderer.alloc( 4 )
+        self._outline_renderer.set_color( self._outline_slot, self.color, 4 )
+        self._outline_renderer.set_thickness( self._outline_slot, 1.0, 4 )
+        # free the slots if the container is dropped without .release_outline()
+        self._outline_finalizer = weakref.finalize( self, self._outline_renderer.free, self._outline_slot, 4 )
 
         self._lines_original_color = self.color
 
@@ -206,33 +264,86 @@ class Container( pyglet.event.EventDispatcher ):
         self.do_draw_overlay = False
         self._marchinglines_time = 0.0
         #self._marchinglines_shader = pyglet.shapes.get_default_shader()
+        # shared program, the overlay's state is in its vertex attributes
         self._marchinglines_shader = boxer.shaders.get_marchinglines_shader()
         
 
         self.marching_lines_collapse_color = (1.0, 0.1, 0.0, 0.5)
         self.marching_lines_split_color = (1.0, 1.0, 1.0, 0.35)
-        self._marchinglines_shader["color_one"] = (1.0, 0.1, 0.0, 0.5) #0.25)
-        #self._marchinglines_shader["line_ratio"] = 0.5
-        self._marchinglines_shader["time"] = 0.0
-        self._marchinglines_shader["ir_bl"] = (70.0, 70.0)    # inner rect, bottom left
-        self._marchinglines_shader["ir_tr"] = (120.0, 120.0)    # inner rect, top right
-        self._marchinglines_shader["positive"] = 1.0        # value of inner rect (1.0
-                                                            # means black outside, 0.0 means black inside)
 
-        _points = boxer.shapes.rectangle_centered_vertices( 130, 230, 200, 200 )
-        _colors = (1.0, 1.0, 1.0, 1.0) * 4
-        self.overlay_quad = self._marchinglines_shader.vertex_list_indexed( 4,
-                                        gl.GL_TRIANGLES,
-                                        (0,1,2,0,2,3),
-                                        self.overlay_batch,
-                                        None,
-                                        position = ('f', _points),
-                                        colors = ('f', _colors),
-                                        )
+        # action hint overlay, only drawn by the root container,
+        # created on first use (see .get_overlay_quad())
+        self.overlay_quad = None
 
         # imgui
         self.container_view_combo_selected = 0
         self.container_actions_combo_selected = 0
+        self._chrome_popups_open = False    # a header popup of this leaf is open, see .draw_leaf_popups()
+
+        self._disposed = False
+        boxer.leaks.track( self )
+
+
+    def dispose(self) -> None:
+        """release what this container holds outside of Python objects: its outline
+        segments, the root's window handlers, overlay vertex list and view caches.
+        Called by `Container.change_container()` on the containers it removes,
+        safe to call more than once.
+        """
+        if self._disposed:
+            return
+        self._disposed = True
+        self.release_outline()
+        self.disconnect_mouse_router()
+        bus = boxer.events.get_bus( self.window ) if self.window else None
+        if bus is not None:
+            bus.unsubscribe_target( self )
+        if self.overlay_quad is not None:
+            self.overlay_quad.delete()
+            self.overlay_quad = None
+        if self.CONTAINER_DEBUG_LABEL:
+            self.debug_label_name.delete()
+        for cache in self.view_caches.values():
+            cache.delete()
+        self.view_caches.clear()
+        self._mouse_leaf = None
+        self._routed_split_handles.clear()
+
+
+    @staticmethod
+    def dispose_containers( containers : list['Container'], root : 'Container' ) -> None:
+        """dispose containers removed from the tree of `root`, and drop the root's
+        references to them"""
+        bus = boxer.events.get_bus( root.window ) if root.window else None
+        for container in containers:
+            if container is None or container is root:
+                continue
+            container.dispose()
+            if bus is not None:
+                bus.unsubscribe_target( container )
+            if root._mouse_leaf is container:
+                root._mouse_leaf = None
+            if isinstance( container, ( SplitContainer, GridContainer ) ):
+                root._routed_split_handles.difference_update( container.split_handles )
+
+
+    @staticmethod
+    def dispose_view( view : 'ContainerView', container : 'Container', root : 'Container' ) -> None:
+        """dispose a view removed from `container`: its window handlers, offscreen
+        cache and the view's own resources (`ContainerView.dispose()`)"""
+        if view is None:
+            return
+        if container.mouse_inside and root.window:
+            view.disconnect_handlers( root.event_bus )
+        cache = root.view_caches.pop( view, None )
+        if cache is not None:
+            cache.delete()
+        view.dispose()
+
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        Container.container_types[ cls.__name__ ] = cls
 
 
     def __del__(self) -> None:
@@ -244,6 +355,54 @@ class Container( pyglet.event.EventDispatcher ):
         return "%s at %s name:'%s'"%(type(self), id(self),self.name)
 
 
+    # geometry attributes read through to a boxer.layout.LayoutStore row when attached
+    @property
+    def position(self) -> pyglet.math.Vec2:
+        if self._layout_store is None:
+            return self._position
+        row = self._layout_row
+        return pyglet.math.Vec2( float(self._layout_store.x[row]), float(self._layout_store.y[row]) )
+
+
+    @position.setter
+    def position(self, value) -> None:
+        if self._layout_store is None:
+            self._position = pyglet.math.Vec2( value[0], value[1] )
+        else:
+            self._layout_store.x[self._layout_row] = value[0]
+            self._layout_store.y[self._layout_row] = value[1]
+
+
+    @property
+    def width(self):
+        if self._layout_store is None:
+            return self._width
+        return float(self._layout_store.width[self._layout_row])
+
+
+    @width.setter
+    def width(self, value) -> None:
+        if self._layout_store is None:
+            self._width = value
+        else:
+            self._layout_store.width[self._layout_row] = value
+
+
+    @property
+    def height(self):
+        if self._layout_store is None:
+            return self._height
+        return float(self._layout_store.height[self._layout_row])
+
+
+    @height.setter
+    def height(self, value) -> None:
+        if self._layout_store is None:
+            self._height = value
+        else:
+            self._layout_store.height[self._layout_row] = value
+
+
     @classmethod
     def register_container_view_type( cls, name : str, view_type : type['ContainerView']):
         """add a `ContainerView` type to the Container instance
@@ -262,6 +421,7 @@ class Container( pyglet.event.EventDispatcher ):
             child.window = self.window
             # child.connect_to_window_mouse_events( child.window )
             self.children.append( child )
+            Container.structure_changed()
 
 
     def remove_children(self, old_children : list['Container'] | None = None) -> list['Container']:
@@ -280,13 +440,13 @@ class Container( pyglet.event.EventDispatcher ):
                 self.children[idx] = None
     
                 if child.window:
-                    # self.window.remove_handlers(on_mouse_motion=child.on_mouse_motion)
-                    child.window.remove_handlers(on_mouse_motion=child.on_mouse_motion)
                     child.remove_handlers( )
                     child.window = None
+                child.release_outline()
                 old_children = child.remove_children( old_children )
   
         self.children=[]
+        Container.structure_changed()
         return old_children
 
 
@@ -301,15 +461,21 @@ class Container( pyglet.event.EventDispatcher ):
             child.window = None
             idx = self.children.index( child )
             if self.window:
-                self.window.remove_handlers(on_mouse_motion=child.on_mouse_motion)
                 self.remove_handlers( )
             self.children[idx] = None
-            # the pyglet shapes (Lines) need to be derleted from the batch
+            # the outline segments need to be released from the batch's renderer
             # otherwise they stay after self is disconnected.
-            child.lines={}
+            child.release_outline()
+            Container.structure_changed()
         return idx
 
 
+    def release_outline(self) -> None:
+        """stop drawing this container's outline, and free its renderer slots"""
+        self._outline_finalizer()
+        self._outline_slot = None
+
+
     def set_child(self, child, index=0) -> None:
         """sets a child to a specific child index
         if the index > len(self.children) the children list is extended by Nones
@@ -321,6 +487,7 @@ class Container( pyglet.event.EventDispatcher ):
         child.parent = self
         child.window = self.window
         self.children[index] = child
+        Container.structure_changed()
 
 
     def replace_child(self, old_child, new_child ):
@@ -390,11 +557,50 @@ class Container( pyglet.event.EventDispatcher ):
 
 
     def get_root_container(self):
-        """scans up to find rootiest node"""
+        """scans up to find rootiest node
+        the result is cached until the structure of any tree changes, so repeated
+        calls (per frame, per action) are O(1)
+        """
         # print("get root container %s"%self.name)
-        if self.parent == None:
-            return self
-        return self.parent.get_root_container()
+        root, version = self._root_cache
+        if version == Container._structure_version:
+            return root
+        root = self
+        while root.parent is not None:
+            root = root.parent
+        self._root_cache = (root, Container._structure_version)
+        return root
+
+
+    @staticmethod
+    def structure_changed() -> None:
+        """invalidate cached roots, call after changing .children or .parent directly"""
+        Container._structure_version += 1
+
+
+    def get_container_by_id(self, node_id : int) -> 'Container | None':
+        """on a root, the Container with `._node_id`, as numbered by `.update_structure()`"""
+        if 0 <= node_id < len(self.containers_by_id):
+            return self.containers_by_id[node_id]
+        return None
+
+
+    def get_container_by_path(self, path : str) -> 'Container | None':
+        """on a root, the Container at a path of names from the root, eg. `"root/root_hsplit/root_hsplit_cleft"`"""
+        return self.containers_by_path.get( path )
+
+
+    def get_container_by_name(self, name : str) -> 'Container | None':
+        """on a root, the first Container (in preorder) called `name`"""
+        return self.containers_by_name.get( name )
+
+
+    def has_container(self, container : 'Container') -> bool:
+        """on a root, True if `container` was in the tree at the last `.update_structure()`"""
+        node_id = container._node_id
+        return node_id is not None\
+                and node_id < len(self.containers_by_id)\
+                and self.containers_by_id[node_id] is container
 
 
     def get_child_position(self, this):
@@ -441,16 +647,46 @@ class Container( pyglet.event.EventDispatcher ):
             child.pprint_tree( depth+1 )
 
 
-    def update_geometries( self ) -> None:
-        """traverse all children and update all geometries, positions, etc"""
+    def update_geometries( self, only_changed : bool = False ) -> None:
+        """traverse all children and update all geometries, positions, etc
+
+        `only_changed` : `bool`
+            incremental pass. Only nodes whose rect changed since the last pass,
+            or that were marked with `.invalidate_geometry()`, update their Lines,
+            views etc. Clean subtrees are skipped entirely.
+        """
         # print("\033[38;5;215mContainer update_geometries\033[0m (%s)"%self.name)
+        if self._layout_store is not None:
+            self._layout_store.update_geometries( only_changed )
+            return
+
         self.get_available_size_from_parent()
         self.get_position_from_parent()
 
+        rect = (self.position.x, self.position.y, self.width, self.height)
+        changed = self._geometry_dirty or rect != self._layout_rect
+        self._layout_rect = rect
+        self._geometry_dirty = False
+        self._geometry_dirty_descendants = False
+
+        if changed or not only_changed:
+            self.update_node_geometry()
+
+        for child in [c for c in self.children if c is not None]:
+            if not only_changed or changed\
+                    or child._geometry_dirty or child._geometry_dirty_descendants:
+                child.update_geometries( only_changed )
+
+
+    def update_node_geometry( self ) -> None:
+        """update the graphical things of this node only (Lines, labels, view)
+        from its current position and size.
+        Subclasses extend this for their own decorations (handles, ratio lines)
+        """
         margin = 1#3
 
         if self.is_root:
-            self.overlay_quad.position = (self.position.x, self.position.y + self.height, 0.0, # type: ignore
+            self.get_overlay_quad().position = (self.position.x, self.position.y + self.height, 0.0, # type: ignore
                                             self.position.x + self.width, self.position.y + self.height, 0.0,
                                             self.position.x + self.width, self.position.y, 0.0,
                                             self.position.x, self.position.y, 0.0)
@@ -463,29 +699,11 @@ class Container( pyglet.event.EventDispatcher ):
             else:
                 self.debug_label_name.opacity = 0
 
-        # self.lines["left"].x = self.position.x + margin
-        # self.lines["left"].y = self.position.y + margin
-        self.lines["left"].position = ( self.position.x + margin, self.position.y + margin )
-        self.lines["left"].x2 = self.position.x + margin
-        self.lines["left"].y2 = self.position.y + self.height - margin
-
-        # self.lines["top"].x = self.position.x + margin #-1
-        # self.lines["top"].y = self.position.y + self.height - margin
-        self.lines["top"].position = ( self.position.x + margin, self.position.y + self.height - margin )
-        self.lines["top"].x2 = self.position.x + self.width - margin
-        self.lines["top"].y2 = self.position.y + self.height - margin
-
-        # self.lines["right"].x = self.position.x + self.width - margin
-        # self.lines["right"].y = self.position.y + self.height - margin
-        self.lines["right"].position = ( self.position.x + self.width - margin, self.position.y + self.height - margin )
-        self.lines["right"].x2 = self.position.x + self.width - margin
-        self.lines["right"].y2 = self.position.y + margin #+ 1
-
-        # self.lines["bottom"].x = self.position.x + margin
-        # self.lines["bottom"].y = self.position.y + margin
-        self.lines["bottom"].position = ( self.position.x + margin, self.position.y + margin )
-        self.lines["bottom"].x2 = self.position.x + self.width -margin
-        self.lines["bottom"].y2 = self.position.y + margin
+        if self._outline_slot is not None:
+            self._outline_renderer.set_rect( self._outline_slot,
+                                        self.position.x, self.position.y,
+                                        self.width, self.height,
+                                        margin )
 
 
         self.update_display()
@@ -495,8 +713,39 @@ class Container( pyglet.event.EventDispatcher ):
                 self.root_container.container_views[self].update_geometries( self )
             self.root_container.dispatch_event("resized", self)
 
-        for child in [c for c in self.children if c is not None]:
-            child.update_geometries()
+
+    def invalidate_geometry( self ) -> None:
+        """mark this node's geometry as needing a relayout
+        (eg. after changing a size or split ratio).
+
+        Only this node's subtree is recomputed by the next `.update_dirty_geometries()`,
+        ancestors are flagged so the pass can find the dirty subtree without
+        walking clean branches.
+        """
+        self._geometry_dirty = True
+        if self._layout_store is not None:
+            self._layout_store.dirty_rows.add( self._layout_row )
+        parent = self.parent
+        while parent is not None and not parent._geometry_dirty_descendants:
+            parent._geometry_dirty_descendants = True
+            parent = parent.parent
+        boxer.redraw.invalidate( ( self.position[0], self.position[1], self.width, self.height ) )
+
+
+    @property
+    def geometry_dirty( self ) -> bool:
+        """True if this node or any of its descendants needs a relayout"""
+        return self._geometry_dirty or self._geometry_dirty_descendants
+
+
+    def update_dirty_geometries( self ) -> None:
+        """incremental layout pass, normally run once per frame on the root
+        (see `Container.draw()`).
+        Recomputes only the subtrees marked with `.invalidate_geometry()`, and
+        only touches the Lines and views of nodes whose rect actually changed.
+        """
+        if self.geometry_dirty:
+            self.update_geometries( only_changed = True )
 
 
     def update_display( self, ) -> None:
@@ -513,62 +762,96 @@ class Container( pyglet.event.EventDispatcher ):
             else:
                 self.debug_label_name.text = ""
 
-        if self.mouse_inside:
-            for lk in self.lines.items():
-                lk[1].width = 0.5#1.5
-                lk[1].opacity = self._lines_original_color[3] + 65 #255
-        else:
-            if self.is_leaf:
-                for lk in self.lines.items():
-                    lk[1].width = .5
-                    lk[1].opacity = self._lines_original_color[3]
+        if self._outline_slot is not None:
+            if self.mouse_inside:
+                opacity = self._lines_original_color[3] + 65 #255
+            elif self.is_leaf:
+                opacity = self._lines_original_color[3]
             else:
-                for lk in self.lines.items():
-                    lk[1].opacity = 0        
+                opacity = 0
+            self._outline_renderer.set_color( self._outline_slot, self._lines_original_color[:3] + (opacity,), 4 )
 
 
-    # def update_structure( self, depth : int = 0, count : int = 0, leaves = None, root = None ) -> tuple[int, list, 'Container']:
-    def update_structure( self, depth : int = 0, count : int = 0, leaves = None, root = None ) -> tuple[int, list, 'Container']:
-        """Update internal structure data, like is_leaf, unique ids, pushing and
-        popping events handlers.
+    def update_structure( self ) -> tuple[int, list, 'Container']:
+        """Update internal structure data, like is_leaf, unique ids, depths,
+        pushing and popping events handlers.
         Push and pop handlers to additional subscribers.
         Call this after adding or removing or replacing children of the tree.
-        """
-        if leaves is None:
-            leaves = []
 
-        self._depth = depth
-        self._node_id = count
-        count += 1
-
-        if depth == 0:
-            self.is_root = True
-            root = self
-            self.root_container = self
-            self.root_container.split_containers = []
-        else:
-            assert root is not None
-            self.root_container = root
+        Walks the tree once (iterative, preorder), and builds the root's `.leaves`,
+        `.split_containers`, and the lookup indexes `.containers_by_id`,
+        `.containers_by_path` and `.containers_by_name`.
+        The root is cached on every node (`.root_container`, `.get_root_container()`).
 
-        if isinstance(self, SplitContainer):
-            self.root_container.split_containers.append( self )
-
-        if self.window:
-            self.window.remove_handlers(on_mouse_motion=self.on_mouse_motion)
+        `returns`
+            ( node count, leaves, root )
+        """
+        root = self
+        version = Container._structure_version
 
-        if len(self.children) == 0:
-            self.is_leaf = True
-            leaves.append( self )
-            if self.window:
-                self.window.push_handlers(on_mouse_motion=self.on_mouse_motion)
-        else:
-            self.is_leaf = False
-            self.mouse_inside = False
-            if self in leaves:
-                leaves.remove(self)
-            for child in self.children:
-                count, leaves, root = child.update_structure( depth+1, count, leaves, root )
-        return count, leaves, root
+        leaves = []
+        split_containers = []
+        containers_by_id = []
+        containers_by_path = {}
+        containers_by_name = {}
+
+        stack = [ (self, 0, self.name) ]
+        while stack:
+            node, depth, path = stack.pop()
+
+            node._depth = depth
+            node._node_id = len( containers_by_id )
+            node._path = path
+            node.is_root = node is root
+            node.root_container = root
+            node._root_cache = (root, version)
+
+            containers_by_id.append( node )
+            containers_by_path.setdefault( path, node )
+            containers_by_name.setdefault( node.name, node )
+
+            if isinstance(node, ( SplitContainer, GridContainer )):
+                split_containers.append( node )
+
+            if len(node.children) == 0:
+                node.is_leaf = True
+                leaves.append( node )
+            else:
+                node.is_leaf = False
+                node.mouse_inside = False
+                # push reversed, so children pop in order (preorder ids)
+                for child in reversed( node.children ):
+                    if child is not None:
+                        stack.append( (child, depth + 1, path + "/" + child.name) )
+
+        self.leaves = leaves
+        self.split_containers = split_containers
+        self.containers_by_id = containers_by_id
+        self.containers_by_path = containers_by_path
+        self.containers_by_name = containers_by_name
+
+        self.update_layout_store()
+        self.connect_mouse_router()
+        if self._mouse_leaf is not None\
+                and not ( self._mouse_leaf.is_leaf and self.has_container( self._mouse_leaf ) ):
+            # the hovered leaf was split or closed
+            self._mouse_leaf = None
+        return len( containers_by_id ), leaves, root
+
+
+    def update_layout_store(self) -> None:
+        """(re)build the array backed boxer.layout.LayoutStore for this root's tree
+        if `.array_layout` is set, otherwise detach from any previous store.
+        Called from `.update_structure()`
+        """
+        if self._layout_store is not None:
+            self._layout_store.detach()
+        if self.array_layout:
+            store = boxer.layout.LayoutStore.from_tree( self )
+            if store is None:
+                print("\033[38;5;196mupdate_layout_store: tree under '%s' is not supported by boxer.layout, using recursive layout\033[0m"%self.name)
+            else:
+                store.attach()
 
 
     def update(self) -> None:
@@ -582,8 +865,449 @@ class Container( pyglet.event.EventDispatcher ):
         self.update_geometries()  
 
 
+    @staticmethod
+    def get_subtree_leaves( container : 'Container' ) -> list['Container']:
+        """the leaves below `container` (not including `container`), from the
+        children lists, so it doesn't rely on `.update_structure()` being current"""
+        leaves = []
+        stack = [ c for c in reversed( container.children ) if c is not None ]
+        while stack:
+            node = stack.pop()
+            if len(node.children) == 0:
+                leaves.append( node )
+            else:
+                stack.extend( [ c for c in reversed( node.children ) if c is not None ] )
+        return leaves
+
+
+    @staticmethod
+    def get_subtree_nodes( container : 'Container' ) -> list['Container']:
+        """every container below `container` (not including `container`), preorder"""
+        nodes = []
+        stack = [ c for c in reversed( container.children ) if c is not None ]
+        while stack:
+            node = stack.pop()
+            nodes.append( node )
+            stack.extend( [ c for c in reversed( node.children ) if c is not None ] )
+        return nodes
+
+
+    # layout snapshots ---------------------------------------------------------
+    # The tree as plain, json ready dicts: container types and names, split ratios
+    # and ratio modes, and each leaf's view type with the view's own state
+    # (`ContainerView.as_json()`).
+    #
+    #   data = root.as_json()
+    #   root.restore_layout( data )
+    #
+    # `.restore_layout()` builds the saved containers directly under the root, in
+    # one transaction, so a layout of any size costs one structure pass and one
+    # geometry pass (no `Container.change_container()` replay, one split at a time).
+
+    def as_json(self) -> dict:
+        """write this container and its subtree as a json ready dict"""
+        data = {
+            "type": type(self).__name__,
+            "name": self.name,
+        }
+        data.update( self.layout_as_json() )
+
+        view = self.get_root_container().container_views.get( self )
+        if view is not None:
+            view_type = Container.get_view_type_of( view )
+            data["view"] = {
+                "type": view_type[0] if view_type else view.string_name,
+                "state": view.as_json(),
+            }
+
+        children = [ child for child in self.children if child is not None ]
+        if children:
+            data["children"] = [ child.as_json() for child in children ]
+        return data
+
+
+    def layout_as_json(self) -> dict:
+        """the layout parameters of this container type (split ratios, tracks ..)
+        for `.as_json()`, subclasses override this with `.set_layout_from_json()`"""
+        return {}
+
+
+    def set_layout_from_json(self, data : dict) -> None:
+        """set the layout parameters written by `.layout_as_json()`"""
+        ...
+
+
+    @staticmethod
+    def get_view_type( name : str ) -> list | None:
+        """the `[ name, ContainerView subclass ]` entry of `Container.container_view_types` named `name`"""
+        for view_type in Container.container_view_types:
+            if view_type[0] == name:
+                return view_type
+        return None
+
+
+    @staticmethod
+    def get_view_type_of( view : 'ContainerView' ) -> list | None:
+        """the `[ name, ContainerView subclass ]` entry of `Container.container_view_types` of `view`"""
+        for view_type in Container.container_view_types:
+            if view_type[1] is type( view ):
+                return view_type
+        return None
+
+
+    def restore_layout(self, data : dict) -> None:
+        """replace the tree under this root by the snapshot `data` (from `.as_json()`)
+
+        The current views are disposed of, and `"collapsed"` is dispatched for the
+        current leaves. The saved containers and views are created directly, then
+        the transaction commit runs the one `.update()` and dispatches `"view_changed"`
+        for the restored views.
+        """
+        root = self.get_root_container()
+        print("\033[38;5;63m--- [txn] restore_layout:\033[0m '%s'"%root.name)
+        with root.transaction():
+            old_leaves = [ root ] + Container.get_subtree_leaves( root )
+            for leaf in old_leaves:
+                _view = root.container_views.pop( leaf, None )
+                if _view is not None:
+                    root.container_view_types_active.get( type(_view), weakref.WeakSet() ).discard( leaf )
+                    Container.dispose_view( _view, leaf, root )
+            Container.dispose_containers( root.remove_children(), root )
+            for leaf in old_leaves[1:]:
+                root.dispatch_structure_event( "collapsed", leaf, root )
+
+            root._restore_view( root, data.get( "view" ) )
+            for index, child_data in enumerate( data.get( "children", [] ) ):
+                root.set_child( root._container_from_json( child_data ), index )
+            root.update_after_change()
+
+
+    def _new_container(self, data : dict) -> 'Container':
+        """on the root, create the container of snapshot `data`, without children or view"""
+        cls = Container.container_types.get( data.get( "type" ), Container )
+        container = cls( name = data.get( "name", "container" ), window = self.window, batch = self.batch )
+        container.set_layout_from_json( data )
+        if self.in_transaction:
+            self._transaction_created.add( container )
+        return container
+
+
+    def _container_from_json(self, data : dict) -> 'Container':
+        """on the root, create the container (and subtree) of snapshot `data`"""
+        container = self._new_container( data )
+        for index, child_data in enumerate( data.get( "children", [] ) ):
+            container.set_child( self._container_from_json( child_data ), index )
+        self._restore_view( container, data.get( "view" ) )
+        return container
+
+
+    def _restore_view(self, container : 'Container', data : dict | None) -> None:
+        """on the root, create the view of snapshot `data` in `container`
+        (the geometry pass of the commit reflows it)"""
+        if not data:
+            return
+        view_type = Container.get_view_type( data.get( "type" ) )
+        if view_type is None or view_type[1] is None:
+            print("\033[38;5;196mrestore_layout: unknown view type '%s' in '%s', skipped\033[0m"%(data.get( "type" ), container.name))
+            return
+        view : ContainerView = view_type[1]()
+        boxer.leaks.track( view )
+        view.from_json( data.get( "state", {} ) )
+        self._attach_view( container, view, view_type )
+
+
+    def _attach_view(self, container : 'Container', view : 'ContainerView', view_type : list) -> None:
+        """on the root, register `view` as the view of `container`"""
+        self.container_views[ container ] = view
+        self.container_view_types_active.setdefault( view_type[1], weakref.WeakSet() ).add( container )
+        container.container_view_combo_selected = Container.container_view_types.index( view_type )
+        self.dispatch_structure_event( "view_changed", container, view )
+
+
+    # layout patching ----------------------------------------------------------
+    # `.apply_layout()` changes the live tree into a snapshot (from `.as_json()`)
+    # with as few changes as it can: containers of the same type at the same place
+    # are kept (renamed, ratios set), a leaf that becomes a split is kept as the
+    # split's first child (as `Container.change_container()` splits do), and live
+    # views are kept in their container or moved to a container that wants a view
+    # of their type (as `Container.change_container_view_on_split()` moves them).
+    # Only the containers and views that differ are created or disposed of, so
+    # switching between saved layouts keeps the views' state and GL resources.
+
+    def apply_layout(self, data : dict) -> dict[str, int]:
+        """patch the tree of this root into the snapshot `data`, in one transaction
+
+        `returns`
+            counts of the changes: `{ "containers_created", "containers_removed",
+            "views_created", "views_moved", "views_removed" }`
+        """
+        root = self.get_root_container()
+        print("\033[38;5;63m--- [txn] apply_layout:\033[0m '%s'"%root.name)
+        stats = dict.fromkeys( ( "containers_created", "containers_removed",
+                                "views_created", "views_moved", "views_removed" ), 0 )
+        with root.transaction():
+            old_leaves = set( root.leaves )
+            removed = []            # containers dropped from the tree
+            wanted_views = []       # [ (container, view snapshot) ]
+
+            root.name = data.get( "name", root.name )
+            if data.get( "view" ):
+                wanted_views.append( ( root, data["view"] ) )
+            root._patch_children( root, list( root.children ), data.get( "children", [] ), removed, wanted_views, stats )
+
+            root._patch_views( wanted_views, stats )
+
+            Container.dispose_containers( removed, root )
+            stats["containers_removed"] = len( removed )
+            for container in removed:
+                if container in old_leaves:
+                    root.dispatch_structure_event( "collapsed", container, root )
+            root.update_after_change()
+        print("\033[38;5;63m--- [txn] apply_layout:\033[0m %s"%stats)
+        return stats
+
+
+    def _patch_node(self, node : 'Container | None', data : dict, removed : list, wanted_views : list, stats : dict) -> 'Container':
+        """on the root, the container for snapshot `data`, reusing `node` (and its
+        subtree) where the types match"""
+        cls = Container.container_types.get( data.get( "type" ), Container )
+        if node is not None and type( node ) is cls:
+            container = node
+            container.name = data.get( "name", container.name )
+            container.set_layout_from_json( data )
+            reuse = list( container.children )
+        else:
+            container = self._new_container( data )
+            stats["containers_created"] += 1
+            reuse = []
+            if node is not None:
+                if len( node.children ):
+                    # a split changing type: keep its children, drop the split.
+                    # Detached like .remove_child() does (without releasing the
+                    # reused children's outlines), so the structure indexes, root
+                    # caches and layout store don't keep it
+                    reuse = list( node.children )
+                    for child in reuse:
+                        if child is not None:
+                            child.parent = None
+                    node.children = []
+                    if node.parent is not None and node in node.parent.children:
+                        node.parent.children[ node.parent.children.index( node ) ] = None
+                    node.parent = None
+                    Container.structure_changed()
+                    removed.append( node )
+                else:
+                    # a leaf becoming a split: keep it as the first child
+                    reuse = [ node ]
+
+        if data.get( "view" ):
+            wanted_views.append( ( container, data["view"] ) )
+        self._patch_children( container, reuse, data.get( "children", [] ), removed, wanted_views, stats )
+        return container
+
+
+    def _patch_children(self, container : 'Container', reuse : list, children_data : list, removed : list, wanted_views : list, stats : dict) -> None:
+        """on the root, patch `container`'s children into `children_data`, reusing
+        the containers in `reuse` by position"""
+        reuse = [ child for child in reuse if child is not None ]
+        for index, child_data in enumerate( children_data ):
+            old = reuse[index] if index < len( reuse ) else None
+            child = self._patch_node( old, child_data, removed, wanted_views, stats )
+            if index >= len( container.children ) or container.children[index] is not child:
+                container.set_child( child, index )
+
+        # children the snapshot doesn't have
+        for child in reuse[ len( children_data ): ]:
+            removed.append( child )
+            removed.extend( Container.get_subtree_nodes( child ) )
+        if len( container.children ) > len( children_data ):
+            container.children = container.children[ :len( children_data ) ]
+            Container.structure_changed()
+
+
+    def _patch_views(self, wanted_views : list, stats : dict) -> None:
+        """on the root, give each container of `wanted_views` a view of the snapshot's
+        type: its current view, else a live view of that type no longer wanted where
+        it is (preferring one from a container of the same name), else a new view.
+        Live views left over are disposed of."""
+        kept = {}       # container -> view, views staying in their container
+        for container, view_data in wanted_views:
+            view = self.container_views.get( container )
+            view_type = Container.get_view_type( view_data.get( "type" ) )
+            if view is not None and view_type is not None and type( view ) is view_type[1]:
+                kept[container] = view
+
+        # { view class : [ (old container, view) ] } of the views free to move
+        pool : dict[ type[ContainerView], list ] = {}
+        for container, view in list( self.container_views.items() ):
+            if kept.get( container ) is view:
+                continue
+            self.container_views.pop( container )
+            self.container_view_types_active.get( type(view), weakref.WeakSet() ).discard( container )
+            if container.mouse_inside and self.window:
+                view.disconnect_handlers( self.event_bus )
+            pool.setdefault( type(view), [] ).append( ( container, view ) )
+            self.dispatch_structure_event( "view_changed", container, view )
+
+        for container, view_data in wanted_views:
+            view = kept.get( container )
+            if view is not None:
+                view.from_json( view_data.get( "state", {} ) )
+                continue
+            view_type = Container.get_view_type( view_data.get( "type" ) )
+            candidates = pool.get( view_type[1] ) if view_type is not None else None
+            if not candidates:
+                self._restore_view( container, view_data )
+                stats["views_created"] += int( container in self.container_views )
+                continue
+            pick = 0
+            for i, ( old_container, _ ) in enumerate( candidates ):
+                if old_container.name == container.name:
+                    pick = i
+                    break
+            old_container, view = candidates.pop( pick )
+            view.from_json( view_data.get( "state", {} ) )
+            self._attach_view( container, view, view_type )
+            if old_container is not container:
+                stats["views_moved"] += 1
+
+        for candidates in pool.values():
+            for old_container, view in candidates:
+                Container.dispose_view( view, old_container, self )
+                stats["views_removed"] += 1
+
+
+    # layout transactions ------------------------------------------------------
+    # Batch several `Container.change_container()` actions: the tree is changed
+    # straight away (re-linking parents and children is cheap), but the structure
+    # pass, the geometry pass, view reflows and the events run once, at the commit.
+    #
+    #   with root.transaction():
+    #       leaves = Container.change_container( root, Container.ACTION_SPLIT_HORIZONTAL )
+    #       Container.change_container( leaves[1], Container.ACTION_SPLIT_VERTICAL )
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """context manager for `.begin_transaction()` / `.commit_transaction()` on the root"""
+        root = self.get_root_container()
+        root.begin_transaction()
+        try:
+            yield root
+        finally:
+            root.commit_transaction()
+
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._transaction_depth > 0
+
+
+    def begin_transaction(self) -> None:
+        """start (or nest) a transaction on this root"""
+        self._transaction_depth += 1
+
+
+    def commit_transaction(self) -> None:
+        """end a transaction, the outermost commit applies the changes:
+        one `.update()`, then the coalesced events (see `._coalesce_transaction_events()`)
+        """
+        if self._transaction_depth == 0:
+            raise RuntimeError("commit_transaction() on '%s' without begin_transaction()"%self.name)
+        self._transaction_depth -= 1
+        if self._transaction_depth > 0:
+            return
+
+        events = self._transaction_events
+        created = self._transaction_created
+        self._transaction_events = []
+        self._transaction_created = set()
+
+        if self._transaction_pending_update:
+            self._transaction_pending_update = False
+            self.update()
+            print("\033[38;5;63m--- [txn] commit_transaction:\033[0m '%s' %s nodes, %s events"%(self.name, len(self.containers_by_id), len(events)))
+
+        for event_type, args in self._coalesce_transaction_events( events, created ):
+            self.dispatch_event( event_type, *args )
+
+
+    def update_after_change(self) -> None:
+        """on the root, after a structural change: `.update()` now, or at the
+        transaction commit"""
+        if self.in_transaction:
+            self._transaction_pending_update = True
+        else:
+            self.update()
+            self.pprint_tree()
+            boxer.redraw.invalidate()
+
+
+    def dispatch_structure_event(self, event_type : str, *args) -> None:
+        """on the root, dispatch `"split"`, `"collapsed"`, `"view_changed"` now, or
+        queue it until the transaction commit"""
+        if self.in_transaction:
+            self._transaction_events.append( (event_type, args) )
+        else:
+            self.dispatch_event( event_type, *args )
+
+
+    def _coalesce_transaction_events(self, events : list, created : set) -> list:
+        """reduce a transaction's queued events to the changes visible from outside it
+
+        - consecutive splits of new leaves fold into the first `"split"`, whose leaves
+          become the final leaves (of the ones still in the tree)
+        - `"collapsed"` is dropped for containers created inside the transaction
+        - `"view_changed"` is kept once per container (the last one), for
+          containers still in the tree
+        """
+        coalesced = []
+        split_by_leaf = {}      # new leaf -> its "split" entry
+        view_changed_at = {}    # container -> index in coalesced
+        for event_type, args in events:
+            match event_type:
+                case "split":
+                    original, leaves, root = args
+                    entry = split_by_leaf.pop( original, None )
+                    if entry is None:
+                        entry = [ original, list(leaves), root ]
+                        coalesced.append( ("split", entry) )
+                    else:
+                        i = entry[1].index( original )
+                        entry[1][i:i+1] = leaves
+                    for leaf in leaves:
+                        split_by_leaf[leaf] = entry
+                case "collapsed":
+                    if args[0] not in created:
+                        coalesced.append( (event_type, args) )
+                case "view_changed":
+                    if args[0] in view_changed_at:
+                        coalesced[ view_changed_at[args[0]] ] = None
+                    view_changed_at[args[0]] = len(coalesced)
+                    coalesced.append( (event_type, args) )
+                case _:
+                    coalesced.append( (event_type, args) )
+
+        result = []
+        for item in coalesced:
+            if item is None:
+                continue
+            event_type, args = item
+            if event_type == "split":
+                args = ( args[0], [ leaf for leaf in args[1] if self.has_container( leaf ) ], args[2] )
+            elif event_type == "view_changed" and not self.has_container( args[0] ):
+                continue
+            result.append( (event_type, tuple(args)) )
+        return result
+
+
     def draw_leaf(self, extras = []):
-        """draw self as a leaf (only draws as a single leaf container)"""
+        """draw self as a leaf (only draws as a single leaf container)
+
+        The header chrome (cog, view type and action buttons) goes into imgui's
+        background draw list, hit tested by hand (see `.draw_leaf_chrome()`), so
+        a leaf costs no imgui window. Windows are only begun for this leaf's open
+        popups, and for views that draw their own imgui (`extras`).
+        """
         # maybe just draw a coloured outline
         # NO DRAW, ONLY BATCH.
 
@@ -597,17 +1321,74 @@ class Container( pyglet.event.EventDispatcher ):
             return
         #----------------------------------------------------------------------
 
-        pos = self.position
+        # top of the leaf, in imgui's (y down) screen space
+        top = self.window.height - self.position[1] - self.height
+
+        if self.width >= self.CHROME_MIN_WIDTH:
+            self.draw_leaf_chrome( top )
+
+        if extras:
+            self.draw_leaf_window( top, extras )
+
+        if self._chrome_popups_open:
+            self.draw_leaf_popups()
+
+
+    def draw_leaf_chrome(self, top : float) -> None:
+        """draw the header buttons of the leaf into the background draw list,
+        and open their popups when they're clicked"""
+        x = self.position[0]
+        buttons = (
+            ( "cog", x + 3.0, (0.0, 0.0), (1.0, 1.0) ),
+            ( "view-combo", x + 3.0 + self.CHROME_BUTTON_SIZE, (0.0, 1.0), (1.0, 0.0) ),
+            ( "downarrow", x + self.width - (15+3.0), (0.0, 1.0), (1.0, 0.0) ),
+        )
+        y = top + 3.0
+        size = self.CHROME_BUTTON_SIZE
+
+        draw_list = imgui.get_background_draw_list()
+        draw_list.push_clip_rect( x, top, x + self.width - 1, top + self.height - 1 )
+        texture_id = boxer.resource_manager.icon_texture_id()
+
+        # hit test only the leaf under the mouse, and not through an open popup
+        hovered = None
+        mouse_x, mouse_y = imgui.get_mouse_pos()
+        if x <= mouse_x < x + self.width and y <= mouse_y < y + size:
+            if not ( imgui.is_popup_open( "", imgui.POPUP_ANY_POPUP_ID | imgui.POPUP_ANY_POPUP_LEVEL )
+                    and imgui.is_window_hovered( imgui.HOVERED_ANY_WINDOW ) ):
+                for name, button_x, _, _ in buttons:
+                    if button_x <= mouse_x < button_x + size:
+                        hovered = name
+
+        for name, button_x, uv0, uv1 in buttons:
+            if name == hovered:
+                alpha = 0.3 if imgui.is_mouse_down( 0 ) else 0.2
+                draw_list.add_rect_filled( button_x, y, button_x + size, y + size,
+                                        imgui.get_color_u32_rgba( 1.0, 1.0, 1.0, alpha ), 2.0 )
+            uv0, uv1 = boxer.resource_manager.icon_uv( self.icons[name], uv0, uv1 )
+            draw_list.add_image( texture_id, ( button_x + 1.0, y + 1.0 ), ( button_x + size - 1.0, y + size - 1.0 ), uv0, uv1 )
+        draw_list.pop_clip_rect()
+
+        if hovered is None or not imgui.is_mouse_clicked( 0 ):
+            return
+        match hovered:
+            case "view-combo":
+                self.open_leaf_popup( "container-view-type", x + 3.0 + 12, y + size )
+            case "downarrow":
+                self.open_leaf_popup( "container-actions", x + self.width - (15+3.0), top + 19 )
+
+
+    def open_leaf_popup(self, popup : str, x : float, y : float) -> None:
+        """open one of the leaf's popups at screen position `x`, `y` (y down)"""
+        imgui.push_id( self.name )
+        imgui.set_next_window_position( x, y )
+        imgui.open_popup( popup )
+        imgui.pop_id()
+        self._chrome_popups_open = True
 
-        # imgui ----------------------------------------------------------------
-        # no decoration / no collapsible title bar
-                            # imgui.WINDOW_NO_TITLE_BAR\
-                            # | imgui.WINDOW_NO_BACKGROUND\
-                            # | imgui.WINDOW_NO_RESIZE\
-                            # | imgui.WINDOW_NO_SAVED_SETTINGS\
-                            # | imgui.WINDOW_NO_SCROLLBAR\
-                            # | imgui.WINDOW_NO_BRING_TO_FRONT_ON_FOCUS
 
+    def draw_leaf_window(self, top : float, extras : list) -> None:
+        """one imgui window over the leaf, for the imgui of its view"""
         container_imwindow_flags = imgui.WINDOW_NO_TITLE_BAR\
                             | imgui.WINDOW_NO_BACKGROUND\
                             | imgui.WINDOW_NO_RESIZE\
@@ -615,136 +1396,83 @@ class Container( pyglet.event.EventDispatcher ):
                             | imgui.WINDOW_NO_SCROLLBAR\
                             | imgui.WINDOW_NO_BRING_TO_FRONT_ON_FOCUS
 
-        # with title bar
-        container_imwindow_flags2 = imgui.WINDOW_NO_BACKGROUND\
-                            | imgui.WINDOW_NO_RESIZE\
-                            | imgui.WINDOW_NO_SAVED_SETTINGS
-
-        imgui.set_next_window_position(\
-                            pos[0],
-                            self.window.height - pos[1] - self.height)
-
-        imgui.set_next_window_size(\
-                            self.width-1,
-                            self.height)
-
+        imgui.set_next_window_position( self.position[0], top )
+        imgui.set_next_window_size( self.width-1, self.height )
         imgui.push_style_var(imgui.STYLE_WINDOW_PADDING , imgui.Vec2(3.0, 3.0)) # type: ignore
+        with imgui.begin(self.name, flags = container_imwindow_flags ):
+            for e in extras:
+                e()
+        imgui.pop_style_var()
 
-        imgui.push_style_var(imgui.STYLE_FRAME_ROUNDING, 2.0)
-        imgui.push_style_var(imgui.STYLE_ITEM_SPACING, imgui.Vec2(-1.0, 0.0)) # type: ignore
-        imgui.push_style_color(imgui.COLOR_BUTTON, 0.0, 0.0, 0.0, 0.0)
-        imgui.push_style_color(imgui.COLOR_BUTTON_ACTIVE, 1.0, 1.0, 1.0, 0.3)
-        imgui.push_style_color(imgui.COLOR_BUTTON_HOVERED, 1.0, 1.0, 1.0, 0.2)
-        
-        with imgui.begin(self.name, flags = container_imwindow_flags ) as imgui_window:
-            imgui.push_clip_rect(\
-                            pos[0],
-                            self.window.height - pos[1] - self.height,
-                            pos[0] + self.width -1,
-                            self.window.height - pos[1] - 1)
-            imgui.push_style_var(imgui.STYLE_FRAME_PADDING, imgui.Vec2(1.0, 1.0)) # type: ignore
-            imgui.push_style_var(imgui.STYLE_ITEM_SPACING, imgui.Vec2(0.0, 0.0)) # type: ignore
-            imgui.image_button( self.textures["cog"].id, 12, 12)
-            imgui.same_line()
-
-            imgui.push_item_width(80)
-
-            # viewtype combo ---------------------------------------------------
-            imgui.image_button( self.textures["view-combo"].id, 12, 12, uv0=(0.0, 1.0), uv1=(1.0, 0.0) )
-            if imgui.is_item_clicked( 0 ):
-                curr_cursor_pos = imgui.get_cursor_screen_position()  # type: ignore
-                popup_pos = imgui.Vec2( curr_cursor_pos.x+12, curr_cursor_pos.y ) # type: ignore
-                imgui.set_next_window_position( popup_pos.x, popup_pos.y )
-                imgui.open_popup( "container-view-type" )
-
-            imgui.same_line() 
-            with imgui.begin_popup( "container-view-type" ) as container_view_popup:
-                imgui.push_style_var(imgui.STYLE_ITEM_SPACING, imgui.Vec2(3.0, 3.0))
-                if container_view_popup.opened:
-                    imgui.text("view type")
-                    imgui.separator()
-
-                    for container_view_index, container_view_item in enumerate( Container.container_view_types ):
-                        if container_view_index ==1:
-                            imgui.separator()
-                        is_view_selected = (container_view_index == self.container_view_combo_selected)
-                        
-                        imgui.selectable( container_view_item[0], is_view_selected )
-                        if imgui.is_mouse_released(0) and imgui.is_item_hovered():
-                            self.container_view_combo_selected = container_view_index
-                            
-                            if not is_view_selected:
-                                Container.change_container_view( self, container_view_item )
-                                # self.get_root_container().dispatch_event( "view_changed", self, container_view_item )
-
-                            imgui.close_current_popup()
-                        
-                        if is_view_selected:
-                            imgui.set_item_default_focus()
+
+    def draw_leaf_popups(self) -> None:
+        """the view type and action popups of the leaf, while one is open"""
+        do_container_action = False
+        action_item_hovered = None
+        do_draw_container_action_hint = False
+
+        imgui.push_id( self.name )
+        imgui.push_style_var(imgui.STYLE_ITEM_SPACING, imgui.Vec2(3.0, 3.0))
+
+        # viewtype combo ---------------------------------------------------
+        with imgui.begin_popup( "container-view-type" ) as container_view_popup:
+            if container_view_popup.opened:
+                imgui.text("view type")
+                imgui.separator()
+
+                for container_view_index, container_view_item in enumerate( Container.container_view_types ):
+                    if container_view_index ==1:
+                        imgui.separator()
+                    is_view_selected = (container_view_index == self.container_view_combo_selected)
+                    
+                    imgui.selectable( container_view_item[0], is_view_selected )
+                    if imgui.is_mouse_released(0) and imgui.is_item_hovered():
+                        self.container_view_combo_selected = container_view_index
                         
-                imgui.pop_style_var(1)
+                        if not is_view_selected:
+                            Container.change_container_view( self, container_view_item )
+                            # self.get_root_container().dispatch_event( "view_changed", self, container_view_item )
 
-            # ------------------------------------------------------------------
-            imgui.pop_item_width()
+                        imgui.close_current_popup()
+                    
+                    if is_view_selected:
+                        imgui.set_item_default_focus()
+        view_popup_opened = container_view_popup.opened
+
+        # container action combo -------------------------------------------
+        with imgui.begin_popup("container-actions") as select_popup:
+            if select_popup.opened:
+                imgui.text("container-actions")
+                imgui.separator()
+    
+                for action_index, action_item in enumerate( Container.container_action_labels):
 
-            imgui.same_line()
+                    if action_index == 2 or action_index ==5:
+                        imgui.separator()
 
-            # container action combo -------------------------------------------
-            do_container_action = False
-            action_item_hovered = None
-            do_draw_container_action_hint = False
+                    # if imgui.selectable( action_item, selected = False )[0]:
+                    _, selected = imgui.selectable( action_item, selected = False )
 
-            imgui.set_cursor_pos( (self.width - (15+3.0) , 3.0) )
+                    if imgui.is_mouse_released(0) and imgui.is_item_hovered():
+                        self.container_actions_combo_selected = action_index
+                        print("container action: '%s' (%s)"%(\
+                                Container.container_action_labels[self.container_actions_combo_selected],
+                                self.name)
+                        )
+                        do_container_action = True
+                        imgui.close_current_popup()
 
-            imgui.image_button( self.textures["downarrow"].id, 12, 12, uv0=(0,1), uv1=(1,0) )
-            if imgui.is_item_clicked( 0 ):
-                popup_pos = imgui.Vec2( self.position.x + self.width - (15+3.0) , self.window.height - self.position.y - self.height +19)
-                imgui.set_next_window_position( popup_pos.x, popup_pos.y )
-                imgui.open_popup("container-actions")
+                    if imgui.is_item_hovered():
+                        action_item_hovered = action_index
+                        do_draw_container_action_hint = True
+                    else:
+                        self.root_container.do_draw_overlay = False
 
-            imgui.same_line()
-            with imgui.begin_popup("container-actions") as select_popup:
-                imgui.push_style_var(imgui.STYLE_ITEM_SPACING, imgui.Vec2(3.0, 3.0))
-                if select_popup.opened:
-                    imgui.text("container-actions")
-                    imgui.separator()
-    
-                    for action_index, action_item in enumerate( Container.container_action_labels):
-
-                        if action_index == 2 or action_index ==5:
-                            imgui.separator()
-
-                        # if imgui.selectable( action_item, selected = False )[0]:
-                        _, selected = imgui.selectable( action_item, selected = False )
-
-                        if imgui.is_mouse_released(0) and imgui.is_item_hovered():
-                            self.container_actions_combo_selected = action_index
-                            print("container action: '%s' (%s)"%(\
-                                    Container.container_action_labels[self.container_actions_combo_selected],
-                                    self.name)
-                            )
-                            do_container_action = True
-                            imgui.close_current_popup()
-
-                        if imgui.is_item_hovered():
-                            action_item_hovered = action_index
-                            do_draw_container_action_hint = True
-                        else:
-                            self.root_container.do_draw_overlay = False
-
-                imgui.pop_style_var(1)
-            
-            imgui.pop_style_var(2)
-            imgui.pop_clip_rect()
-
-            for e in extras:
-                e()
+        imgui.pop_style_var(1)
+        imgui.pop_id()
 
-        imgui.pop_style_color(3) # button colors
-        imgui.pop_style_var(1) # item spacing
-        imgui.pop_style_var(1) # rounded buttons
-        
-        imgui.pop_style_var()
+        # stop looking for popups once they're closed
+        self._chrome_popups_open = view_popup_opened or select_popup.opened
 
         split_line_hint_width = 15.0
 
@@ -754,28 +1482,19 @@ class Container( pyglet.event.EventDispatcher ):
                     self.root_container.do_draw_overlay = True
                     bl = self.position + pyglet.math.Vec2((self.width / 2.0) - (split_line_hint_width/2.0), 0.0)
                     tr = ( bl[0] + split_line_hint_width, bl[1] + self.height )
-                    self.root_container._marchinglines_shader["ir_bl"] = bl
-                    self.root_container._marchinglines_shader["ir_tr"] = tr
-                    self.root_container._marchinglines_shader["positive"] = 1.0
-                    self.root_container._marchinglines_shader["color_one"] = self.marching_lines_split_color
+                    self.root_container.set_overlay_hint( bl, tr, 1.0, self.marching_lines_split_color )
 
                 case Container.ACTION_SPLIT_VERTICAL:
                     self.root_container.do_draw_overlay = True
                     bl = self.position + pyglet.math.Vec2( 0.0, (self.height/2.0) - (split_line_hint_width / 2.0 ) )
                     tr = ( bl[0] + self.width, bl[1] + split_line_hint_width )
-                    self.root_container._marchinglines_shader["ir_bl"] = bl
-                    self.root_container._marchinglines_shader["ir_tr"] = tr
-                    self.root_container._marchinglines_shader["positive"] = 1.0               
-                    self.root_container._marchinglines_shader["color_one"] = self.marching_lines_split_color
+                    self.root_container.set_overlay_hint( bl, tr, 1.0, self.marching_lines_split_color )
 
                 case Container.ACTION_CLOSE:
                     self.root_container.do_draw_overlay = True
                     bl = self.position
                     tr = ( bl[0] + self.width, bl[1] + self.height )
-                    self.root_container._marchinglines_shader["ir_bl"] = bl
-                    self.root_container._marchinglines_shader["ir_tr"] = tr
-                    self.root_container._marchinglines_shader["positive"] = 1.0
-                    self.root_container._marchinglines_shader["color_one"] = self.marching_lines_collapse_color
+                    self.root_container.set_overlay_hint( bl, tr, 1.0, self.marching_lines_collapse_color )
 
                 case Container.ACTION_CLOSE_SPLIT:
                     # get sibling
@@ -789,19 +1508,13 @@ class Container( pyglet.event.EventDispatcher ):
 
                         bl = sibling.position
                         tr = ( bl[0] + sibling.width, bl[1] + sibling.height )
-                        self.root_container._marchinglines_shader["ir_bl"] = bl
-                        self.root_container._marchinglines_shader["ir_tr"] = tr
-                        self.root_container._marchinglines_shader["positive"] = 1.0
-                        self.root_container._marchinglines_shader["color_one"] = self.marching_lines_collapse_color
+                        self.root_container.set_overlay_hint( bl, tr, 1.0, self.marching_lines_collapse_color )
 
                 case Container.ACTION_CLOSE_OTHERS:
                     self.root_container.do_draw_overlay = True
                     bl = self.position
                     tr = ( bl[0] + self.width, bl[1] + self.height )
-                    self.root_container._marchinglines_shader["ir_bl"] = bl
-                    self.root_container._marchinglines_shader["ir_tr"] = tr                   
-                    self.root_container._marchinglines_shader["positive"] = 0.0
-                    self.root_container._marchinglines_shader["color_one"] = self.marching_lines_collapse_color
+                    self.root_container.set_overlay_hint( bl, tr, 0.0, self.marching_lines_collapse_color )
 
                 case _:
                     self.root_container.do_draw_overlay = False
@@ -812,7 +1525,12 @@ class Container( pyglet.event.EventDispatcher ):
 
 
     def draw(self) -> None:
-        """root container draw method"""
+        """root container draw method
+        Each phase is recorded as a span by `boxer.profiler` (when enabled)."""
+
+        # the one layout pass per frame, only recomputes dirty subtrees
+        with boxer.profiler.span( "layout", "container" ):
+            self.update_dirty_geometries()
   
         gl.glEnable(gl.GL_BLEND)
         gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
@@ -863,17 +1581,25 @@ class Container( pyglet.event.EventDispatcher ):
         #         print(f"    : {t.views}")
 
         for t in self.container_view_types_active:
-            t.draw_class()
+            # cached view types are drawn per instance, by .draw_view_caches()
+            if not t.cache_to_texture:
+                with boxer.profiler.span( t.__name__, "view" ):
+                    t.draw_class()
+
+        with boxer.profiler.span( "view caches", "view" ):
+            self.draw_view_caches()
 
 
         for l in self.leaves:
             # gather extra imgui drawing from ContainerView subclasses
             # from the self.container_views map
             # ContainerView imgui commands are drawn INSIDE Container.draw_leaf()
-            # so that they're combined in the one imgui.window (one per Container leaf)
+            # so that they're combined in the one imgui.window of the leaf
             extra_imgui = []
-            if l in self.container_views:
-                extra_imgui.append( self.container_views[l].draw_imgui )
+            view = self.container_views.get( l )
+            # views without imgui of their own don't need a window
+            if view is not None and type(view).draw_imgui is not ContainerView.draw_imgui:
+                extra_imgui.append( view.draw_imgui )
                 
                 
                 ##########################################################################
@@ -884,39 +1610,100 @@ class Container( pyglet.event.EventDispatcher ):
                 # self.container_views[l].draw_instance()
                 ##########################################################################
 
-            l.draw_leaf(extras = extra_imgui )
+            with boxer.profiler.span( l.name, "leaf" ):
+                l.draw_leaf(extras = extra_imgui )
 
 
         # draw Container batch (outlines)
-        self.batch.draw()
+        with boxer.profiler.span( "batch.draw", "container" ):
+            self.batch.draw()
 
         # draw things for all SplitContainers
         # right-click context menu for splitters etc
-        for h in self.split_containers:
-            h.draw_handle_ui()
+        with boxer.profiler.span( "handle ui", "container" ):
+            for h in self.split_containers:
+                h.draw_handle_ui()
 
         gl.glEnable(gl.GL_BLEND)
         gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
 
-        self.draw_overlay()
+        with boxer.profiler.span( "overlay", "container" ):
+            self.draw_overlay()
+
+
+    def draw_view_caches(self) -> None:
+        """on the root: redraw the offscreen caches of the leaf views with
+        `cache_to_texture` that changed (see `ContainerView.invalidate()`) or
+        whose leaf moved, then copy every cache into the window"""
+        for leaf in self.leaves:
+            view = self.container_views.get( leaf )
+            if view is None or not view.cache_to_texture:
+                continue
+            cache = self.view_caches.get( view )
+            if cache is None:
+                cache = boxer.viewcache.ViewCache()
+                self.view_caches[view] = cache
+            rect = ( leaf.position[0], leaf.position[1], leaf.width, leaf.height )
+            if cache.needs_render( view, rect ):
+                cache.render( view, self.window, rect )
+            cache.composite( self.window )
 
 
     def draw_overlay(self) -> None:
         if self.root_container.do_draw_overlay:
             self._marchinglines_time += 1.5
-            self._marchinglines_shader["time"] = self._marchinglines_time
+            self.get_overlay_quad().line = ( *boxer.shaders.MARCHINGLINES_LINE_DEFAULTS[:3], self._marchinglines_time ) * 4
             self.overlay_batch.draw()
+            # the lines march while the overlay shows, ask for the next frame
+            boxer.redraw.invalidate()
+
+
+    def get_overlay_quad(self) -> pyglet.graphics.vertexdomain.IndexedVertexList:
+        """the marching lines quad of the action hint overlay (root only), created on first use"""
+        if self.overlay_quad is None:
+            _points = boxer.shapes.rectangle_centered_vertices( 130, 230, 200, 200 )
+            _colors = (1.0, 1.0, 1.0, 1.0) * 4
+            self.overlay_quad = self._marchinglines_shader.vertex_list_indexed( 4,
+                                            gl.GL_TRIANGLES,
+                                            (0,1,2,0,2,3),
+                                            self.overlay_batch,
+                                            None,
+                                            position = ('f', _points),
+                                            colors = ('f', _colors),
+                                            color_one = ('f', self.marching_lines_collapse_color * 4),
+                                            inner_rect = ('f', (70.0, 70.0, 120.0, 120.0) * 4),
+                                            positive = ('f', (1.0,) * 4),
+                                            line = ('f', boxer.shaders.MARCHINGLINES_LINE_DEFAULTS * 4),
+                                            )
+        return self.overlay_quad
+
+
+    def set_overlay_hint(self, bl, tr, positive : float, color : tuple) -> None:
+        """set the overlay's marching lines inner rect (bottom left, top right),
+        inside/outside mode and colour"""
+        quad = self.get_overlay_quad()
+        quad.inner_rect = ( bl[0], bl[1], tr[0], tr[1] ) * 4
+        quad.positive = ( positive, ) * 4
+        quad.color_one = tuple( color ) * 4
 
 
     def on_mouse_motion(self, x, y, ds, dy) -> None:
-        """to be bound to a pyglet.window.Window's mouse events"""
-        _prev_mouse_inside = self.mouse_inside
-        if boxer.shapes.point_in_box( x, y,
+        """hit tests this container alone and sets `.mouse_inside`
+        (not connected by default, the root's mouse router calls
+        `.set_mouse_inside()` on the one leaf that changed)"""
+        self.set_mouse_inside( boxer.shapes.point_in_box( x, y,
                 self.position.x,
                 self.position.y,
                 self.position.x+self.width,
-                self.position.y+self.height ):
-            self.mouse_inside = True
+                self.position.y+self.height ) )
+
+
+    def set_mouse_inside(self, inside : bool) -> None:
+        """update `.mouse_inside`, on a change dispatch `mouse_entered`/`mouse_exited`
+        from the root and connect/disconnect the leaf's `ContainerView` handlers"""
+        _prev_mouse_inside = self.mouse_inside
+        self.mouse_inside = inside
+        if inside:
             if _prev_mouse_inside is not True:
                 self.update_display()
                 # ret = self.dispatch_event( "mouse_entered", self )
@@ -929,12 +1716,11 @@ class Container( pyglet.event.EventDispatcher ):
                     _container_view = self.root_container.container_views[self]
                     # print(f"{self} mouse_entered {_container_view}" )
                     # self.window.push_handlers( on_mouse_motion=_container_view.on_mouse_motion )
-                    _container_view.connect_handlers( self.window )
+                    _container_view.connect_handlers( self.event_bus )
 
                 #self.window.push_handlers(  )   
                 #---------------------
         else:
-            self.mouse_inside = False
             if _prev_mouse_inside is True:
                 self.update_display()
                 # ret = self.dispatch_event( "mouse_exited", self )
@@ -945,7 +1731,144 @@ class Container( pyglet.event.EventDispatcher ):
                     _container_view = self.root_container.container_views[self]
                     # print(f"{self} mouse_exited {_container_view}" )
                     # self.window.remove_handlers( on_mouse_motion=_container_view.on_mouse_motion )
-                    _container_view.disconnect_handlers( self.window )
+                    _container_view.disconnect_handlers( self.event_bus )
+
+
+    # mouse routing ------------------------------------------------------------
+    # The root subscribes a single set of mouse handlers to the window's event bus
+    # (boxer.events), and routes events down the split tree (used like a BSP) to
+    # the leaf under the mouse, and to the split handles along that path.
+    # The window's handler stack stays the same size however many containers exist.
+    # Subscribers of a container target then get the event routed through the tree:
+    #
+    #   root.event_bus.subscribe( "on_mouse_press", handler, target = container )
+
+    @property
+    def event_bus(self) -> 'boxer.events.EventBus | None':
+        """the event bus of the window, see boxer.events"""
+        return boxer.events.for_window( self.window ) if self.window else None
+
+
+    def connect_mouse_router(self) -> None:
+        """subscribe the root's routing mouse handlers to the window's bus (once)"""
+        if self._mouse_router_window is self.window:
+            return
+        self.disconnect_mouse_router()
+        if self.window:
+            bus = self.event_bus
+            self._mouse_router_subscriptions = [
+                bus.subscribe( "on_mouse_motion", self.on_routed_mouse_motion ),
+                bus.subscribe( "on_mouse_press", self.on_routed_mouse_press ),
+                bus.subscribe( "on_mouse_release", self.on_routed_mouse_release ),
+                bus.subscribe( "on_mouse_drag", self.on_routed_mouse_drag ) ]
+            self._mouse_router_window = self.window
+
+
+    def disconnect_mouse_router(self) -> None:
+        for subscription in self._mouse_router_subscriptions:
+            subscription.cancel()
+        self._mouse_router_subscriptions = []
+        self._mouse_router_window = None
+
+
+    def dispatch_routed(self, event_type : str, leaf : 'Container | None', *args) -> None:
+        """on the root: dispatch a window event to the subscribers of `leaf` and of its
+        ancestors (capture, then bubble, see boxer.events)"""
+        if leaf is not None and self._mouse_router_window is not None:
+            self.event_bus.dispatch( event_type, *args, target = leaf )
+
+
+    def get_child_at(self, x, y) -> 'Container | None':
+        """the child to descend into when routing the point (x, y)
+        SplitContainers override this, comparing against the split coordinate
+        """
+        for child in self.children:
+            if child is not None and boxer.shapes.point_in_box( x, y,
+                    child.position.x,
+                    child.position.y,
+                    child.position.x + child.width,
+                    child.position.y + child.height ):
+                return child
+        return None
+
+
+    def get_leaf_at(self, x, y) -> tuple['Container | None', list]:
+        """descend from self to the leaf containing (x, y), O(depth)
+
+        `returns`
+            ( leaf or None, [ SplitContainers along the path ] )
+        """
+        path_splits = []
+        node = self
+        if not boxer.shapes.point_in_box( x, y,
+                node.position.x,
+                node.position.y,
+                node.position.x + node.width,
+                node.position.y + node.height ):
+            return None, path_splits
+        while node.children:
+            if isinstance( node, ( SplitContainer, GridContainer ) ):
+                path_splits.append( node )
+            node = node.get_child_at( x, y )
+            if node is None:
+                return None, path_splits
+        # the split descent ignores the gaps between children, confirm
+        if not boxer.shapes.point_in_box( x, y,
+                node.position.x,
+                node.position.y,
+                node.position.x + node.width,
+                node.position.y + node.height ):
+            return None, path_splits
+        return node, path_splits
+
+
+    def on_routed_mouse_motion(self, x, y, dx, dy) -> None:
+        """window event, connected on the root"""
+        leaf, path_splits = self.get_leaf_at( x, y )
+        if leaf is not self._mouse_leaf:
+            previous = self._mouse_leaf
+            self._mouse_leaf = leaf
+            if previous is not None:
+                previous.set_mouse_inside( False )
+            if leaf is not None:
+                leaf.set_mouse_inside( True )
+
+        handles = { h for s in path_splits for h in s.split_handles } | self._routed_split_handles
+        for handle in handles:
+            handle.on_mouse_motion( x, y, dx, dy )
+        self._update_routed_split_handles( handles )
+        self.dispatch_routed( "on_mouse_motion", leaf, x, y, dx, dy )
+
+
+    def on_routed_mouse_press(self, x, y, buttons, modifiers) -> None:
+        """window event, connected on the root"""
+        handles = self._routed_split_handles.copy()
+        for handle in handles:
+            handle.on_mouse_press( x, y, buttons, modifiers )
+        self._update_routed_split_handles( handles )
+        self.dispatch_routed( "on_mouse_press", self._mouse_leaf, x, y, buttons, modifiers )
+
+
+    def on_routed_mouse_release(self, x, y, buttons, modifiers) -> None:
+        """window event, connected on the root"""
+        handles = self._routed_split_handles.copy()
+        for handle in handles:
+            handle.on_mouse_release( x, y, buttons, modifiers )
+        self._update_routed_split_handles( handles )
+        self.dispatch_routed( "on_mouse_release", self._mouse_leaf, x, y, buttons, modifiers )
+
+
+    def on_routed_mouse_drag(self, x, y, dx, dy, buttons, modifiers) -> None:
+        """window event, connected on the root"""
+        for handle in [ h for h in self._routed_split_handles if h.selected ]:
+            handle.on_mouse_drag( x, y, dx, dy, buttons, modifiers )
+        # drags go to the leaf they started in
+        self.dispatch_routed( "on_mouse_drag", self._mouse_leaf, x, y, dx, dy, buttons, modifiers )
+
+
+    def _update_routed_split_handles(self, handles) -> None:
+        """keep only the handles that still need events (hovered or selected)"""
+        self._routed_split_handles = { h for h in handles if h.hilighted or h.selected }
 
 
     @staticmethod
@@ -964,6 +1887,7 @@ class Container( pyglet.event.EventDispatcher ):
         
         ### returns
             `[]` - A list of either new leaf containers resulting from split actions, or an empy list.
+            Closing a cell of a `GridContainer` of several rows and columns returns the empty leaf left in the cell.
             
         ### events
         - #### (`"split"`, original_container, leaves, root )
@@ -981,6 +1905,9 @@ class Container( pyglet.event.EventDispatcher ):
             `container` : `Container` - the `Container` that was just collapsed (see WARNING)
             `root` : `Container` - the root `Container` of the tree
 
+        Inside a transaction (`with root.transaction():`) the update, the tree dump and
+        the events are deferred to the commit, see `Container.transaction()`.
+
         ### WARNING:
         The `"collapsed"` and `"split"` events dispatched from these actions can return `Container`s that have been
         disconnected from the `Container` heirarchy. As a consequence, their references to parents and children
@@ -1005,14 +1932,16 @@ class Container( pyglet.event.EventDispatcher ):
                     container = container.replace_by( new_container )
 
                 root = container.get_root_container()
-                root.update()
-                root.pprint_tree()
+                if root.in_transaction:
+                    root._transaction_created.update( [new_container] + new_container.children )
+                root.update_after_change()
                 ##########################################################################
                 # WARNING: 'original_container' passed through event is very disconnected from the container tree by this point
                 ##########################################################################
                 leaves = new_container.children.copy()
                 Container.change_container_view_on_split(original_container, leaves, root)
-                root.dispatch_event( "split", original_container, leaves, root )
+                Container.dispose_containers( [ original_container ], root )
+                root.dispatch_structure_event( "split", original_container, leaves, root )
                 return leaves
 
 
@@ -1032,15 +1961,46 @@ class Container( pyglet.event.EventDispatcher ):
                     container = container.replace_by( new_container )
 
                 root = container.get_root_container()
-                root.update()
-                root.pprint_tree()
+                if root.in_transaction:
+                    root._transaction_created.update( [new_container] + new_container.children )
+                root.update_after_change()
 
                 ##########################################################################
                 # WARNING: 'original_container' passed through event is very disconnected from the container tree by this point
                 ##########################################################################
                 leaves = new_container.children.copy()
                 Container.change_container_view_on_split(original_container, leaves, root)
-                root.dispatch_event( "split", original_container, leaves, root )
+                Container.dispose_containers( [ original_container ], root )
+                root.dispatch_structure_event( "split", original_container, leaves, root )
+                return leaves
+
+
+            case Container.ACTION_SPLIT_GRID:
+                print("\033[38;5;63m--- [ + ] change_container:\033[0m 'split grid' on '%s'"%container.name)
+
+                new_container = GridContainer(name = container.name + "_grid",
+                                    window = container.window,
+                                    batch = container.batch,
+                                    columns = 2,
+                                    rows = 2,
+                                    create_default_children = True)
+
+                original_container = container
+
+                if container.parent is None:
+                    container.set_child( new_container, 0 )
+                else:
+                    container = container.replace_by( new_container )
+
+                root = container.get_root_container()
+                if root.in_transaction:
+                    root._transaction_created.update( [new_container] + new_container.children )
+                root.update_after_change()
+
+                leaves = new_container.children.copy()
+                Container.change_container_view_on_split(original_container, leaves, root)
+                Container.dispose_containers( [ original_container ], root )
+                root.dispatch_structure_event( "split", original_container, leaves, root )
                 return leaves
 
 
@@ -1051,6 +2011,30 @@ class Container( pyglet.event.EventDispatcher ):
                 if container.parent is None or container.parent.parent is None:
                     raise RuntimeError("closing a root container is not allowed yet")
                 parent : Container = container.parent
+                if isinstance(parent, GridContainer):
+                    # a grid drops the track, or leaves an empty cell
+                    root = container.get_root_container()
+                    empty_leaf = parent.close_child( container )
+                    if empty_leaf is None and len(parent.children) == 1:
+                        # one track left, replace the grid by it (as closing in a split does)
+                        remaining = parent.children[0]
+                        parent.children = []
+                        # remove_child() clears parent.parent
+                        grandparent : Container = parent.parent
+                        idx = grandparent.remove_child( parent )
+                        grandparent.set_child( remaining, idx )
+                    else:
+                        parent = None
+                    if root.in_transaction and empty_leaf is not None:
+                        root._transaction_created.add( empty_leaf )
+                    for c in [ container ] + Container.get_subtree_leaves( container ):
+                        Container.collapse_container_view( c, root )
+                    Container.dispose_containers( [ container, parent ] + container.remove_children(), root )
+                    root.dispatch_structure_event( "collapsed", container, root )
+                    root.do_draw_overlay = False
+                    root.update_after_change()
+                    return [ empty_leaf ] if empty_leaf is not None else []
+
                 if isinstance(parent, SplitContainer):
 
                     # get sibling
@@ -1076,11 +2060,13 @@ class Container( pyglet.event.EventDispatcher ):
                     ##########################################################################
                     # WARNING: 'container' passed through event is very disconnected from the container tree by this point
                     ##########################################################################
-                    Container.collapse_container_view( container, root )
-                    root.dispatch_event( "collapsed", container, root )
+                    # (a closed SplitContainer takes its subtree's views with it)
+                    for c in [ container ] + Container.get_subtree_leaves( container ):
+                        Container.collapse_container_view( c, root )
+                    Container.dispose_containers( [ container, parent ] + container.remove_children(), root )
+                    root.dispatch_structure_event( "collapsed", container, root )
                 root.do_draw_overlay = False
-                root.update()
-                root.pprint_tree()
+                root.update_after_change()
                 return []
 
 
@@ -1100,20 +2086,22 @@ class Container( pyglet.event.EventDispatcher ):
                 parent.children[idx] = None
 
                 # remove children of parent split container
+                # (find the leaves first, .is_leaf is stale inside a transaction)
+                removed_leaves = Container.get_subtree_leaves( parent )
                 removed_children = parent.remove_children()
                 
-                for c in removed_children:
-                    if c and c.is_leaf:
-                        ##########################################################################
-                        # WARNING: 'container' passed through event is very disconnected from the container tree by this point
-                        ##########################################################################
-                        Container.collapse_container_view( c, root )
-                        root.dispatch_event("collapsed", c, root)
+                for c in removed_leaves:
+                    ##########################################################################
+                    # WARNING: 'container' passed through event is very disconnected from the container tree by this point
+                    ##########################################################################
+                    Container.collapse_container_view( c, root )
+                    root.dispatch_structure_event("collapsed", c, root)
+                Container.dispose_containers( removed_children, root )
 
                 # replace parent split container by this container
                 parent.replace_by( container )
-                root.update()
-                root.pprint_tree()
+                Container.dispose_containers( [ parent ], root )
+                root.update_after_change()
                 return [ container ]
 
 
@@ -1130,21 +2118,21 @@ class Container( pyglet.event.EventDispatcher ):
                 idx = container.parent.children.index( container )
                 container.parent.children[idx] = None
 
+                removed_leaves = Container.get_subtree_leaves( root )
                 removed_children = root.remove_children()
                 
                 # ONLY emit "collapsed" signal on leaf containers
                 # TODO is this the right thing to do?
-                for c in removed_children:
-                    if c and c.is_leaf:
-                        ##########################################################################
-                        # WARNING: 'container' passed through event is very disconnected from the container tree by this point
-                        ##########################################################################
-                        Container.collapse_container_view( c, root )
-                        root.dispatch_event("collapsed", c, root)
+                for c in removed_leaves:
+                    ##########################################################################
+                    # WARNING: 'container' passed through event is very disconnected from the container tree by this point
+                    ##########################################################################
+                    Container.collapse_container_view( c, root )
+                    root.dispatch_structure_event("collapsed", c, root)
+                Container.dispose_containers( removed_children, root )
 
                 root.set_child( container, 0 )
-                root.update()
-                root.pprint_tree()
+                root.update_after_change()
                 return [ container ]
 
         return []
@@ -1214,7 +2202,8 @@ class Container( pyglet.event.EventDispatcher ):
             for c in _to_remove:
                 root.container_view_types_active[type(_view) ].remove( c ) # type: ignore
 
-            root.dispatch_event("view_changed", container, _view)
+            root.dispatch_structure_event("view_changed", container, _view)
+            Container.dispose_view( _view, container, root )
             # print(f"REFERENCES {gc.get_referrers( _view )}")
             del(_view)
 
@@ -1238,6 +2227,7 @@ class Container( pyglet.event.EventDispatcher ):
             view : ContainerView = view_type[1](
                 # batch = _batch
             )
+            boxer.leaks.track( view )
             
             root.container_views[ container ] = view
             # root.container_view_types_active[ view_type[1] ] = 1 #.append( container )
@@ -1257,7 +2247,7 @@ class Container( pyglet.event.EventDispatcher ):
             #     root.container_view_cameras[view] = boxer.camera.Camera( window=root.window )
             # else:
             #     print(f"\033[38;5;63m[ContainerView]\033[0m camera: {view} reusing camera {root.container_view_cameras[view]}")
-            root.dispatch_event("view_changed", container, view)
+            root.dispatch_structure_event("view_changed", container, view)
 
             # is the mouse already in this container?
             # happens when then mouse is used to choose the ContainerView from the
@@ -1268,7 +2258,7 @@ class Container( pyglet.event.EventDispatcher ):
                 # print(f"{container} mouse_inside {_container_view}" )
                 if container.window:
                     # container.window.push_handlers( on_mouse_motion=_container_view.on_mouse_motion )
-                    _container_view.connect_handlers( container.window )
+                    _container_view.connect_handlers( container.event_bus )
 
         # --------------------------------------------------------------------------------
         # post switching
@@ -1314,7 +2304,10 @@ class Container( pyglet.event.EventDispatcher ):
             # ----------------------------------------------------------------------------
 
             # reflow
-            this_view.update_geometries( this_container )
+            # (inside a transaction the commit's geometry pass reflows the view,
+            # this_container has no geometry yet)
+            if not root.in_transaction:
+                this_view.update_geometries( this_container )
 
             # set the view type on the new view-owner:
             # find the type index of this_view, in Container.container_view_types
@@ -1333,7 +2326,7 @@ class Container( pyglet.event.EventDispatcher ):
                 # not sure. In the even that a view witha lot of state is moved because of a Container split,
                 # maybe I don't want to signal it.
                 # this_container.get_root_container().dispatch_event("view_changed", this_container, this_container.get_root_container().container_view_types[type_index])
-                this_container.get_root_container().dispatch_event("view_changed", this_container, this_view)
+                this_container.get_root_container().dispatch_structure_event("view_changed", this_container, this_view)
                 this_container.update_display()
 
 
@@ -1343,6 +2336,7 @@ class Container( pyglet.event.EventDispatcher ):
         print("\033[38;5;196mon_container_collapsed:\033[0m %s"%container)
         _view = root.container_views.pop( container, None )
         # root.container_view_cameras.pop( _view, None)
+        Container.dispose_view( _view, container, root )
         del(_view)
         # print(f"container_views (on_container_collapsed): {root.container_views}")
         # Container.change_container_view( container, ["none", None] )
@@ -1378,6 +2372,8 @@ Container.register_event_type("resized")
 Container.register_event_type("collapsed")
 # ------------------------------------------------------------------------------
 
+Container.container_types[ Container.__name__ ] = Container
+
 
 class SplitContainer( Container ):
     """`Container` that manages a split view of two children `Container`s"""
@@ -1390,12 +2386,16 @@ class SplitContainer( Container ):
     def __init__(self,
             ratio : float = 0.5,
             create_default_children : bool = False,
+            ratio_mode : int = RATIO_MODE_RATIO,
+            fixed_size : float = 0.0,
             **kwargs):
         Container.__init__( self, **kwargs )
         self.ratio = ratio
         self.ratio_margin = 15 # limit from hitting 0 or 1, in pixels
 
-        self.ratio_mode = SplitContainer.RATIO_MODE_RATIO
+        self.ratio_mode = ratio_mode
+        # size in pixels of the child on the fixed side, in the RATIO_MODE_FIXED_* modes
+        self.fixed_size = fixed_size
 
         self.create_default_children = create_default_children
         if self.create_default_children:
@@ -1414,28 +2414,144 @@ class SplitContainer( Container ):
                 #batch = self.batch,
                 )
 
-        if self.window:
-            self.window.push_handlers( on_mouse_motion = self.split_handle.on_mouse_motion )
-            self.window.push_handlers( on_mouse_press = self.split_handle.on_mouse_press )
-            self.window.push_handlers( on_mouse_release = self.split_handle.on_mouse_release )
-            self.window.push_handlers( on_mouse_drag = self.split_handle.on_mouse_drag )
+        # the split_handle receives mouse events from the root's mouse router
+        # (Container.on_routed_mouse_*) when the mouse is over this SplitContainer
 
         self.split_handle.push_handlers( position_updated = self.on_split_handle_position_updated )
         self.split_handle.push_handlers( mouse_entered = self.on_split_handle_mouse_entered )
         self.split_handle.push_handlers( mouse_exited = self.on_split_handle_mouse_exited )
         self.split_handle.push_handlers( pressed = self.on_split_handle_mouse_pressed )
+        self.split_handle.push_handlers( released = self.on_split_handle_mouse_released )
+
+        # split position of a drag in progress, with `.preview_drag`
+        self._preview_split_position : float | None = None
 
         self.do_draw_handle_ui = False
         self.draw_handle_ui_rightclick_data = {}
 
-        self.ratio_line = pyglet.shapes.Line( 0.0, 0.0, 1.0, 1.0,
-                                            # width = 4.0,
-                                            thickness = 4.0,
-                                            color=(255,255,255,180),
-                                            batch=self.batch )
+        # the ratio line is one segment in the batch's boxer.outlines.OutlineRenderer
+        self._ratio_line_slot = self._outline_renderer.alloc( 1 )
+        self._outline_renderer.set_thickness( self._ratio_line_slot, 4.0 )
+        self._ratio_line_original_color = (255,255,255,180)
+        self._outline_renderer.set_color( self._ratio_line_slot, self._ratio_line_original_color[:3]+(0,) )
+        self._ratio_line_finalizer = weakref.finalize( self, self._outline_renderer.free, self._ratio_line_slot, 1 )
+
+
+    def release_outline(self) -> None:
+        super().release_outline()
+        self._ratio_line_finalizer()
+        self._ratio_line_slot = None
+
+
+    def dispose(self) -> None:
+        if self._disposed:
+            return
+        super().dispose()
+        self.split_handle.dispose()
+
+
+    @property
+    def ratio(self) -> float:
+        if self._layout_store is None:
+            return self._ratio
+        return float(self._layout_store.ratio[self._layout_row])
+
+
+    @ratio.setter
+    def ratio(self, value : float) -> None:
+        if self._layout_store is None:
+            self._ratio = value
+        else:
+            self._layout_store.ratio[self._layout_row] = value
+
+
+    @property
+    def ratio_mode(self) -> int:
+        if self._layout_store is None:
+            return self._ratio_mode
+        return int(self._layout_store.mode[self._layout_row])
+
+
+    @ratio_mode.setter
+    def ratio_mode(self, value : int) -> None:
+        if self._layout_store is None:
+            self._ratio_mode = value
+        else:
+            self._layout_store.mode[self._layout_row] = value
+
+
+    @property
+    def fixed_size(self) -> float:
+        if self._layout_store is None:
+            return self._fixed_size
+        return float(self._layout_store.fixed[self._layout_row])
 
-        self._ratio_line_original_color = self.ratio_line.color
-        self.ratio_line.color = self._ratio_line_original_color[:3]+(0,)
+
+    @fixed_size.setter
+    def fixed_size(self, value : float) -> None:
+        if self._layout_store is None:
+            self._fixed_size = value
+        else:
+            self._layout_store.fixed[self._layout_row] = value
+
+
+    @property
+    def split_handles(self) -> list[boxer.handles.Handle]:
+        """the handles the root's mouse router sends events to"""
+        return [ self.split_handle ]
+
+
+    def split_length(self) -> float:
+        """length of the split axis (width or height), subclasses override this"""
+        return self.width
+
+
+    def split_position(self, length : float) -> float:
+        """distance in pixels from the start of a split axis of `length` to the split,
+        from `.ratio` or `.fixed_size`, depending on `.ratio_mode`"""
+        match self.ratio_mode:
+            case SplitContainer.RATIO_MODE_FIXED_0:
+                position = self.fixed_size
+            case SplitContainer.RATIO_MODE_FIXED_1:
+                position = length - self.fixed_size
+            case _:
+                position = length * self.ratio
+        return min( max( position, 0.0 ), length )
+
+
+    def set_split_position(self, position : float, length : float) -> None:
+        """move the split to `position` pixels along a split axis of `length`:
+        sets `.ratio`, and `.fixed_size` in the fixed modes"""
+        if length > 0.0:
+            self.ratio = position / float(length)
+        match self.ratio_mode:
+            case SplitContainer.RATIO_MODE_FIXED_0:
+                self.fixed_size = position
+            case SplitContainer.RATIO_MODE_FIXED_1:
+                self.fixed_size = length - position
+
+
+    def set_ratio_mode(self, ratio_mode : int) -> None:
+        """switch `.ratio_mode`, keeping the split where it is now"""
+        length = self.split_length()
+        position = self.split_position( length )
+        self.ratio_mode = ratio_mode
+        self.set_split_position( position, length )
+        self.invalidate_geometry()
+
+
+    def layout_as_json(self) -> dict:
+        return {
+            "ratio": self.ratio,
+            "ratio_mode": self.ratio_mode,
+            "fixed_size": self.fixed_size,
+        }
+
+
+    def set_layout_from_json(self, data : dict) -> None:
+        self.ratio = data.get( "ratio", self.ratio )
+        self.ratio_mode = data.get( "ratio_mode", self.ratio_mode )
+        self.fixed_size = data.get( "fixed_size", self.fixed_size )
 
 
     def _default_children( self ):
@@ -1449,20 +2565,61 @@ class SplitContainer( Container ):
         self.set_child( c2, 1 )
 
 
-    def update_geometries(self, *args, **kwargs) -> None:
-        # print("\033[38;5;216mSplitContainer update_geometries\033[0m (%s)"%self.name)
-        super().update_geometries(*args, **kwargs)
+    def update_node_geometry(self) -> None:
+        # print("\033[38;5;216mSplitContainer update_node_geometry\033[0m (%s)"%self.name)
+        super().update_node_geometry()
 
 
     def on_split_handle_position_updated(self, position) -> None:
         # print("\033[38;5;123m%s.split_handle position:\033[0m %s"%(self.name, position))
         ...
 
+
+    def snap(self, handle : boxer.handles.Handle, position : pyglet.math.Vec2) -> pyglet.math.Vec2:
+        """the split handle's snapper while `.snap_ratios` are set, see `boxer.snapping`:
+        `position` with its split axis coordinate snapped to the ratios of the split"""
+        axis = 1 if isinstance( self, VSplitContainer ) else 0
+        length = self.split_length()
+        offset = position[axis] - self.position[axis]
+        offset = boxer.snapping.snap_to_values( offset, sorted( r * length for r in self.snap_ratios ), self.snap_tolerance )
+        if axis == 0:
+            return pyglet.math.Vec2( self.position[0] + offset, position.y )
+        return pyglet.math.Vec2( position.x, self.position[1] + offset )
+
+
+    def drag_split_to(self, position : float) -> None:
+        """move the split to `position` pixels along the split axis, from a handle drag.
+        Only records the position: the relayout runs in the next frame's
+        `.update_dirty_geometries()` pass however many drag events arrive, or on
+        release with `.preview_drag`, which moves only the ratio line meanwhile."""
+        if self.preview_drag and self.split_handle.selected:
+            self._preview_split_position = position
+            self.set_ratio_line( position )
+            boxer.redraw.invalidate( ( self.position[0], self.position[1], self.width, self.height ) )
+            return
+        self.set_split_position( position, self.split_length() )
+        self.invalidate_geometry()
+
+
+    def on_split_handle_mouse_released(self, x, y, buttons, modifiers) -> None:
+        # apply a previewed drag
+        if self._preview_split_position is not None:
+            self.set_split_position( self._preview_split_position, self.split_length() )
+            self._preview_split_position = None
+            self.invalidate_geometry()
+
+
+    def set_ratio_line(self, position : float) -> None:
+        """draw the ratio line `position` pixels along the split axis, subclasses override this"""
+        ...
+
     
     def on_split_handle_mouse_pressed(self, x, y, buttons, modifiers) -> None:
         """event handler for mouse press on SplitContainer mouse press
         """
         print("\033[38;5;93m-^- \033[38;5;237m[h]\033[38;5;245m on_split_handle_mouse_pressed %s \033[0m %s, %s, %s, %s"%(self.name, x, y, buttons, modifiers))
+        # snap the drag to split ratios, read at each press so changes to .snap_ratios apply
+        self.split_handle.snapper = self if self.snap_ratios else None
         if buttons & pyglet.window.mouse.RIGHT:
             # right-click control for SplitContainer splitter bars
             # this pattern is very annoying.
@@ -1494,7 +2651,7 @@ class SplitContainer( Container ):
                     if True in opened:
                         # set menu selection
                         print("opened:selected", opened, selected)
-                        self.ratio_mode = opened.index(True)
+                        self.set_ratio_mode( opened.index(True) )
                         self.do_draw_handle_ui = False
                         imgui.close_current_popup()
 
@@ -1506,18 +2663,22 @@ class SplitContainer( Container ):
 
     def on_split_handle_mouse_entered(self):
         print("\033[38;5;10m--> \033[38;5;237m[h]\033[38;5;245m on_split_handle_mouse_entered %s \033[0m"%self.name)
-        self.ratio_line.color = self._ratio_line_original_color
+        if self._ratio_line_slot is not None:
+            self._outline_renderer.set_color( self._ratio_line_slot, self._ratio_line_original_color )
 
 
     def on_split_handle_mouse_exited(self):
         print("\033[38;5;173mo-- \033[38;5;237m[h]\033[38;5;245m on_split_handle_mouse_exited %s \033[0m"%self.name)
-        self.ratio_line.color = self._ratio_line_original_color[:3]+(0,)
+        if self._ratio_line_slot is not None:
+            self._outline_renderer.set_color( self._ratio_line_slot, self._ratio_line_original_color[:3]+(0,) )
 
 
 class HSplitContainer( SplitContainer ):
     """container managing split view of two child containers,
     first child added is on left, second child on right
     """
+    _array_layout_kind = boxer.layout.KIND_HSPLIT
+
     def __init__(self, **kwargs):
         SplitContainer.__init__( self, **kwargs )
 
@@ -1529,8 +2690,12 @@ class HSplitContainer( SplitContainer ):
         self.set_child( c2, 1 )
 
 
+    def split_length(self) -> float:
+        return self.width
+
+
     def get_child_size(self, this) -> pyglet.math.Vec2: #tuple:
-        s0 = math.floor(self.width*self.ratio) -1.0
+        s0 = math.floor(self.split_position(self.width)) -1.0
         if this == self.children[0]:
             # return pyglet.math.Vec2(math.floor(self.width*self.ratio) -1.0 , self.height  )
             return pyglet.math.Vec2( s0 , self.height  )
@@ -1544,18 +2709,25 @@ class HSplitContainer( SplitContainer ):
             x = self.position.x
             y = self.position.y
         else:
-            x = self.position.x + math.floor(self.width*self.ratio)
+            x = self.position.x + math.floor(self.split_position(self.width))
             y = self.position.y
         return pyglet.math.Vec2(x, y)
 
 
-    def update_geometries(self, *args, **kwargs) -> None:
-        # print("\033[38;5;217mHSplitContainer update_geometries\033[0m (%s)"%self.name)
-        super().update_geometries(*args, **kwargs)
+    def get_child_at(self, x, y) -> 'Container | None':
+        # one comparison against the split coordinate
+        if x < self.position.x + math.floor(self.split_position(self.width)):
+            return self.children[0]
+        return self.children[1]
+
+
+    def update_node_geometry(self) -> None:
+        # print("\033[38;5;217mHSplitContainer update_node_geometry\033[0m (%s)"%self.name)
+        super().update_node_geometry()
 
         if self.split_handle:
             self.split_handle.position = pyglet.math.Vec2(\
-                                self.position.x + (self.width * self.ratio),
+                                self.position.x + self.split_position(self.width),
                                 self.position.y + (self.height * 0.5 ))
             self.split_handle.hit_width = 10.0
             self.split_handle.hit_height = self.height - 20.0
@@ -1564,10 +2736,7 @@ class HSplitContainer( SplitContainer ):
             self.split_handle.set_shape_anchors()
             self.split_handle.update_vertices()
 
-            self.ratio_line.x = self.position.x + (self.width * self.ratio) -1.0
-            self.ratio_line.y = self.position.y + 0.5 
-            self.ratio_line.x2 = self.ratio_line.x
-            self.ratio_line.y2 = self.ratio_line.y + self.height - 1.0
+            self.set_ratio_line( self.split_position(self.width) )
 
             self.split_handle.update_position(dispatch_event = False)
 
@@ -1579,16 +2748,25 @@ class HSplitContainer( SplitContainer ):
         self.split_handle.position = pyglet.math.Vec2( x, y )
         # self.split_handle.position.x = x
         # self.split_handle.update_position()
-        new_ratio = (x - self.position.x) / float(self.width)
-        self.ratio = new_ratio
-        self.update_geometries()
+        self.drag_split_to( x - self.position.x )
         # self.root_container.update_geometries()
 
 
+    def set_ratio_line(self, position : float) -> None:
+        ratio_x = self.position.x + position -1.0
+        ratio_y = self.position.y + 0.5
+        if self._ratio_line_slot is not None:
+            self._outline_renderer.set_segment( self._ratio_line_slot,
+                                        ratio_x, ratio_y,
+                                        ratio_x, ratio_y + self.height - 1.0 )
+
+
 class VSplitContainer( SplitContainer ):
     """container managing split view of two child containers,
     first child added is on bottom, second child on top
     """
+    _array_layout_kind = boxer.layout.KIND_VSPLIT
+
     def __init__(self, **kwargs):
         SplitContainer.__init__( self, **kwargs )
 
@@ -1600,8 +2778,12 @@ class VSplitContainer( SplitContainer ):
         self.set_child( c2, 1 )
 
 
+    def split_length(self) -> float:
+        return self.height
+
+
     def get_child_size(self, this) -> pyglet.math.Vec2:
-        s0 = math.floor(self.height * self.ratio) -1.0
+        s0 = math.floor(self.split_position(self.height)) -1.0
         
         if this == self.children[0]:
             # return pyglet.math.Vec2(self.width , math.floor(self.height * self.ratio) -1.0 )
@@ -1616,19 +2798,26 @@ class VSplitContainer( SplitContainer ):
             y = self.position.y
         else:
             x = self.position.x
-            y = self.position.y + math.floor(self.height*self.ratio)
+            y = self.position.y + math.floor(self.split_position(self.height))
         return pyglet.math.Vec2(x, y)
 
 
-    def update_geometries(self, *args, **kwargs) -> None:
-        # print("%s.update_geometries"%self.name)
-        # print("\033[38;5;217mVSplitContainer update_geometries\033[0m (%s)"%self.name)
-        super().update_geometries(*args, **kwargs)
+    def get_child_at(self, x, y) -> 'Container | None':
+        # one comparison against the split coordinate
+        if y < self.position.y + math.floor(self.split_position(self.height)):
+            return self.children[0]
+        return self.children[1]
+
+
+    def update_node_geometry(self) -> None:
+        # print("%s.update_node_geometry"%self.name)
+        # print("\033[38;5;217mVSplitContainer update_node_geometry\033[0m (%s)"%self.name)
+        super().update_node_geometry()
 
         if self.split_handle:
             self.split_handle.position = pyglet.math.Vec2(\
                                 self.position.x + (self.width * 0.5),
-                                self.position.y + (self.height * self.ratio ))
+                                self.position.y + self.split_position(self.height) )
             self.split_handle.hit_width = self.width - 20.0
             self.split_handle.hit_height = 10.0
             self.split_handle.display_width = self.split_handle.hit_width - 2.0
@@ -1636,10 +2825,7 @@ class VSplitContainer( SplitContainer ):
             self.split_handle.set_shape_anchors()
             self.split_handle.update_vertices()
 
-            self.ratio_line.x = self.position.x + 0.5
-            self.ratio_line.y = self.position.y + (self.height * self.ratio) -1.0
-            self.ratio_line.x2 = self.ratio_line.x + self.width - 1.0
-            self.ratio_line.y2 = self.ratio_line.y
+            self.set_ratio_line( self.split_position(self.height) )
 
             self.split_handle.update_position(dispatch_event = False)
 
@@ -1651,12 +2837,485 @@ class VSplitContainer( SplitContainer ):
         # self.split_handle.position.y = y
         self.split_handle.position = pyglet.math.Vec2( x, y )
         # self.split_handle.update_position()
-        new_ratio = ( y - self.position.y) / float(self.height)
-        self.ratio = new_ratio
-        self.update_geometries()
+        self.drag_split_to( y - self.position.y )
         # self.root_container.update_geometries()
 
 
+    def set_ratio_line(self, position : float) -> None:
+        ratio_x = self.position.x + 0.5
+        ratio_y = self.position.y + position -1.0
+        if self._ratio_line_slot is not None:
+            self._outline_renderer.set_segment( self._ratio_line_slot,
+                                        ratio_x, ratio_y,
+                                        ratio_x + self.width - 1.0, ratio_y )
+
+
+class GridContainer( Container ):
+    """`Container` laying out its children in a grid of column and row tracks.
+
+    One node lays out all of its tracks in one pass (see `.get_track_edges()`), so
+    an 8x8 grid of panes is one node with 14 edge handles, instead of a tree of 63
+    binary `SplitContainer`s with a handle each.
+
+    Children fill the cells row by row, child `row * column count + column`. Columns
+    go left to right, rows go up from the bottom (as in `VSplitContainer`).
+
+    A track is either a ratio track (`TRACK_RATIO`), sharing the space the fixed
+    tracks leave by its weight, or a fixed track (`TRACK_FIXED`) of a size in pixels.
+    Change the tracks with `.set_tracks()`, `.move_track_edge()` or `.set_track_modes()`.
+
+    There's one handle per inner edge, dragging it resizes the two tracks either
+    side of it. Right-click a handle to fix the size of one of them.
+
+    `columns`, `rows` : `int | list[float]` - a number of equal ratio tracks, or the track weights / sizes
+    `column_modes`, `row_modes` : `list[int]` - `TRACK_*` of each track, ratio tracks if None
+    """
+
+    TRACK_RATIO = 0         # the track shares the space left by the fixed tracks, by weight
+    TRACK_FIXED = 1         # the track is a fixed number of pixels
+
+    AXIS_COLUMNS = 0
+    AXIS_ROWS = 1
+
+    # not known to the array solver, see boxer.layout
+    _array_layout_kind = None
+
+    def __init__(self,
+            columns : int | list[float] = 2,
+            rows : int | list[float] = 2,
+            column_modes : list[int] | None = None,
+            row_modes : list[int] | None = None,
+            create_default_children : bool = False,
+            **kwargs):
+        Container.__init__( self, **kwargs )
+        self.ratio_margin = 15 # limit from hitting the neighbouring edges, in pixels
+
+        self.columns : list[float] = []
+        self.column_modes : list[int] = []
+        self.rows : list[float] = []
+        self.row_modes : list[int] = []
+        self._tracks_version = 0
+        self._track_edges_cache = None      # ( key, column edges, row edges )
+        self._child_slots = ( -1, {} )      # ( Container._structure_version, { id(child) : index } )
+
+        # [ ( axis, edge, BoxHandle ) ], one per inner track edge
+        self.track_handles : list[tuple[int, int, boxer.handles.BoxHandle]] = []
+        self._track_lines_slot : int | None = None
+        self._track_lines_finalizer = None
+        self._track_line_original_color = (255,255,255,180)
+
+        self.do_draw_handle_ui = False
+        self.draw_handle_ui_rightclick_data = {}
+
+        # ( axis, edge, offset ) of a drag in progress, with `.preview_drag`
+        self._preview_track_edge : tuple[int, int, float] | None = None
+
+        self.set_tracks( columns, rows, column_modes, row_modes )
+
+        self.create_default_children = create_default_children
+        if self.create_default_children:
+            self._default_children()
+
+
+    def _default_children(self) -> None:
+        for row in range( len(self.rows) ):
+            for column in range( len(self.columns) ):
+                child = Container(name = self.name + "_c%d_%d"%(column, row), batch=self.batch, window=self.window)
+                self.set_child( child, row * len(self.columns) + column )
+
+
+    def release_outline(self) -> None:
+        super().release_outline()
+        if self._track_lines_finalizer is not None:
+            self._track_lines_finalizer()
+        self._track_lines_slot = None
+
+
+    def dispose(self) -> None:
+        if self._disposed:
+            return
+        super().dispose()
+        for _, _, handle in self.track_handles:
+            handle.dispose()
+
+
+    @property
+    def split_handles(self) -> list[boxer.handles.Handle]:
+        """the handles the root's mouse router sends events to"""
+        return [ handle for _, _, handle in self.track_handles ]
+
+
+    # tracks -------------------------------------------------------------------
+
+    def get_tracks(self, axis : int) -> tuple[list[float], list[int]]:
+        """( sizes, modes ) of the tracks of `axis` (`AXIS_COLUMNS` or `AXIS_ROWS`)"""
+        if axis == GridContainer.AXIS_COLUMNS:
+            return self.columns, self.column_modes
+        return self.rows, self.row_modes
+
+
+    def set_tracks(self,
+            columns : int | list[float],
+            rows : int | list[float],
+            column_modes : list[int] | None = None,
+            row_modes : list[int] | None = None) -> None:
+        """set the column and row tracks, see the class docstring"""
+        if isinstance( columns, int ):
+            columns = [ 1.0 / columns ] * columns
+        if isinstance( rows, int ):
+            rows = [ 1.0 / rows ] * rows
+        counts_changed = len(columns) != len(self.columns) or len(rows) != len(self.rows)
+        self.columns = [ float(size) for size in columns ]
+        self.rows = [ float(size) for size in rows ]
+        self.column_modes = list( column_modes ) if column_modes is not None else [ GridContainer.TRACK_RATIO ] * len(columns)
+        self.row_modes = list( row_modes ) if row_modes is not None else [ GridContainer.TRACK_RATIO ] * len(rows)
+        if counts_changed:
+            self._build_track_handles()
+        self._tracks_changed()
+
+
+    def _tracks_changed(self) -> None:
+        self._tracks_version += 1
+        self.invalidate_geometry()
+
+
+    @staticmethod
+    def solve_tracks( sizes : list[float], modes : list[int], length : float ) -> list[float]:
+        """offsets of the edges of tracks along an axis of `length`, `len(sizes) + 1` of
+        them from 0.0 to `length`, inner edges floored to whole pixels.
+        Fixed tracks take their size, ratio tracks share what's left by weight,
+        the last track takes any remainder."""
+        fixed = 0.0
+        weights = 0.0
+        for size, mode in zip( sizes, modes ):
+            if mode == GridContainer.TRACK_FIXED:
+                fixed += size
+            else:
+                weights += size
+        free = max( 0.0, length - fixed )
+
+        edges = [ 0.0 ]
+        position = 0.0
+        for size, mode in zip( sizes, modes ):
+            if mode == GridContainer.TRACK_FIXED:
+                position += size
+            elif weights > 0.0:
+                position += free * size / weights
+            edges.append( min( math.floor( position ), length ) )
+        edges[-1] = length
+        return edges
+
+
+    def get_track_edges(self) -> tuple[list[float], list[float]]:
+        """( column edges, row edges ) relative to `.position`, see `.solve_tracks()`
+        solved once per size and track change, for all the children"""
+        key = ( self.width, self.height, self._tracks_version )
+        if self._track_edges_cache is None or self._track_edges_cache[0] != key:
+            self._track_edges_cache = ( key,
+                                    GridContainer.solve_tracks( self.columns, self.column_modes, self.width ),
+                                    GridContainer.solve_tracks( self.rows, self.row_modes, self.height ) )
+        return self._track_edges_cache[1], self._track_edges_cache[2]
+
+
+    def get_track_pixels(self, axis : int) -> list[float]:
+        """the laid out sizes of the tracks of `axis`, in pixels"""
+        edges = self.get_track_edges()[axis]
+        return [ edges[i + 1] - edges[i] for i in range( len(edges) - 1 ) ]
+
+
+    def set_track_pixels(self, axis : int, pixels : list[float]) -> None:
+        """resize the tracks of `axis` to `pixels`: fixed tracks take the sizes,
+        ratio tracks take weights in proportion to theirs"""
+        sizes, modes = self.get_tracks( axis )
+        ratio_total = sum( pixels[i] for i in range( len(pixels) ) if modes[i] != GridContainer.TRACK_FIXED )
+        for i, pixel in enumerate( pixels ):
+            if modes[i] == GridContainer.TRACK_FIXED:
+                sizes[i] = float( pixel )
+            elif ratio_total > 0.0:
+                sizes[i] = pixel / ratio_total
+        self._tracks_changed()
+
+
+    def move_track_edge(self, axis : int, edge : int, offset : float) -> None:
+        """move inner edge `edge` of `axis` (between tracks `edge` and `edge + 1`) to
+        `offset` pixels from `.position`, resizing the two tracks"""
+        edges = self.get_track_edges()[axis]
+        low = edges[edge] + self.ratio_margin
+        high = edges[edge + 2] - self.ratio_margin
+        offset = min( high, max( low, offset ) ) if low <= high else ( edges[edge] + edges[edge + 2] ) * 0.5
+        pixels = self.get_track_pixels( axis )
+        pixels[edge] = offset - edges[edge]
+        pixels[edge + 1] = edges[edge + 2] - offset
+        self.set_track_pixels( axis, pixels )
+
+
+    def set_track_modes(self, axis : int, modes : dict[int, int]) -> None:
+        """set the `TRACK_*` mode of tracks of `axis`, `{ track index : mode }`,
+        keeping the tracks at their current size"""
+        pixels = self.get_track_pixels( axis )
+        track_modes = self.get_tracks( axis )[1]
+        for track, mode in modes.items():
+            track_modes[track] = mode
+        self.set_track_pixels( axis, pixels )
+
+
+    def layout_as_json(self) -> dict:
+        return {
+            "columns": list( self.columns ),
+            "column_modes": list( self.column_modes ),
+            "rows": list( self.rows ),
+            "row_modes": list( self.row_modes ),
+        }
+
+
+    def set_layout_from_json(self, data : dict) -> None:
+        self.set_tracks( data.get( "columns", self.columns ),
+                        data.get( "rows", self.rows ),
+                        data.get( "column_modes", self.column_modes ),
+                        data.get( "row_modes", self.row_modes ) )
+
+
+    # children -----------------------------------------------------------------
+
+    def _child_cell(self, this) -> tuple[int, int]:
+        """( column, row ) of child `this`"""
+        version, slots = self._child_slots
+        if version != Container._structure_version:
+            slots = { id(child) : index for index, child in enumerate( self.children ) if child is not None }
+            self._child_slots = ( Container._structure_version, slots )
+        return divmod( slots[ id(this) ], len(self.columns) )[::-1]
+
+
+    def get_child_size(self, this) -> pyglet.math.Vec2:
+        column, row = self._child_cell( this )
+        column_edges, row_edges = self.get_track_edges()
+        # a pixel gap after every track but the last, as in HSplitContainer / VSplitContainer
+        width = column_edges[column + 1] - column_edges[column] - ( 1.0 if column < len(self.columns) - 1 else 0.0 )
+        height = row_edges[row + 1] - row_edges[row] - ( 1.0 if row < len(self.rows) - 1 else 0.0 )
+        return pyglet.math.Vec2( width, height )
+
+
+    def get_child_position(self, this) -> pyglet.math.Vec2:
+        column, row = self._child_cell( this )
+        column_edges, row_edges = self.get_track_edges()
+        return pyglet.math.Vec2( self.position.x + column_edges[column], self.position.y + row_edges[row] )
+
+
+    def get_child_at(self, x, y) -> 'Container | None':
+        # a binary search of the edges on each axis
+        column_edges, row_edges = self.get_track_edges()
+        column = min( max( bisect.bisect_right( column_edges, x - self.position.x ) - 1, 0 ), len(self.columns) - 1 )
+        row = min( max( bisect.bisect_right( row_edges, y - self.position.y ) - 1, 0 ), len(self.rows) - 1 )
+        index = row * len(self.columns) + column
+        return self.children[index] if index < len(self.children) else None
+
+
+    def close_child(self, child : 'Container') -> 'Container | None':
+        """remove `child` from the grid: a grid of one row or one column loses that
+        track, a grid of more rows and columns gets an empty leaf in the cell.
+        Returns the new leaf, or None."""
+        index = self.children.index( child )
+        self.remove_child( child )
+        if len(self.rows) == 1 or len(self.columns) == 1:
+            axis = GridContainer.AXIS_COLUMNS if len(self.rows) == 1 else GridContainer.AXIS_ROWS
+            sizes, modes = self.get_tracks( axis )
+            if len(sizes) > 1:
+                del sizes[index]
+                del modes[index]
+                del self.children[index]
+                Container.structure_changed()
+                self._build_track_handles()
+                self._tracks_changed()
+                return None
+        leaf = Container(name = child.name + "_empty", batch=self.batch, window=self.window)
+        self.set_child( leaf, index )
+        return leaf
+
+
+    # handles ------------------------------------------------------------------
+
+    def _build_track_handles(self) -> None:
+        """(re)create one handle and one outline segment per inner track edge"""
+        root = self.get_root_container()
+        for _, _, handle in self.track_handles:
+            root._routed_split_handles.discard( handle )
+            handle.dispose()
+        if self._track_lines_finalizer is not None:
+            self._track_lines_finalizer()
+        self.track_handles = []
+
+        for axis, count in ( ( GridContainer.AXIS_COLUMNS, len(self.columns) ), ( GridContainer.AXIS_ROWS, len(self.rows) ) ):
+            for edge in range( count - 1 ):
+                handle = boxer.handles.BoxHandle(\
+                        position = pyglet.math.Vec2( 0.0, 0.0 ),
+                        name = "%s_TrackHandle_%d_%d"%(self.name, axis, edge),
+                        display_width = 5.0,
+                        display_height = 5.0,
+                        hit_width = 15.0,
+                        hit_height = 15.0,
+                        mouse = None,
+                        debug = False,
+                        space = boxer.handles.Handle.SPACE_WORLD,
+                        )
+                # the handles receive mouse events from the root's mouse router
+                handle.push_handlers(
+                    position_updated = lambda position, axis=axis, edge=edge: self.on_track_handle_position_updated( axis, edge ),
+                    mouse_entered = lambda axis=axis, edge=edge: self.on_track_handle_mouse_entered( axis, edge ),
+                    mouse_exited = lambda axis=axis, edge=edge: self.on_track_handle_mouse_exited( axis, edge ),
+                    pressed = lambda x, y, buttons, modifiers, axis=axis, edge=edge: self.on_track_handle_mouse_pressed( axis, edge, x, y, buttons, modifiers ),
+                    released = lambda x, y, buttons, modifiers: self.on_track_handle_mouse_released() )
+                self.track_handles.append( ( axis, edge, handle ) )
+
+        # the edge lines are a block of segments in the batch's boxer.outlines.OutlineRenderer
+        count = len( self.track_handles )
+        self._track_lines_slot = None
+        self._track_lines_finalizer = None
+        if count:
+            self._track_lines_slot = self._outline_renderer.alloc( count )
+            self._outline_renderer.set_thickness( self._track_lines_slot, 4.0, count )
+            self._outline_renderer.set_color( self._track_lines_slot, self._track_line_original_color[:3]+(0,), count )
+            self._track_lines_finalizer = weakref.finalize( self, self._outline_renderer.free, self._track_lines_slot, count )
+
+
+    def _track_handle_index(self, axis : int, edge : int) -> int:
+        return edge if axis == GridContainer.AXIS_COLUMNS else len(self.columns) - 1 + edge
+
+
+    def update_node_geometry(self) -> None:
+        super().update_node_geometry()
+        column_edges, row_edges = self.get_track_edges()
+        for axis, edge, handle in self.track_handles:
+            if axis == GridContainer.AXIS_COLUMNS:
+                offset = column_edges[edge + 1]
+                handle.position = pyglet.math.Vec2( self.position.x + offset, self.position.y + (self.height * 0.5) )
+                handle.hit_width = 10.0
+                handle.hit_height = self.height - 20.0
+                handle.display_width = 2.0
+                handle.display_height = handle.hit_height - 2.0
+            else:
+                offset = row_edges[edge + 1]
+                handle.position = pyglet.math.Vec2( self.position.x + (self.width * 0.5), self.position.y + offset )
+                handle.hit_width = self.width - 20.0
+                handle.hit_height = 10.0
+                handle.display_width = handle.hit_width - 2.0
+                handle.display_height = 2.0
+            handle.set_shape_anchors()
+            handle.update_vertices()
+            self.set_track_line( axis, edge, offset )
+            handle.update_position(dispatch_event = False)
+
+
+    def set_track_line(self, axis : int, edge : int, offset : float) -> None:
+        """draw the line of inner edge `edge` of `axis`, `offset` pixels from `.position`"""
+        if self._track_lines_slot is None:
+            return
+        if axis == GridContainer.AXIS_COLUMNS:
+            x = self.position.x + offset - 1.0
+            segment = ( x, self.position.y + 0.5, x, self.position.y + self.height - 0.5 )
+        else:
+            y = self.position.y + offset - 1.0
+            segment = ( self.position.x + 0.5, y, self.position.x + self.width - 0.5, y )
+        self._outline_renderer.set_segment( self._track_lines_slot + self._track_handle_index( axis, edge ), *segment )
+
+
+    def on_track_handle_position_updated(self, axis : int, edge : int) -> None:
+        handle = self.track_handles[ self._track_handle_index( axis, edge ) ][2]
+        if axis == GridContainer.AXIS_COLUMNS:
+            offset = handle.position.x - self.position.x
+        else:
+            offset = handle.position.y - self.position.y
+        if self.preview_drag and handle.selected:
+            # only the line moves until the release, see Container.preview_drag
+            self._preview_track_edge = ( axis, edge, offset )
+            self.set_track_line( axis, edge, offset )
+            boxer.redraw.invalidate( ( self.position[0], self.position[1], self.width, self.height ) )
+            return
+        # relayout of this subtree is deferred to the next frame's
+        # .update_dirty_geometries() pass, however many drag events arrive
+        self.move_track_edge( axis, edge, offset )
+
+
+    def on_track_handle_mouse_released(self) -> None:
+        # apply a previewed drag
+        if self._preview_track_edge is not None:
+            axis, edge, offset = self._preview_track_edge
+            self._preview_track_edge = None
+            self.move_track_edge( axis, edge, offset )
+
+
+    def on_track_handle_mouse_pressed(self, axis : int, edge : int, x, y, buttons, modifiers) -> None:
+        print("\033[38;5;93m-^- \033[38;5;237m[h]\033[38;5;245m on_track_handle_mouse_pressed %s %s %s \033[0m %s, %s, %s, %s"%(self.name, axis, edge, x, y, buttons, modifiers))
+        if buttons & pyglet.window.mouse.RIGHT:
+            # right-click menu, drawn from Container.draw() as for SplitContainers
+            self.do_draw_handle_ui = True
+            self.draw_handle_ui_rightclick_data = {"x": x, "y": self.window.height - y, "axis": axis, "edge": edge}
+
+
+    def on_track_handle_mouse_entered(self, axis : int, edge : int) -> None:
+        if self._track_lines_slot is not None:
+            self._outline_renderer.set_color( self._track_lines_slot + self._track_handle_index( axis, edge ), self._track_line_original_color )
+
+
+    def on_track_handle_mouse_exited(self, axis : int, edge : int) -> None:
+        if self._track_lines_slot is not None:
+            self._outline_renderer.set_color( self._track_lines_slot + self._track_handle_index( axis, edge ), self._track_line_original_color[:3]+(0,) )
+
+
+    def draw_handle_ui(self) -> None:
+        """draws the track edge menu, triggered on right-click:
+        "ratio" (both tracks share by weight), "fixed 0" / "fixed 1" (the track
+        before / after the edge keeps its size in pixels)
+        """
+        if self.do_draw_handle_ui:
+            axis = self.draw_handle_ui_rightclick_data["axis"]
+            edge = self.draw_handle_ui_rightclick_data["edge"]
+            modes = self.get_tracks( axis )[1]
+            imgui.set_next_window_position( self.draw_handle_ui_rightclick_data["x"], self.draw_handle_ui_rightclick_data["y"] )
+            imgui.open_popup( "grid-container-right-click-context-menu" )
+            with imgui.begin_popup( "grid-container-right-click-context-menu" ) as track_handle_context_menu:
+                opened = [False, False, False]
+                selected = [ modes[edge] != GridContainer.TRACK_FIXED and modes[edge + 1] != GridContainer.TRACK_FIXED,
+                            modes[edge] == GridContainer.TRACK_FIXED,
+                            modes[edge + 1] == GridContainer.TRACK_FIXED ]
+                if track_handle_context_menu.opened:
+                    opened[0], selected[0] = imgui.selectable("ratio", selected[0])
+                    opened[1], selected[1] = imgui.selectable("fixed 0", selected[1])
+                    opened[2], selected[2] = imgui.selectable("fixed 1", selected[2])
+
+                    if True in opened:
+                        choice = opened.index(True)
+                        self.set_track_modes( axis, {
+                            edge : GridContainer.TRACK_FIXED if choice == 1 else GridContainer.TRACK_RATIO,
+                            edge + 1 : GridContainer.TRACK_FIXED if choice == 2 else GridContainer.TRACK_RATIO } )
+                        self.do_draw_handle_ui = False
+                        imgui.close_current_popup()
+
+                    if imgui.is_mouse_released(0):
+                        # close on left-mouse-up
+                        self.do_draw_handle_ui = False
+                        imgui.close_current_popup()
+
+
+class HNSplitContainer( GridContainer ):
+    """N-way horizontal split, a `GridContainer` of one row,
+    first child on the left"""
+
+    def __init__(self, columns : int | list[float] = 3, column_modes : list[int] | None = None, **kwargs):
+        kwargs.pop( "rows", None )
+        kwargs.pop( "row_modes", None )
+        GridContainer.__init__( self, columns = columns, rows = 1, column_modes = column_modes, **kwargs )
+
+
+class VNSplitContainer( GridContainer ):
+    """N-way vertical split, a `GridContainer` of one column,
+    first child on the bottom"""
+
+    def __init__(self, rows : int | list[float] = 3, row_modes : list[int] | None = None, **kwargs):
+        kwargs.pop( "columns", None )
+        kwargs.pop( "column_modes", None )
+        GridContainer.__init__( self, columns = 1, rows = rows, row_modes = row_modes, **kwargs )
+
+
 # ------------------------------------------------------------------------------
 class ContainerView( pyglet.event.EventDispatcher ):
     """
@@ -1675,8 +3334,12 @@ class ContainerView( pyglet.event.EventDispatcher ):
     Implementations will probably want to connect to window events and/or
     other events in the system.
     
-    connect_handlers( container )
-    disconnect_handlers( container )
+    connect_handlers( bus )
+    disconnect_handlers( bus )
+
+    are called with the window's `boxer.events.EventBus` when the mouse enters and
+    leaves the view's container, `bus.push_handlers()` / `bus.remove_handlers()`
+    subscribe and unsubscribe window events in O(1).
     
     """
     # class events
@@ -1693,6 +3356,11 @@ class ContainerView( pyglet.event.EventDispatcher ):
     # Container.register_container_view_type( name : str, <ContainerView subcclass> )
     auto_register = True
 
+    # draw instances into an offscreen cache, redrawn only after .invalidate()
+    # (or a move/resize), instead of drawing the class every frame.
+    # see boxer.viewcache
+    cache_to_texture = False
+
     # imgui ----------------------------------------------------------------
     # no decoration / no collapsible title bar
     containerview_imwindow_flags = imgui.WINDOW_NO_TITLE_BAR\
@@ -1713,6 +3381,16 @@ class ContainerView( pyglet.event.EventDispatcher ):
         ContainerView.event_type.dispatch_event( "view_created", self )
 
 
+    def dispose(self) -> None:
+        """release the view's vertex lists, textures, clock callbacks and handlers.
+        Called by `Container.change_container_view()` (and on collapse) when the view
+        is removed from its container, the view isn't drawn again after this.
+
+        Subclasses extend it, calling `super().dispose()`.
+        """
+        self._disposed = True
+
+
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         print(f'\033[38;5;63m[ContainerView.__init_subclass__]\033[0m {cls}')
@@ -1745,6 +3423,29 @@ class ContainerView( pyglet.event.EventDispatcher ):
         self.height = container.height
         
 
+    def as_json(self) -> dict:
+        """write the view's state as a json ready dict, saved in layout snapshots
+        (see `Container.as_json()`). Subclasses override this with `.from_json()`."""
+        return {}
+
+
+    def from_json(self, data : dict) -> None:
+        """restore the state written by `.as_json()`, called by `Container.restore_layout()`
+        right after instancing the view, before it has geometry"""
+        ...
+
+
+    def invalidate(self) -> None:
+        """report a change of the view's contents, so a cached view
+        (`cache_to_texture`) is drawn again, and a frame is scheduled"""
+        self._cache_valid = False
+        position = getattr( self, "position", None )
+        if position is None:
+            boxer.redraw.invalidate()
+        else:
+            boxer.redraw.invalidate( ( position[0], position[1], self.width, self.height ) )
+
+
     def draw_imgui(self) -> None:
         ...
 
@@ -1926,24 +3627,16 @@ if __name__ == "__main__":
             
             self.batch = batch or pyglet.graphics.Batch()
             self._marchinglines_time = 0.0
+            # shared program, this view's colour, inner rect and line settings are vertex attributes
             self._marchinglines_shader = boxer.shaders.get_marchinglines_shader()
 
 
             #color = [ i*255 for i in colorsys.hls_to_rgb( 0.521 + (random.random()-0.5)*0.1, 0.5, 0.65 )] + [128]
 
-
-            self._marchinglines_shader["color_one"] = (color[0]/255.0, color[1]/255.0, color[2]/255.0, color[3]/255.0)#(1.0, 0.1, 0.0, 0.25)
-            self._marchinglines_shader["line_ratio"] = 0.1
-            self._marchinglines_shader["line_width"] = 10
-            self._marchinglines_shader["gap_alpha"] = 0.8
-            self._marchinglines_shader["time"] = 0.0
-            self._marchinglines_shader["ir_bl"] = (0.0, 0.0)    # inner rect, bottom left
-            self._marchinglines_shader["ir_tr"] = (0.0, 0.0)    # inner rect, top right
-            self._marchinglines_shader["positive"] = 0.0        # value of inner rect (1.0
-                                                            # means black outside, 0.0 means black inside)
+            # ( line_ratio, line_width, gap_alpha ), the line attribute's time is animated
+            self._line = (0.1, 10.0, 0.8)
 
             _c = [ i for i in colorsys.hls_to_rgb( 0.521 + (random.random()-0.5)*0.1, 0.5, 0.65 )] + [0.5]
-            self._marchinglines_shader["color_one"] = _c
 
 
             self.vertex_list : pyglet.graphics.vertexdomain.VertexList = self._marchinglines_shader.vertex_list_indexed( 4,
@@ -1953,20 +3646,31 @@ if __name__ == "__main__":
                                             None,
                                             position = ('f', _points),
                                             colors = ('f', _colors),
+                                            color_one = ('f', _c * 4),
+                                            inner_rect = ('f', (0.0, 0.0, 0.0, 0.0) * 4),    # inner rect, bottom left, top right
+                                            positive = ('f', (0.0,) * 4),        # value of inner rect (1.0
+                                                            # means black outside, 0.0 means black inside)
+                                            line = ('f', (*self._line, 0.0) * 4),
                                             )
             super(BlueView, self).__init__()
 
 
+        def dispose(self) -> None:
+            if getattr( self, "_disposed", False ):
+                return
+            self.vertex_list.delete()
+            super().dispose()
+
+
         def __del__(self) -> None:
-            super(BlueView, self).__del__()
             print("\033[38;5;52m[X]\033[0m '%s' (BlueView) being deleted."%self)
-            self.vertex_list.delete()
+            boxer.leaks.warn_undisposed( self )
             super().__del__()
 
 
         def update_geometries(self, container: Container) -> None:
             self._marchinglines_time -= 0.5
-            self._marchinglines_shader["time"] = self._marchinglines_time
+            self.vertex_list.line = (*self._line, self._marchinglines_time) * 4
             self.vertex_list.position = ( container.position.x, container.position.y + container.height, 0.0,
                                         container.position.x + container.width, container.position.y + container.height, 0.0,
                                         container.position.x + container.width, container.position.y, 0.0,
@@ -1974,7 +3678,7 @@ if __name__ == "__main__":
 
 
         def set_color(self, color : tuple) -> None:
-            self._marchinglines_shader["color_one"] = (color[0]/255.0, color[1]/255.0, color[2]/255.0, color[3]/255.0)#(1.0, 0.1, 0.0, 0.25)            
+            self.vertex_list.color_one = (color[0]/255.0, color[1]/255.0, color[2]/255.0, color[3]/255.0) * 4 #(1.0, 0.1, 0.0, 0.25)
 
 
     #---------------------------------------------------------------------------
@@ -2060,6 +3764,7 @@ if __name__ == "__main__":
     #---------------------------------------------------------------------------
     # extend container actions
     # add a new menu item
+    ACTION_SUBDIVIDE_TEST = len( Container.container_action_labels )
     Container.container_action_labels += ["subdivide layout test"]
     # stash original callback
     change_container_original = Container.change_container
@@ -2101,7 +3806,7 @@ if __name__ == "__main__":
 
         # change_container maps an action here:
         # call the subdivision function defined just above
-        if action==5:
+        if action==ACTION_SUBDIVIDE_TEST:
             _root = container.root_container
             print(f"   subdividing container {container}")
             _subd_container(3, container)
@@ -0,0 +1,272 @@
+"""routed events
+
+An `EventBus` keeps a table of subscriptions keyed by ( event type, target ), so
+subscribing and unsubscribing are O(1), and a dispatch only calls the subscribers
+of that event type (and target), however many handlers exist for other events.
+
+Each window has one bus, `for_window( window )`, which pushes a single frame of
+forwarding handlers onto the window's pyglet handler stack and dispatches the
+window's input events to its subscribers:
+
+    bus = boxer.events.for_window( window )
+    subscription = bus.subscribe( "on_mouse_press", self.on_mouse_press, priority = 10 )
+    subscription.cancel()
+
+    bus.push_handlers( self.mouse )                          # pyglet style, all window events of an object
+    bus.remove_handlers( on_mouse_motion = self.on_mouse_motion )
+
+Subscribers with a `target` (eg. a `boxer.containers.Container`) get routed events,
+dispatched with `bus.dispatch( event_type, *args, target = leaf )`: CAPTURE phase
+subscribers from the root of the target's `.parent` chain down to the target, then
+BUBBLE phase subscribers from the target back up to the root. The root container's
+mouse router dispatches its mouse events this way, to the leaf under the mouse.
+
+Subscribers run by priority (highest first), equal priorities newest first like a
+pyglet handler stack. A subscriber returning `EVENT_HANDLED` stops the dispatch.
+"""
+import functools
+import itertools
+import weakref
+
+import pyglet
+
+import boxer.profiler
+
+EVENT_HANDLED = pyglet.event.EVENT_HANDLED
+EVENT_UNHANDLED = pyglet.event.EVENT_UNHANDLED
+
+CAPTURE = 0     # routed events, root to target
+BUBBLE = 1      # routed events, target to root (and the phase of untargeted subscriptions)
+
+# window events forwarded to a window's bus
+WINDOW_EVENTS = ( "on_mouse_motion", "on_mouse_press", "on_mouse_release", "on_mouse_drag",
+                "on_mouse_scroll", "on_mouse_enter", "on_mouse_leave",
+                "on_key_press", "on_key_release", "on_text", "on_text_motion" )
+
+
+class Subscription:
+    """one handler subscribed to an event type (of a target), returned by `EventBus.subscribe()`"""
+    __slots__ = ( "event_type", "handler", "target", "priority", "phase", "serial", "_bus", "__weakref__" )
+
+    def __init__(self, bus, event_type : str, handler, target, priority : int, phase : int, serial : int):
+        self._bus = bus
+        self.event_type = event_type
+        self.handler = handler
+        self.target = target
+        self.priority = priority
+        self.phase = phase
+        self.serial = serial
+
+
+    @property
+    def active(self) -> bool:
+        return self._bus is not None
+
+
+    def cancel(self) -> None:
+        """unsubscribe, O(1)"""
+        if self._bus is not None:
+            self._bus.unsubscribe( self )
+
+
+    def __repr__(self) -> str:
+        return "<Subscription %s target:%s priority:%s>"%( self.event_type, self.target, self.priority )
+
+
+class EventBus:
+    """subscription table and dispatcher of one window's events"""
+
+    def __init__(self):
+        # { ( event type, target ) : { Subscription : None } }, dicts as ordered sets
+        self._subscriptions : dict[tuple, dict] = {}
+        # { ( event type, target ) : ( Subscription, .. ) } in call order, built on dispatch
+        self._ordered : dict[tuple, tuple] = {}
+        # { target : { event type, .. } }, to drop every subscription of a target
+        self._target_events : dict[object, set] = {}
+        # { event type : number of subscriptions with a target }
+        self._routed_counts : dict[str, int] = {}
+        # { ( event type, handler ) : Subscription } of `.push_handlers()`
+        self._pushed : dict[tuple, Subscription] = {}
+        self._serials = itertools.count()
+
+        # weak, the window's handler stack (and `_buses`) keep the bus alive, not the reverse
+        self._window_ref = None
+        self._window_handlers = {}
+        self.dispatch_count = 0     # handlers called, see tests/test_events.py
+
+
+    # window -------------------------------------------------------------------
+
+    @property
+    def window(self) -> pyglet.window.Window | None:
+        return self._window_ref() if self._window_ref is not None else None
+
+
+    def attach(self, window : pyglet.window.Window) -> None:
+        """forward `window`'s input events (`WINDOW_EVENTS`) to the bus, with one
+        frame on the window's handler stack"""
+        self.detach()
+        self._window_ref = weakref.ref( window )
+        self._window_handlers = { name : functools.partial( self._forward, name ) for name in WINDOW_EVENTS }
+        window.push_handlers( **self._window_handlers )
+
+
+    def detach(self) -> None:
+        window = self.window
+        if window is not None:
+            window.remove_handlers( **self._window_handlers )
+        self._window_ref = None
+        self._window_handlers = {}
+
+
+    # subscriptions ------------------------------------------------------------
+
+    def subscribe(self, event_type : str, handler, target = None, priority : int = 0, phase : int = BUBBLE) -> Subscription:
+        """call `handler( *args )` on `event_type`, of `target` (routed) or of the window (None)"""
+        subscription = Subscription( self, event_type, handler, target, priority, phase, next( self._serials ) )
+        key = ( event_type, target )
+        self._subscriptions.setdefault( key, {} )[subscription] = None
+        self._ordered.pop( key, None )
+        if target is not None:
+            self._target_events.setdefault( target, set() ).add( event_type )
+            self._routed_counts[event_type] = self._routed_counts.get( event_type, 0 ) + 1
+        return subscription
+
+
+    def unsubscribe(self, subscription : Subscription) -> None:
+        if subscription._bus is not self:
+            return
+        subscription._bus = None
+        key = ( subscription.event_type, subscription.target )
+        subscriptions = self._subscriptions.get( key )
+        if subscriptions is None or subscriptions.pop( subscription, False ) is False:
+            return
+        self._ordered.pop( key, None )
+        if not subscriptions:
+            del self._subscriptions[key]
+            if subscription.target is not None:
+                events = self._target_events.get( subscription.target )
+                if events is not None:
+                    events.discard( subscription.event_type )
+                    if not events:
+                        del self._target_events[subscription.target]
+        if subscription.target is not None:
+            self._routed_counts[subscription.event_type] -= 1
+
+
+    def unsubscribe_target(self, target) -> None:
+        """drop every subscription of `target` (eg. a disposed container)"""
+        for event_type in list( self._target_events.get( target, () ) ):
+            for subscription in list( self._subscriptions.get( ( event_type, target ), () ) ):
+                self.unsubscribe( subscription )
+
+
+    def subscribers(self, event_type : str, target = None) -> tuple[Subscription, ...]:
+        """subscriptions of `event_type` of `target`, in call order"""
+        key = ( event_type, target )
+        ordered = self._ordered.get( key )
+        if ordered is None:
+            ordered = tuple( sorted( self._subscriptions.get( key, () ), key = lambda s: ( -s.priority, -s.serial ) ) )
+            self._ordered[key] = ordered
+        return ordered
+
+
+    def has_subscribers(self, event_type : str, target = None) -> bool:
+        return ( event_type, target ) in self._subscriptions
+
+
+    def __len__(self) -> int:
+        return sum( len(subscriptions) for subscriptions in self._subscriptions.values() )
+
+
+    # pyglet style -------------------------------------------------------------
+
+    def push_handlers(self, *objects, **handlers) -> None:
+        """subscribe like `pyglet.event.EventDispatcher.push_handlers()`: the methods of
+        `objects` named after `WINDOW_EVENTS`, and `event_type = handler` keywords"""
+        for obj in objects:
+            for event_type in WINDOW_EVENTS:
+                handler = getattr( obj, event_type, None )
+                if handler is not None:
+                    handlers[event_type] = handler
+        for event_type, handler in handlers.items():
+            subscription = self._pushed.get( ( event_type, handler ) )
+            if subscription is None or not subscription.active:
+                self._pushed[ ( event_type, handler ) ] = self.subscribe( event_type, handler )
+
+
+    def remove_handlers(self, *objects, **handlers) -> None:
+        """unsubscribe what `.push_handlers()` subscribed, O(1) per handler"""
+        for obj in objects:
+            for event_type in WINDOW_EVENTS:
+                handler = getattr( obj, event_type, None )
+                if handler is not None:
+                    handlers[event_type] = handler
+        for event_type, handler in handlers.items():
+            subscription = self._pushed.pop( ( event_type, handler ), None )
+            if subscription is not None:
+                subscription.cancel()
+
+
+    # dispatch -----------------------------------------------------------------
+
+    def dispatch(self, event_type : str, *args, target = None) -> bool | None:
+        """call the subscribers of `event_type`: the window's (`target` None), or
+        routed through the `.parent` chain of `target` (capture, then bubble)
+
+        `returns` `EVENT_HANDLED` if a subscriber handled the event"""
+        if target is None:
+            return self._call( self.subscribers( event_type ), args )
+
+        if not self._routed_counts.get( event_type ):
+            return EVENT_UNHANDLED
+        path = []
+        node = target
+        while node is not None:
+            path.append( node )
+            node = getattr( node, "parent", None )
+        for node in reversed( path ):
+            if ( event_type, node ) in self._subscriptions:
+                if self._call( self.subscribers( event_type, node ), args, CAPTURE ):
+                    return EVENT_HANDLED
+        for node in path:
+            if ( event_type, node ) in self._subscriptions:
+                if self._call( self.subscribers( event_type, node ), args, BUBBLE ):
+                    return EVENT_HANDLED
+        return EVENT_UNHANDLED
+
+
+    def _forward(self, event_type : str, *args) -> bool | None:
+        """a window event, recorded as an input span by boxer.profiler"""
+        with boxer.profiler.span( event_type, "input" ):
+            return self.dispatch( event_type, *args )
+
+
+    def _call(self, subscriptions : tuple, args : tuple, phase : int = BUBBLE) -> bool | None:
+        for subscription in subscriptions:
+            if subscription.phase != phase or subscription._bus is None:
+                continue
+            self.dispatch_count += 1
+            if subscription.handler( *args ):
+                return EVENT_HANDLED
+        return EVENT_UNHANDLED
+
+
+# ------------------------------------------------------------------------------
+# { window : EventBus }
+_buses : weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def for_window( window : pyglet.window.Window ) -> EventBus:
+    """the event bus of `window`, created and attached on first use"""
+    bus = _buses.get( window )
+    if bus is None:
+        bus = EventBus()
+        bus.attach( window )
+        _buses[window] = bus
+    return bus
+
+
+def get_bus( window : pyglet.window.Window ) -> EventBus | None:
+    """the event bus of `window` if it has one, without creating it"""
+    return _buses.get( window )
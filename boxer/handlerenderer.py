@@ -0,0 +1,226 @@
+"""shared instanced renderer for BoxHandles and PointHandles.
+
+One `HandleRenderer` per `pyglet.graphics.Batch` draws every instanced handle of
+that batch (`Handle( batch = batch, instanced = True )`) with a single instanced
+draw call: one quad (4 vertices, shared) per handle instance, shaded by a signed
+distance fragment shader, see `boxer.shaders.get_handle_shader()`.
+
+A handle is a row in the renderer's per-instance arrays: its centre, display and
+hit sizes, shape kind, colours and highlight / select opacities. Handles update
+their row with numpy writes (`.set_shape()`, `.set_position()`, `.set_colors()`,
+`.set_state()`), and the changed rows are copied into the instance buffers once,
+just before the batch draws the renderer's group (`.flush()`).
+
+Needs pyglet 2.1.0, pinned in requirements.txt: besides instanced vertex lists
+the renderer uses the instanced domain's internals (`safe_alloc_instance()`,
+`attrib_name_buffers`, and the slot `add_instance()` writes), which can change in
+any release.
+"""
+import weakref
+
+import numpy as np
+import pyglet
+from pyglet import gl
+
+import boxer.shaders
+
+# shape kinds, the `kind` attribute
+KIND_BOX = 0
+KIND_CIRCLE = 1
+
+# quad corners, as a triangle strip
+_CORNERS = ( -1.0, -1.0,  1.0, -1.0,  -1.0, 1.0,  1.0, 1.0 )
+
+# per instance attributes: ( name, format, components )
+_INSTANCE_ATTRIBUTES = (
+    ( "center", "f", 2 ),           # x, y
+    ( "sizes", "f", 4 ),            # display half width, half height, hit half width, half height (radii for circles)
+    ( "kind", "f", 1 ),
+    ( "display_color", "Bn", 4 ),
+    ( "hit_color", "Bn", 4 ),
+    ( "highlight_color", "Bn", 4 ),
+    ( "select_color", "Bn", 4 ),
+    ( "state", "f", 2 ),            # highlight opacity, select opacity 0-1
+)
+
+
+class HandleGroup( pyglet.graphics.Group ):
+    """group to flush pending handle writes, and draw with the handle shader"""
+    def __init__(self, renderer : 'HandleRenderer', program, order = 0):
+        super().__init__(order)
+        self.renderer = weakref.proxy( renderer )
+        self.program = program
+
+
+    def set_state(self):
+        # the domain commits its buffers after set_state, so writes land this frame
+        self.renderer.flush()
+        self.program.use()
+        gl.glEnable(gl.GL_BLEND)
+        gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+
+
+    def unset_state(self):
+        gl.glDisable(gl.GL_BLEND)
+        self.program.stop()
+
+
+class HandleRenderer:
+    """every instanced handle of one batch, drawn with one instanced call
+
+    Get the renderer of a batch with `HandleRenderer.for_batch( batch )`.
+    """
+    INITIAL_CAPACITY = 64   # handles
+
+    _renderers : weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+    @classmethod
+    def for_batch( cls, batch : pyglet.graphics.Batch ) -> 'HandleRenderer':
+        """the shared renderer of `batch`, created on first use"""
+        renderer = cls._renderers.get( batch )
+        if renderer is None:
+            renderer = cls( batch )
+            cls._renderers[batch] = renderer
+        return renderer
+
+
+    def __init__(self, batch : pyglet.graphics.Batch):
+        self.program = boxer.shaders.get_handle_shader()
+        # weak, the renderer lives as long as its batch (see ._renderers)
+        self._batch = weakref.ref( batch )
+        self.group = HandleGroup( self, self.program )
+
+        self.capacity = 0
+        self.end = 0                # slots [0, end) have been handed out, and are drawn
+        self._free : list[int] = []
+        # the vertex list starts with one instance (slot 0), one is added per slot
+        # after that with the vertex list's .add_instance(), so the draw call
+        # covers [0, end). Slots are reused, never removed, so it only grows.
+        self._instances : list = []
+
+        # system memory copies of the per instance attributes, one row per handle
+        self._arrays : dict[str, np.ndarray] = {
+            name : np.zeros( ( 0, components ), dtype = np.uint8 if fmt == "Bn" else np.float32 )
+            for name, fmt, components in _INSTANCE_ATTRIBUTES }
+
+        self._dirty_min = 0         # changed slot range, copied by .flush()
+        self._dirty_max = 0
+        self.vertex_list = self.program.vertex_list_instanced( 4,
+                                        gl.GL_TRIANGLE_STRIP,
+                                        [ name for name, _, _ in _INSTANCE_ATTRIBUTES ],
+                                        batch,
+                                        self.group,
+                                        corner = ( 'f', _CORNERS ),
+                                        **{ name : fmt for name, fmt, _ in _INSTANCE_ATTRIBUTES } )
+        self._grow( self.INITIAL_CAPACITY )
+
+
+    def __len__(self) -> int:
+        """number of handles drawn"""
+        return self.end - len( self._free )
+
+
+    # slots --------------------------------------------------------------------
+
+    def alloc(self) -> int:
+        """reserve a slot (row) for a handle"""
+        if self._free:
+            return self._free.pop()
+        slot = self.end
+        if slot >= self.capacity:
+            self._grow( self.capacity * 2 )
+        self.end = slot + 1
+        if slot > len( self._instances ):
+            self._instances.append( self.vertex_list.add_instance(
+                    **{ name : tuple( array[slot].tolist() ) for name, array in self._arrays.items() } ) )
+        return slot
+
+
+    def free(self, slot : int) -> None:
+        """release a slot, it stops drawing immediately"""
+        for array in self._arrays.values():
+            array[slot] = 0
+        self._mark( slot )
+        self._free.append( slot )
+
+
+    # writes -------------------------------------------------------------------
+
+    def set_shape(self, slot : int, kind : int, display_size : tuple[float, float], hit_size : tuple[float, float]) -> None:
+        """`display_size`, `hit_size` : half width and half height of boxes, ( radius, radius ) of circles"""
+        self._arrays["kind"][slot] = kind
+        self._arrays["sizes"][slot] = ( display_size[0], display_size[1], hit_size[0], hit_size[1] )
+        self._mark( slot )
+
+
+    def set_position(self, slot : int, x : float, y : float) -> None:
+        self._arrays["center"][slot] = ( x, y )
+        self._mark( slot )
+
+
+    def set_positions(self, slots : np.ndarray, positions : np.ndarray) -> None:
+        """move many handles in one write, `positions` ( n, 2 ) for the rows `slots` ( n )"""
+        if len( slots ) == 0:
+            return
+        self._arrays["center"][slots] = positions
+        self._mark( int( slots.min() ) )
+        self._mark( int( slots.max() ) )
+
+
+    def set_colors(self, slot : int, display : tuple, hit : tuple, highlight : tuple, select : tuple) -> None:
+        """colours as (r, g, b, a) in 0-255, or (r, g, b) opaque"""
+        for name, color in ( ("display_color", display), ("hit_color", hit),
+                             ("highlight_color", highlight), ("select_color", select) ):
+            self._arrays[name][slot] = tuple( color ) + ( 255, ) * ( 4 - len( color ) )
+        self._mark( slot )
+
+
+    def set_state(self, slot : int, highlight : float, select : float) -> None:
+        """highlight and select ring opacities, 0-1"""
+        self._arrays["state"][slot] = ( highlight, select )
+        self._mark( slot )
+
+
+    def get_row(self, slot : int) -> dict[str, tuple]:
+        """{ attribute : values } of a slot"""
+        return { name : tuple( array[slot].tolist() ) for name, array in self._arrays.items() }
+
+
+    # buffers ------------------------------------------------------------------
+
+    def flush(self) -> None:
+        """copy the changed rows into the instance buffers"""
+        domain = self.vertex_list.domain
+        if self._dirty_max <= self._dirty_min:
+            return
+        lo = self._dirty_min
+        hi = self._dirty_max
+        for name, array in self._arrays.items():
+            buffer = domain.attrib_name_buffers[name]
+            view = np.ctypeslib.as_array( buffer.get_region( 0, self.capacity ) )
+            view[lo*buffer.count:hi*buffer.count] = array[lo:hi].ravel()
+            buffer.invalidate_region( lo, hi - lo )
+        self._dirty_min = self._dirty_max = 0
+
+
+    def _mark(self, slot : int) -> None:
+        if self._dirty_max <= self._dirty_min:
+            self._dirty_min = slot
+            self._dirty_max = slot + 1
+        else:
+            self._dirty_min = min( self._dirty_min, slot )
+            self._dirty_max = max( self._dirty_max, slot + 1 )
+
+
+    def _grow(self, capacity : int) -> None:
+        """make room for `capacity` handles in the arrays and the instance buffers"""
+        old = self.capacity
+        for name, array in self._arrays.items():
+            self._arrays[name] = np.concatenate( ( array, np.zeros( ( capacity - old, array.shape[1] ), dtype = array.dtype ) ) )
+        # the domain's instance buffers are resized by allocating instance slots,
+        # they keep their contents, and every row is copied again on the next flush
+        self.vertex_list.domain.safe_alloc_instance( capacity - old )
+        self.capacity = capacity
+        self._dirty_min = 0
+        self._dirty_max = capacity
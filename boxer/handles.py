@@ -1,4 +1,8 @@
 # ui handles (draggable areas)
+import itertools
+import math
+
+import numpy as np
 import pyglet
 import pyglet.gl as gl
 
@@ -7,8 +11,11 @@ if __name__ == "__main__":
     sys.path.extend("..")
 
 import boxer
+import boxer.handlerenderer
 import boxer.mouse
 import boxer.shapes
+import boxer.redraw
+import boxer.leaks
 
 DEBUG_SHAPE_COLOR = (255, 80, 20, 128)
 DEBUG_HIT_SHAPE_COLOR = (255, 240, 20, 20)
@@ -29,7 +36,8 @@ class Handle(pyglet.event.EventDispatcher):
         group : pyglet.graphics.Group = None,
         base_opacity : float = 1.0,
         highlighted_opacity : float = 1.0,
-        selected_opacity : float = 1.0
+        selected_opacity : float = 1.0,
+        instanced : bool = False
         ):
 
         self.name = name
@@ -39,7 +47,8 @@ class Handle(pyglet.event.EventDispatcher):
         self.mouse = mouse or None
         self.mouse_inside = False
         self.hilighted = False
-        self.selected = False
+        self.selected = False           # pressed, receives drags
+        self.in_selection = False       # in a HandleSelection, see HandleManager.selection
         self.debug : bool = debug
         self.space : int = space
         self.batch = batch or None #pyglet.graphics.Batch()
@@ -48,6 +57,45 @@ class Handle(pyglet.event.EventDispatcher):
         self.highlighted_opacity = highlighted_opacity
         self.selected_opacity = selected_opacity
         self._shapes = {}
+        self.manager : 'HandleManager' = None    # set by HandleManager.add()
+
+        # drag moves are accumulated, and applied once per frame by .apply_drag()
+        self._drag_pending = pyglet.math.Vec2()
+        self._drag_total = pyglet.math.Vec2()   # of the current drag, for "drag_finished"
+        # with a snapper (see boxer.snapping), the handle snaps while dragged: it follows
+        # the unsnapped drag position, so it can leave a snap line again
+        self.snapper = None                     # the manager's snapper when None
+        self._drag_raw : pyglet.math.Vec2 | None = None
+
+        # an instanced handle owns no shapes, it's a row of its batch's
+        # HandleRenderer (and has no .batch of its own), see boxer.handlerenderer
+        self.renderer : boxer.handlerenderer.HandleRenderer = None
+        self._slot : int = None
+        if instanced:
+            if batch is None:
+                raise ValueError("instanced handles need a batch")
+            self.renderer = boxer.handlerenderer.HandleRenderer.for_batch( batch )
+            self._slot = self.renderer.alloc()
+            self.batch = None
+        boxer.leaks.track( self )
+
+
+    def dispose(self) -> None:
+        """delete the handle's shapes (vertex lists), drop its event handlers and
+        take it out of its manager"""
+        if self.manager is not None:
+            self.manager.remove( self )
+        # a drag waiting for the next frame has nothing left to move
+        self._drag_pending = pyglet.math.Vec2()
+        self._drag_raw = None
+        self.snapper = None
+        if self.renderer is not None:
+            self.renderer.free( self._slot )
+            self.renderer = None
+        for shape in self._shapes.values():
+            shape.delete()
+        self._shapes = {}
+        self.remove_handlers()
 
     @property
     def x(self):
@@ -87,6 +135,50 @@ class Handle(pyglet.event.EventDispatcher):
         raise NotImplementedError()
 
 
+    def hit_bounds(self) -> tuple[float, float, float, float]:
+        """( min x, min y, max x, max y ) of the hit shape, in the handle's space"""
+        raise NotImplementedError()
+
+
+    def _instance_shape(self) -> tuple[int, tuple, tuple]:
+        """( kind, display size, hit size ) of the handle's renderer row, see
+        `boxer.handlerenderer.HandleRenderer.set_shape()`"""
+        raise NotImplementedError()
+
+
+    def _instance_colors(self) -> tuple:
+        """( display, hit, highlight, select ) colours of the handle's renderer row"""
+        raise NotImplementedError()
+
+
+    def _update_instance(self) -> None:
+        """write the whole row of an instanced handle"""
+        if self.renderer is None:
+            return
+        kind, display_size, hit_size = self._instance_shape()
+        self.renderer.set_shape( self._slot, kind, display_size, hit_size )
+        self.renderer.set_position( self._slot, self.position.x, self.position.y )
+        self.renderer.set_colors( self._slot, *self._instance_colors() )
+        self._update_state_shapes()
+
+
+    def _update_state_shapes(self) -> None:
+        """highlight and select opacities, of the batch shapes or the renderer row"""
+        highlight = ( 120 if self.hilighted else 10 ) * self.highlighted_opacity
+        select = 220 * int(self.selected_opacity) if self.selected or self.in_selection else 0
+        if self.renderer is not None:
+            self.renderer.set_state( self._slot, highlight / 255.0, select / 255.0 )
+        elif self.batch:
+            self._shapes["highlight"].opacity = int(highlight)
+            self._shapes["select"].opacity = select
+
+
+    def _update_index(self) -> None:
+        """the hit shape moved or changed size, re-index it in the manager"""
+        if self.manager is not None:
+            self.manager.update( self )
+
+
     def draw(self) -> None:
         # if self.batch:
         #     self.batch.draw()
@@ -107,24 +199,22 @@ class Handle(pyglet.event.EventDispatcher):
             self.dispatch_event("pressed", x, y, buttons, modifiers)
             if buttons & pyglet.window.mouse.LEFT:
                 self.selected = True
-                if self.batch:
-                    self._shapes["select"].opacity = 220 * int(self.selected_opacity)
+                self._drag_total = pyglet.math.Vec2()
+                self._drag_raw = None
         else:
             self.selected = False
-            if self.batch:
-                self._shapes["select"].opacity = 0 * int(self.selected_opacity)
+        self._update_state_shapes()
 
 
     def on_mouse_release( self, x, y, buttons, modifiers ):
-        if self.hilighted and buttons & pyglet.window.mouse.LEFT:
+        if self.selected:
+            # the last moves land before "released"
+            self.finish_drag()
+        # a dragged handle can trail the mouse, it's released wherever the mouse is
+        if ( self.hilighted or self.selected ) and buttons & pyglet.window.mouse.LEFT:
             self.dispatch_event("released", x, y, buttons, modifiers)
-            self.selected = False
-            if self.batch:
-                self._shapes["select"].opacity = 0 * int(self.selected_opacity)
-        else:
-            self.selected = False
-            if self.batch:
-                self._shapes["select"].opacity = 0 * int(self.selected_opacity)
+        self.selected = False
+        self._update_state_shapes()
 
 
     def on_mouse_drag( self, x, y, dx, dy, buttons, modifiers):
@@ -134,55 +224,78 @@ class Handle(pyglet.event.EventDispatcher):
             # OR ask mouse for world-space conversion (mouse holds a camera transform)
             if self.mouse:
                 if self.space == Handle.SPACE_WORLD:
-                    self.position += pyglet.math.Vec2(dx, dy)*(1.0/self.mouse.camera_zoom)
+                    delta = pyglet.math.Vec2(dx, dy)*(1.0/self.mouse.camera_zoom)
                 else:
-                    self.position += pyglet.math.Vec2(dx, dy)
+                    delta = pyglet.math.Vec2(dx, dy)
             else:
-                self.position += pyglet.math.Vec2(dx, dy)
+                delta = pyglet.math.Vec2(dx, dy)
             # print(f"on_mouse_drag draging {x}, {y}, {dx}, {dy}")
-            self.update_position()
+            # a mouse can send many drag events per frame, the handle moves (and
+            # dispatches "position_updated") once, before the next frame
+            self._drag_pending += delta
+            self._drag_total += delta
+            boxer.redraw.call_before_frame( self.apply_drag )
+
+
+    def apply_drag( self ) -> None:
+        """move the handle by the drag moves since the last frame, with one `.update_position()`"""
+        if self._drag_pending == pyglet.math.Vec2():
+            return
+        snapper = self.get_snapper()
+        if snapper is not None:
+            if self._drag_raw is None:
+                self._drag_raw = self.position
+            self._drag_raw += self._drag_pending
+            self.position = snapper.snap( self, self._drag_raw )
+        else:
+            self.position += self._drag_pending
+        self._drag_pending = pyglet.math.Vec2()
+        self.update_position()
+
+
+    def get_snapper( self ):
+        """`.snapper`, or the manager's, None when the handle doesn't snap"""
+        if self.snapper is not None:
+            return self.snapper
+        if self.manager is not None:
+            return self.manager.snapper
+        return None
+
+
+    def finish_drag( self ) -> None:
+        """apply the pending moves, and dispatch "drag_finished" with the drag's total move"""
+        self.apply_drag()
+        total = self._drag_total
+        self._drag_total = pyglet.math.Vec2()
+        self._drag_raw = None
+        if total != pyglet.math.Vec2():
+            self.dispatch_event( "drag_finished", total.x, total.y )
 
 
     def on_mouse_motion( self, x, y, dx, dy):
-        # TODO: fix this, always checks if mouse on every callback
-        # ... and only checking here for the test cases that don't set up a boxer mouse
-        # ... and is pretty darn WET.
-        _prev_mouse_inside = self.mouse_inside
+        # a handle in a HandleManager gets its hover from the manager's index,
+        # this is for handles that are pushed onto a window (or bus) on their own
         if self.mouse:
             if not self.mouse.captured_by_ui:
                 if self.space == Handle.SPACE_WORLD:
                     mp = self.mouse.world_position
                 else:
                     mp = self.mouse.position
-                if self.is_inside( pyglet.math.Vec2( mp.x, mp.y ) ):
-                    self.hilighted = True
-                    self.mouse_inside = True
-                    if _prev_mouse_inside is not True:
-                        self.dispatch_event("mouse_entered")
-                else:
-                    self.hilighted = False
-                    self.mouse_inside = False
-                    if _prev_mouse_inside is True:
-                        self.dispatch_event("mouse_exited")
+                self.set_hovered( self.is_inside( pyglet.math.Vec2( mp.x, mp.y ) ) )
         else:
-            if self.is_inside( pyglet.math.Vec2( x, y ) ):
-                self.hilighted = True
-                self.mouse_inside = True
-                if _prev_mouse_inside is not True:
-                    self.dispatch_event("mouse_entered")
+            self.set_hovered( self.is_inside( pyglet.math.Vec2( x, y ) ) )
 
-            else:
-                self.hilighted = False
-                self.mouse_inside = False
-                if _prev_mouse_inside is True:
-                    self.dispatch_event("mouse_exited")
 
-
-        if self.batch:
-            if self.hilighted:
-                self._shapes["highlight"].opacity = int(120 * self.highlighted_opacity)
-            else:
-                self._shapes["highlight"].opacity = int(10 * self.highlighted_opacity)
+    def set_hovered( self, hovered : bool ) -> None:
+        """highlight the handle, dispatching "mouse_entered" or "mouse_exited" on changes"""
+        _prev_mouse_inside = self.mouse_inside
+        self.hilighted = hovered
+        self.mouse_inside = hovered
+        if hovered and _prev_mouse_inside is not True:
+            self.dispatch_event("mouse_entered")
+        elif not hovered and _prev_mouse_inside is True:
+            self.dispatch_event("mouse_exited")
+        self._update_state_shapes()
 
 
     def update_position( self, dispatch_event = True, update_all_shapes_positions = True ) -> None:
@@ -192,6 +305,10 @@ class Handle(pyglet.event.EventDispatcher):
             for k, v in self._shapes.items():
                 v.x = self.position.x
                 v.y = self.position.y
+            if self.renderer is not None:
+                self.renderer.set_position( self._slot, self.position.x, self.position.y )
+            self._update_index()
+        boxer.redraw.invalidate()
 
 
 # ------------------------------------------------------------------------------
@@ -199,7 +316,8 @@ class Handle(pyglet.event.EventDispatcher):
 Handle.register_event_type("mouse_entered")
 Handle.register_event_type("mouse_exited")
 Handle.register_event_type("position_updated")
-Handle.register_event_type("dragged")
+Handle.register_event_type("dragged") # every drag event, the move is applied once per frame
+Handle.register_event_type("drag_finished") # total move of a drag ( dx, dy ), on release
 Handle.register_event_type("pressed") # for mouse presses
 Handle.register_event_type("released")
 
@@ -257,7 +375,8 @@ class BoxHandle( Handle):
         # self._shapes["highlight"].opacity = 20
         # self._shapes["select"] = boxer.shapes.RectangleLine(  self.position.x, self.position.y, self._hit_width+4, self._hit_height+4, line_width = 1, color = self._selected_color, batch=self.batch)
         # self._shapes["select"].opacity = 20
-        self._shapes["hit"] = pyglet.shapes.Rectangle( self.position.x, self.position.y, self._hit_width, self._hit_height, color=DEBUG_HIT_SHAPE_COLOR, batch=self.batch)
+        if self.renderer is None:
+            self._shapes["hit"] = pyglet.shapes.Rectangle( self.position.x, self.position.y, self._hit_width, self._hit_height, color=DEBUG_HIT_SHAPE_COLOR, batch=self.batch)
         if self.batch:
             self._shapes["display"] = pyglet.shapes.Rectangle( self.position.x, self.position.y, self._display_width, self._display_height, color=DEBUG_SHAPE_COLOR, batch=self.batch)
             self._shapes["highlight"] = boxer.shapes.RectangleLine(  self.position.x, self.position.y, self._hit_width+2, self._hit_height+2, line_width = 1, color = self._highlighted_color, batch=self.batch)
@@ -266,6 +385,7 @@ class BoxHandle( Handle):
             self._shapes["select"].opacity = 20
 
             self.set_shape_anchors()
+        self._update_instance()
 
 
 
@@ -277,10 +397,13 @@ class BoxHandle( Handle):
     @hit_width.setter
     def hit_width(self, value):
         self._hit_width = value
-        self._shapes["hit"].width = value
+        if self.renderer is None:
+            self._shapes["hit"].width = value
         if self.batch:
             self._shapes["highlight"].width = value +2
             self._shapes["select"].width = value + 4
+        self._update_instance()
+        self._update_index()
  
 
     @property
@@ -291,10 +414,13 @@ class BoxHandle( Handle):
     @hit_height.setter
     def hit_height(self, value):
         self._hit_height = value
-        self._shapes["hit"].height = value
+        if self.renderer is None:
+            self._shapes["hit"].height = value
         if self.batch:
             self._shapes["highlight"].height = value +2
             self._shapes["select"].height = value + 4
+        self._update_instance()
+        self._update_index()
 
 
     @property
@@ -307,6 +433,7 @@ class BoxHandle( Handle):
         self._display_width = value
         if self.batch:
             self._shapes["display"].width = value
+        self._update_instance()
 
 
     @property
@@ -319,22 +446,49 @@ class BoxHandle( Handle):
         self._display_height = value
         if self.batch:
             self._shapes["display"].height = value
+        self._update_instance()
 
 
     def is_inside(self, position : pyglet.math.Vec2 = pyglet.math.Vec2()) -> bool:
         """point inside test"""
+        if self.renderer is not None:
+            x0, y0, x1, y1 = self.hit_bounds()
+            return boxer.shapes.point_in_box( position.x, position.y, x0, y0, x1, y1 )
         # using pyglet.shapes 'in' overloading
         return (position.x, position.y) in self._shapes["hit"]
 
 
+    def hit_bounds(self) -> tuple[float, float, float, float]:
+        if self.renderer is not None:
+            # instanced boxes are centred on the position
+            return ( self.position.x - self._hit_width / 2.0, self.position.y - self._hit_height / 2.0,
+                    self.position.x + self._hit_width / 2.0, self.position.y + self._hit_height / 2.0 )
+        hit = self._shapes["hit"]
+        x = hit.x - hit.anchor_x
+        y = hit.y - hit.anchor_y
+        return ( x, y, x + hit.width, y + hit.height )
+
+
+    def _instance_shape(self) -> tuple[int, tuple, tuple]:
+        return ( boxer.handlerenderer.KIND_BOX,
+                ( self._display_width / 2.0, self._display_height / 2.0 ),
+                ( self._hit_width / 2.0, self._hit_height / 2.0 ) )
+
+
+    def _instance_colors(self) -> tuple:
+        return ( DEBUG_SHAPE_COLOR, DEBUG_HIT_SHAPE_COLOR, self._highlighted_color, self._selected_color )
+
+
     def set_shape_anchors(self) -> tuple:
         """sets the anchor position at the centres of self.*_width and self.*_height"""
-        self._shapes["hit"].anchor_position = (self._hit_width / 2.0, self._hit_height/2.0)
+        if self.renderer is None:
+            self._shapes["hit"].anchor_position = (self._hit_width / 2.0, self._hit_height/2.0)
         if self.batch:
             self._shapes["display"].anchor_position = (self._display_width / 2.0, self._display_height/2.0)
             self._shapes["highlight"].anchor_position = ( self._shapes["highlight"]._width/2.0, self._shapes["highlight"]._height/2.0 )
             self._shapes["select"].anchor_position = ( self._shapes["select"]._width/2.0, self._shapes["select"]._height/2.0 )
             # self._shapes["temp"].anchor_position = ( self._shapes["temp"]._width/2.0, self._shapes["temp"]._height/2.0 )
+        self._update_index()
 
 
     def draw_debug(self):
@@ -391,13 +545,15 @@ class PointHandle( Handle ):
 
         # dictionary?
         self._shapes = {}
-        self._shapes["hit"] = pyglet.shapes.Circle( self.position.x, self.position.y, radius=self.hit_radius, segments=24, color=DEBUG_HIT_SHAPE_COLOR, batch=self.batch)
+        if self.renderer is None:
+            self._shapes["hit"] = pyglet.shapes.Circle( self.position.x, self.position.y, radius=self.hit_radius, segments=24, color=DEBUG_HIT_SHAPE_COLOR, batch=self.batch)
         if self.batch:
             self._shapes["display"] = pyglet.shapes.Circle( self.position.x, self.position.y, radius=self.display_radius, segments=24, color=DEBUG_SHAPE_COLOR, batch=self.batch)
             self._shapes["highlight"] = boxer.shapes.Arc( self.position.x, self.position.y, radius=self.hit_radius+1, segments=24, color=(255,255,255), batch=self.batch )
             self._shapes["highlight"].opacity = 20
             self._shapes["select"] = boxer.shapes.Arc( self.position.x, self.position.y, radius=self.hit_radius+3, segments=24, color=(255,70,70), batch=self.batch )
             self._shapes["select"].opacity = 20
+        self._update_instance()
 
 
     def draw_debug(self):
@@ -411,9 +567,702 @@ class PointHandle( Handle ):
         """point inside test"""
         # using pyglet.shapes 'in' overloading
         #return  position.distance( self.position ) < self.hit_radius
+        if self.renderer is not None:
+            return position.distance( self.position ) < self.hit_radius
         return position in self._shapes["hit"]
 
 
+    def hit_bounds(self) -> tuple[float, float, float, float]:
+        if self.renderer is not None:
+            r = self.hit_radius
+            return ( self.position.x - r, self.position.y - r, self.position.x + r, self.position.y + r )
+        hit = self._shapes["hit"]
+        x = hit.x - hit.anchor_x
+        y = hit.y - hit.anchor_y
+        return ( x - hit.radius, y - hit.radius, x + hit.radius, y + hit.radius )
+
+
+    def _instance_shape(self) -> tuple[int, tuple, tuple]:
+        return ( boxer.handlerenderer.KIND_CIRCLE,
+                ( self.display_radius, self.display_radius ),
+                ( self.hit_radius, self.hit_radius ) )
+
+
+    def _instance_colors(self) -> tuple:
+        return ( DEBUG_SHAPE_COLOR, DEBUG_HIT_SHAPE_COLOR, (255, 255, 255), (255, 70, 70) )
+
+
+# ------------------------------------------------------------------------------
+# spatial index
+
+class SpatialHash:
+    """uniform grid of items' bounding boxes, for point and rectangle queries that
+    only look at the items in the cells they touch
+
+    `cell_size` : `float` - size of the square cells
+    `max_cells` : `int` - items covering more cells than this are kept in one list
+    that every query returns, instead of being written into each cell
+    """
+
+    def __init__(self, cell_size : float = 64.0, max_cells : int = 256):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        # { ( i, j ) : { item : None } }, dicts as ordered sets
+        self._cells : dict[tuple[int, int], dict] = {}
+        # { item : cell range ( i0, j0, i1, j1 ), or None for large items }
+        self._item_cells : dict = {}
+        self._large : dict = {}
+
+
+    def __len__(self) -> int:
+        return len( self._item_cells )
+
+
+    def __contains__(self, item) -> bool:
+        return item in self._item_cells
+
+
+    def _cell_range(self, bounds : tuple[float, float, float, float]) -> tuple[int, int, int, int]:
+        s = self.cell_size
+        return ( math.floor( bounds[0] / s ), math.floor( bounds[1] / s ),
+                math.floor( bounds[2] / s ), math.floor( bounds[3] / s ) )
+
+
+    def insert(self, item, bounds : tuple[float, float, float, float]) -> None:
+        """add `item` with `bounds` ( min x, min y, max x, max y ), or move it there"""
+        cells = self._cell_range( bounds )
+        i0, j0, i1, j1 = cells
+        if ( i1 - i0 + 1 ) * ( j1 - j0 + 1 ) > self.max_cells:
+            cells = None
+        if item in self._item_cells:
+            if self._item_cells[item] == cells:
+                return
+            self.remove( item )
+        self._item_cells[item] = cells
+        if cells is None:
+            self._large[item] = None
+            return
+        for i in range( i0, i1 + 1 ):
+            for j in range( j0, j1 + 1 ):
+                self._cells.setdefault( ( i, j ), {} )[item] = None
+
+
+    def insert_many(self, items : list, bounds : np.ndarray) -> None:
+        """`.insert()` many items, `bounds` ( n, 4 ): the cell ranges are computed in
+        one numpy step, and only the items whose cells changed are moved"""
+        if not len( items ):
+            return
+        cells = np.floor( np.asarray( bounds, dtype = np.float64 ) / self.cell_size ).astype( np.int64 )
+        # the current ranges, large or new items never match
+        missing = ( 1, 1, 0, 0 )
+        old = np.array( [ self._item_cells.get( item ) or missing for item in items ], dtype = np.int64 )
+        for row in np.flatnonzero( np.any( cells != old, axis = 1 ) ).tolist():
+            self.insert( items[row], tuple( bounds[row].tolist() ) )
+
+
+    def remove(self, item) -> None:
+        if item not in self._item_cells:
+            return
+        cells = self._item_cells.pop( item )
+        if cells is None:
+            del self._large[item]
+            return
+        i0, j0, i1, j1 = cells
+        for i in range( i0, i1 + 1 ):
+            for j in range( j0, j1 + 1 ):
+                cell = self._cells[ ( i, j ) ]
+                del cell[item]
+                if not cell:
+                    del self._cells[ ( i, j ) ]
+
+
+    def query_point(self, x : float, y : float) -> list:
+        """the items whose cells contain ( x, y ), a superset of the items whose bounds do"""
+        s = self.cell_size
+        cell = self._cells.get( ( math.floor( x / s ), math.floor( y / s ) ) )
+        items = list( cell ) if cell else []
+        if self._large:
+            items.extend( self._large )
+        return items
+
+
+    def query_rect(self, bounds : tuple[float, float, float, float]) -> set:
+        """the items whose cells overlap `bounds` ( min x, min y, max x, max y )"""
+        i0, j0, i1, j1 = self._cell_range( bounds )
+        items = set( self._large )
+        if ( i1 - i0 + 1 ) * ( j1 - j0 + 1 ) > len( self._cells ):
+            # a rectangle larger than the occupied cells, walk those instead
+            for ( i, j ), cell in self._cells.items():
+                if i0 <= i <= i1 and j0 <= j <= j1:
+                    items.update( cell )
+            return items
+        for i in range( i0, i1 + 1 ):
+            for j in range( j0, j1 + 1 ):
+                cell = self._cells.get( ( i, j ) )
+                if cell:
+                    items.update( cell )
+        return items
+
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._item_cells.clear()
+        self._large.clear()
+
+
+# ------------------------------------------------------------------------------
+# selection
+
+class HandleSelection( pyglet.event.EventDispatcher ):
+    """a set of handles selected together, moved, scaled and rotated as a group
+
+    Group transforms work on an ( n, 2 ) array of the handles' positions, in one
+    numpy operation, and write the positions of instanced handles into their
+    renderer's rows in one write per renderer, and their hit bounds into the
+    manager's indices in one pass. Subscribers get one "transformed" event for the
+    group, not a "position_updated" per handle.
+
+    During a group drag (`.drag()`) that array is the selection's positions: the
+    handles' `.position`s are set from it when the drag finishes (`.finish_drag()`,
+    on release), read `.positions()` in "transformed" handlers. The dragged handles
+    don't get "dragged" events, the selection's "transformed" (once per frame)
+    replaces them, and each gets "drag_finished" with the drag's total move. A
+    selection can hold world and screen space handles, world space handles move by
+    the drag scaled to the world (`world_scale`, 1 / the camera zoom).
+
+        selection.select( handles, HandleSelection.ADD )
+        selection.move( 10.0, 0.0 )
+        selection.rotate( math.pi / 2.0 )           # about the centroid
+        selection.scale( 2.0, pivot = ( 0.0, 0.0 ) )
+
+    `manager` : `HandleManager` - re-indexes the moved handles, when set
+    """
+    # selection modes
+    REPLACE = 0
+    ADD = 1
+    TOGGLE = 2
+
+    def __init__(self, manager : 'HandleManager' = None):
+        self.manager = manager
+        self._handles : dict[Handle, None] = {}     # ordered set
+        # { renderer : ( slots, rows ) } of the instanced handles, see ._grouped()
+        self._renderer_rows = None
+        # group drag positions, until .sync() sets them on the handles
+        self._live : np.ndarray | None = None
+        # ( n, 4 ) hit bounds of the instanced handles relative to their positions, see ._hit_extents()
+        self._extents : np.ndarray | None = None
+        # drag moves of each space, [ space ] = ( dx, dy )
+        self._drag_pending = np.zeros( ( 2, 2 ) )
+        self._drag_total = np.zeros( ( 2, 2 ) )
+
+
+    def __len__(self) -> int:
+        return len( self._handles )
+
+
+    def __contains__(self, handle : Handle) -> bool:
+        return handle in self._handles
+
+
+    def __iter__(self):
+        return iter( list( self._handles ) )
+
+
+    @property
+    def handles(self) -> list[Handle]:
+        return list( self._handles )
+
+
+    # membership ---------------------------------------------------------------
+
+    def select(self, handles, mode : int = REPLACE) -> None:
+        """select `handles`: instead of the selection (`REPLACE`), in addition (`ADD`),
+        or toggling each handle in or out of it (`TOGGLE`)"""
+        handles = list( handles )
+        self.sync()
+        before = dict( self._handles )
+        if mode == HandleSelection.REPLACE:
+            self._handles = dict.fromkeys( handles )
+        elif mode == HandleSelection.ADD:
+            self._handles.update( dict.fromkeys( handles ) )
+        else:
+            for handle in handles:
+                if handle in self._handles:
+                    del self._handles[handle]
+                else:
+                    self._handles[handle] = None
+        self._changed( before )
+
+
+    def deselect(self, handles) -> None:
+        self.sync()
+        before = dict( self._handles )
+        for handle in handles:
+            self._handles.pop( handle, None )
+        self._changed( before )
+
+
+    def discard(self, handle : Handle) -> None:
+        """drop a handle that's removed from its manager, without events"""
+        if handle in self._handles:
+            self.sync()
+        if self._handles.pop( handle, False ) is None:
+            handle.in_selection = False
+            self._renderer_rows = None
+
+
+    def clear(self) -> None:
+        self.deselect( list( self._handles ) )
+
+
+    def _changed(self, before : dict) -> None:
+        if before.keys() == self._handles.keys():
+            return
+        for handle in before.keys() - self._handles.keys():
+            handle.in_selection = False
+            handle._update_state_shapes()
+        for handle in self._handles.keys() - before.keys():
+            handle.in_selection = True
+            handle._update_state_shapes()
+        self._renderer_rows = None
+        boxer.redraw.invalidate()
+        self.dispatch_event( "selection_changed", self.handles )
+
+
+    # transforms ---------------------------------------------------------------
+
+    def positions(self) -> np.ndarray:
+        """( n, 2 ) positions of the selected handles, in selection order"""
+        if self._live is not None:
+            return self._live.copy()
+        if not self._handles:
+            return np.zeros( ( 0, 2 ) )
+        return np.array( [ ( h.position.x, h.position.y ) for h in self._handles ], dtype = np.float64 )
+
+
+    def centroid(self) -> tuple[float, float]:
+        return tuple( self.positions().mean( axis = 0 ).tolist() ) if self._handles else ( 0.0, 0.0 )
+
+
+    def move(self, dx : float, dy : float) -> None:
+        if self._handles:
+            self.set_positions( self.positions() + ( dx, dy ) )
+
+
+    def scale(self, sx : float, sy : float = None, pivot : tuple[float, float] = None) -> None:
+        """scale the positions about `pivot` (the centroid by default)"""
+        sy = sx if sy is None else sy
+        self.transform( np.array( [ [ sx, 0.0 ], [ 0.0, sy ] ] ), pivot )
+
+
+    def rotate(self, angle : float, pivot : tuple[float, float] = None) -> None:
+        """rotate the positions by `angle` radians (counter clockwise) about `pivot` (the centroid by default)"""
+        c = math.cos( angle )
+        s = math.sin( angle )
+        self.transform( np.array( [ [ c, -s ], [ s, c ] ] ), pivot )
+
+
+    def transform(self, matrix : np.ndarray, pivot : tuple[float, float] = None) -> None:
+        """apply the 2x2 `matrix` to the positions about `pivot` (the centroid by default)"""
+        if not self._handles:
+            return
+        positions = self.positions()
+        pivot = positions.mean( axis = 0 ) if pivot is None else np.asarray( pivot, dtype = np.float64 )
+        self.set_positions( ( positions - pivot ) @ np.asarray( matrix ).T + pivot )
+
+
+    def set_positions(self, positions : np.ndarray, sync : bool = True) -> None:
+        """move the selected handles to the rows of `positions` ( n, 2 )
+
+        With `sync = False` (group drags) the instanced handles' `.position`s aren't
+        set, `positions` stays the selection's positions until `.sync()`."""
+        positions = np.array( positions, dtype = np.float64 )
+        if self._live is None:
+            # sizes can change between transforms, not during a drag
+            self._extents = None
+        # instanced handles, one write per renderer and one re-index
+        for renderer, ( slots, rows ) in self._grouped().items():
+            renderer.set_positions( slots, positions[rows] )
+        instanced, rows = self._instanced
+        if self.manager is not None and len( rows ):
+            moved = positions[rows]
+            self.manager.update_many( instanced, moved, np.tile( moved, 2 ) + self._hit_extents() )
+        # the others move their shapes
+        for row, handle in self._shaped:
+            handle.position = pyglet.math.Vec2( *positions[row].tolist() )
+            handle.update_position( dispatch_event = False )
+        self._live = positions
+        if sync:
+            self.sync()
+        boxer.redraw.invalidate()
+        self.dispatch_event( "transformed", self.handles )
+
+
+    def sync(self) -> None:
+        """set the handles' `.position`s from a group drag's positions"""
+        if self._live is None:
+            return
+        live = self._live
+        self._live = None
+        for handle, ( x, y ) in zip( self._handles, live.tolist() ):
+            handle.position = pyglet.math.Vec2( x, y )
+
+
+    def _grouped(self) -> dict:
+        """{ renderer : ( slots, rows ) } of the instanced handles, rows index .handles"""
+        if self._renderer_rows is None:
+            groups = {}
+            instanced = []
+            self._shaped = []
+            self._spaces = np.array( [ handle.space for handle in self._handles ], dtype = np.int64 )
+            for row, handle in enumerate( self._handles ):
+                if handle.renderer is not None:
+                    slots, rows = groups.setdefault( handle.renderer, ( [], [] ) )
+                    slots.append( handle._slot )
+                    rows.append( row )
+                    instanced.append( ( row, handle ) )
+                else:
+                    self._shaped.append( ( row, handle ) )
+            self._renderer_rows = { renderer : ( np.array( slots ), np.array( rows ) )
+                                    for renderer, ( slots, rows ) in groups.items() }
+            self._instanced = ( [ handle for _, handle in instanced ],
+                                np.array( [ row for row, _ in instanced ], dtype = np.int64 ) )
+            self._extents = None
+        return self._renderer_rows
+
+
+    def _hit_extents(self) -> np.ndarray:
+        """( n, 4 ) hit bounds of the instanced handles, minus their positions"""
+        if self._extents is None:
+            handles = self._instanced[0]
+            bounds = np.array( [ h.hit_bounds() for h in handles ], dtype = np.float64 ).reshape( -1, 4 )
+            origins = np.array( [ ( h.position.x, h.position.y ) for h in handles ], dtype = np.float64 ).reshape( -1, 2 )
+            self._extents = bounds - np.tile( origins, 2 )
+        return self._extents
+
+
+    # drags --------------------------------------------------------------------
+
+    def drag(self, dx : float, dy : float, world_scale : float = 1.0) -> None:
+        """move the group by a drag event's move, in window pixels (world space
+        handles by the move times `world_scale`), applied once before the next frame"""
+        move = np.array( [ ( dx, dy ), ( dx * world_scale, dy * world_scale ) ] )
+        self._drag_pending += move
+        self._drag_total += move
+        boxer.redraw.call_before_frame( self.apply_drag )
+
+
+    def apply_drag(self) -> None:
+        if not self._drag_pending.any() or not self._handles:
+            return
+        self._grouped()
+        move = self._drag_pending[self._spaces]
+        self._drag_pending[:] = 0.0
+        self.set_positions( self.positions() + move, sync = False )
+
+
+    def finish_drag(self) -> None:
+        """apply the pending moves, set the handles' `.position`s, and dispatch
+        "drag_finished" with the drag's total move on each handle"""
+        self.apply_drag()
+        self.sync()
+        totals = self._drag_total.tolist()
+        self._drag_total[:] = 0.0
+        for handle in self.handles:
+            dx, dy = totals[handle.space]
+            if dx or dy:
+                handle.dispatch_event( "drag_finished", dx, dy )
+
+
+HandleSelection.register_event_type("selection_changed")   # ( handles )
+HandleSelection.register_event_type("transformed")         # ( handles ) moved, scaled or rotated
+
+
+# ------------------------------------------------------------------------------
+# handle manager
+
+class HandleManager:
+    """owns handles in world and screen space, and gives them their mouse events
+
+    Instead of each handle subscribing to the window and hit testing every mouse
+    motion, the manager keeps the handles' hit bounds in a `SpatialHash` per space
+    and resolves hover, press, release and drag with one indexed query per event.
+    Only the handles in the cell under the mouse are tested with `Handle.is_inside()`.
+
+        manager = boxer.handles.HandleManager( mouse = mouse )
+        manager.attach( boxer.events.for_window( window ) )
+        manager.add( handle )
+
+    Screen space handles are above world space handles, and in a space the last
+    added (or pressed) handle is on top. Handles re-index themselves when they move
+    (`Handle.update_position()`) or change size.
+
+    Clicks select handles into `.selection` (a `HandleSelection`), with shift adding
+    to it and ctrl toggling. With `band_select`, dragging from where there's no
+    handle selects the handles in the rubber band (`.band`). Dragging a selected
+    handle moves the whole selection.
+
+    `mouse` : `boxer.mouse.Mouse` - its positions are used for hit testing (the world
+    position for world space handles), when None the event's x, y are used
+    `cell_size` : `float` - cell size of the spatial hashes
+    `band_select` : `bool` - left drags from empty space select with a rubber band
+    `snapper` : `boxer.snapping.Snapper` - dragged handles snap with it, the manager
+    keeps its index of handle positions up to date
+    """
+    # behind the mouse and camera, so they update positions before the hit test
+    EVENT_PRIORITY = -1
+
+    def __init__(self, mouse : boxer.mouse.Mouse = None, cell_size : float = 64.0, band_select : bool = False, snapper = None):
+        self.mouse = mouse
+        self.snapper = snapper
+        self.selection = HandleSelection( self )
+        self.band_select = band_select
+        # rubber band, { space : ( x, y ) } where it started, and ( x0, y0, x1, y1 ) in window coordinates
+        self._band_start : dict[int, pyglet.math.Vec2] | None = None
+        self._band_mode = HandleSelection.REPLACE
+        self.band : tuple[float, float, float, float] | None = None
+        self._band_shape = None
+        self._group_drag = False
+        self._indices = { Handle.SPACE_SCREEN : SpatialHash( cell_size ),
+                        Handle.SPACE_WORLD : SpatialHash( cell_size ) }
+        self._order : dict[Handle, int] = {}     # stacking order, last added on top
+        self._serials = itertools.count()
+        self.hovered : Handle | None = None
+        self.selected : dict[Handle, None] = {}
+        self._subscriptions = []
+        self.tested_count = 0       # is_inside() tests, see tests/test_handles.py
+
+
+    def __len__(self) -> int:
+        return len( self._order )
+
+
+    def __contains__(self, handle : Handle) -> bool:
+        return handle in self._order
+
+
+    def __iter__(self):
+        return iter( list( self._order ) )
+
+
+    # handles ------------------------------------------------------------------
+
+    def add(self, handle : Handle) -> Handle:
+        if handle.manager is not None and handle.manager is not self:
+            handle.manager.remove( handle )
+        handle.manager = self
+        self._order[handle] = next( self._serials )
+        self._indices[handle.space].insert( handle, handle.hit_bounds() )
+        if self.snapper is not None:
+            self.snapper.update_handle( handle )
+        return handle
+
+
+    def remove(self, handle : Handle) -> None:
+        if handle not in self._order:
+            return
+        del self._order[handle]
+        for index in self._indices.values():
+            index.remove( handle )
+        self.selection.discard( handle )
+        self.selected.pop( handle, None )
+        if self.snapper is not None:
+            self.snapper.remove_handle( handle )
+        if self.hovered is handle:
+            self.hovered = None
+        handle.manager = None
+
+
+    def update(self, handle : Handle) -> None:
+        """re-index a handle that moved or changed size"""
+        if handle in self._order:
+            self._indices[handle.space].insert( handle, handle.hit_bounds() )
+            if self.snapper is not None:
+                self.snapper.update_handle( handle )
+
+
+    def update_many(self, handles : list[Handle], positions : np.ndarray, bounds : np.ndarray) -> None:
+        """re-index moved handles in bulk, from their `positions` ( n, 2 ) and hit
+        `bounds` ( n, 4 ), rather than from each handle's `.position`"""
+        spaces = np.array( [ handle.space for handle in handles ] )
+        for space, index in self._indices.items():
+            rows = np.flatnonzero( spaces == space )
+            if len( rows ):
+                index.insert_many( [ handles[row] for row in rows.tolist() ], bounds[rows] )
+        if self.snapper is not None:
+            self.snapper.update_handles( handles, positions )
+
+
+    def clear(self) -> None:
+        for handle in list( self._order ):
+            self.remove( handle )
+
+
+    # queries ------------------------------------------------------------------
+
+    def space_position(self, space : int, x : float, y : float) -> pyglet.math.Vec2:
+        """the mouse position in `space`, ( x, y ) are window coordinates"""
+        if self.mouse is None:
+            return pyglet.math.Vec2( x, y )
+        mp = self.mouse.world_position if space == Handle.SPACE_WORLD else self.mouse.position
+        return pyglet.math.Vec2( mp.x, mp.y )
+
+
+    def handle_at(self, x : float, y : float) -> Handle | None:
+        """the top handle under window position ( x, y )"""
+        for space in ( Handle.SPACE_SCREEN, Handle.SPACE_WORLD ):
+            index = self._indices[space]
+            if not len( index ):
+                continue
+            position = self.space_position( space, x, y )
+            candidates = index.query_point( position.x, position.y )
+            for handle in sorted( candidates, key = self._order.__getitem__, reverse = True ):
+                self.tested_count += 1
+                if handle.is_inside( position ):
+                    return handle
+        return None
+
+
+    def handles_in(self, space : int, bounds : tuple[float, float, float, float]) -> list[Handle]:
+        """the handles of `space` whose hit bounds overlap `bounds` ( min x, min y, max x, max y )"""
+        x0, y0, x1, y1 = bounds
+        result = []
+        for handle in self._indices[space].query_rect( bounds ):
+            hx0, hy0, hx1, hy1 = handle.hit_bounds()
+            if hx0 <= x1 and hx1 >= x0 and hy0 <= y1 and hy1 >= y0:
+                result.append( handle )
+        return sorted( result, key = self._order.__getitem__ )
+
+
+    # events -------------------------------------------------------------------
+
+    def attach(self, bus) -> None:
+        """subscribe the manager's mouse handlers to a `boxer.events.EventBus`"""
+        self.detach()
+        for event_type in ( "on_mouse_motion", "on_mouse_press", "on_mouse_release", "on_mouse_drag" ):
+            self._subscriptions.append( bus.subscribe( event_type, getattr( self, event_type ), priority = self.EVENT_PRIORITY ) )
+
+
+    def detach(self) -> None:
+        for subscription in self._subscriptions:
+            subscription.cancel()
+        self._subscriptions = []
+
+
+    def on_mouse_motion(self, x, y, dx, dy) -> None:
+        if self.mouse is not None and self.mouse.captured_by_ui:
+            return
+        handle = self.handle_at( x, y )
+        if handle is not self.hovered:
+            if self.hovered is not None:
+                self.hovered.set_hovered( False )
+            self.hovered = handle
+        if handle is not None:
+            handle.set_hovered( True )
+
+
+    def raise_handle(self, handle : Handle) -> None:
+        """put `handle` on top of the handles of its space"""
+        if handle in self._order:
+            self._order[handle] = next( self._serials )
+
+
+    @staticmethod
+    def selection_mode(modifiers : int) -> int:
+        if modifiers & pyglet.window.key.MOD_SHIFT:
+            return HandleSelection.ADD
+        if modifiers & ( pyglet.window.key.MOD_CTRL | pyglet.window.key.MOD_COMMAND ):
+            return HandleSelection.TOGGLE
+        return HandleSelection.REPLACE
+
+
+    def on_mouse_press(self, x, y, buttons, modifiers) -> None:
+        # the pressed handle is selected and raised, the others deselected
+        handles = dict.fromkeys( self.selected )
+        if self.hovered is not None:
+            handles[self.hovered] = None
+            self.raise_handle( self.hovered )
+            # containers may have moved since the last drag
+            if self.snapper is not None and buttons & pyglet.window.mouse.LEFT:
+                self.snapper.refresh()
+        for handle in handles:
+            handle.on_mouse_press( x, y, buttons, modifiers )
+        self.selected = { h : None for h in handles if h.selected }
+
+        if not buttons & pyglet.window.mouse.LEFT:
+            return
+        mode = self.selection_mode( modifiers )
+        if self.hovered is not None:
+            # a plain click on a selected handle keeps the selection, to drag it
+            if not ( mode == HandleSelection.REPLACE and self.hovered in self.selection ):
+                self.selection.select( [ self.hovered ], mode )
+            self._group_drag = self.hovered in self.selection and len( self.selection ) > 1
+        elif self.band_select and not ( self.mouse is not None and self.mouse.captured_by_ui ):
+            self._band_start = { space : self.space_position( space, x, y ) for space in self._indices }
+            self._band_mode = mode
+            self.band = ( x, y, x, y )
+        elif mode == HandleSelection.REPLACE:
+            self.selection.clear()
+
+
+    def on_mouse_release(self, x, y, buttons, modifiers) -> None:
+        if self._band_start is not None:
+            self._finish_band( x, y )
+        if self._group_drag:
+            # before the handles' "released"
+            self.selection.finish_drag()
+            self._group_drag = False
+        handles = dict.fromkeys( self.selected )
+        if self.hovered is not None:
+            handles[self.hovered] = None
+        for handle in handles:
+            handle.on_mouse_release( x, y, buttons, modifiers )
+        self.selected = { h : None for h in handles if h.selected }
+
+
+    def on_mouse_drag(self, x, y, dx, dy, buttons, modifiers) -> None:
+        if self._band_start is not None:
+            self.band = ( self.band[0], self.band[1], x, y )
+            boxer.redraw.invalidate()
+            return
+        if self._group_drag:
+            # one numpy move of the whole selection per frame, instead of a drag per handle
+            world_scale = 1.0 / self.mouse.camera_zoom if self.mouse is not None else 1.0
+            self.selection.drag( dx, dy, world_scale )
+            return
+        for handle in list( self.selected ):
+            handle.on_mouse_drag( x, y, dx, dy, buttons, modifiers )
+
+
+    # rubber band --------------------------------------------------------------
+
+    def _finish_band(self, x : float, y : float) -> None:
+        """select the handles of each space inside the band"""
+        handles = []
+        for space, start in self._band_start.items():
+            end = self.space_position( space, x, y )
+            bounds = ( min( start.x, end.x ), min( start.y, end.y ), max( start.x, end.x ), max( start.y, end.y ) )
+            handles.extend( self.handles_in( space, bounds ) )
+        self._band_start = None
+        self.band = None
+        boxer.redraw.invalidate()
+        self.selection.select( handles, self._band_mode )
+
+
+    def draw_band(self) -> None:
+        """draw the rubber band, in window coordinates"""
+        if self.band is None:
+            return
+        x0, y0, x1, y1 = self.band
+        if self._band_shape is None:
+            self._band_shape = boxer.shapes.RectangleLine( 0, 0, 1, 1, line_width = 1, color = (255, 255, 255) )
+            self._band_shape.opacity = 160
+        self._band_shape.position = ( min( x0, x1 ), min( y0, y1 ) )
+        self._band_shape.width = abs( x1 - x0 )
+        self._band_shape.height = abs( y1 - y0 )
+        self._band_shape.draw()
+
+
 # ------------------------------------------------------------------------------
 if __name__ == "__main__":
     """handles sandbox"""
@@ -0,0 +1,255 @@
+"""array backed layout engine for Container trees.
+
+A `LayoutStore` keeps every `Container`'s position, size, split ratio and parent
+index in flat numpy arrays, in preorder (the same order as `Container._node_id`).
+The split tree is solved level by level with vectorised operations instead of
+recursive `get_child_size()` / `get_child_position()` calls.
+
+While a tree is attached to a store, its `Container`s are thin views over rows of
+the store: reading or setting `.position`, `.width`, `.height` (and `.ratio`,
+`.ratio_mode`, `.fixed_size` on `SplitContainer`s) reads or writes the arrays.
+
+Enable it on a root with `Container(..., array_layout=True)`, the store is (re)built
+by `Container.update_structure()`.
+
+Only the layout rules of `Container`, `HSplitContainer` and `VSplitContainer` are
+known to the solver. Trees containing other `Container` types (eg. `GridContainer`,
+or subclasses that override `get_child_size()` / `get_child_position()`) are not
+attached, and use the recursive path.
+"""
+import numpy as np
+
+# layout kinds, declared on Container classes as `_array_layout_kind`
+KIND_CONTAINER = 0  # children fill the parent
+KIND_HSPLIT = 1     # children[0] left, children[1] right
+KIND_VSPLIT = 2     # children[0] bottom, children[1] top
+
+# split ratio modes, the values of SplitContainer.RATIO_MODE_*
+MODE_RATIO = 0      # split at width (or height) * ratio
+MODE_FIXED_0 = 1    # children[0] is `fixed` pixels wide (or high)
+MODE_FIXED_1 = 2    # children[1] is `fixed` pixels wide (or high)
+
+
+class LayoutStore:
+    """flat, preorder arrays of Container rectangles
+
+    Build with `LayoutStore.from_tree( root )`.
+    """
+
+    def __init__(self, count : int):
+        self.x = np.zeros( count, dtype=np.float64 )
+        self.y = np.zeros( count, dtype=np.float64 )
+        self.width = np.zeros( count, dtype=np.float64 )
+        self.height = np.zeros( count, dtype=np.float64 )
+        self.ratio = np.full( count, 0.5, dtype=np.float64 )
+        self.mode = np.zeros( count, dtype=np.int8 )         # MODE_*
+        self.fixed = np.zeros( count, dtype=np.float64 )     # fixed child size of the MODE_FIXED_* modes
+        self.parent = np.full( count, -1, dtype=np.int64 )
+        self.slot = np.zeros( count, dtype=np.int64 )        # index in parent.children
+        self.kind = np.zeros( count, dtype=np.int8 )
+        self.explicit = np.zeros( count, dtype=bool )        # use_explicit_dimensions
+
+        # rects at the last applied layout, to find changed rows
+        self._applied = np.full( (count, 4), np.nan, dtype=np.float64 )
+
+        # per tree level (excluding the root level): rows and precomputed
+        # gather indices, see ._prepare_levels()
+        self.levels : list[tuple] = []
+
+        self.containers = []
+        # rows marked by Container.invalidate_geometry()
+        self.dirty_rows : set[int] = set()
+
+
+    def __len__(self) -> int:
+        return len(self.containers)
+
+
+    @staticmethod
+    def layout_kind( container ) -> int | None:
+        """the layout kind of a container, or None if the solver doesn't know
+        how to lay out this container's children"""
+        for owner in type(container).__mro__:
+            if "_array_layout_kind" in owner.__dict__:
+                kind = owner.__dict__["_array_layout_kind"]
+                if kind is None:
+                    return None
+                if type(container).get_child_size is not owner.get_child_size\
+                        or type(container).get_child_position is not owner.get_child_position:
+                    return None
+                return kind
+        return None
+
+
+    @classmethod
+    def from_tree( cls, root ) -> 'LayoutStore | None':
+        """build a store from a tree (in preorder)
+        returns None if the tree contains containers the solver can't lay out
+        """
+        nodes = []
+        parents = []
+        slots = []
+        depths = []
+        kinds = []
+        stack = [ (root, -1, 0, 0) ]
+        while stack:
+            node, parent_row, slot, depth = stack.pop()
+            kind = cls.layout_kind( node )
+            if kind is None:
+                return None
+            row = len(nodes)
+            nodes.append( node )
+            parents.append( parent_row )
+            slots.append( slot )
+            depths.append( depth )
+            kinds.append( kind )
+            # push reversed so children pop in order (preorder)
+            for child_slot in range( len(node.children) - 1, -1, -1 ):
+                child = node.children[child_slot]
+                if child is not None:
+                    stack.append( (child, row, child_slot, depth + 1) )
+
+        store = cls( len(nodes) )
+        store.parent[:] = parents
+        store.slot[:] = slots
+        store.kind[:] = kinds
+
+        depth = np.asarray( depths, dtype=np.int64 )
+        order = np.argsort( depth, kind="stable" )
+        bounds = np.cumsum( np.bincount( depth ) )[:-1]
+        levels = np.split( order, bounds )[1:]
+
+        for row, node in enumerate( nodes ):
+            store.x[row] = node.position[0]
+            store.y[row] = node.position[1]
+            store.width[row] = node.width
+            store.height[row] = node.height
+            store.ratio[row] = getattr( node, "ratio", 0.5 )
+            store.mode[row] = getattr( node, "ratio_mode", MODE_RATIO )
+            store.fixed[row] = getattr( node, "fixed_size", 0.0 )
+            store.explicit[row] = node.use_explicit_dimensions
+        store.containers = nodes
+        store._prepare_levels( levels )
+        return store
+
+
+    def attach(self) -> None:
+        """turn the containers into views over the store's rows"""
+        for row, node in enumerate( self.containers ):
+            node._layout_store = self
+            node._layout_row = row
+
+
+    def detach(self) -> None:
+        """copy values back into the containers and disconnect them from the store"""
+        for row, node in enumerate( self.containers ):
+            if node._layout_store is not self:
+                continue
+            node._layout_store = None
+            node._layout_row = None
+            node.position = ( float(self.x[row]), float(self.y[row]) )
+            node.width = float(self.width[row])
+            node.height = float(self.height[row])
+            if hasattr( node, "_ratio" ):
+                node._ratio = float(self.ratio[row])
+                node._ratio_mode = int(self.mode[row])
+                node._fixed_size = float(self.fixed[row])
+        self.containers = []
+        self.dirty_rows.clear()
+
+
+    def _prepare_levels(self, levels : list[np.ndarray]) -> None:
+        """precompute the per level index arrays and masks used by .solve()
+        (the structure is fixed for the lifetime of a store)"""
+        self.levels = []
+        for rows in levels:
+            rows = rows[ ~self.explicit[rows] ]     # explicit rows keep their own rect
+            if len(rows) == 0:
+                continue
+            parent = self.parent[rows]
+            kind = self.kind[parent]
+            second = self.slot[rows] > 0
+            h_first = ( kind == KIND_HSPLIT ) & ~second
+            h_second = ( kind == KIND_HSPLIT ) & second
+            v_first = ( kind == KIND_VSPLIT ) & ~second
+            v_second = ( kind == KIND_VSPLIT ) & second
+            self.levels.append( (rows, parent,
+                                np.flatnonzero( h_first ), np.flatnonzero( h_second ),
+                                np.flatnonzero( v_first ), np.flatnonzero( v_second )) )
+
+
+    def split_positions(self, rows : np.ndarray, length : np.ndarray) -> np.ndarray:
+        """`SplitContainer.split_position()` of split `rows`, for split axes of `length`"""
+        mode = self.mode[rows]
+        fixed = self.fixed[rows]
+        position = np.where( mode == MODE_FIXED_0, fixed,
+                    np.where( mode == MODE_FIXED_1, length - fixed, length * self.ratio[rows] ) )
+        return np.clip( position, 0.0, length )
+
+
+    def solve(self) -> None:
+        """lay out every non-root row from the root row, one tree level at a time"""
+        x, y, width, height = self.x, self.y, self.width, self.height
+        for rows, parent, h_first, h_second, v_first, v_second in self.levels:
+            cx = x[parent]
+            cy = y[parent]
+            cw = width[parent]
+            ch = height[parent]
+
+            # HSplitContainer children
+            if len(h_first):
+                cw[h_first] = np.floor( self.split_positions( parent[h_first], cw[h_first] ) ) - 1.0
+            if len(h_second):
+                split = np.floor( self.split_positions( parent[h_second], cw[h_second] ) )
+                cw[h_second] -= split
+                cx[h_second] += split
+            # VSplitContainer children
+            if len(v_first):
+                ch[v_first] = np.floor( self.split_positions( parent[v_first], ch[v_first] ) ) - 1.0
+            if len(v_second):
+                split = np.floor( self.split_positions( parent[v_second], ch[v_second] ) )
+                ch[v_second] -= split
+                cy[v_second] += split
+
+            x[rows] = cx
+            y[rows] = cy
+            width[rows] = cw
+            height[rows] = ch
+
+
+    def update_geometries(self, only_changed : bool = False ) -> None:
+        """solve the whole tree, then update the Lines/views etc of the containers
+        whose rect changed (or every container if `only_changed` is False)
+        """
+        root = self.containers[0]
+        root.get_available_size_from_parent()
+        root.get_position_from_parent()
+        self.solve()
+
+        rects = np.stack( (self.x, self.y, self.width, self.height), axis=1 )
+        if only_changed:
+            changed = np.any( rects != self._applied, axis=1 )
+            for row in self.dirty_rows:
+                changed[row] = True
+            rows = np.flatnonzero( changed )
+        else:
+            rows = range( len(self.containers) )
+        self._applied = rects
+
+        # clear the dirty flags, walking up from the invalidated rows
+        for row in self.dirty_rows:
+            node = self.containers[row]
+            while node is not None and ( node._geometry_dirty or node._geometry_dirty_descendants ):
+                node._geometry_dirty = False
+                node._geometry_dirty_descendants = False
+                node = node.parent
+        self.dirty_rows.clear()
+        root._geometry_dirty = False
+        root._geometry_dirty_descendants = False
+
+        containers = self.containers
+        for row in rows:
+            node = containers[row]
+            node._geometry_dirty = False
+            node._layout_rect = ( float(rects[row, 0]), float(rects[row, 1]), float(rects[row, 2]), float(rects[row, 3]) )
+            node.update_node_geometry()
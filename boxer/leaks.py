@@ -0,0 +1,85 @@
+"""live object counts, to find leaks in long sessions
+
+Objects that own GL resources or handlers register themselves with `track()`
+(`Container`, `ContainerView`, `boxer.handles.Handle`, `boxer.background.Background`
+and `boxer.plugins.graph_view.GraphCanvas`). `snapshot()` counts the live tracked
+objects by class, with the number of vertices allocated in pyglet vertex domains
+(vertex lists that were never `.delete()`d) and the number of functions scheduled
+on the pyglet clock.
+
+Tests use `assert_no_growth()` to run an action repeatedly and fail if any count
+grows, eg. split/close cycles of containers (see tests/test_leaks.py).
+
+GL resources are released by `dispose()`, called by their owner, never from
+`__del__`: the collector can free a reference cycle (and run its `__del__`s)
+inside a pyglet vertex allocation, and deleting a vertex list there corrupts the
+allocator. `__del__` only reports objects collected undisposed, `warn_undisposed()`.
+"""
+import gc
+import weakref
+
+import pyglet
+
+# { class name : WeakSet of live instances }
+_tracked : dict[str, weakref.WeakSet] = {}
+
+VERTICES = "vertices"       # snapshot key of allocated pyglet vertices
+SCHEDULED = "scheduled"     # snapshot key of pyglet clock callbacks
+
+
+def track( obj ) -> None:
+    """count `obj` under its class name while it's alive"""
+    _tracked.setdefault( type(obj).__name__, weakref.WeakSet() ).add( obj )
+
+
+def warn_undisposed( obj ) -> None:
+    """from `obj.__del__()`: report `obj` if it's collected without `.dispose()`"""
+    if not getattr( obj, "_disposed", False ):
+        print("\033[38;5;196m[leaks]\033[0m %s collected without dispose(), its GL resources leak"%type(obj).__name__)
+
+
+def live_counts() -> dict[str, int]:
+    """{ class name : number of live tracked instances }"""
+    return { name : len(instances) for name, instances in _tracked.items() if len(instances) }
+
+
+def vertex_count() -> int:
+    """vertices allocated in all live pyglet vertex domains"""
+    count = 0
+    for obj in gc.get_objects():
+        if isinstance( obj, pyglet.graphics.vertexdomain.VertexDomain ):
+            count += sum( obj.allocator.sizes )
+    return count
+
+
+def scheduled_count() -> int:
+    """functions scheduled on pyglet's default clock"""
+    clock = pyglet.clock.get_default()
+    return len( clock._schedule_items ) + len( clock._schedule_interval_items )
+
+
+def snapshot() -> dict[str, int]:
+    """live counts, after a full garbage collection"""
+    gc.collect()
+    counts = live_counts()
+    counts[VERTICES] = vertex_count()
+    counts[SCHEDULED] = scheduled_count()
+    return counts
+
+
+def growth( before : dict[str, int], after : dict[str, int] ) -> dict[str, int]:
+    """{ key : increase } of the counts that grew from `before` to `after`"""
+    return { key : count - before.get( key, 0 ) for key, count in after.items() if count > before.get( key, 0 ) }
+
+
+def assert_no_growth( action, cycles : int = 5, warmup : int = 1 ) -> None:
+    """run `action()` `warmup` times (to fill caches, pools ..), then `cycles` times,
+    raise AssertionError if any count grew over the measured cycles"""
+    for _ in range( warmup ):
+        action()
+    before = snapshot()
+    for _ in range( cycles ):
+        action()
+    grown = growth( before, snapshot() )
+    if grown:
+        raise AssertionError( "leak: counts grew over %d cycles: %s"%( cycles, grown ) )
@@ -0,0 +1,211 @@
+"""shared outline renderer for Container borders and SplitContainer ratio lines.
+
+One `OutlineRenderer` per `pyglet.graphics.Batch` holds every outline segment of
+the Containers drawn in that batch, in a single indexed vertex list (one quad per
+line segment, expanded from the segment's end points in the vertex shader, see
+`boxer.shaders.get_outline_shader()`).
+
+Containers allocate segment slots (`.alloc()`), and update them with numpy slice
+writes into system memory copies of the vertex attributes (`.set_rect()`,
+`.set_segment()`, `.set_color()`, `.set_thickness()`).
+The changed range is copied into the vertex buffers once, just before the batch
+draws the renderer's group (`.flush()`).
+"""
+import weakref
+
+import numpy as np
+import pyglet
+from pyglet import gl
+
+import boxer.shaders
+
+# quad corners of a segment: (along the segment, across the segment)
+_CORNERS = np.array( [ (0.0, -1.0), (1.0, -1.0), (1.0, 1.0), (0.0, 1.0) ], dtype=np.float32 )
+_QUAD_INDICES = np.array( [0, 1, 2, 0, 2, 3], dtype=np.int64 )
+
+# rect segments, in slot order
+RECT_SEGMENTS = ("left", "top", "right", "bottom")
+
+
+class OutlineGroup( pyglet.graphics.Group ):
+    """group to flush pending outline writes, and draw with the outline shader"""
+    def __init__(self, renderer : 'OutlineRenderer', program, order = 0):
+        super().__init__(order)
+        self.renderer = weakref.proxy( renderer )
+        self.program = program
+
+
+    def set_state(self):
+        # the domain commits its buffers after set_state, so writes land this frame
+        self.renderer.flush()
+        self.program.use()
+        gl.glEnable(gl.GL_BLEND)
+        gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+
+
+    def unset_state(self):
+        gl.glDisable(gl.GL_BLEND)
+        self.program.stop()
+
+
+class OutlineRenderer:
+    """every outline segment of one batch, drawn with one call
+
+    Get the renderer of a batch with `OutlineRenderer.for_batch( batch )`.
+    """
+    INITIAL_CAPACITY = 64   # segments
+
+    _renderers : weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+    @classmethod
+    def for_batch( cls, batch : pyglet.graphics.Batch ) -> 'OutlineRenderer':
+        """the shared renderer of `batch`, created on first use"""
+        renderer = cls._renderers.get( batch )
+        if renderer is None:
+            renderer = cls( batch )
+            cls._renderers[batch] = renderer
+        return renderer
+
+
+    def __init__(self, batch : pyglet.graphics.Batch):
+        self.program = boxer.shaders.get_outline_shader()
+        # weak, the renderer lives as long as its batch (see ._renderers)
+        self._batch = weakref.ref( batch )
+        self.group = OutlineGroup( self, self.program )
+
+        self.capacity = 0
+        self.end = 0            # slots [0, end) have been handed out
+        self._free : dict[int, list[int]] = {}   # { count : [ start, ..] } of released slots
+
+        # system memory copies of the vertex attributes, 4 vertices per segment
+        self._segment = np.zeros( (0, 4), dtype=np.float32 )
+        self._thickness = np.zeros( 0, dtype=np.float32 )
+        self._colors = np.zeros( (0, 4), dtype=np.uint8 )
+
+        self._dirty_min = 0     # changed segment range, copied by .flush()
+        self._dirty_max = 0
+        self.vertex_list = None
+        self._grow( self.INITIAL_CAPACITY )
+
+
+    def __len__(self) -> int:
+        """number of segments in use"""
+        return self.end - sum( count * len(starts) for count, starts in self._free.items() )
+
+
+    # slots --------------------------------------------------------------------
+
+    def alloc(self, count : int = 1) -> int:
+        """reserve `count` contiguous segment slots, returns the first slot"""
+        starts = self._free.get( count )
+        if starts:
+            return starts.pop()
+        start = self.end
+        if start + count > self.capacity:
+            self._grow( max( self.capacity * 2, start + count ) )
+        self.end = start + count
+        return start
+
+
+    def free(self, start : int, count : int = 1) -> None:
+        """release slots, they stop drawing immediately"""
+        self._thickness[start*4:(start+count)*4] = 0.0
+        self._colors[start*4:(start+count)*4] = 0
+        self._mark( start, count )
+        self._free.setdefault( count, [] ).append( start )
+
+
+    # writes -------------------------------------------------------------------
+
+    def set_rect(self, start : int, x : float, y : float, width : float, height : float, margin : float = 1.0) -> None:
+        """write the 4 segments (`RECT_SEGMENTS` order) of a rectangle outline from slot `start`"""
+        x0 = x + margin
+        y0 = y + margin
+        x1 = x + width - margin
+        y1 = y + height - margin
+        segments = np.array( [ (x0, y0, x0, y1),    # left
+                               (x0, y1, x1, y1),    # top
+                               (x1, y1, x1, y0),    # right
+                               (x0, y0, x1, y0) ],  # bottom
+                               dtype=np.float32 )
+        self._segment.reshape( -1, 4, 4 )[start:start+4] = segments[:, None, :]
+        self._mark( start, 4 )
+
+
+    def set_segment(self, slot : int, x1 : float, y1 : float, x2 : float, y2 : float) -> None:
+        self._segment[slot*4:slot*4+4] = (x1, y1, x2, y2)
+        self._mark( slot, 1 )
+
+
+    def set_color(self, start : int, color : tuple, count : int = 1) -> None:
+        """`color` : (r, g, b, a) in 0-255"""
+        self._colors[start*4:(start+count)*4] = color
+        self._mark( start, count )
+
+
+    def set_thickness(self, start : int, thickness : float, count : int = 1) -> None:
+        self._thickness[start*4:(start+count)*4] = thickness
+        self._mark( start, count )
+
+
+    def get_segment(self, slot : int) -> tuple[float, float, float, float]:
+        return tuple( float(v) for v in self._segment[slot*4] )
+
+
+    def get_color(self, slot : int) -> tuple[int, int, int, int]:
+        return tuple( int(v) for v in self._colors[slot*4] )
+
+
+    # buffers ------------------------------------------------------------------
+
+    def flush(self) -> None:
+        """copy the changed segment range into the vertex buffers"""
+        if self._dirty_max <= self._dirty_min:
+            return
+        lo = self._dirty_min * 4
+        hi = self._dirty_max * 4
+        vertex_list = self.vertex_list
+        for name, array in ( ("segment", self._segment),
+                             ("thickness", self._thickness),
+                             ("colors", self._colors) ):
+            buffer = vertex_list.domain.attrib_name_buffers[name]
+            # the full region view is cached by pyglet, write into a slice of it
+            view = np.ctypeslib.as_array( buffer.get_region( vertex_list.start, vertex_list.count ) )
+            view[lo*buffer.count:hi*buffer.count] = array[lo:hi].ravel()
+            buffer.invalidate_region( vertex_list.start + lo, hi - lo )
+        self._dirty_min = self._dirty_max = 0
+
+
+    def _mark(self, start : int, count : int) -> None:
+        if self._dirty_max <= self._dirty_min:
+            self._dirty_min = start
+            self._dirty_max = start + count
+        else:
+            self._dirty_min = min( self._dirty_min, start )
+            self._dirty_max = max( self._dirty_max, start + count )
+
+
+    def _grow(self, capacity : int) -> None:
+        """reallocate the vertex list with room for `capacity` segments"""
+        old = self.capacity
+        self._segment = np.concatenate( (self._segment, np.zeros( ((capacity-old)*4, 4), dtype=np.float32 )) )
+        self._thickness = np.concatenate( (self._thickness, np.zeros( (capacity-old)*4, dtype=np.float32 )) )
+        self._colors = np.concatenate( (self._colors, np.zeros( ((capacity-old)*4, 4), dtype=np.uint8 )) )
+        self.capacity = capacity
+
+        if self.vertex_list is not None:
+            self.vertex_list.delete()
+        indices = ( _QUAD_INDICES[None, :] + 4 * np.arange( capacity )[:, None] ).ravel()
+        self.vertex_list = self.program.vertex_list_indexed( capacity * 4,
+                                        gl.GL_TRIANGLES,
+                                        indices.tolist(),
+                                        self._batch(),
+                                        self.group,
+                                        segment = 'f',
+                                        corner = ('f', np.tile( _CORNERS, (capacity, 1) ).ravel().tolist()),
+                                        thickness = 'f',
+                                        colors = 'Bn' )
+        # everything goes to the new buffers
+        self._dirty_min = 0
+        self._dirty_max = capacity
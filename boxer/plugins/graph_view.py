@@ -2,6 +2,8 @@ import pyglet
 import boxer.containers
 import boxer.background
 import boxer.camera
+import boxer.redraw
+import boxer.leaks
 import imgui
 import pyglet.gl as gl
 import random
@@ -20,6 +22,10 @@ class CanvasGroup( pyglet.graphics.Group ):
 class GraphView( boxer.containers.ContainerView ):
         string_name = "Graph"
 
+        # each view draws its canvas into an offscreen cache (see boxer.viewcache),
+        # redrawn when its camera or canvas changes, or the mouse moves in it
+        cache_to_texture = True
+
         imgui.create_context()
         io = imgui.get_io()
         font_t1 = io.fonts.add_font_from_file_ttf("boxer/resources/fonts/DejaVuSansCondensed.ttf", 12 )
@@ -85,7 +91,7 @@ class GraphView( boxer.containers.ContainerView ):
             for k in cls.canvases.keys():
                 rems.append(k)
             for rem in rems:
-                cls.canvases.pop( rem )
+                cls.canvases.pop( rem ).dispose()
             # for c in cls.canvases:
             #     cc = cls.canvases[c]
             #     print(f"deleting canvas {cc}")
@@ -115,6 +121,7 @@ class GraphView( boxer.containers.ContainerView ):
             self.entered = False
 
             self.camera = boxer.camera.Camera( )
+            self.camera.push_handlers( transform_changed = self.on_camera_transform_changed )
             # self.camera_group = boxer.camera.CameraGroup( self.camera )
             # self.bg_group = boxer.background.BackgroundGroup( parent = self.camera_group )
             #-----------------------------------------------------------------------------
@@ -201,6 +208,10 @@ class GraphView( boxer.containers.ContainerView ):
             imgui.pop_style_var() # window padding
 
 
+        def on_camera_transform_changed(self, transform) -> None:
+            self.invalidate()
+
+
         def graph_view_local_function(self) -> None:
             print(f"CLICKED graph:// from {self} (and this is a method on the instance)")
 
@@ -216,12 +227,43 @@ class GraphView( boxer.containers.ContainerView ):
             # del(self.background.group)
             # del(self.background)
             # self.batch.invalidate() # to update the change in Groups associated with the Batch
+            boxer.leaks.warn_undisposed( self )
+            super().__del__()
+
+
+        def dispose(self) -> None:
+            if getattr( self, "_disposed", False ):
+                return
             self.circle.delete()
             self.mouse_circle.delete()
             self.view_label.delete()
             self.hash_label.delete()
-            # self.disconnect_handlers()
-            super().__del__()
+            # the canvas stays cached by uri in GraphView.canvases, for other views of it
+            views = GraphView.canvas_views.get( self.canvas )
+            if views is not None:
+                views.discard( self )
+            GraphView.views.discard( self )
+            super().dispose()
+
+
+        def as_json(self) -> dict:
+            return {
+                "uri": self.uri,
+                "camera": self.camera.as_json(),
+            }
+
+
+        def from_json(self, data : dict) -> None:
+            uri = data.get( "uri", self.uri )
+            if uri != self.uri:
+                views = GraphView.canvas_views.get( self.canvas )
+                if views is not None:
+                    views.discard( self )
+                self.uri = uri
+                self.canvas = GraphView.get_canvas_from_uri( self.uri, self )
+                self.invalidate()
+            if "camera" in data:
+                self.camera.from_json( data["camera"] )
 
 
         def update_geometries(self, container):
@@ -242,17 +284,20 @@ class GraphView( boxer.containers.ContainerView ):
             self.entered = True
             self.mouse_circle.color = (*self.mouse_circle.color[:3], 10)
             target.push_handlers( on_mouse_motion=self.on_mouse_motion )
+            self.invalidate()
 
 
         def disconnect_handlers(self, target) -> None:
             self.entered = False
             self.mouse_circle.color = (*self.mouse_circle.color[:3], 0)
             target.remove_handlers( on_mouse_motion=self.on_mouse_motion )
+            self.invalidate()
 
 
         def on_mouse_motion( self, x, y, dx, dy ) -> None:
             # print(f"ParameterView.on_mouse_motion() {x} {y} {dx} {dy}")
             self.mouse_circle.position = pyglet.math.Vec2( x, y )
+            self.invalidate()
 
 
         def draw_instance(self ) -> None:
@@ -273,11 +318,12 @@ class GraphView( boxer.containers.ContainerView ):
             ##############################################################################
 
 
-            # set scissor here !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
-            # I don't want to set the scissor every frame
+            # drawn into the view's cache, which is the size of the view: the scissor
+            # is the cache's whole viewport (in framebuffer pixels, not window coordinates)
             canvas = GraphView.canvases[self.uri]
-            canvas.background.group.set_scissor( self.position.x, self.position.y, self.width, self.height )
-            # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+            viewport = ( gl.GLint * 4 )()
+            gl.glGetIntegerv( gl.GL_VIEWPORT, viewport )
+            canvas.background.group.set_scissor( *viewport )
             canvas.draw()
             self.batch.draw()
 
@@ -292,6 +338,18 @@ class GraphCanvas(  pyglet.event.EventDispatcher ):
     def __init__(self, **kwargs):
         self.batch = pyglet.graphics.Batch()
         self.background : boxer.background.Background = boxer.background.Background(batch=self.batch, group=GraphView.canvas_group)
+        self.background.push_handlers( changed = self.invalidate )
+        self._disposed = False
+        boxer.leaks.track( self )
+
+
+    def dispose(self) -> None:
+        """delete the canvas' background (vertex list, texture, animation)"""
+        if self._disposed:
+            return
+        self._disposed = True
+        self.background.dispose()
+        self.batch.invalidate()
 
 
     def __del__(self) -> None:
@@ -299,10 +357,13 @@ class GraphCanvas(  pyglet.event.EventDispatcher ):
         # print("8<-----------------------")
         # self.batch._dump_draw_list()
         # print("----------------------->8")
-        pyglet.clock.unschedule(self.background.on_update)
-        del(self.background)
-        self.batch.invalidate()
-        del(self.batch)
+        boxer.leaks.warn_undisposed( self )
+
+
+    def invalidate(self) -> None:
+        """the canvas changed, redraw the cached views of it"""
+        for view in list( GraphView.canvas_views.get( self, () ) ):
+            view.invalidate()
 
 
     def draw(self) -> None:
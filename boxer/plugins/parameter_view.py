@@ -1,11 +1,15 @@
 import pyglet
 import boxer.containers
+import boxer.leaks
 import imgui
 # import boxer.plugins.parameter_view
 
 class ParameterView( boxer.containers.ContainerView ):
         string_name = "Parameters"
 
+        # static between mouse moves, draw from an offscreen cache
+        cache_to_texture = True
+
         imgui.create_context()
         io = imgui.get_io()
         font_t1 = io.fonts.add_font_from_file_ttf("boxer/resources/fonts/DejaVuSansCondensed.ttf", 12 )
@@ -81,13 +85,19 @@ class ParameterView( boxer.containers.ContainerView ):
             imgui.pop_style_var() # window padding
 
 
-        def __del__(self) -> None:
-            print(f"deleting GraphView {self}")
+        def dispose(self) -> None:
+            if getattr( self, "_disposed", False ):
+                return
             self.bg_rect.delete()
             self.circle.delete()
             self.mouse_circle.delete()
-            self.view_label.delete()            
-            # self.disconnect_handlers()
+            self.view_label.delete()
+            super().dispose()
+
+
+        def __del__(self) -> None:
+            print(f"deleting ParameterView {self}")
+            boxer.leaks.warn_undisposed( self )
             super().__del__()
 
 
@@ -112,14 +122,17 @@ class ParameterView( boxer.containers.ContainerView ):
             self.entered = True
             self.mouse_circle.color = (*self.mouse_circle.color[:3], 100)
             target.push_handlers( on_mouse_motion=self.on_mouse_motion )
+            self.invalidate()
 
 
         def disconnect_handlers(self, target) -> None:
             self.entered = False
             self.mouse_circle.color = (*self.mouse_circle.color[:3], 0)
             target.remove_handlers( on_mouse_motion=self.on_mouse_motion )
+            self.invalidate()
 
 
         def on_mouse_motion( self, x, y, dx, dy ) -> None:
             # print(f"ParameterView.on_mouse_motion() {x} {y} {dx} {dy}")
             self.mouse_circle.position = pyglet.math.Vec2( x, y )
+            self.invalidate()
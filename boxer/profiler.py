@@ -0,0 +1,318 @@
+"""frame phase profiler
+
+Records timed spans of each frame (input events, layout, each view type's
+`draw_class()`, each leaf's `draw_leaf()`, batch draws, imgui rendering ..) into a
+ring buffer of the last `max_frames` frames. The spans are shown in an imgui
+timeline panel (`FrameProfiler.draw_imgui()`, View > Profiler) and can be exported
+as a Chrome trace (chrome://tracing, https://ui.perfetto.dev).
+
+Module level functions work on the default profiler, `boxer.profiler.profiler`,
+which records nothing until it's enabled:
+
+    boxer.profiler.set_enabled( True )
+    boxer.profiler.begin_frame()
+    with boxer.profiler.span( "layout", "container" ):
+        ...
+    boxer.profiler.end_frame()
+    boxer.profiler.profiler.export_chrome_trace( "trace.json" )
+
+Spans recorded between frames (input events) belong to the next frame.
+"""
+import array
+import collections
+import json
+import time
+
+import imgui
+
+
+class Frame:
+    """the spans of one frame
+
+    `spans` : `list` - ( name, category, start, end, depth ) tuples, times in seconds
+    """
+    __slots__ = ( "index", "start", "end", "spans" )
+
+    def __init__(self, index : int, start : float, end : float, spans : list):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.spans = spans
+
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class _Span:
+    """context manager of one span, see `FrameProfiler.span()`"""
+    __slots__ = ( "profiler", "name", "category" )
+
+    def __init__(self, profiler : 'FrameProfiler', name : str, category : str):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+
+
+    def __enter__(self):
+        self.profiler.begin( self.name, self.category )
+        return self
+
+
+    def __exit__(self, *exc):
+        self.profiler.end()
+        return False
+
+
+class _NullSpan:
+    """context manager that records nothing, returned while the profiler is disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class FrameProfiler:
+    """records the spans of the last `max_frames` frames
+
+    `max_frames` : `int` - size of the ring buffer of frames
+    """
+    # timeline colours of span categories, (r, g, b, a) 0-1
+    CATEGORY_COLORS = {
+        "frame" : ( 0.45, 0.45, 0.45, 1.0 ),
+        "input" : ( 0.85, 0.55, 0.25, 1.0 ),
+        "container" : ( 0.30, 0.55, 0.85, 1.0 ),
+        "view" : ( 0.45, 0.75, 0.35, 1.0 ),
+        "leaf" : ( 0.60, 0.45, 0.80, 1.0 ),
+        "imgui" : ( 0.85, 0.35, 0.45, 1.0 ),
+    }
+    DEFAULT_COLOR = ( 0.6, 0.6, 0.6, 1.0 )
+    # spans kept while no frame is drawn (input events), the oldest are dropped
+    MAX_PENDING_SPANS = 4096
+
+    def __init__(self, max_frames : int = 300):
+        self.enabled = False
+        self.frames : collections.deque[Frame] = collections.deque( maxlen = max_frames )
+        self.frame_count = 0            # frames recorded
+        self._spans = []                # spans of the frame being recorded
+        self._stack = []                # open spans ( name, category, start )
+        self._frame_start : float | None = None
+        self._epoch = time.perf_counter()   # trace time zero
+
+        # imgui panel
+        self.paused = False
+        self.selected_frame = -1        # index into .frames, -1 for the last
+        self.trace_path = "boxer_trace.json"
+
+
+    def set_enabled(self, enabled : bool) -> None:
+        """start or stop recording, stopping drops a partly recorded frame"""
+        self.enabled = enabled
+        if not enabled:
+            self._spans = []
+            self._stack = []
+            self._frame_start = None
+
+
+    def clear(self) -> None:
+        self.frames.clear()
+        self._spans = []
+        self._stack = []
+        self._frame_start = None
+
+
+    # recording ----------------------------------------------------------------
+
+    def begin_frame(self) -> None:
+        if not self.enabled or self.paused:
+            return
+        self._frame_start = time.perf_counter()
+
+
+    def end_frame(self) -> None:
+        """close the frame, with its spans since the previous frame"""
+        if self._frame_start is None:
+            return
+        end = time.perf_counter()
+        # close spans left open (an exception skipped their end)
+        while self._stack:
+            self.end()
+        start = min( [ self._frame_start ] + [ span[2] for span in self._spans ] )
+        self._spans.append( ( "frame", "frame", self._frame_start, end, 0 ) )
+        self.frames.append( Frame( self.frame_count, start, end, self._spans ) )
+        self.frame_count += 1
+        self._spans = []
+        self._frame_start = None
+
+
+    def begin(self, name : str, category : str = "") -> None:
+        """open a span, nested in the open spans"""
+        if self.enabled and not self.paused:
+            self._stack.append( ( name, category, time.perf_counter() ) )
+
+
+    def end(self) -> None:
+        """close the innermost open span"""
+        if self._stack:
+            name, category, start = self._stack.pop()
+            # depth 0 is the frame span
+            self._spans.append( ( name, category, start, time.perf_counter(), len( self._stack ) + 1 ) )
+            if self._frame_start is None and len( self._spans ) > self.MAX_PENDING_SPANS:
+                del self._spans[ :len( self._spans ) - self.MAX_PENDING_SPANS ]
+
+
+    def span(self, name : str, category : str = "") -> _Span | _NullSpan:
+        """`with profiler.span( name, category ):` records the block as a span"""
+        if not self.enabled or self.paused:
+            return _NULL_SPAN
+        return _Span( self, name, category )
+
+
+    # queries ------------------------------------------------------------------
+
+    def last_frame(self) -> Frame | None:
+        return self.frames[-1] if self.frames else None
+
+
+    def averages(self) -> dict[tuple[str, str], float]:
+        """{ ( name, category ) : mean time per frame in ms } over the recorded frames"""
+        totals = collections.defaultdict( float )
+        for frame in self.frames:
+            for name, category, start, end, _ in frame.spans:
+                totals[ ( name, category ) ] += end - start
+        count = max( 1, len( self.frames ) )
+        return { key : total * 1000.0 / count for key, total in totals.items() }
+
+
+    # export -------------------------------------------------------------------
+
+    def chrome_trace(self) -> dict:
+        """the recorded frames in the Chrome trace event format ("X" complete events, in microseconds)"""
+        events = []
+        for frame in self.frames:
+            for name, category, start, end, depth in frame.spans:
+                events.append( {
+                    "name" : name,
+                    "cat" : category,
+                    "ph" : "X",
+                    "ts" : ( start - self._epoch ) * 1e6,
+                    "dur" : ( end - start ) * 1e6,
+                    "pid" : 1,
+                    "tid" : 1,
+                    "args" : { "frame" : frame.index, "depth" : depth },
+                } )
+        events.sort( key = lambda e: ( e["ts"], -e["dur"] ) )
+        return { "traceEvents" : events, "displayTimeUnit" : "ms" }
+
+
+    def export_chrome_trace(self, path : str) -> None:
+        with open( path, "w" ) as f:
+            json.dump( self.chrome_trace(), f )
+        print("\033[38;5;123mprofiler:\033[0m wrote %s frames to '%s'"%( len( self.frames ), path ))
+
+
+    # imgui --------------------------------------------------------------------
+
+    def draw_imgui(self) -> bool:
+        """profiler panel: frame times, the timeline of one frame and the slowest
+        spans, returns False when the window is closed"""
+        imgui.set_next_window_size( 520, 380, imgui.FIRST_USE_EVER )
+        expanded, opened = imgui.begin( "profiler", closable = True, flags = imgui.WINDOW_NO_SAVED_SETTINGS )
+        if expanded:
+            _, enabled = imgui.checkbox( "record", self.enabled )
+            if enabled != self.enabled:
+                self.set_enabled( enabled )
+            imgui.same_line()
+            _, self.paused = imgui.checkbox( "pause", self.paused )
+            imgui.same_line()
+            if imgui.button( "clear" ):
+                self.clear()
+            imgui.same_line()
+            if imgui.button( "export trace" ):
+                self.export_chrome_trace( self.trace_path )
+
+            if self.frames:
+                durations = array.array( "f", [ frame.duration * 1000.0 for frame in self.frames ] )
+                imgui.plot_histogram( "##frames", durations, graph_size = ( 0, 50 ),
+                                    overlay_text = "frame %.2f ms (max %.2f)"%( durations[-1], max( durations ) ) )
+                if imgui.is_item_clicked( 0 ):
+                    # pick the frame under the mouse
+                    min_x = imgui.get_item_rect_min().x
+                    width = max( 1.0, imgui.get_item_rect_size().x )
+                    self.selected_frame = min( len( self.frames ) - 1,
+                            int( ( imgui.get_mouse_pos().x - min_x ) / width * len( self.frames ) ) )
+                    self.paused = True
+                frame = self.frames[ self.selected_frame ] if self.paused and 0 <= self.selected_frame < len( self.frames ) else self.frames[-1]
+                self._draw_timeline( frame )
+                self._draw_averages()
+        imgui.end()
+        return opened
+
+
+    def _draw_timeline(self, frame : Frame) -> None:
+        row_height = 14.0
+        depth = max( span[4] for span in frame.spans )
+        width = max( 10.0, imgui.get_content_region_available_width() )
+        height = ( depth + 1 ) * row_height
+        x0, y0 = imgui.get_cursor_screen_pos()
+        imgui.text( "frame %s  %.3f ms"%( frame.index, frame.duration * 1000.0 ) )
+        y0 += imgui.get_text_line_height_with_spacing()
+        imgui.dummy( width, height )
+
+        draw_list = imgui.get_window_draw_list()
+        scale = width / max( frame.duration, 1e-9 )
+        mouse_x, mouse_y = imgui.get_mouse_pos()
+        hovered = None
+        for span in frame.spans:
+            name, category, start, end, span_depth = span
+            left = x0 + ( start - frame.start ) * scale
+            right = max( left + 1.0, x0 + ( end - frame.start ) * scale )
+            top = y0 + span_depth * row_height
+            color = self.CATEGORY_COLORS.get( category, self.DEFAULT_COLOR )
+            draw_list.add_rect_filled( left, top, right, top + row_height - 1.0, imgui.get_color_u32_rgba( *color ) )
+            if right - left > 40.0:
+                draw_list.add_text( left + 2.0, top, imgui.get_color_u32_rgba( 0.0, 0.0, 0.0, 1.0 ), name )
+            if left <= mouse_x < right and top <= mouse_y < top + row_height:
+                hovered = span
+        if hovered is not None:
+            name, category, start, end, _ = hovered
+            imgui.set_tooltip( "%s (%s)\n%.3f ms"%( name, category, ( end - start ) * 1000.0 ) )
+
+
+    def _draw_averages(self, count : int = 12) -> None:
+        imgui.separator()
+        imgui.text( "mean ms per frame, over %s frames"%len( self.frames ) )
+        averages = sorted( self.averages().items(), key = lambda item: -item[1] )
+        for ( name, category ), ms in averages[:count]:
+            imgui.text( "%8.3f  %s"%( ms, name ) )
+            imgui.same_line()
+            imgui.text_disabled( category )
+
+
+# default profiler -------------------------------------------------------------
+
+profiler = FrameProfiler()
+
+
+def span( name : str, category : str = "" ) -> _Span | _NullSpan:
+    """`with boxer.profiler.span( name, category ):` on the default profiler"""
+    return profiler.span( name, category )
+
+
+def begin_frame() -> None:
+    profiler.begin_frame()
+
+
+def end_frame() -> None:
+    profiler.end_frame()
+
+
+def set_enabled( enabled : bool ) -> None:
+    profiler.set_enabled( enabled )
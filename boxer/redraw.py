@@ -0,0 +1,233 @@
+"""render on demand
+
+The `RedrawScheduler` draws its window only when something changed: input events,
+`invalidate()` calls (from containers, handles, views, the camera ..) or running
+animations. An idle window draws at `idle_fps` (0 for never), so idle sessions
+don't keep a CPU core busy.
+
+The application runs the event loop without pyglet's redraw interval
+(`pyglet.app.run( interval=None )`), and the scheduler's clock callbacks draw.
+
+Module level functions work on the default scheduler, `boxer.redraw.scheduler`,
+which is attached to the application window by `boxer.application.Application`:
+
+    boxer.redraw.invalidate()                       # redraw the whole frame
+    boxer.redraw.invalidate( (x, y, width, height) )  # redraw, a region changed
+    boxer.redraw.add_animation( self.on_update )    # call on_update(dt) every frame
+    boxer.redraw.call_before_frame( self.apply )    # call apply() once, before the next frame
+    boxer.redraw.remove_animation( self.on_update )
+    boxer.redraw.set_continuous( True )             # draw every frame, always
+"""
+import weakref
+
+import pyglet
+
+
+class RedrawScheduler:
+    """draws a window when it's invalidated, or while animations run
+
+    `active_fps` : `float` - frame rate cap while something is changing
+    `idle_fps` : `float` - frame rate when nothing changes, 0 to never draw when idle
+    `input_frames` : `int` - frames drawn after an input event (imgui reacts to some input a frame late)
+    `clock` : `pyglet.clock.Clock` - schedules the frames and times them, pyglet's default clock when None
+    """
+    WINDOW_EVENTS = ( "on_mouse_motion", "on_mouse_press", "on_mouse_release", "on_mouse_drag",
+                    "on_mouse_scroll", "on_mouse_enter", "on_mouse_leave",
+                    "on_key_press", "on_key_release", "on_text", "on_text_motion",
+                    "on_resize", "on_expose", "on_show", "on_activate", "on_deactivate" )
+
+    def __init__(self,
+            window : pyglet.window.Window = None,
+            active_fps : float = 60.0,
+            idle_fps : float = 0.0,
+            input_frames : int = 2,
+            clock : pyglet.clock.Clock = None):
+
+        self.window = None
+        self.clock = clock or pyglet.clock.get_default()
+        self.active_fps = active_fps
+        self.idle_fps = 0.0
+        self.input_frames = input_frames
+
+        self.continuous = False
+        self.frames_pending = 0         # frames still to draw for past invalidations
+        self.dirty_rect = None          # union of the invalidated regions, None for the whole frame
+        self.frame_count = 0            # frames drawn
+        self._animations : list[weakref.WeakMethod] = []
+        self._before_frame : dict = {}  # { callback : None } one shot callbacks of the next frame
+        self._scheduled = False
+        self._last_draw_time = 0.0
+        self._input_handlers = {}
+
+        self.set_idle_fps( idle_fps )
+        if window is not None:
+            self.attach( window )
+
+
+    # window -------------------------------------------------------------------
+
+    def attach(self, window : pyglet.window.Window) -> None:
+        """draw `window` on demand, invalidating on its input events"""
+        self.detach()
+        self.window = window
+        self._input_handlers = { name : self._on_window_event for name in self.WINDOW_EVENTS }
+        window.push_handlers( **self._input_handlers )
+        self.invalidate()
+
+
+    def detach(self) -> None:
+        self._call_before_frame()
+        if self.window is not None:
+            self.window.remove_handlers( **self._input_handlers )
+        self.window = None
+        self._input_handlers = {}
+        self.clock.unschedule( self._draw )
+        self._scheduled = False
+
+
+    def _on_window_event(self, *args) -> None:
+        # never handles the event, only notes that a frame is needed
+        self.invalidate( frames = self.input_frames )
+
+
+    # invalidation -------------------------------------------------------------
+
+    @property
+    def dirty(self) -> bool:
+        """True if a frame is due"""
+        return self.frames_pending > 0 or self.animating
+
+
+    @property
+    def animating(self) -> bool:
+        return self.continuous or len( self._animations ) > 0
+
+
+    def invalidate(self, rect : tuple = None, frames : int = 1) -> None:
+        """request a redraw, of the region `rect` (x, y, width, height) or of the
+        whole frame (None)
+        The scheduler always redraws the whole frame, the region is kept in
+        `.dirty_rect` for consumers that can limit their work to it."""
+        if self.frames_pending == 0:
+            self.dirty_rect = rect
+        elif rect is None or self.dirty_rect is None:
+            self.dirty_rect = None
+        else:
+            x0 = min( self.dirty_rect[0], rect[0] )
+            y0 = min( self.dirty_rect[1], rect[1] )
+            x1 = max( self.dirty_rect[0] + self.dirty_rect[2], rect[0] + rect[2] )
+            y1 = max( self.dirty_rect[1] + self.dirty_rect[3], rect[1] + rect[3] )
+            self.dirty_rect = ( x0, y0, x1 - x0, y1 - y0 )
+        self.frames_pending = max( self.frames_pending, frames )
+        self._schedule()
+
+
+    def call_before_frame(self, callback) -> None:
+        """call `callback()` once before the next frame, however many times it's
+        requested until then (eg. to apply a burst of input events once per frame).
+        Without a window nothing draws, it's called immediately."""
+        if self.window is None:
+            callback()
+            return
+        self._before_frame[callback] = None
+        self.invalidate()
+
+
+    def _call_before_frame(self) -> None:
+        callbacks = list( self._before_frame )
+        self._before_frame.clear()
+        for callback in callbacks:
+            callback()
+
+
+    # animations ---------------------------------------------------------------
+
+    def add_animation(self, callback) -> None:
+        """call the bound method `callback( dt )` before every frame, and keep
+        drawing at `active_fps` until it's removed (or its object is deleted)"""
+        if not any( ref() == callback for ref in self._animations ):
+            self._animations.append( weakref.WeakMethod( callback ) )
+        self._schedule()
+
+
+    def remove_animation(self, callback) -> None:
+        self._animations = [ ref for ref in self._animations if ref() is not None and ref() != callback ]
+
+
+    def set_continuous(self, continuous : bool) -> None:
+        """draw every frame at `active_fps`, invalidated or not"""
+        self.continuous = continuous
+        self._schedule()
+
+
+    def set_idle_fps(self, idle_fps : float) -> None:
+        """frame rate while nothing changes, 0 to not draw when idle"""
+        self.clock.unschedule( self._idle_draw )
+        self.idle_fps = idle_fps
+        if idle_fps > 0.0:
+            self.clock.schedule_interval_soft( self._idle_draw, 1.0 / idle_fps )
+
+
+    # drawing ------------------------------------------------------------------
+
+    def _schedule(self) -> None:
+        """schedule the next frame, no sooner than 1/active_fps after the last"""
+        if self._scheduled or self.window is None or not self.dirty:
+            return
+        elapsed = self.clock.time() - self._last_draw_time
+        delay = max( 0.0, 1.0 / self.active_fps - elapsed )
+        self.clock.schedule_once( self._draw, delay )
+        self._scheduled = True
+
+
+    def _idle_draw(self, dt : float) -> None:
+        if not self._scheduled:
+            self.invalidate()
+
+
+    def _draw(self, dt : float) -> None:
+        self._scheduled = False
+        if self.window is None:
+            return
+        self._last_draw_time = self.clock.time()
+
+        self._call_before_frame()
+        for ref in list( self._animations ):
+            callback = ref()
+            if callback is None:
+                self._animations.remove( ref )
+            else:
+                callback( dt )
+
+        self.frames_pending = max( 0, self.frames_pending - 1 )
+        if self.frames_pending == 0:
+            self.dirty_rect = None
+        self.frame_count += 1
+        self.window.draw( dt )
+        self._schedule()
+
+
+# default scheduler ------------------------------------------------------------
+
+scheduler = RedrawScheduler()
+
+
+def invalidate( rect : tuple = None, frames : int = 1 ) -> None:
+    """request a redraw from the default scheduler, see `RedrawScheduler.invalidate()`"""
+    scheduler.invalidate( rect, frames )
+
+
+def add_animation( callback ) -> None:
+    scheduler.add_animation( callback )
+
+
+def call_before_frame( callback ) -> None:
+    scheduler.call_before_frame( callback )
+
+
+def remove_animation( callback ) -> None:
+    scheduler.remove_animation( callback )
+
+
+def set_continuous( continuous : bool ) -> None:
+    scheduler.set_continuous( continuous )
@@ -0,0 +1,137 @@
+"""lazy, shared loading of the files in `boxer/resources`
+
+Images are decoded on first use and shared by every caller (`load_image()`), so
+importing `boxer.containers` or `boxer.ui` doesn't decode or upload anything.
+
+The 16 pixel icons (`boxer/resources/*_16.png`) are packed into one atlas texture
+per GL object space, on the first `get_icon()` / `icon_uv()` call. imgui draws
+every icon from that one texture, by passing the icon's uv rectangle, see
+`icon_image()` and `icon_button()`:
+
+    boxer.resource_manager.icon_button( "cog", 12, 12, uv0=(0,1), uv1=(1,0) )
+"""
+import glob
+import math
+import os
+import weakref
+
+import imgui
+import pyglet
+
+RESOURCE_PATH = os.path.join( os.path.dirname(__file__), "resources" )
+
+ICON_SUFFIX = "_16.png"
+ICON_BORDER = 1     # blank pixels around each icon in the atlas, against filtering bleed
+
+# { file name : pyglet.image.AbstractImage }
+_images : dict = {}
+# { object_space : IconAtlas }
+_atlases : weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+# number of image files decoded, see tests/test_resource_manager.py
+load_count = 0
+
+
+def resource_path( *parts : str ) -> str:
+    """absolute path of a file in `boxer/resources`"""
+    return os.path.join( RESOURCE_PATH, *parts )
+
+
+def load_image( name : str ) -> pyglet.image.AbstractImage:
+    """the decoded image `boxer/resources/<name>`, loaded once and shared"""
+    global load_count
+    image = _images.get( name )
+    if image is None:
+        image = pyglet.image.load( resource_path( name ) )
+        load_count += 1
+        _images[name] = image
+    return image
+
+
+def icon_names() -> list[str]:
+    """names of the atlas icons, the file names without the `_16.png` suffix"""
+    paths = sorted( glob.glob( resource_path( "*" + ICON_SUFFIX ) ) )
+    return [ os.path.basename(path)[:-len(ICON_SUFFIX)] for path in paths ]
+
+
+class IconAtlas:
+    """every `*_16.png` icon in one texture
+
+    Get the atlas of the current GL context with `get_icon_atlas()`.
+    """
+
+    def __init__(self, names : list[str]):
+        # smallest square power of two that fits a grid of the icons
+        cell = 16 + ICON_BORDER * 2
+        columns = max( 1, math.ceil( math.sqrt( len(names) ) ) )
+        size = 1 << ( columns * cell - 1 ).bit_length()
+        self._atlas = pyglet.image.atlas.TextureAtlas( size, size )
+        self.texture : pyglet.image.Texture = self._atlas.texture
+
+        # { name : TextureRegion }
+        self.regions : dict = {}
+        # { name : (u0, v0, u1, v1) } of the region, in the atlas
+        self.uv_rects : dict[str, tuple] = {}
+        for name in names:
+            image = load_image( name + ICON_SUFFIX ).get_image_data()
+            region = self._atlas.add( image, border=ICON_BORDER )
+            self.regions[name] = region
+            # tex_coords are ( u, v, r ) of the bottom left, bottom right, top right, top left corners
+            coords = region.tex_coords
+            self.uv_rects[name] = ( coords[0], coords[1], coords[6], coords[7] )
+
+
+    def uv(self, name : str, uv0 : tuple = (0.0, 0.0), uv1 : tuple = (1.0, 1.0)) -> tuple[tuple, tuple]:
+        """map `uv0`, `uv1` (as passed to imgui for a single icon texture) into
+        the atlas rectangle of icon `name`, returns (uv0, uv1)"""
+        u0, v0, u1, v1 = self.uv_rects[name]
+        du = u1 - u0
+        dv = v1 - v0
+        return ( ( u0 + uv0[0] * du, v0 + uv0[1] * dv ),
+                 ( u0 + uv1[0] * du, v0 + uv1[1] * dv ) )
+
+
+def get_icon_atlas() -> IconAtlas:
+    """the icon atlas of the current GL context, built on first use"""
+    object_space = pyglet.gl.current_context.object_space
+    atlas = _atlases.get( object_space )
+    if atlas is None:
+        atlas = IconAtlas( icon_names() )
+        _atlases[object_space] = atlas
+    return atlas
+
+
+def get_icon( name : str ) -> pyglet.image.TextureRegion:
+    """the atlas region of icon `name` (eg. "cog" for `cog_16.png`)"""
+    return get_icon_atlas().regions[name]
+
+
+def icon_texture_id() -> int:
+    """GL texture name of the icon atlas, for `imgui.image()` / `imgui.image_button()`"""
+    return get_icon_atlas().texture.id
+
+
+def icon_uv( name : str, uv0 : tuple = (0.0, 0.0), uv1 : tuple = (1.0, 1.0) ) -> tuple[tuple, tuple]:
+    """(uv0, uv1) of icon `name` in the atlas, see `IconAtlas.uv()`"""
+    return get_icon_atlas().uv( name, uv0, uv1 )
+
+
+# imgui ------------------------------------------------------------------------
+
+def icon_image( name : str, width : float, height : float, uv0 : tuple = (0.0, 0.0), uv1 : tuple = (1.0, 1.0), **kwargs ) -> None:
+    """`imgui.image()` of icon `name`, `uv0` and `uv1` are relative to the icon"""
+    uv0, uv1 = icon_uv( name, uv0, uv1 )
+    imgui.image( icon_texture_id(), width, height, uv0=uv0, uv1=uv1, **kwargs )
+
+
+def icon_button( name : str, width : float, height : float, uv0 : tuple = (0.0, 0.0), uv1 : tuple = (1.0, 1.0), **kwargs ) -> bool:
+    """`imgui.image_button()` of icon `name`, `uv0` and `uv1` are relative to the icon
+
+    imgui derives an image button's id from its texture, and every icon shares
+    the atlas texture, so the button is wrapped in an id scope of the icon name.
+    """
+    uv0, uv1 = icon_uv( name, uv0, uv1 )
+    imgui.push_id( name )
+    clicked = imgui.image_button( icon_texture_id(), width, height, uv0=uv0, uv1=uv1, **kwargs )
+    imgui.pop_id()
+    return clicked
@@ -1,4 +1,255 @@
+"""GLSL sources and shared shader programs
+
+The `get_*_shader()` functions return programs from a registry: each program is
+compiled and linked once per GL object space (pyglet contexts share objects by
+default, so usually once per process), and handed out to every caller.
+
+Shared programs carry no per-instance state. Per-instance values are vertex
+attributes (see the marching lines shader), or are set by the owner's
+`pyglet.graphics.Group.set_state()` (see `boxer.background.BackgroundGroup`).
+Don't set instance specific uniforms on a shared program.
+
+Linked programs are cached on disk (see `load_program_binary()` / `save_program_binary()`),
+so warm starts skip compiling and linking. Set the environment variable
+`BOXER_SHADER_CACHE` to choose the cache directory, or to `"0"` to disable it.
+"""
+import ctypes
+import hashlib
+import os
+import struct
+import time
+import weakref
+
 import pyglet
+import pyglet.gl as gl
+
+# program registry -------------------------------------------------------------
+
+# { name : (vertex_source, fragment_source) }
+_program_sources : dict[str, tuple] = {}
+# { object_space : { name : program } }
+_programs : weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+# number of programs compiled and linked, see tests/test_shaders.py
+compile_count = 0
+
+
+def register_program( name : str, vertex_source : str, fragment_source : str ) -> None:
+    """add program sources to the registry, compiled by `get_program( name )`"""
+    _program_sources[name] = ( vertex_source, fragment_source )
+
+
+def compile_program( vertex_source : str, fragment_source : str ) -> pyglet.graphics.shader.ShaderProgram:
+    """a new program (not shared), loaded from the program binary cache or
+    compiled and linked (and then saved to the cache)"""
+    global compile_count
+    key = None
+    if program_cache_available():
+        key = program_cache_key( vertex_source, fragment_source )
+        program = load_program_binary( key )
+        if program is not None:
+            return program
+
+    t0 = time.perf_counter()
+    _vert_shader = pyglet.graphics.shader.Shader(vertex_source, 'vertex')
+    _frag_shader = pyglet.graphics.shader.Shader(fragment_source, 'fragment')
+    if key is None:
+        program = pyglet.graphics.shader.ShaderProgram(_vert_shader, _frag_shader)
+    else:
+        program = _wrap_program( _link_retrievable( _vert_shader, _frag_shader ) )
+    compile_seconds = time.perf_counter() - t0
+    compile_count += 1
+    program_cache_stats["compiled"] += 1
+    program_cache_stats["compile_seconds"] += compile_seconds
+
+    if key is not None:
+        save_program_binary( key, program, compile_seconds )
+    return program
+
+
+def get_program( name : str ) -> pyglet.graphics.shader.ShaderProgram:
+    """the shared program `name` for the current GL context, compiled on first use"""
+    object_space = pyglet.gl.current_context.object_space
+    programs = _programs.get( object_space )
+    if programs is None:
+        programs = {}
+        _programs[object_space] = programs
+    program = programs.get( name )
+    if program is None:
+        vertex_source, fragment_source = _program_sources[name]
+        program = compile_program( vertex_source, fragment_source )
+        programs[name] = program
+    return program
+
+
+# program binary cache ---------------------------------------------------------
+# files are `<key>.bin`: a header ( binary format : uint32, compile seconds : float64 )
+# then the glGetProgramBinary() blob. The key hashes the sources with the GL vendor,
+# renderer and version strings, so a driver update misses the cache instead of
+# loading stale binaries. Drivers may still reject a binary (eg. after an update
+# that kept the version string), then the program is compiled and re-saved.
+
+_PROGRAM_CACHE_HEADER = struct.Struct( "<Id" )
+
+program_cache_dir = os.environ.get( "BOXER_SHADER_CACHE",
+                        os.path.join( os.path.expanduser("~"), ".cache", "boxer", "shaders" ) )
+
+program_cache_stats = {
+    "compiled" : 0,             # programs compiled from source
+    "compile_seconds" : 0.0,
+    "loaded" : 0,               # programs loaded from the cache
+    "load_seconds" : 0.0,
+    "saved_seconds" : 0.0,      # recorded compile time - load time, of loaded programs
+    "rejected" : 0,             # cached binaries the driver refused
+}
+
+
+def program_cache_available() -> bool:
+    """True if program binaries can be cached (OpenGL 4.1 or ARB_get_program_binary,
+    at least one binary format, pyglet internals `_wrap_program()` needs, and the
+    cache isn't disabled)"""
+    if program_cache_dir in ("", "0") or not can_wrap_programs():
+        return False
+    info = pyglet.gl.gl_info
+    if not ( info.have_version(4, 1) or info.have_extension("GL_ARB_get_program_binary") ):
+        return False
+    formats = gl.GLint()
+    gl.glGetIntegerv( gl.GL_NUM_PROGRAM_BINARY_FORMATS, formats )
+    return formats.value > 0
+
+
+def program_cache_key( vertex_source : str, fragment_source : str ) -> str:
+    info = pyglet.gl.gl_info
+    h = hashlib.sha1()
+    for part in ( vertex_source, fragment_source,
+                info.get_vendor(), info.get_renderer(), info.get_version_string() ):
+        h.update( part.encode("utf-8") )
+        h.update( b"\0" )
+    return h.hexdigest()
+
+
+def program_cache_report() -> str:
+    """one line summary of the program cache use in this process"""
+    st = program_cache_stats
+    return "shader programs: %s loaded from cache (%.1f ms, saved %.1f ms), %s compiled (%.1f ms), %s rejected"%(
+        st["loaded"], st["load_seconds"] * 1000.0, st["saved_seconds"] * 1000.0,
+        st["compiled"], st["compile_seconds"] * 1000.0, st["rejected"] )
+
+
+def load_program_binary( key : str ) -> pyglet.graphics.shader.ShaderProgram | None:
+    """the cached program for `key`, or None if there isn't one or the driver rejects it"""
+    path = os.path.join( program_cache_dir, key + ".bin" )
+    try:
+        with open( path, "rb" ) as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) <= _PROGRAM_CACHE_HEADER.size:
+        return None
+
+    t0 = time.perf_counter()
+    binary_format, compile_seconds = _PROGRAM_CACHE_HEADER.unpack_from( data )
+    binary = data[_PROGRAM_CACHE_HEADER.size:]
+    program_id = gl.glCreateProgram()
+    status = gl.GLint()
+    try:
+        gl.glProgramBinary( program_id, binary_format, ctypes.create_string_buffer( binary, len(binary) ), len(binary) )
+        gl.glGetProgramiv( program_id, gl.GL_LINK_STATUS, status )
+    except gl.GLException:
+        status.value = 0
+    if not status.value:
+        gl.glDeleteProgram( program_id )
+        program_cache_stats["rejected"] += 1
+        print("\033[38;5;196m[shaders]\033[0m cached program binary %s rejected by the driver, recompiling"%key[:12])
+        try:
+            os.remove( path )
+        except OSError:
+            pass
+        return None
+
+    program = _wrap_program( program_id )
+    load_seconds = time.perf_counter() - t0
+    program_cache_stats["loaded"] += 1
+    program_cache_stats["load_seconds"] += load_seconds
+    program_cache_stats["saved_seconds"] += max( 0.0, compile_seconds - load_seconds )
+    return program
+
+
+def save_program_binary( key : str, program : pyglet.graphics.shader.ShaderProgram, compile_seconds : float ) -> bool:
+    """write the linked `program` to the cache, returns False if it couldn't"""
+    length = gl.GLint()
+    gl.glGetProgramiv( program.id, gl.GL_PROGRAM_BINARY_LENGTH, length )
+    if length.value <= 0:
+        return False
+    binary = ctypes.create_string_buffer( length.value )
+    binary_format = gl.GLenum()
+    written = gl.GLsizei()
+    gl.glGetProgramBinary( program.id, length.value, written, binary_format, binary )
+
+    path = os.path.join( program_cache_dir, key + ".bin" )
+    try:
+        os.makedirs( program_cache_dir, exist_ok=True )
+        # write then rename, so a concurrent start never reads a partial file
+        with open( path + ".tmp", "wb" ) as f:
+            f.write( _PROGRAM_CACHE_HEADER.pack( binary_format.value, compile_seconds ) )
+            f.write( binary.raw[:written.value] )
+        os.replace( path + ".tmp", path )
+    except OSError as e:
+        print("\033[38;5;196m[shaders]\033[0m could not write program cache %s: %s"%(path, e))
+        return False
+    return True
+
+
+def _link_retrievable( *shaders ) -> int:
+    """link like pyglet's ShaderProgram does, with the binary retrievable hint set"""
+    program_id = gl.glCreateProgram()
+    for shader in shaders:
+        gl.glAttachShader( program_id, shader.id )
+    gl.glProgramParameteri( program_id, gl.GL_PROGRAM_BINARY_RETRIEVABLE_HINT, gl.GL_TRUE )
+    gl.glLinkProgram( program_id )
+
+    status = gl.GLint()
+    gl.glGetProgramiv( program_id, gl.GL_LINK_STATUS, status )
+    if not status.value:
+        length = gl.GLint()
+        gl.glGetProgramiv( program_id, gl.GL_INFO_LOG_LENGTH, length )
+        log = ctypes.create_string_buffer( length.value )
+        gl.glGetProgramInfoLog( program_id, len(log), None, log )
+        raise pyglet.graphics.shader.ShaderException( "Error linking shader program:\n%s"%log.value.decode() )
+
+    for shader in shaders:
+        gl.glDetachShader( program_id, shader.id )
+    return program_id
+
+
+# what _wrap_program() sets and uses: the ShaderProgram slots and introspection
+# functions of pyglet 2.1, see tests/test_shaders.py
+_WRAPPED_SLOTS = ( "_id", "_context", "_attributes", "_uniforms", "_uniform_blocks" )
+_INTROSPECTION = ( "_introspect_attributes", "_introspect_uniforms", "_introspect_uniform_blocks" )
+
+
+def can_wrap_programs() -> bool:
+    """True if this pyglet's ShaderProgram can be built around a linked program,
+    as `_wrap_program()` does. Otherwise the cache is unavailable and programs are
+    compiled from source."""
+    _shader = pyglet.graphics.shader
+    slots = set( getattr( _shader.ShaderProgram, "__slots__", () ) ) - { "__weakref__" }
+    return slots == set( _WRAPPED_SLOTS ) and all( callable( getattr( _shader, name, None ) ) for name in _INTROSPECTION )
+
+
+def _wrap_program( program_id : int ) -> pyglet.graphics.shader.ShaderProgram:
+    """a pyglet ShaderProgram around an already linked GL program
+    (mirrors ShaderProgram.__init__ of pyglet 2.1, after its link step)"""
+    _shader = pyglet.graphics.shader
+    program = _shader.ShaderProgram.__new__( _shader.ShaderProgram )
+    program._id = program_id
+    program._context = pyglet.gl.current_context
+    have_dsa = pyglet.gl.gl_info.have_version(4, 1) or pyglet.gl.gl_info.have_extension("GL_ARB_separate_shader_objects")
+    program._attributes = _shader._introspect_attributes( program_id )
+    program._uniforms = _shader._introspect_uniforms( program_id, have_dsa )
+    program._uniform_blocks = _shader._introspect_uniform_blocks( program )
+    return program
+
 
 # basic shaders ----------------------------------------------------------------
 
@@ -51,24 +302,21 @@ _fragment_textured_source = """#version 330 core
     }
 """
 
+register_program( "default", _vertex_source, _fragment_source )
+register_program( "default_textured", _vertex_source, _fragment_textured_source )
+
 def get_default_shader():
     """
-    default shader program with vertex colors
+    default shader program with vertex colors (shared)
     """
-    _default_vert_shader = pyglet.graphics.shader.Shader(_vertex_source, 'vertex')
-    _default_frag_shader = pyglet.graphics.shader.Shader(_fragment_source, 'fragment')
-    program = pyglet.graphics.shader.ShaderProgram(_default_vert_shader, _default_frag_shader)
-    return program
+    return get_program( "default" )
 
 
 def get_default_textured_shader():
     """
-    default shader program with texturing, texture coords and vertex colors
+    default shader program with texturing, texture coords and vertex colors (shared)
     """
-    _default_vert_shader = pyglet.graphics.shader.Shader(_vertex_source, 'vertex')
-    _default_frag_shader = pyglet.graphics.shader.Shader(_fragment_textured_source, 'fragment')
-    program = pyglet.graphics.shader.ShaderProgram(_default_vert_shader, _default_frag_shader)
-    return program
+    return get_program( "default_textured" )
 
 
 # texture colour mixer shaders (TCMix) -----------------------------------------
@@ -79,9 +327,13 @@ _TCMix_vertex_source ="""#version 330 core
     in vec3 position;
     in vec4 colors;
     in vec3 tex_coords;
+    in vec4 color_one;
+    in vec4 color_two;
     out vec4 vertex_colors;
     out vec3 texture_coords;
     out vec4 user_data;
+    flat out vec4 mix_color_one;
+    flat out vec4 mix_color_two;
     
     uniform WindowBlock
     {
@@ -95,48 +347,68 @@ _TCMix_vertex_source ="""#version 330 core
 
         vertex_colors = colors;
         texture_coords = tex_coords;
+        mix_color_one = color_one;
+        mix_color_two = color_two;
     }
 """
 
 _TCMix_fragment_source = """#version 330 core
     in vec4 vertex_colors;
     in vec3 texture_coords;
+    flat in vec4 mix_color_one;
+    flat in vec4 mix_color_two;
     out vec4 final_colors;
 
-    uniform vec4 color_one;
-    uniform vec4 color_two;
-
     uniform sampler2D our_texture;
 
     void main()
     {
-        final_colors = mix( color_one, color_two, texture(our_texture, texture_coords.xy).r) * vertex_colors;    
+        final_colors = mix( mix_color_one, mix_color_two, texture(our_texture, texture_coords.xy).r) * vertex_colors;    
     }
 """
 
+register_program( "texture_colour_mix", _TCMix_vertex_source, _TCMix_fragment_source )
+
 def get_texture_colour_mix_shader():
     """
-    colour mixing shader program with texturing, texture coords and vertex colors
-    two uniforms control input colours:
+    colour mixing shader program with texturing, texture coords and vertex colors (shared)
+    two vertex attributes control input colours:
     color_one
     color_two
 
     returns a mix by red channel of our_texture sampler2D
+    `camera_matrix` is a uniform, set it in the drawing group's set_state()
     """
-    _default_vert_shader = pyglet.graphics.shader.Shader(_TCMix_vertex_source, 'vertex')
-    _default_frag_shader = pyglet.graphics.shader.Shader(_TCMix_fragment_source, 'fragment')
-    program = pyglet.graphics.shader.ShaderProgram(_default_vert_shader, _default_frag_shader)
-    return program
+    return get_program( "texture_colour_mix" )
 
 
 # marching lines shaders -------------------------------------------------------
 
+# the per-instance state is in vertex attributes, so one program draws any number
+# of marching lines quads with different colours, inner rects and animation times:
+#   color_one  : vec4 - line colour
+#   inner_rect : vec4 - inner rect (bottom left x, y, top right x, y)
+#   positive   : float - value of the inner rect (1.0 means black outside,
+#                        0.0 means black inside)
+#   line       : vec4 - ( line_ratio - ratio of gap-to-line,
+#                         line_width - width of the line in viewport pixels,
+#                         gap_alpha - the alpha value in the line gaps,
+#                         time )
+
 _MarchingLines_vertex_source ="""#version 330 core
     in vec3 position;
     in vec4 colors;
+    in vec4 color_one;
+    in vec4 inner_rect;
+    in float positive;
+    in vec4 line;
     out vec4 vertex_colors;
     out vec4 user_data;
     out vec2 sposition;
+    flat out vec4 v_color_one;
+    flat out vec4 v_inner_rect;
+    flat out float v_positive;
+    flat out vec4 v_line;
 
     uniform WindowBlock
     {
@@ -149,6 +421,10 @@ _MarchingLines_vertex_source ="""#version 330 core
         gl_Position = window.projection * window.view * vec4(position, 1.0);
         sposition = position.xy;
         vertex_colors = colors;
+        v_color_one = color_one;
+        v_inner_rect = inner_rect;
+        v_positive = positive;
+        v_line = line;
     }
 """
 
@@ -160,54 +436,208 @@ _MarchingLines_vertex_source ="""#version 330 core
 _MarchingLines_fragment_source = """#version 330 core
     in vec4 vertex_colors;
     in vec2 sposition;
+    flat in vec4 v_color_one;
+    flat in vec4 v_inner_rect;
+    flat in float v_positive;
+    flat in vec4 v_line;
     out vec4 final_color;
 
-    uniform vec4 color_one;
-    uniform float line_ratio; // ratio of gap-to-line
-    uniform float line_width; // width of the line in viewport pixels
-    uniform float gap_alpha; // the alpha value in the line gaps
-    uniform float time;
+    void main()
+    {
+        float line_ratio = v_line.x;
+        float line_width = v_line.y;
+        float gap_alpha = v_line.z;
+        float time = v_line.w;
+
+        vec2 st = sposition;//gl_FragCoord.xy;///u_resolution.xy;
+        // box
+        vec2 box_bl = step( v_inner_rect.xy, st );
+        vec2 box_tr = vec2(1.0)-step( v_inner_rect.zw, st );
+        float box_shape = box_bl.x * box_bl.y * box_tr.x * box_tr.y;
+        float box = mix(box_shape, 1.0 - box_shape, step(v_positive, 0.5));
+
+        // lines
+        float _line_width = line_width * 2.0;
+        float diagonal = ((gl_FragCoord.x+time) - gl_FragCoord.y)*(1.0/_line_width);
+        float dx = fwidth( diagonal );
+
+        float mod_diagonal = mod( diagonal, 1.0 );
+        float d1 = smoothstep( line_ratio-dx, line_ratio+dx, mod_diagonal );
+        float d2 = smoothstep( 1.0, 1.0-dx*2.0, mod_diagonal );    
+        float line = mix(gap_alpha, 1.0, d1*d2);
+
+        vec4 col2 = vec4( 1.0, 1.0, 1.0, line * box  );
+
+        final_color = v_color_one * col2 * vertex_colors;
+        //final_color = vec4(st * .001, 0.0, 1.0) * vertex_colors;
+    }
+"""
 
-    vec2 st = sposition;//gl_FragCoord.xy;///u_resolution.xy;
-    // box
-    uniform vec2 ir_bl;
-    uniform vec2 ir_tr;
-    uniform float positive;
+# defaults for the `line` attribute: ( line_ratio, line_width, gap_alpha, time )
+MARCHINGLINES_LINE_DEFAULTS = (0.5, 25.0, 0.0, 0.0)
 
-    vec2 box_bl = step( ir_bl, st );
-    vec2 box_tr = vec2(1.0)-step( ir_tr, st );
-    float box_shape = box_bl.x * box_bl.y * box_tr.x * box_tr.y;
-    float box = mix(box_shape, 1.0 - box_shape, step(positive, 0.5));
+register_program( "marchinglines", _MarchingLines_vertex_source, _MarchingLines_fragment_source )
 
-    // lines
-    float _line_width = line_width * 2.0;
-    float diagonal = ((gl_FragCoord.x+time) - gl_FragCoord.y)*(1.0/_line_width);
-    float dx = fwidth( diagonal );
+def get_marchinglines_shader():
+    """
+    marching lines shader program (shared), the instance state is in the vertex
+    attributes `color_one`, `inner_rect`, `positive`, `line`
+    """
+    return get_program( "marchinglines" )
 
-    float mod_diagonal = mod( diagonal, 1.0 );
-    float d1 = smoothstep( line_ratio-dx, line_ratio+dx, mod_diagonal );
-    float d2 = smoothstep( 1.0, 1.0-dx*2.0, mod_diagonal );    
-    float line = mix(gap_alpha, 1.0, d1*d2);
 
-    vec4 col2 = vec4( 1.0, 1.0, 1.0, line * box  );
+# outline shaders --------------------------------------------------------------
+# line segments expanded to quads in the vertex shader, see boxer.outlines
+# every vertex of a segment carries the whole segment (x1, y1, x2, y2), and
+# its corner of the quad: (along the segment 0..1, across the segment -1..1)
+
+_Outline_vertex_source = """#version 330 core
+    in vec4 segment;
+    in vec2 corner;
+    in float thickness;
+    in vec4 colors;
+    out vec4 vertex_colors;
+
+    uniform WindowBlock
+    {
+        mat4 projection;
+        mat4 view;
+    } window;
 
     void main()
     {
-        final_color = color_one * col2 * vertex_colors;
-        //final_color = vec4(st * .001, 0.0, 1.0) * vertex_colors;
+        vec2 d = segment.zw - segment.xy;
+        float l = length( d );
+        vec2 direction = l > 0.0 ? d / l : vec2( 1.0, 0.0 );
+        vec2 normal = vec2( -direction.y, direction.x );
+        vec2 p = mix( segment.xy, segment.zw, corner.x ) + normal * corner.y * thickness * 0.5;
+        gl_Position = window.projection * window.view * vec4( p, 0.0, 1.0 );
+
+        vertex_colors = colors;
     }
 """
 
-def get_marchinglines_shader():
+_Outline_fragment_source = """#version 330 core
+    in vec4 vertex_colors;
+    out vec4 final_colors;
+
+    void main()
+    {
+        final_colors = vertex_colors;
+    }
+"""
+
+register_program( "outline", _Outline_vertex_source, _Outline_fragment_source )
+
+def get_outline_shader():
     """
+    shader program for boxer.outlines.OutlineRenderer (shared)
     """
-    _vert_shader = pyglet.graphics.shader.Shader(_MarchingLines_vertex_source, 'vertex')
-    _frag_shader = pyglet.graphics.shader.Shader(_MarchingLines_fragment_source, 'fragment')
-    program = pyglet.graphics.shader.ShaderProgram(_vert_shader, _frag_shader)
-    
-    #set defaults
-    program["line_ratio"] = 0.5
-    program["line_width"] = 25.0
-    program["gap_alpha"] = 0.0
-    
-    return program
\ No newline at end of file
+    return get_program( "outline" )
+
+
+# handle shaders ---------------------------------------------------------------
+# one instanced quad per handle, see boxer.handlerenderer
+# the quad's corners (-1..1) are per vertex, everything else is per instance; the
+# fragment shader shades the handle's shapes from their signed distances
+
+_Handle_vertex_source = """#version 330 core
+    in vec2 corner;
+    in vec2 center;
+    in vec4 sizes;
+    in float kind;
+    in vec4 display_color;
+    in vec4 hit_color;
+    in vec4 highlight_color;
+    in vec4 select_color;
+    in vec2 state;
+    out vec2 local;
+    flat out vec4 v_sizes;
+    flat out float v_kind;
+    flat out vec4 v_display_color;
+    flat out vec4 v_hit_color;
+    flat out vec4 v_highlight_color;
+    flat out vec4 v_select_color;
+    flat out vec2 v_state;
+
+    uniform WindowBlock
+    {
+        mat4 projection;
+        mat4 view;
+    } window;
+
+    void main()
+    {
+        // room for the select ring outside the hit shape, and antialiasing
+        vec2 extent = max( sizes.xy, sizes.zw ) + vec2( 5.0 );
+        local = corner * extent;
+        gl_Position = window.projection * window.view * vec4( center + local, 0.0, 1.0 );
+
+        v_sizes = sizes;
+        v_kind = kind;
+        v_display_color = display_color;
+        v_hit_color = hit_color;
+        v_highlight_color = highlight_color;
+        v_select_color = select_color;
+        v_state = state;
+    }
+"""
+
+_Handle_fragment_source = """#version 330 core
+    in vec2 local;
+    flat in vec4 v_sizes;
+    flat in float v_kind;
+    flat in vec4 v_display_color;
+    flat in vec4 v_hit_color;
+    flat in vec4 v_highlight_color;
+    flat in vec4 v_select_color;
+    flat in vec2 v_state;
+    out vec4 final_color;
+
+    float aa;
+
+    // signed distance to a box of half size `b`, or a circle of radius `b.x`
+    float sd( vec2 p, vec2 b )
+    {
+        if ( v_kind > 0.5 )
+            return length( p ) - b.x;
+        vec2 q = abs( p ) - b;
+        return length( max( q, 0.0 ) ) + min( max( q.x, q.y ), 0.0 );
+    }
+
+    float fill( float d ) { return 1.0 - smoothstep( -aa, aa, d ); }
+
+    // a line 1 unit wide along the shape's edge
+    float ring( float d ) { return 1.0 - smoothstep( 0.5 - aa, 0.5 + aa, abs( d ) ); }
+
+    vec4 over( vec4 dst, vec4 src )
+    {
+        float a = src.a + dst.a * ( 1.0 - src.a );
+        vec3 rgb = a > 0.0 ? ( src.rgb * src.a + dst.rgb * dst.a * ( 1.0 - src.a ) ) / a : vec3( 0.0 );
+        return vec4( rgb, a );
+    }
+
+    void main()
+    {
+        aa = max( fwidth( local.x ), fwidth( local.y ) ) * 0.5;
+        vec2 hit = v_sizes.zw;
+        // rings: highlight 1 unit outside the hit shape, select 2 (boxes) or 3 (circles)
+        float select_offset = v_kind > 0.5 ? 3.0 : 2.0;
+
+        vec4 color = v_hit_color * vec4( 1.0, 1.0, 1.0, fill( sd( local, hit ) ) );
+        color = over( color, v_display_color * vec4( 1.0, 1.0, 1.0, fill( sd( local, v_sizes.xy ) ) ) );
+        color = over( color, vec4( v_highlight_color.rgb, v_highlight_color.a * v_state.x * ring( sd( local, hit + vec2( 1.0 ) ) ) ) );
+        color = over( color, vec4( v_select_color.rgb, v_select_color.a * v_state.y * ring( sd( local, hit + vec2( select_offset ) ) ) ) );
+        if ( color.a <= 0.0 )
+            discard;
+        final_color = color;
+    }
+"""
+
+register_program( "handle", _Handle_vertex_source, _Handle_fragment_source )
+
+def get_handle_shader():
+    """
+    instanced shader program for boxer.handlerenderer.HandleRenderer (shared)
+    """
+    return get_program( "handle" )
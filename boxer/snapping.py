@@ -0,0 +1,319 @@
+"""snapping of dragged handles
+
+A `Snapper` snaps a dragged `boxer.handles.Handle` to a grid, to the x and y
+alignment lines of the other handles, and to container edges. It keeps a
+`SnapIndex` per handle space: the snap coordinates of each axis in a sorted numpy
+array, so a drag frame costs two logarithmic nearest queries instead of a pass
+over every handle. A handle that moves on its own is a `np.searchsorted` and an
+O(n) array copy per axis, a group of handles moving together (a
+`boxer.handles.HandleSelection`) rebuilds each axis with one sort.
+
+    snapper = boxer.snapping.Snapper( mouse = mouse, grid_size = 20.0 )
+    manager = boxer.handles.HandleManager( mouse = mouse, snapper = snapper )
+    snapper.track_containers( root )
+
+A handle snaps when it has a `.snapper` (or its manager has one): anything with a
+`.snap( handle, position )` method returning the snapped position. Split handles
+use their `boxer.containers.SplitContainer`, which snaps to `Container.snap_ratios`.
+
+The tolerance is in pixels, world space tolerances are scaled by the camera zoom.
+"""
+import numpy as np
+import pyglet
+
+import boxer.handles
+
+# split ratios snapped to, with Container.snap_ratios = boxer.snapping.DEFAULT_RATIOS
+DEFAULT_RATIOS = ( 0.25, 1.0/3.0, 0.5, 2.0/3.0, 0.75 )
+
+
+def nearest_value( values : np.ndarray, value : float ) -> float | None:
+    """the closest of sorted `values` to `value`, None if `values` is empty"""
+    i = int( np.searchsorted( values, value ) )
+    best = None
+    for j in ( i - 1, i ):
+        if 0 <= j < len( values ) and ( best is None or abs( values[j] - value ) < abs( best - value ) ):
+            best = float( values[j] )
+    return best
+
+
+def snap_to_values( value : float, values, tolerance : float ) -> float:
+    """`value` moved to the closest of sorted `values`, if it's within `tolerance`"""
+    target = nearest_value( np.asarray( values, dtype = np.float64 ), value )
+    if target is not None and abs( target - value ) <= tolerance:
+        return target
+    return value
+
+
+def container_lines( root ) -> tuple[list[float], list[float]]:
+    """( xs, ys ), the edges of `root` and every container below it, in window coordinates"""
+    xs = set()
+    ys = set()
+    for container in [ root ] + root.get_subtree_nodes( root ):
+        x, y = container.position[0], container.position[1]
+        xs.update( ( float( x ), float( x + container.width ) ) )
+        ys.update( ( float( y ), float( y + container.height ) ) )
+    return sorted( xs ), sorted( ys )
+
+
+class _SortedAxis:
+    """snap coordinates of one axis, sorted, with the key (a handle, or a line id) of each"""
+    __slots__ = ( "values", "keys" )
+
+    def __init__(self):
+        self.values = np.zeros( 0, dtype = np.float64 )
+        self.keys : list = []
+
+
+    def __len__(self) -> int:
+        return len( self.keys )
+
+
+    def insert(self, value : float, key) -> None:
+        i = int( np.searchsorted( self.values, value ) )
+        self.values = np.insert( self.values, i, value )
+        self.keys.insert( i, key )
+
+
+    def remove(self, value : float, key) -> None:
+        # the key is among the equal values, found from the first of them
+        i = int( np.searchsorted( self.values, value, side = "left" ) )
+        while self.keys[i] is not key:
+            i += 1
+        self.values = np.delete( self.values, i )
+        del self.keys[i]
+
+
+    def nearest(self, value : float, exclude = ()) -> tuple[float, object] | None:
+        """( value, key ) closest to `value`, skipping the keys in `exclude`"""
+        i = int( np.searchsorted( self.values, value ) )
+        lo = i - 1
+        while lo >= 0 and self.keys[lo] in exclude:
+            lo -= 1
+        hi = i
+        while hi < len( self.keys ) and self.keys[hi] in exclude:
+            hi += 1
+        candidates = [ j for j in ( lo, hi ) if 0 <= j < len( self.keys ) ]
+        if not candidates:
+            return None
+        j = min( candidates, key = lambda j: abs( self.values[j] - value ) )
+        return float( self.values[j] ), self.keys[j]
+
+
+class SnapIndex:
+    """the x and y snap coordinates of one space: points (handle positions), and
+    named sets of lines (eg. container edges), each axis sorted for nearest queries"""
+
+    def __init__(self):
+        self.xs = _SortedAxis()
+        self.ys = _SortedAxis()
+        self._points : dict[object, tuple[float, float]] = {}
+        # { name : ( ( x key, .. ), ( y key, .. ) ) }
+        self._lines : dict[str, tuple[tuple, tuple]] = {}
+
+
+    def __len__(self) -> int:
+        return len( self._points )
+
+
+    def __contains__(self, key) -> bool:
+        return key in self._points
+
+
+    def set_point(self, key, x : float, y : float) -> None:
+        """add or move the point of `key` (a handle), a binary search and an O(n) array
+        copy per axis, for many keys use `.set_points()`"""
+        old = self._points.get( key )
+        if old == ( x, y ):
+            return
+        if old is not None:
+            if old[0] != x:
+                self.xs.remove( old[0], key )
+            if old[1] != y:
+                self.ys.remove( old[1], key )
+        if old is None or old[0] != x:
+            self.xs.insert( x, key )
+        if old is None or old[1] != y:
+            self.ys.insert( y, key )
+        self._points[key] = ( x, y )
+
+
+    def set_points(self, keys : list, xy : np.ndarray) -> None:
+        """add or move the points of `keys` (distinct) to the rows of `xy` ( n, 2 ),
+        each axis rebuilt with one `np.argsort` rather than a copy per point"""
+        if not len( keys ):
+            return
+        xy = np.asarray( xy, dtype = np.float64 ).reshape( -1, 2 )
+        moved = set( keys )
+        for axis, column in ( ( self.xs, xy[:,0] ), ( self.ys, xy[:,1] ) ):
+            keep = [ i for i, key in enumerate( axis.keys ) if key not in moved ]
+            values = np.concatenate( ( axis.values[keep], column ) )
+            axis_keys = [ axis.keys[i] for i in keep ] + list( keys )
+            order = np.argsort( values, kind = "stable" )
+            axis.values = values[order]
+            axis.keys = [ axis_keys[i] for i in order.tolist() ]
+        self._points.update( zip( keys, map( tuple, xy.tolist() ) ) )
+
+
+    def remove_point(self, key) -> None:
+        old = self._points.pop( key, None )
+        if old is not None:
+            self.xs.remove( old[0], key )
+            self.ys.remove( old[1], key )
+
+
+    def set_lines(self, name : str, xs = (), ys = ()) -> None:
+        """replace the lines called `name`: vertical lines at `xs`, horizontal at `ys`"""
+        self.remove_lines( name )
+        x_keys = tuple( ( name, "x", i ) for i in range( len( xs ) ) )
+        y_keys = tuple( ( name, "y", i ) for i in range( len( ys ) ) )
+        for key, x in zip( x_keys, xs ):
+            self.xs.insert( float( x ), key )
+        for key, y in zip( y_keys, ys ):
+            self.ys.insert( float( y ), key )
+        self._lines[name] = ( x_keys, y_keys )
+
+
+    def remove_lines(self, name : str) -> None:
+        keys = self._lines.pop( name, None )
+        if keys is None:
+            return
+        for axis, axis_keys in ( ( self.xs, keys[0] ), ( self.ys, keys[1] ) ):
+            drop = set( axis_keys )
+            keep = [ i for i, key in enumerate( axis.keys ) if key not in drop ]
+            axis.values = axis.values[keep]
+            axis.keys = [ axis.keys[i] for i in keep ]
+
+
+    def nearest_x(self, x : float, exclude = ()) -> tuple[float, object] | None:
+        return self.xs.nearest( x, exclude )
+
+
+    def nearest_y(self, y : float, exclude = ()) -> tuple[float, object] | None:
+        return self.ys.nearest( y, exclude )
+
+
+    def clear(self) -> None:
+        self.xs = _SortedAxis()
+        self.ys = _SortedAxis()
+        self._points = {}
+        self._lines = {}
+
+
+class Snapper:
+    """snaps dragged handles to a grid, to other handles' x / y alignment and to container edges
+
+    A `boxer.handles.HandleManager` created with `snapper = ...` keeps the snapper's
+    indices up to date with its handles, and its handles snap while dragged.
+    `.guides` holds the x and y (None when not snapped) of the last `.snap()`, to
+    draw alignment guides.
+
+    `mouse` : `boxer.mouse.Mouse` - its camera zoom scales world space tolerances
+    `tolerance` : `float` - snapping distance in pixels
+    `grid_size` : `float` - grid spacing, in the handle's space, None for no grid
+    `snap_to_handles` : `bool` - snap to the other handles' x and y
+    """
+
+    def __init__(self,
+            mouse = None,
+            tolerance : float = 8.0,
+            grid_size : float | None = None,
+            snap_to_handles : bool = True):
+        self.mouse = mouse
+        self.tolerance = tolerance
+        self.grid_size = grid_size
+        self.snap_to_handles = snap_to_handles
+        self.indices = { boxer.handles.Handle.SPACE_SCREEN : SnapIndex(),
+                        boxer.handles.Handle.SPACE_WORLD : SnapIndex() }
+        self._containers = []
+        self.guides : tuple[float | None, float | None] = ( None, None )
+
+
+    # handles ------------------------------------------------------------------
+
+    def update_handle(self, handle) -> None:
+        """index or re-index the position of `handle`"""
+        if not self.snap_to_handles:
+            return
+        for space, index in self.indices.items():
+            if space != handle.space:
+                index.remove_point( handle )
+        self.indices[handle.space].set_point( handle, float( handle.position.x ), float( handle.position.y ) )
+
+
+    def update_handles(self, handles : list, positions : np.ndarray) -> None:
+        """`.update_handle()` for many `handles` at `positions` ( n, 2 ), with one
+        `SnapIndex.set_points()` per space"""
+        if not self.snap_to_handles or not len( handles ):
+            return
+        spaces = np.array( [ handle.space for handle in handles ] )
+        for space, index in self.indices.items():
+            rows = np.flatnonzero( spaces == space ).tolist()
+            for row in np.flatnonzero( spaces != space ).tolist():
+                index.remove_point( handles[row] )
+            if rows:
+                index.set_points( [ handles[row] for row in rows ], positions[rows] )
+
+
+    def remove_handle(self, handle) -> None:
+        for index in self.indices.values():
+            index.remove_point( handle )
+
+
+    # containers ---------------------------------------------------------------
+
+    def track_containers(self, root) -> None:
+        """snap screen space handles to the edges of `root`'s containers, read
+        again by `.refresh()` (when a drag starts)"""
+        if root not in self._containers:
+            self._containers.append( root )
+        self.refresh()
+
+
+    def untrack_containers(self, root) -> None:
+        if root in self._containers:
+            self._containers.remove( root )
+            self.indices[boxer.handles.Handle.SPACE_SCREEN].remove_lines( "containers:%s"%id( root ) )
+
+
+    def refresh(self) -> None:
+        """re-read the tracked containers' edges"""
+        index = self.indices[boxer.handles.Handle.SPACE_SCREEN]
+        for root in self._containers:
+            xs, ys = container_lines( root )
+            index.set_lines( "containers:%s"%id( root ), xs, ys )
+
+
+    # snapping -----------------------------------------------------------------
+
+    def space_tolerance(self, space : int) -> float:
+        """`.tolerance` in the units of `space`"""
+        if space == boxer.handles.Handle.SPACE_WORLD and self.mouse is not None:
+            return self.tolerance / self.mouse.camera_zoom
+        return self.tolerance
+
+
+    def snap_value(self, space : int, axis : int, value : float, exclude = ()) -> float | None:
+        """the closest snap coordinate to `value` on `axis` (0 x, 1 y) within the
+        tolerance, None if there's none"""
+        tolerance = self.space_tolerance( space )
+        index = self.indices[space]
+        candidates = []
+        found = index.nearest_x( value, exclude ) if axis == 0 else index.nearest_y( value, exclude )
+        if found is not None:
+            candidates.append( found[0] )
+        if self.grid_size:
+            candidates.append( round( value / self.grid_size ) * self.grid_size )
+        best = min( candidates, key = lambda c: abs( c - value ), default = None )
+        if best is not None and abs( best - value ) <= tolerance:
+            return best
+        return None
+
+
+    def snap(self, handle, position : pyglet.math.Vec2) -> pyglet.math.Vec2:
+        """`position` of a dragged `handle`, snapped on each axis"""
+        exclude = { handle }
+        x = self.snap_value( handle.space, 0, position.x, exclude )
+        y = self.snap_value( handle.space, 1, position.y, exclude )
+        self.guides = ( x, y )
+        return pyglet.math.Vec2( position.x if x is None else x, position.y if y is None else y )
@@ -6,6 +6,9 @@ from imgui.integrations.pyglet import create_renderer
 import inspect
 import math
 
+import boxer.resource_manager
+import boxer.profiler
+
 #from tkinter import filedialog, Tk
 import tkinter.filedialog
 import tkinter
@@ -14,17 +17,12 @@ import tkinter
 class Ui(pyglet.event.EventDispatcher):
     """main Ui class"""
 
-    print("Ui: loading icons ..")
-    cog_image = pyglet.image.load("boxer/resources/cog_16.png")
-    alert_image = pyglet.image.load("boxer/resources/alert_16.png")
-    notification_image = pyglet.image.load("boxer/resources/notification_16.png")
-    code_object_image = pyglet.image.load("boxer/resources/object_16.png")
-
-    textures = {
-        "cog" : cog_image.get_texture(),
-        "alert" : alert_image.get_texture(),
-        "notification" : notification_image.get_texture(),
-        "code_object" : code_object_image.get_texture()
+    # { ui name : icon name }, icons are loaded lazily from the shared atlas, see boxer.resource_manager
+    icons = {
+        "cog" : "cog",
+        "alert" : "alert",
+        "notification" : "notification",
+        "code_object" : "object",
     }
 
     def __init__(self,
@@ -36,6 +34,7 @@ class Ui(pyglet.event.EventDispatcher):
         self.main_menu_bar_visible = True
         self.parameter_pane_visible = True
         self.imgui_demo_visible = False
+        self.profiler_visible = False
         # parameter pane -------------------------------------------------------
         self.parameter_panel_width = 210
         self.parameter_panel_width_original = self.parameter_panel_width
@@ -126,6 +125,11 @@ class Ui(pyglet.event.EventDispatcher):
                         _demo_clicked, _demo_state = imgui.menu_item("Dear ImGui Demo", selected = self.imgui_demo_visible)
                         if _demo_clicked:
                             self.imgui_demo_visible = not self.imgui_demo_visible
+                        _profiler_clicked, _profiler_state = imgui.menu_item("Profiler", selected = self.profiler_visible)
+                        if _profiler_clicked:
+                            self.profiler_visible = not self.profiler_visible
+                            # record while the panel is open
+                            boxer.profiler.set_enabled( self.profiler_visible )
                         imgui.separator()
                         _fullscreen_clicked, _fullscreen_state = imgui.menu_item( "fullscreen", 'Alt-Enter', selected = self.application_root.fullscreen )
                         if _fullscreen_clicked:
@@ -135,7 +139,7 @@ class Ui(pyglet.event.EventDispatcher):
                     if help_menu.opened:
                         imgui.menu_item("about boxer")
                         
-                        imgui.image( self.textures["cog"].id, 16, 16, border_color=(1, 0, 0, 1)  )
+                        boxer.resource_manager.icon_image( self.icons["cog"], 16, 16, border_color=(1, 0, 0, 1) )
                         
                         imgui.image(self.application_root.background.texture.id,
                             self.application_root.background.texture.width,
@@ -151,9 +155,9 @@ class Ui(pyglet.event.EventDispatcher):
                 imgui.push_style_color(imgui.COLOR_BUTTON_HOVERED, 1.0, 1.0, 1.0, 0.2)
                 cp = imgui.get_cursor_pos()
                 imgui.set_cursor_pos(imgui.Vec2(cp[0], cp[1] + 1.0) )
-                imgui.image_button( self.textures["cog"].id, 16, 16 )
-                imgui.image_button( self.textures["alert"].id, 16, 16, uv0=(0,1), uv1=(1,0) )
-                imgui.image_button( self.textures["notification"].id, 16, 16, uv0=(0,1), uv1=(1,0), tint_color=(1.0, 0.1, 0.1, math.sin(self.time*2.0)/2.0+0.65) )
+                boxer.resource_manager.icon_button( self.icons["cog"], 16, 16 )
+                boxer.resource_manager.icon_button( self.icons["alert"], 16, 16, uv0=(0,1), uv1=(1,0) )
+                boxer.resource_manager.icon_button( self.icons["notification"], 16, 16, uv0=(0,1), uv1=(1,0), tint_color=(1.0, 0.1, 0.1, math.sin(self.time*2.0)/2.0+0.65) )
                 imgui.pop_style_color(3)
                 imgui.pop_style_var(1) # item spacing
                 imgui.pop_style_var(1) # rounded buttons
@@ -391,6 +395,10 @@ class Ui(pyglet.event.EventDispatcher):
             self.parameter_pane()
         if self.imgui_demo_visible:
             imgui.show_demo_window()
+        if self.profiler_visible:
+            self.profiler_visible = boxer.profiler.profiler.draw_imgui()
+            if not self.profiler_visible:
+                boxer.profiler.set_enabled( False )
         imgui.pop_font()
 
         # imgui.render()
@@ -445,6 +453,21 @@ def browse_save_file_path() -> str:
     return file_path
 
 
+def browse_open_file_path() -> str:
+    """open a file dialog to browse a filepath to open"""
+    
+    root = tkinter.Tk()
+    root.withdraw()  # Hide the main window
+    file_path = tkinter.filedialog.askopenfilename(
+        defaultextension = ".json",
+        filetypes = [("JSON", "*.json"),('boxer project files', '*.bxr'), ('All files', '*.*')],
+        title = "Open"
+    )
+    print("chosen file path: '%s'"%file_path)
+    root.destroy()    
+    return file_path
+
+
 def tooltip_object_hover_icon( thing, v_offset:float=0.0 ) -> None:
     """displays a little 16x16 icon to serve as a mouse-hover tagert for object tooltips
     
@@ -456,7 +479,7 @@ def tooltip_object_hover_icon( thing, v_offset:float=0.0 ) -> None:
     imgui.begin_group()
     #imgui.dummy(0.0, v_offset)
     imgui.set_cursor_pos_y(imgui.get_cursor_pos_y()+v_offset)
-    imgui.image( Ui.textures["code_object"].id, 16, 16, uv0=(0,1), uv1=(1,0), tint_color=(1.0, 0.55, 0.0, 1.0))
+    boxer.resource_manager.icon_image( Ui.icons["code_object"], 16, 16, uv0=(0,1), uv1=(1,0), tint_color=(1.0, 0.55, 0.0, 1.0))
     imgui.end_group()
 
     if imgui.is_item_hovered():
@@ -466,7 +489,7 @@ def tooltip_object_hover_icon( thing, v_offset:float=0.0 ) -> None:
 
 def tooltip_obect_info( thing ) -> None:
     """returns a bunch of imgui commands to draw text info for an Any object"""
-    imgui.image( Ui.textures["code_object"].id, 16, 16, uv0=(0,1), uv1=(1,0), tint_color=(1.0, 0.55, 0.0, 1.0))
+    boxer.resource_manager.icon_image( Ui.icons["code_object"], 16, 16, uv0=(0,1), uv1=(1,0), tint_color=(1.0, 0.55, 0.0, 1.0))
     imgui.push_style_color( imgui.COLOR_TEXT, 1.0, 1.0, 1.0 )
     if hasattr(thing, "name"):
         imgui.text('name: "%s"'%str(thing.name))
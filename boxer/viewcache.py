@@ -0,0 +1,92 @@
+"""offscreen caches of ContainerView contents
+
+A `ContainerView` subclass with `cache_to_texture = True` is drawn (`.draw_instance()`)
+into its own framebuffer texture, and the root `Container.draw()` copies the
+cached pixels into the window every frame. The view is only drawn again when it
+reports a change with `ContainerView.invalidate()`, or when its leaf's rectangle
+changes.
+
+Cached views are opaque: the cache is cleared to the window's clear colour, and
+copied over the window with `glBlitFramebuffer()` (no blending), so views must
+not expect to draw over other content.
+"""
+import math
+
+import pyglet
+from pyglet import gl
+
+
+class ViewCache:
+    """framebuffer + colour texture holding one view's last drawn frame"""
+
+    def __init__(self):
+        self.framebuffer : pyglet.image.buffer.Framebuffer = None
+        self.texture : pyglet.image.Texture = None
+        self.rect = None            # window rect ( x, y, width, height ) of the cached frame
+        self.render_count = 0
+
+
+    def needs_render(self, view, rect : tuple) -> bool:
+        """True if `view` changed, or moved/resized to `rect`, since it was cached"""
+        return rect != self.rect or not getattr( view, "_cache_valid", False )
+
+
+    def _resize(self, width : int, height : int) -> None:
+        if self.texture is not None and self.texture.width == width and self.texture.height == height:
+            return
+        self.delete()
+        self.texture = pyglet.image.Texture.create( width, height )
+        self.framebuffer = pyglet.image.buffer.Framebuffer()
+        self.framebuffer.attach_texture( self.texture )
+
+
+    def render(self, view, window, rect : tuple) -> None:
+        """draw `view` into the cache, with the window projection of `rect`
+        (so the view draws in window coordinates, as it does uncached)"""
+        x, y, width, height = rect
+        ratio = window.get_pixel_ratio()
+        self._resize( max( 1, math.ceil( width * ratio ) ), max( 1, math.ceil( height * ratio ) ) )
+
+        viewport = ( gl.GLint * 4 )()
+        gl.glGetIntegerv( gl.GL_VIEWPORT, viewport )
+        clear_color = ( gl.GLfloat * 4 )()
+        gl.glGetFloatv( gl.GL_COLOR_CLEAR_VALUE, clear_color )
+        projection = window.projection
+
+        self.framebuffer.bind()
+        gl.glViewport( 0, 0, self.texture.width, self.texture.height )
+        gl.glClearColor( clear_color[0], clear_color[1], clear_color[2], 1.0 )
+        gl.glClear( gl.GL_COLOR_BUFFER_BIT )
+        window.projection = pyglet.math.Mat4.orthogonal_projection( x, x + width, y, y + height, -255, 255 )
+        try:
+            view.draw_instance()
+        finally:
+            window.projection = projection
+            self.framebuffer.unbind()
+            gl.glViewport( *viewport )
+
+        self.rect = rect
+        view._cache_valid = True
+        self.render_count += 1
+
+
+    def composite(self, window) -> None:
+        """copy the cached frame into the window's framebuffer, at `.rect`"""
+        if self.framebuffer is None:
+            return
+        ratio = window.get_pixel_ratio()
+        x0 = int( self.rect[0] * ratio )
+        y0 = int( self.rect[1] * ratio )
+        gl.glBindFramebuffer( gl.GL_READ_FRAMEBUFFER, self.framebuffer.id )
+        gl.glBindFramebuffer( gl.GL_DRAW_FRAMEBUFFER, 0 )
+        gl.glBlitFramebuffer( 0, 0, self.texture.width, self.texture.height,
+                            x0, y0, x0 + self.texture.width, y0 + self.texture.height,
+                            gl.GL_COLOR_BUFFER_BIT, gl.GL_NEAREST )
+        gl.glBindFramebuffer( gl.GL_FRAMEBUFFER, 0 )
+
+
+    def delete(self) -> None:
+        if self.framebuffer is not None:
+            self.framebuffer.delete()
+        self.framebuffer = None
+        self.texture = None
@@ -35,7 +35,7 @@ def main():
 
     app = boxer.application.Application(name = "boxer")
 
-    pyglet.app.run()
+    app.run()
 
     # app.imgui_renderer.shutdown()
 
@@ -0,0 +1,34 @@
+"""shared test setup"""
+import os
+import sys
+
+import imgui
+import pytest
+
+
+def pytest_configure( config ) -> None:
+    # boxer.shaders resolves its program cache directory on import, which happens
+    # when test modules are collected, so the variable is set before that. Tests
+    # never write program binaries into the user's ~/.cache/boxer/shaders, it's
+    # disabled until the fixture below points it at the test's tmp_path
+    os.environ["BOXER_SHADER_CACHE"] = "0"
+
+
+@pytest.fixture( autouse = True )
+def _shader_cache_in_tmp_path( tmp_path, monkeypatch ) -> None:
+    """programs compiled by a test are cached in its tmp_path"""
+    cache_dir = str( tmp_path / "shaders" )
+    monkeypatch.setenv( "BOXER_SHADER_CACHE", cache_dir )
+    shaders = sys.modules.get( "boxer.shaders" )
+    if shaders is not None:
+        monkeypatch.setattr( shaders, "program_cache_dir", cache_dir )
+
+
+@pytest.fixture
+def imgui_context():
+    """an imgui context for the test, which doesn't save an imgui.ini into the
+    working directory"""
+    context = imgui.create_context()
+    imgui.get_io().ini_file_name = None
+    yield context
+    imgui.destroy_context( context )
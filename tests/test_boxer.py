@@ -16,4 +16,5 @@ import boxer.background
 
 def test_boxer_background():
     background = boxer.background.Background()
-    assert type(background).__name__ == "Background"
\ No newline at end of file
+    assert type(background).__name__ == "Background"
+    background.dispose()
@@ -1,5 +1,16 @@
 """boxer.Container tests"""
+import json
+import types
+
+import imgui
 import pyglet.math
+import pytest
+from pyglet import gl
+
+import boxer.application
+import boxer.layout
+import boxer.plugins.graph_view
+import boxer.redraw
 from boxer import containers
 
 
@@ -204,7 +215,6 @@ def test_Container_get_root_container() -> None:
 def test_Container_action_close_with_no_parent() -> None :
     """test that closing a root container (container with no parent)
     raises a RuntimeWarning"""
-    import pytest
     c_parent = containers.Container(name="root")
     with pytest.raises(RuntimeError, match='closing a root container is not allowed yet'):
         containers.Container.change_container( c_parent, containers.Container.ACTION_CLOSE )
@@ -304,7 +314,6 @@ def test_register_ContainerView_type() -> None:
 # ------------------------------------------------------------------------------
 # raise exception in incorrect register ContainerView type
 def test_register_ContainerView_type_exception() -> None:
-    import pytest
     class RedHerring():
         ...
     with pytest.raises(RuntimeError, match='is not a subclass of ContainerView, cannot register view_type to Container'):
@@ -394,7 +403,6 @@ def test_ContainerView_subclass_register_name_to_container_views() -> None:
 # subclass of ContainerView must redefine the class attribute 'string_name' to
 # give it a pretty identifier
 def test_ContainerView_subclass_string_name_not_defined() -> None:
-    import pytest
     with pytest.raises( RuntimeError, match='subclasses of ContainerView must redefine "string_name" variable'):
         class NewView( containers.ContainerView ):
             def __init__( self, batch = None ):
@@ -403,7 +411,6 @@ def test_ContainerView_subclass_string_name_not_defined() -> None:
                 ...
 
 def test_ContainerView_subclass_string_name_base() -> None:
-    import pytest
     with pytest.raises( RuntimeError, match='subclasses of ContainerView must redefine "string_name" variable'):
         class NewView( containers.ContainerView ):
             string_name = "base"
@@ -413,7 +420,6 @@ def test_ContainerView_subclass_string_name_base() -> None:
                 ...
 
 def test_ContainerView_subclass_string_name_None() -> None:
-    import pytest
     with pytest.raises( RuntimeError, match='subclasses of ContainerView must redefine "string_name" variable'):
         class NewView( containers.ContainerView ):
             string_name = None
@@ -465,3 +471,709 @@ def test_ContainerView_dimensions_update_geometries() -> None:
     assert(cv.width==789)
     assert(cv.height==1011)
 
+
+
+# ------------------------------------------------------------------------------
+# incremental layout (dirty flags)
+def _record_node_geometry_updates( nodes ) -> list:
+    """wrap .update_node_geometry on instances, return a list collecting the names
+    of the nodes that were updated"""
+    updated = []
+    for n in nodes:
+        def _wrapped( _n = n, _original = n.update_node_geometry ):
+            updated.append( _n.name )
+            _original()
+        n.update_node_geometry = _wrapped
+    return updated
+
+
+def test_Container_invalidate_geometry_flags_ancestors() -> None:
+    c = containers.Container(name="root")
+    leaves = containers.Container.change_container( c, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    leaves_2 = containers.Container.change_container( leaves[0], containers.Container.ACTION_SPLIT_VERTICAL )
+    assert not c.geometry_dirty
+    vsplit = leaves_2[0].parent
+    vsplit.invalidate_geometry()
+    assert c.geometry_dirty
+    assert vsplit.parent.geometry_dirty
+    assert not leaves[1].geometry_dirty
+
+
+def test_Container_update_dirty_geometries_only_dirty_subtree() -> None:
+    c = containers.Container(name="root")
+    leaves = containers.Container.change_container( c, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    leaves_2 = containers.Container.change_container( leaves[0], containers.Container.ACTION_SPLIT_VERTICAL )
+    vsplit = leaves_2[0].parent
+    hsplit = vsplit.parent
+
+    updated = _record_node_geometry_updates( [c, hsplit, vsplit, leaves[1]] + leaves_2 )
+    vsplit.ratio = 0.25
+    vsplit.invalidate_geometry()
+    c.update_dirty_geometries()
+
+    assert sorted(updated) == sorted( [vsplit.name, leaves_2[0].name, leaves_2[1].name] )
+    assert not c.geometry_dirty
+
+    # a second pass with nothing dirty touches nothing
+    updated.clear()
+    c.update_dirty_geometries()
+    assert updated == []
+
+
+# ------------------------------------------------------------------------------
+# array backed layout (boxer.layout)
+def _build_split_tree( root, depth ) -> None:
+    """split every leaf `depth` times, alternating directions and ratios"""
+    leaves = [ root ]
+    for d in range(depth):
+        action = containers.Container.ACTION_SPLIT_HORIZONTAL if d%2==0 else containers.Container.ACTION_SPLIT_VERTICAL
+        new_leaves = []
+        for i, leaf in enumerate(leaves):
+            new_leaves += containers.Container.change_container( leaf, action )
+            new_leaves[-1].parent.ratio = 0.3 + 0.1 * (i%4)
+        leaves = new_leaves
+
+
+def _tree_rects( root ) -> list:
+    rects = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        rects.append( (node.name, node.position.x, node.position.y, node.width, node.height) )
+        stack.extend( [c for c in node.children if c is not None] )
+    return rects
+
+
+def test_LayoutStore_matches_recursive_layout() -> None:
+    recursive_root = containers.Container( name="root", position=pyglet.math.Vec2(13,7), width=1013, height=611, use_explicit_dimensions=True )
+    array_root = containers.Container( name="root", position=pyglet.math.Vec2(13,7), width=1013, height=611, use_explicit_dimensions=True, array_layout=True )
+    _build_split_tree( recursive_root, 4 )
+    _build_split_tree( array_root, 4 )
+    recursive_root.update()
+    array_root.update()
+    assert array_root._layout_store is not None
+    assert len(array_root._layout_store) == 32
+    assert _tree_rects( array_root ) == _tree_rects( recursive_root )
+
+
+def test_LayoutStore_container_is_view_over_row() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True, array_layout=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    store = root._layout_store
+    split = leaves[0].parent
+    split.ratio = 0.25
+    assert store.ratio[split._layout_row] == 0.25
+    split.invalidate_geometry()
+    root.update_dirty_geometries()
+    assert leaves[1].position.x == 100
+    assert leaves[1].width == store.width[leaves[1]._layout_row] == 300
+
+
+def test_LayoutStore_detach_on_close() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True, array_layout=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_VERTICAL )
+    split = leaves[0].parent
+    containers.Container.change_container( leaves[1], containers.Container.ACTION_CLOSE )
+    assert split._layout_store is None
+    assert split.width == 400
+    assert leaves[0]._layout_store is root._layout_store
+
+
+# ------------------------------------------------------------------------------
+# mouse routing
+def _handler_count( window ) -> int:
+    return sum( len(frame) for frame in window._event_stack )
+
+
+def test_Container_mouse_router_handler_count_constant() -> None:
+    root = containers.Container( name="root", width=800, height=600, use_explicit_dimensions=True )
+    root.update()
+    count = _handler_count( root.window )
+    _build_split_tree( root, 4 )
+    assert _handler_count( root.window ) == count
+
+
+def test_Container_get_leaf_at() -> None:
+    root = containers.Container( name="root", width=800, height=600, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    leaves_2 = containers.Container.change_container( leaves[1], containers.Container.ACTION_SPLIT_VERTICAL )
+    leaf, path = root.get_leaf_at( 100, 300 )
+    assert leaf is leaves[0]
+    assert path == [ leaves[0].parent ]
+    leaf, path = root.get_leaf_at( 600, 500 )
+    assert leaf is leaves_2[1]
+    assert path == [ leaves[0].parent, leaves_2[0].parent ]
+    leaf, path = root.get_leaf_at( 900, 500 )
+    assert leaf is None
+
+
+def test_Container_routed_mouse_enter_exit_on_leaf_change() -> None:
+    root = containers.Container( name="root", width=800, height=600, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    events = []
+    root.push_handlers( mouse_entered = lambda c: events.append( ("entered", c.name) ),
+                        mouse_exited = lambda c: events.append( ("exited", c.name) ) )
+    root.on_routed_mouse_motion( 100, 300, 0, 0 )
+    root.on_routed_mouse_motion( 110, 310, 10, 10 )
+    root.on_routed_mouse_motion( 700, 300, 590, -10 )
+    assert events == [ ("entered", leaves[0].name),
+                      ("exited", leaves[0].name), ("entered", leaves[1].name) ]
+    assert leaves[1].mouse_inside and not leaves[0].mouse_inside
+
+
+# ------------------------------------------------------------------------------
+# shared outline renderer (boxer.outlines)
+def test_OutlineRenderer_shared_per_batch() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    renderer = root._outline_renderer
+    assert all( leaf._outline_renderer is renderer for leaf in leaves )
+    # root, split (+ ratio line), two leaves
+    assert len(renderer) == 4 + 5 + 4 + 4
+    assert renderer.get_segment( leaves[1]._outline_slot ) == (201.0, 1.0, 201.0, 199.0)
+
+
+def test_OutlineRenderer_slots_released_on_close() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_VERTICAL )
+    renderer = root._outline_renderer
+    slot = leaves[1]._outline_slot
+    containers.Container.change_container( leaves[1], containers.Container.ACTION_CLOSE )
+    assert leaves[1]._outline_slot is None
+    assert renderer.get_color( slot )[3] == 0
+    assert len(renderer) == 4 + 4
+    # released slots are reused
+    leaves = containers.Container.change_container( leaves[0], containers.Container.ACTION_SPLIT_VERTICAL )
+    assert renderer.end == 4 + 5 + 4 + 4 + 4
+
+
+# ------------------------------------------------------------------------------
+# structure indexes
+def test_Container_update_structure_indexes() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    leaves_2 = containers.Container.change_container( leaves[1], containers.Container.ACTION_SPLIT_VERTICAL )
+    assert root.leaves == [ leaves[0] ] + leaves_2
+    for i, c in enumerate( root.containers_by_id ):
+        assert c._node_id == i
+        assert root.get_container_by_id( i ) is c
+        assert c.root_container is root
+    assert root.get_container_by_path( "root/root_hsplit/root_hsplit_cright_vsplit/root_hsplit_cright_vsplit_ctop" ) is leaves_2[1]
+    assert root.get_container_by_name( "root_hsplit_cleft" ) is leaves[0]
+    assert leaves_2[1]._depth == 3
+    assert not root.has_container( leaves[1] )
+
+
+def test_Container_get_root_container_cache_invalidated() -> None:
+    root = containers.Container( name="root" )
+    child = containers.Container( name="child" )
+    assert child.get_root_container() is child
+    root.add_child( child )
+    assert child.get_root_container() is root
+    root.remove_child( child )
+    assert child.get_root_container() is child
+
+
+# ------------------------------------------------------------------------------
+# layout transactions
+def test_Container_transaction_single_update() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    updates = []
+    _original_update = root.update
+    def _update():
+        updates.append( 1 )
+        _original_update()
+    root.update = _update
+    events = []
+    root.push_handlers( split = lambda c, leaves, r: events.append( ("split", c, leaves) ),
+                        collapsed = lambda c, r: events.append( ("collapsed", c) ) )
+
+    with root.transaction():
+        leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+        leaves_2 = containers.Container.change_container( leaves[1], containers.Container.ACTION_SPLIT_VERTICAL )
+        leaves_3 = containers.Container.change_container( leaves_2[0], containers.Container.ACTION_SPLIT_HORIZONTAL )
+        containers.Container.change_container( leaves_3[1], containers.Container.ACTION_CLOSE )
+        assert updates == []
+        assert events == []
+
+    assert updates == [1]
+    # one coalesced split of the root, reporting the final leaves
+    assert events == [ ("split", root, [ leaves[0], leaves_3[0], leaves_2[1] ]) ]
+    assert root.leaves == [ leaves[0], leaves_3[0], leaves_2[1] ]
+    assert leaves_3[0].width == leaves[0].width + 1
+
+
+def test_Container_transaction_nested() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    root.begin_transaction()
+    with root.transaction():
+        containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    assert root.in_transaction
+    assert root.leaves == []
+    root.commit_transaction()
+    assert len(root.leaves) == 2
+
+
+# ------------------------------------------------------------------------------
+# offscreen view caches
+def test_Container_view_cache_redraws_only_invalidated_views() -> None:
+    class CachedView( containers.ContainerView ):
+        string_name = "cached view"
+        cache_to_texture = True
+        def __init__( self ):
+            self.draws = 0
+            self.batch = pyglet.graphics.Batch()
+            self.rect = pyglet.shapes.Rectangle( 0, 0, 10, 10, color=(255, 0, 0, 255), batch=self.batch )
+        def update_geometries(self, container):
+            super().update_geometries( container )
+            self.rect.position = ( container.position.x, container.position.y )
+        def draw_instance(self):
+            self.draws += 1
+            self.batch.draw()
+
+    window = pyglet.window.Window( 400, 200, visible=False )
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    for leaf in leaves:
+        containers.Container.change_container_view( leaf, [ "cached view", CachedView ] )
+    views = [ root.container_views[leaf] for leaf in leaves ]
+    root.window = window
+
+    root.draw_view_caches()
+    assert [ view.draws for view in views ] == [1, 1]
+    root.draw_view_caches()
+    assert [ view.draws for view in views ] == [1, 1]
+
+    # only the reported view is drawn again
+    views[1].invalidate()
+    root.draw_view_caches()
+    assert [ view.draws for view in views ] == [1, 2]
+
+    # the view drew in window coordinates, into the bottom left of its cache
+    cache = root.view_caches[ views[1] ]
+    assert cache.rect == ( leaves[1].position[0], leaves[1].position[1], leaves[1].width, leaves[1].height )
+    pixel = ( gl.GLubyte * 4 )()
+    gl.glBindFramebuffer( gl.GL_READ_FRAMEBUFFER, cache.framebuffer.id )
+    gl.glReadPixels( 2, 2, 1, 1, gl.GL_RGBA, gl.GL_UNSIGNED_BYTE, pixel )
+    gl.glBindFramebuffer( gl.GL_FRAMEBUFFER, 0 )
+    assert tuple( pixel )[:3] == (255, 0, 0)
+
+    # resizing redraws
+    root.width = 300
+    root.update_geometries()
+    root.draw_view_caches()
+    assert [ view.draws for view in views ] == [2, 3]
+    root.disconnect_mouse_router()
+    window.close()
+
+
+def test_GraphView_is_cached_and_redrawn_on_changes() -> None:
+    window = pyglet.window.Window( 400, 200, visible=False )
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    containers.Container.change_container_view( leaves[0], [ "Graph", boxer.plugins.graph_view.GraphView ] )
+    view = root.container_views[leaves[0]]
+    root.window = window
+    assert boxer.plugins.graph_view.GraphView.cache_to_texture
+
+    root.draw_view_caches()
+    cache = root.view_caches[view]
+    assert cache.render_count == 1
+    root.draw_view_caches()
+    assert cache.render_count == 1
+
+    # camera moves and canvas changes redraw the cache
+    view.camera.start()
+    root.draw_view_caches()
+    assert cache.render_count == 2
+    view.canvas.background.set_colour_one( (0.1, 0.2, 0.3) )
+    root.draw_view_caches()
+    assert cache.render_count == 3
+    # and so does a restored camera
+    transforms = []
+    view.camera.push_handlers( transform_changed = transforms.append )
+    saved = view.camera.as_json()
+    saved["transform"] = pyglet.math.Mat4.from_scale( pyglet.math.Vec3( 2.0, 2.0, 1.0 ) )
+    view.from_json( { "camera" : saved } )
+    assert transforms == [ saved["transform"] ]
+    root.draw_view_caches()
+    assert cache.render_count == 4
+    view.camera.pop_handlers()
+
+    containers.Container.change_container_view( leaves[0], containers.Container.container_view_types[0] )
+    root.disconnect_mouse_router()
+    window.close()
+
+
+# ------------------------------------------------------------------------------
+# layout snapshots
+class SnapshotView( containers.ContainerView ):
+    string_name = "snapshot view"
+    def __init__( self ):
+        self.value = 0
+    def as_json(self) -> dict:
+        return { "value": self.value }
+    def from_json(self, data) -> None:
+        self.value = data["value"]
+
+
+def test_Container_layout_snapshot_roundtrip() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    leaves_2 = containers.Container.change_container( leaves[1], containers.Container.ACTION_SPLIT_VERTICAL )
+    leaves_2[0].parent.parent.ratio = 0.25
+    leaves_2[0].parent.ratio_mode = containers.SplitContainer.RATIO_MODE_FIXED_0
+    containers.Container.change_container_view( leaves_2[1], [ "snapshot view", SnapshotView ] )
+    root.container_views[ leaves_2[1] ].value = 7
+    root.update()
+    data = json.loads( json.dumps( root.as_json() ) )
+    rects = _tree_rects( root )
+
+    restored = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    restored.restore_layout( data )
+    assert restored.as_json() == data
+    assert _tree_rects( restored ) == rects
+    view = restored.container_views[ restored.leaves[2] ]
+    assert isinstance( view, SnapshotView ) and view.value == 7
+
+    # restoring over an existing tree replaces it, and its views
+    old_view = root.container_views[ leaves_2[1] ]
+    root.restore_layout( { "type": "Container", "name": "root" } )
+    assert root.leaves == [ root ]
+    assert root.container_views == {}
+    assert old_view._disposed
+
+
+def test_Container_restore_layout_single_update() -> None:
+    def _split( name, depth ) -> dict:
+        if depth == 0:
+            return { "type": "Container", "name": name, "view": { "type": "snapshot view", "state": { "value": depth } } }
+        return { "type": "HSplitContainer" if depth%2 else "VSplitContainer", "name": name, "ratio": 0.4,
+                "ratio_mode": containers.SplitContainer.RATIO_MODE_RATIO,
+                "children": [ _split( name + "a", depth-1 ), _split( name + "b", depth-1 ) ] }
+    data = { "type": "Container", "name": "root", "children": [ _split( "s", 9 ) ] }
+
+    root = containers.Container( name="root", width=1600, height=1000, use_explicit_dimensions=True )
+    updates = []
+    _original_update = root.update
+    def _update():
+        updates.append( 1 )
+        _original_update()
+    root.update = _update
+    views_changed = []
+    root.push_handlers( view_changed = lambda c, v: views_changed.append( c ) )
+
+    root.restore_layout( data )
+    assert updates == [1]
+    assert len( root.leaves ) == 512
+    assert len( views_changed ) == 512
+    leaf = root.containers_by_name["saaaaaaaaa"]
+    assert leaf.parent.ratio == 0.4
+    assert leaf.width > 0 and leaf.height > 0
+
+
+def test_Container_apply_layout_reuses_containers_and_views() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    for leaf in leaves:
+        containers.Container.change_container_view( leaf, [ "snapshot view", SnapshotView ] )
+    views = [ root.container_views[leaf] for leaf in leaves ]
+    views[1].value = 3
+    data = root.as_json()
+    nodes = list( root.containers_by_id )
+
+    # the same layout changes nothing
+    stats = root.apply_layout( data )
+    assert stats == dict.fromkeys( stats, 0 )
+    assert root.containers_by_id == nodes
+    assert [ root.container_views[leaf] for leaf in leaves ] == views
+
+    # horizontal to vertical split: only the split is replaced, the leaves and views stay
+    split = data["children"][0]
+    split["type"] = "VSplitContainer"
+    split["children"][1]["view"]["state"]["value"] = 5
+    stats = root.apply_layout( data )
+    assert ( stats["containers_created"], stats["containers_removed"] ) == (1, 1)
+    assert ( stats["views_created"], stats["views_moved"], stats["views_removed"] ) == (0, 0, 0)
+    assert isinstance( root.children[0], containers.VSplitContainer )
+    assert root.leaves == leaves
+    assert [ root.container_views[leaf] for leaf in leaves ] == views
+    assert views[1].value == 5
+
+    # splitting a leaf keeps it as the first child, with its view
+    split["children"][1] = { "type": "HSplitContainer", "name": "new_split", "ratio": 0.5, "ratio_mode": 0,
+                            "children": [ split["children"][1], { "type": "Container", "name": "new_leaf" } ] }
+    stats = root.apply_layout( data )
+    assert stats["containers_created"] == 2 and stats["containers_removed"] == 0
+    assert root.leaves == [ leaves[0], leaves[1], root.containers_by_name["new_leaf"] ]
+    assert root.container_views[ leaves[1] ] is views[1]
+
+    # a view moves to the container that now wants its type, the other is disposed of
+    data["children"] = [ { "type": "Container", "name": "only", "view": { "type": "snapshot view", "state": { "value": 3 } } } ]
+    stats = root.apply_layout( data )
+    assert ( stats["views_created"], stats["views_moved"], stats["views_removed"] ) == (0, 1, 1)
+    assert list( root.container_views.values() ) == [ views[0] ]
+    assert views[1]._disposed and not getattr( views[0], "_disposed", False )
+    assert root.leaves[0].name == "only"
+
+
+def test_Container_apply_layout_updates_indexes() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True, array_layout=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    old_split = leaves[0].parent
+    assert old_split.get_root_container() is root
+    data = root.as_json()
+    data["children"][0]["type"] = "VSplitContainer"
+    data["children"][0]["name"] = "root_vsplit"
+    root.apply_layout( data )
+
+    new_split = root.children[0]
+    assert isinstance( new_split, containers.VSplitContainer )
+    assert leaves[0].parent is new_split
+    # the dropped split is out of the tree and the indexes
+    assert old_split.parent is None
+    assert old_split.get_root_container() is old_split
+    assert old_split not in root.containers_by_id
+    assert root.containers_by_name.get( old_split.name ) is None
+    assert root.get_container_by_path( "root/root_vsplit/%s"%leaves[0].name ) is leaves[0]
+    assert leaves[0].get_root_container() is root
+    # and the layout store lays out the new split
+    store = new_split._layout_store
+    assert store is not None and store.kind[ new_split._layout_row ] == boxer.layout.KIND_VSPLIT
+    assert leaves[0].width == 400 and leaves[1].position.y > leaves[0].position.y
+
+
+# ------------------------------------------------------------------------------
+# fixed split modes, grids and N-way splits
+def test_SplitContainer_fixed_ratio_modes() -> None:
+    for array_layout in ( False, True ):
+        root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True, array_layout=array_layout )
+        leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+        split = leaves[0].parent
+        split.ratio_mode = containers.SplitContainer.RATIO_MODE_FIXED_0
+        split.fixed_size = 100
+        root.update_geometries()
+        assert leaves[0].width == 99
+        root.width = 600
+        root.update_geometries()
+        assert leaves[0].width == 99 and leaves[1].width == 500
+
+        # switching modes keeps the split where it is
+        split.set_ratio_mode( containers.SplitContainer.RATIO_MODE_FIXED_1 )
+        assert split.fixed_size == 500
+        root.width = 800
+        root.update_dirty_geometries()
+        root.update_geometries()
+        assert leaves[1].width == 500 and leaves[0].width == 299
+        assert leaves[1].position.x == 300
+
+
+def test_GridContainer_tracks_one_pass( monkeypatch ) -> None:
+    root = containers.Container( name="root", width=800, height=800, use_explicit_dimensions=True )
+    grid = containers.GridContainer( name="grid", window=root.window, batch=root.batch, columns=8, rows=8, create_default_children=True )
+    root.add_child( grid )
+    root.update()
+
+    # one node and 14 edge handles for 64 panes
+    assert len( root.containers_by_id ) == 66
+    assert len( grid.split_handles ) == 14
+    calls = []
+    _solve_tracks = containers.GridContainer.solve_tracks
+    monkeypatch.setattr( containers.GridContainer, "solve_tracks", staticmethod( lambda *args: calls.append( 1 ) or _solve_tracks( *args ) ) )
+    root.width = 640
+    root.update_geometries()
+    assert len( calls ) == 2    # columns, rows
+
+    cell = grid.children[ 2 * 8 + 3 ]     # column 3, row 2
+    assert ( cell.position.x, cell.position.y ) == ( 240, 200 )
+    assert ( cell.width, cell.height ) == ( 79, 99 )
+    assert grid.children[-1].width == 80
+    assert root.get_leaf_at( 245, 205 )[0] is cell
+
+    # a fixed track keeps its size, the ratio tracks share the rest
+    grid.set_tracks( [ 100, 1, 1 ], 1, [ containers.GridContainer.TRACK_FIXED, 0, 0 ] )
+    assert grid.get_track_edges()[0] == [ 0.0, 100, 370, 640 ]
+    grid.move_track_edge( containers.GridContainer.AXIS_COLUMNS, 0, 150 )
+    assert grid.columns[0] == 150
+    # (the next edge stays where it was)
+    assert grid.get_track_edges()[0] == [ 0.0, 150, 370, 640 ]
+
+
+def test_GridContainer_close_and_snapshot() -> None:
+    root = containers.Container( name="root", width=600, height=300, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_GRID )
+    assert len( leaves ) == 4 and isinstance( leaves[0].parent, containers.GridContainer )
+
+    # closing a cell of a 2x2 grid leaves an empty leaf
+    empty = containers.Container.change_container( leaves[1], containers.Container.ACTION_CLOSE )
+    assert len( empty ) == 1 and root.leaves[1] is empty[0]
+
+    # an N-way split drops the track
+    nsplit = containers.HNSplitContainer( name="nsplit", window=root.window, batch=root.batch, columns=3, create_default_children=True )
+    leaves[2].replace_by( nsplit )
+    root.update()
+    assert len( nsplit.split_handles ) == 2
+    containers.Container.change_container( nsplit.children[1], containers.Container.ACTION_CLOSE )
+    assert len( nsplit.children ) == 2 and len( nsplit.split_handles ) == 1
+    assert nsplit.columns[0] == nsplit.columns[1]
+
+    data = root.as_json()
+    restored = containers.Container( name="root", width=600, height=300, use_explicit_dimensions=True )
+    restored.restore_layout( data )
+    assert restored.as_json() == data
+    assert _tree_rects( restored ) == _tree_rects( root )
+
+
+def test_NSplitContainer_close_to_one_track() -> None:
+    for nested in ( False, True ):
+        root = containers.Container( name="root", width=600, height=300, use_explicit_dimensions=True )
+        nsplit = containers.HNSplitContainer( name="nsplit", window=root.window, batch=root.batch, columns=3, create_default_children=True )
+        if nested:
+            leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_VERTICAL )
+            leaves[0].replace_by( nsplit )
+        else:
+            root.set_child( nsplit, 0 )
+        root.update()
+        grandparent = nsplit.parent
+        last = nsplit.children[2]
+
+        containers.Container.change_container( nsplit.children[0], containers.Container.ACTION_CLOSE )
+        assert len( nsplit.children ) == 2
+        # one track left, the split is replaced by it
+        containers.Container.change_container( nsplit.children[0], containers.Container.ACTION_CLOSE )
+        assert nsplit.parent is None and nsplit.children == []
+        assert last.parent is grandparent and last in grandparent.children
+        assert last.get_root_container() is root
+        assert last in root.containers_by_id and nsplit not in root.containers_by_id
+        assert last.width == grandparent.width
+
+
+# ------------------------------------------------------------------------------
+# frame paced resize and drags
+def test_Container_resizes_coalesce_to_one_layout() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    root.update_geometries()
+    updated = _record_node_geometry_updates( [ root ] + leaves )
+    # the window's resize events, through the application's handler (without
+    # creating an Application, which needs a multisampled window)
+    app = types.SimpleNamespace( container = root )
+    for width in range( 401, 450 ):
+        boxer.application.Application.on_resize( app, width, 326 )
+    assert updated == []
+    # the next frame lays out once
+    root.update_dirty_geometries()
+    assert updated == [ root.name, leaves[0].name, leaves[1].name ]
+    root.update_dirty_geometries()
+    assert len( updated ) == 3
+    assert ( root.width, root.height ) == ( 449, 300 )
+    assert leaves[1].position.x + leaves[1].width == 449
+
+
+def test_SplitContainer_preview_drag() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    root.update_geometries()
+    split = leaves[0].parent
+    handle = split.split_handle
+    renderer = split._outline_renderer
+    slot = split._ratio_line_slot
+    width_0 = leaves[0].width
+
+    containers.Container.preview_drag = True
+    try:
+        handle.selected = True
+        handle.position = pyglet.math.Vec2( 300, handle.position.y )
+        handle.update_position()
+        root.update_dirty_geometries()
+        # only the ratio line moved
+        assert split.ratio == 0.5 and leaves[0].width == width_0
+        assert renderer.get_segment( slot )[0] == 299.0
+
+        handle.dispatch_event( "released", 300, 100, pyglet.window.mouse.LEFT, 0 )
+        root.update_dirty_geometries()
+        assert split.ratio == 0.75
+        assert leaves[1].position.x == 300
+    finally:
+        containers.Container.preview_drag = False
+        handle.selected = False
+
+    # without preview the drag relayouts in the next pass
+    handle.selected = True
+    handle.position = pyglet.math.Vec2( 100, handle.position.y )
+    handle.update_position()
+    handle.selected = False
+    assert split.ratio == 0.25
+    root.update_dirty_geometries()
+    assert leaves[1].position.x == 100
+
+
+def test_SplitContainer_drag_events_coalesce_per_frame() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    root.update_geometries()
+    split = leaves[0].parent
+    handle = split.split_handle
+    ratios = []
+    handle.push_handlers( position_updated = lambda position: ratios.append( split.ratio ) )
+
+    class _Window( pyglet.event.EventDispatcher ):
+        def draw(self, dt):
+            root.update_dirty_geometries()
+    for event in boxer.redraw.RedrawScheduler.WINDOW_EVENTS:
+        _Window.register_event_type( event )
+
+    boxer.redraw.scheduler.attach( _Window() )
+    try:
+        handle.selected = True
+        for _ in range(16):
+            handle.on_mouse_drag( 0, 0, 5, 0, pyglet.window.mouse.LEFT, 0 )
+        assert split.ratio == 0.5
+        boxer.redraw.scheduler._draw( 0.0 )
+        # one move, one relayout
+        assert len( ratios ) == 1
+        assert split.ratio == 0.7
+        assert leaves[1].position.x == 280
+    finally:
+        boxer.redraw.scheduler.detach()
+        handle.selected = False
+
+
+# ------------------------------------------------------------------------------
+# leaf chrome
+def _imgui_frame( root, mouse = (-1.0, -1.0), down = False ):
+    io = imgui.get_io()
+    io.mouse_pos = mouse
+    io.mouse_down[0] = down
+    io.delta_time = 1.0 / 60.0
+    imgui.new_frame()
+    for leaf in root.leaves:
+        leaf.draw_leaf()
+    imgui.render()
+    return imgui.get_draw_data().commands_lists
+
+
+def test_Container_leaf_chrome_without_windows( imgui_context ) -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    leaves_2 = containers.Container.change_container( leaves[0], containers.Container.ACTION_SPLIT_HORIZONTAL )
+    containers.Container.change_container( leaves_2[0], containers.Container.ACTION_SPLIT_HORIZONTAL )
+    io = imgui.get_io()
+    io.display_size = ( root.window.width, root.window.height )
+    io.fonts.get_tex_data_as_rgba32()
+
+    # all chrome in one draw list, the ~50 pixel wide leaves draw none
+    assert [ leaf.width >= containers.Container.CHROME_MIN_WIDTH for leaf in root.leaves ] == [ False, False, True, True ]
+    lists = _imgui_frame( root )
+    assert len( lists ) == 1
+    assert lists[0].vtx_buffer_size == 2 * 3 * 4
+
+    # clicking the action button opens the leaf's popup, its only window
+    top = root.window.height - root.height
+    x = leaves[1].position.x + leaves[1].width - 15
+    _imgui_frame( root, ( x, top + 8 ), True )
+    assert leaves[1]._chrome_popups_open
+    assert len( _imgui_frame( root, ( x, top + 8 ) ) ) == 2
+    _imgui_frame( root, ( 250, top + 100 ), True )
+    _imgui_frame( root, ( 250, top + 100 ) )
+    assert not leaves[1]._chrome_popups_open
@@ -0,0 +1,135 @@
+"""boxer.events tests"""
+import pyglet
+
+import boxer.events
+from boxer import containers
+
+
+class _Window( pyglet.event.EventDispatcher ):
+    """stands in for a pyglet Window"""
+
+for _event in boxer.events.WINDOW_EVENTS:
+    _Window.register_event_type( _event )
+
+
+class _Node:
+    def __init__(self, parent = None):
+        self.parent = parent
+
+
+# ------------------------------------------------------------------------------
+# subscriptions
+def test_EventBus_priority_then_newest_first() -> None:
+    bus = boxer.events.EventBus()
+    calls = []
+    bus.subscribe( "on_key_press", lambda *args: calls.append( "a" ) )
+    bus.subscribe( "on_key_press", lambda *args: calls.append( "b" ) )
+    bus.subscribe( "on_key_press", lambda *args: calls.append( "high" ), priority = 10 )
+    bus.dispatch( "on_key_press", 1, 0 )
+    assert calls == [ "high", "b", "a" ]
+
+
+def test_EventBus_handled_stops_dispatch() -> None:
+    bus = boxer.events.EventBus()
+    calls = []
+    bus.subscribe( "on_key_press", lambda *args: calls.append( "low" ), priority = -1 )
+    bus.subscribe( "on_key_press", lambda *args: calls.append( "handler" ) or boxer.events.EVENT_HANDLED )
+    assert bus.dispatch( "on_key_press", 1, 0 ) == boxer.events.EVENT_HANDLED
+    assert calls == [ "handler" ]
+
+
+def test_EventBus_unsubscribe() -> None:
+    bus = boxer.events.EventBus()
+    calls = []
+    subscriptions = [ bus.subscribe( "on_key_press", lambda *args, i=i: calls.append( i ) ) for i in range(1000) ]
+    for subscription in subscriptions[1:]:
+        subscription.cancel()
+    assert len( bus ) == 1
+    bus.dispatch( "on_key_press", 1, 0 )
+    assert calls == [ 0 ]
+    subscriptions[0].cancel()
+    subscriptions[0].cancel()
+    assert len( bus ) == 0
+
+
+def test_EventBus_dispatch_calls_only_interested_subscribers() -> None:
+    bus = boxer.events.EventBus()
+    for i in range(500):
+        bus.subscribe( "on_mouse_motion", lambda *args: None, target = _Node() )
+        bus.subscribe( "on_key_release", lambda *args: None )
+    bus.subscribe( "on_key_press", lambda *args: None )
+    bus.dispatch( "on_key_press", 1, 0 )
+    bus.dispatch( "on_mouse_press", 0, 0, 1, 0 )
+    assert bus.dispatch_count == 1
+
+
+def test_EventBus_push_handlers_like_pyglet() -> None:
+    window = _Window()
+    bus = boxer.events.EventBus()
+    bus.attach( window )
+    calls = []
+
+    class _Listener:
+        def on_mouse_press( self, *args ):
+            calls.append( "press" )
+        def on_mouse_release( self, *args ):
+            calls.append( "release" )
+
+    listener = _Listener()
+    bus.push_handlers( listener )
+    window.dispatch_event( "on_mouse_press", 0, 0, 1, 0 )
+    window.dispatch_event( "on_mouse_release", 0, 0, 1, 0 )
+    bus.remove_handlers( listener )
+    window.dispatch_event( "on_mouse_press", 0, 0, 1, 0 )
+    assert calls == [ "press", "release" ]
+    assert len( window._event_stack ) == 1
+
+    bus.detach()
+    assert len( window._event_stack ) == 0
+
+
+# ------------------------------------------------------------------------------
+# routing
+def test_EventBus_capture_then_bubble() -> None:
+    bus = boxer.events.EventBus()
+    root = _Node()
+    middle = _Node( root )
+    leaf = _Node( middle )
+    calls = []
+    for name, node in ( ("root", root), ("middle", middle), ("leaf", leaf) ):
+        bus.subscribe( "on_mouse_press", lambda *args, name=name: calls.append( "capture " + name ), target = node, phase = boxer.events.CAPTURE )
+        bus.subscribe( "on_mouse_press", lambda *args, name=name: calls.append( "bubble " + name ), target = node )
+    bus.dispatch( "on_mouse_press", 0, 0, 1, 0, target = leaf )
+    assert calls == [ "capture root", "capture middle", "capture leaf", "bubble leaf", "bubble middle", "bubble root" ]
+
+    # a capture handler of an ancestor can stop the event before the target
+    calls.clear()
+    bus.subscribe( "on_mouse_press", lambda *args: calls.append( "stop" ) or boxer.events.EVENT_HANDLED,
+                target = middle, phase = boxer.events.CAPTURE, priority = 1 )
+    bus.dispatch( "on_mouse_press", 0, 0, 1, 0, target = leaf )
+    assert calls == [ "capture root", "stop" ]
+
+    bus.unsubscribe_target( middle )
+    calls.clear()
+    bus.dispatch( "on_mouse_press", 0, 0, 1, 0, target = leaf )
+    assert calls == [ "capture root", "capture leaf", "bubble leaf", "bubble root" ]
+
+
+def test_Container_routes_mouse_events_to_leaf() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    bus = root.event_bus
+    assert bus is boxer.events.for_window( root.window )
+    pressed = []
+    bus.subscribe( "on_mouse_press", lambda *args: pressed.append( "left" ), target = leaves[0] )
+    bus.subscribe( "on_mouse_press", lambda *args: pressed.append( "right" ), target = leaves[1] )
+    bus.subscribe( "on_mouse_press", lambda *args: pressed.append( "root" ), target = root )
+
+    # as forwarded from the window
+    bus.dispatch( "on_mouse_motion", 300, 100, 0, 0 )
+    bus.dispatch( "on_mouse_press", 300, 100, pyglet.window.mouse.LEFT, 0 )
+    assert pressed == [ "right", "root" ]
+
+    # closed containers lose their subscriptions
+    containers.Container.change_container( leaves[1], containers.Container.ACTION_CLOSE )
+    assert not bus.has_subscribers( "on_mouse_press", leaves[1] )
@@ -1,5 +1,12 @@
 """boxer.Container tests"""
+import math
+
+import numpy as np
 import pyglet.math
+import pytest
+from pyglet import gl
+
+import boxer.redraw
 from boxer import handles
 
 def test_Handle_position_getset_x() -> None:
@@ -69,3 +76,341 @@ def test_BoxHandle_is_inside_using_in() -> None:
 
     assert h.is_inside( pyglet.math.Vec2( 10.0, 10.0 ) ) == True
 
+
+
+def test_BoxHandle_hit_bounds() -> None:
+    h = handles.BoxHandle( position = pyglet.math.Vec2( 10.0, 20.0 ), hit_width = 30.0, hit_height = 40.0 )
+    assert h.hit_bounds() == ( 10.0, 20.0, 40.0, 60.0 )
+    h.set_shape_anchors()
+    assert h.hit_bounds() == ( -5.0, 0.0, 25.0, 40.0 )
+
+
+# ------------------------------------------------------------------------------
+# drags
+
+class _Window( pyglet.event.EventDispatcher ):
+    """stands in for the window of the default redraw scheduler"""
+    def draw(self, dt):
+        pass
+
+for _event in boxer.redraw.RedrawScheduler.WINDOW_EVENTS:
+    _Window.register_event_type( _event )
+
+
+def test_Handle_drag_applied_once_per_frame() -> None:
+    h = handles.PointHandle( position = pyglet.math.Vec2( 0.0, 0.0 ) )
+    updates = []
+    finished = []
+    h.push_handlers( position_updated = lambda position: updates.append( position ) )
+    h.push_handlers( drag_finished = lambda dx, dy: finished.append( ( dx, dy ) ) )
+
+    boxer.redraw.scheduler.attach( _Window() )
+    try:
+        h.set_hovered( True )
+        h.on_mouse_press( 0, 0, pyglet.window.mouse.LEFT, 0 )
+        # a high polling rate mouse, 16 events in a frame
+        for i in range(16):
+            h.on_mouse_drag( i, 0, 1, 2, pyglet.window.mouse.LEFT, 0 )
+        assert updates == [] and h.position == pyglet.math.Vec2( 0.0, 0.0 )
+        boxer.redraw.scheduler._draw( 0.0 )
+        assert updates == [ pyglet.math.Vec2( 16.0, 32.0 ) ]
+
+        h.on_mouse_drag( 16, 0, 4, 0, pyglet.window.mouse.LEFT, 0 )
+        h.on_mouse_release( 20, 0, pyglet.window.mouse.LEFT, 0 )
+        # the release applies the last moves, without waiting for the frame
+        assert updates[-1] == pyglet.math.Vec2( 20.0, 32.0 ) and len( updates ) == 2
+        assert finished == [ ( 20.0, 32.0 ) ]
+        boxer.redraw.scheduler._draw( 0.0 )
+        assert len( updates ) == 2
+    finally:
+        boxer.redraw.scheduler.detach()
+
+
+# ------------------------------------------------------------------------------
+# SpatialHash
+
+def test_SpatialHash_queries() -> None:
+    index = handles.SpatialHash( cell_size = 10.0, max_cells = 16 )
+    index.insert( "a", ( 0.0, 0.0, 5.0, 5.0 ) )
+    index.insert( "b", ( 25.0, 25.0, 35.0, 35.0 ) )
+    index.insert( "large", ( -1000.0, -1000.0, 1000.0, 1000.0 ) )
+    assert set( index.query_point( 2.0, 2.0 ) ) == { "a", "large" }
+    assert set( index.query_point( 31.0, 31.0 ) ) == { "b", "large" }
+    assert index.query_rect( ( 0.0, 0.0, 40.0, 40.0 ) ) == { "a", "b", "large" }
+
+    index.insert( "a", ( 30.0, 30.0, 32.0, 32.0 ) )
+    assert set( index.query_point( 2.0, 2.0 ) ) == { "large" }
+    index.remove( "b" )
+    index.remove( "large" )
+    assert index.query_point( 31.0, 31.0 ) == [ "a" ]
+    assert len( index ) == 1
+    assert index._cells.keys() == { ( 3, 3 ) }
+
+
+# ------------------------------------------------------------------------------
+# HandleManager
+
+def _grid_of_point_handles( manager, count, spacing = 40.0 ) -> list:
+    side = int( count ** 0.5 )
+    return [ manager.add( handles.PointHandle( name = "port_%s"%i,
+                    position = pyglet.math.Vec2( ( i % side ) * spacing, ( i // side ) * spacing ) ) )
+            for i in range( count ) ]
+
+
+def test_HandleManager_hover_tests_only_nearby_handles() -> None:
+    manager = handles.HandleManager()
+    ports = _grid_of_point_handles( manager, 10000 )
+    entered = []
+    ports[5050].push_handlers( mouse_entered = lambda: entered.append( "5050" ) )
+
+    manager.on_mouse_motion( 2002.0, 1998.0, 0, 0 )
+    assert manager.hovered is ports[5050]
+    assert ports[5050].hilighted
+    assert entered == [ "5050" ]
+    assert manager.tested_count <= 4
+
+    manager.on_mouse_motion( 2020.0, 2020.0, 0, 0 )
+    assert manager.hovered is None
+    assert not ports[5050].hilighted
+
+
+def test_HandleManager_press_drag_release() -> None:
+    manager = handles.HandleManager()
+    a, b = _grid_of_point_handles( manager, 4, spacing = 100.0 )[:2]
+    dragged = []
+    a.push_handlers( dragged = lambda x, y, dx, dy: dragged.append( ( dx, dy ) ) )
+
+    manager.on_mouse_motion( 1.0, 1.0, 0, 0 )
+    manager.on_mouse_press( 1.0, 1.0, pyglet.window.mouse.LEFT, 0 )
+    assert list( manager.selected ) == [ a ]
+    manager.on_mouse_drag( 101.0, 1.0, 100, 0, pyglet.window.mouse.LEFT, 0 )
+    assert dragged == [ ( 100, 0 ) ]
+    assert a.position == pyglet.math.Vec2( 100.0, 0.0 )
+    manager.on_mouse_release( 101.0, 1.0, pyglet.window.mouse.LEFT, 0 )
+    assert not manager.selected and not a.selected
+
+    # the dragged handle was re-indexed and raised, it's on top of b where it was dropped
+    manager.on_mouse_motion( 101.0, 1.0, 0, 0 )
+    assert manager.hovered is a
+    assert manager.handles_in( handles.Handle.SPACE_WORLD, ( 90.0, -10.0, 110.0, 10.0 ) ) == [ b, a ]
+    manager.on_mouse_motion( -50.0, 0.0, 0, 0 )
+    assert manager.handle_at( 0.0, 0.0 ) is None
+
+
+def test_HandleManager_dispose_removes_handle() -> None:
+    manager = handles.HandleManager()
+    ports = _grid_of_point_handles( manager, 4 )
+    manager.on_mouse_motion( 0.0, 0.0, 0, 0 )
+    assert manager.hovered is ports[0]
+    ports[0].dispose()
+    assert ports[0] not in manager and len( manager ) == 3
+    assert manager.hovered is None
+    assert manager.handle_at( 0.0, 0.0 ) is None
+
+
+# ------------------------------------------------------------------------------
+# instanced handles (boxer.handlerenderer)
+
+def test_instanced_handles_share_one_renderer() -> None:
+    batch = pyglet.graphics.Batch()
+    box = handles.BoxHandle( position = pyglet.math.Vec2( 10.0, 20.0 ), hit_width = 30.0, hit_height = 40.0,
+                            display_width = 20.0, display_height = 10.0, batch = batch, instanced = True )
+    points = [ handles.PointHandle( position = pyglet.math.Vec2( i * 50.0, 0.0 ), batch = batch, instanced = True ) for i in range(100) ]
+    renderer = box.renderer
+    assert all( p.renderer is renderer for p in points )
+    assert len( renderer ) == 101
+    assert not box._shapes and not points[0]._shapes and box.batch is None
+
+    row = renderer.get_row( box._slot )
+    assert row["center"] == ( 10.0, 20.0 )
+    assert row["sizes"] == ( 10.0, 5.0, 15.0, 20.0 )
+    assert box.hit_bounds() == ( -5.0, 0.0, 25.0, 40.0 )
+    assert box.is_inside( pyglet.math.Vec2( 0.0, 5.0 ) )
+    assert points[1].is_inside( pyglet.math.Vec2( 60.0, 0.0 ) )
+    assert not points[1].is_inside( pyglet.math.Vec2( 70.0, 0.0 ) )
+
+    # hover and select are writes into the handle's row
+    points[1].set_hovered( True )
+    assert renderer.get_row( points[1]._slot )["state"][0] > 0.4
+    points[1].on_mouse_press( 50.0, 0.0, pyglet.window.mouse.LEFT, 0 )
+    assert renderer.get_row( points[1]._slot )["state"][1] > 0.8
+    points[1].on_mouse_drag( 60.0, 5.0, 10, 5, pyglet.window.mouse.LEFT, 0 )
+    assert renderer.get_row( points[1]._slot )["center"] == ( 60.0, 5.0 )
+
+    # disposed handles free their row, which is reused
+    slot = points[1]._slot
+    points[1].dispose()
+    assert len( renderer ) == 100
+    assert renderer.get_row( slot )["state"] == ( 0.0, 0.0 )
+    assert handles.PointHandle( batch = batch, instanced = True )._slot == slot
+
+
+def test_instanced_handles_draw() -> None:
+    window = pyglet.window.Window( 200, 100, visible=False )
+    batch = pyglet.graphics.Batch()
+    box = handles.BoxHandle( position = pyglet.math.Vec2( 50.0, 50.0 ), display_width = 20.0, display_height = 20.0,
+                            batch = batch, instanced = True )
+    point = handles.PointHandle( position = pyglet.math.Vec2( 150.0, 50.0 ), display_radius = 8.0, batch = batch, instanced = True )
+    for _ in range(100):
+        handles.PointHandle( position = pyglet.math.Vec2( 150.0, 90.0 ), batch = batch, instanced = True )
+    assert box.renderer.vertex_list.domain.__class__.__name__ == "InstancedVertexDomain"
+
+    window.switch_to()
+    gl.glClearColor( 0.0, 0.0, 0.0, 1.0 )
+    window.clear()
+    batch.draw()
+    pixels = ( gl.GLubyte * ( 200 * 100 * 4 ) )()
+    gl.glReadPixels( 0, 0, 200, 100, gl.GL_RGBA, gl.GL_UNSIGNED_BYTE, pixels )
+    def pixel( x, y ):
+        return tuple( pixels[ ( y * 200 + x ) * 4 : ( y * 200 + x ) * 4 + 3 ] )
+    # display shapes in DEBUG_SHAPE_COLOR, nothing between the handles
+    assert pixel( 50, 50 )[0] > 100 and pixel( 150, 50 )[0] > 100
+    assert pixel( 100, 20 ) == ( 0, 0, 0 )
+    # the draw covers every slot, up to the last one handed out
+    gl.glClear( gl.GL_COLOR_BUFFER_BIT )
+    for slot in range( box.renderer.end - 1 ):
+        box.renderer.set_state( slot, 0.0, 0.0 )
+        box.renderer.set_position( slot, -100.0, -100.0 )
+    batch.draw()
+    gl.glReadPixels( 0, 0, 200, 100, gl.GL_RGBA, gl.GL_UNSIGNED_BYTE, pixels )
+    assert pixel( 150, 90 )[0] > 100 and pixel( 150, 50 ) == ( 0, 0, 0 )
+    window.close()
+
+
+# ------------------------------------------------------------------------------
+# HandleSelection
+
+def test_HandleSelection_modes() -> None:
+    a, b, c = ( handles.PointHandle( name = name ) for name in "abc" )
+    selection = handles.HandleSelection()
+    changes = []
+    selection.push_handlers( selection_changed = lambda selected: changes.append( [ h.name for h in selected ] ) )
+    selection.select( [ a, b ] )
+    selection.select( [ c ], handles.HandleSelection.ADD )
+    selection.select( [ a, c ], handles.HandleSelection.TOGGLE )
+    assert selection.handles == [ b ]
+    assert b.in_selection and not a.in_selection and not c.in_selection
+    selection.select( [ b ], handles.HandleSelection.ADD )
+    selection.select( [ c ] )
+    assert changes == [ [ "a", "b" ], [ "a", "b", "c" ], [ "b" ], [ "c" ] ]
+
+
+def test_HandleSelection_group_transforms() -> None:
+    batch = pyglet.graphics.Batch()
+    manager = handles.HandleManager()
+    nodes = [ manager.add( handles.PointHandle( position = pyglet.math.Vec2( i % 50 * 40.0, i // 50 * 40.0 ), batch = batch, instanced = True ) )
+            for i in range(2000) ]
+    selection = manager.selection
+    transformed = []
+    selection.push_handlers( transformed = lambda moved: transformed.append( len( moved ) ) )
+    selection.select( nodes )
+    start = selection.positions()
+
+    selection.move( 5.0, -5.0 )
+    assert np.allclose( selection.positions(), start + ( 5.0, -5.0 ) )
+    assert transformed == [ 2000 ]
+    renderer = nodes[0].renderer
+    assert renderer.get_row( nodes[1999]._slot )["center"] == ( 49 * 40.0 + 5.0, 39 * 40.0 - 5.0 )
+    # re-indexed for hit testing
+    assert manager.handle_at( 5.0, -5.0 ) is nodes[0]
+
+    selection.rotate( math.pi / 2.0, pivot = ( 5.0, -5.0 ) )
+    assert nodes[1].position.x == pytest.approx( 5.0 ) and nodes[1].position.y == pytest.approx( 35.0 )
+    selection.scale( 0.5, pivot = ( 5.0, -5.0 ) )
+    assert nodes[1].position.y == pytest.approx( 15.0 )
+    centroid = selection.centroid()
+    selection.scale( 2.0 )
+    assert np.allclose( selection.centroid(), centroid )
+
+
+def test_HandleSelection_group_drag_keeps_positions_in_one_array( monkeypatch ) -> None:
+    batch = pyglet.graphics.Batch()
+    manager = handles.HandleManager()
+    nodes = [ manager.add( handles.PointHandle( position = pyglet.math.Vec2( i * 40.0, 0.0 ), batch = batch, instanced = True ) )
+            for i in range(100) ]
+    selection = manager.selection
+    selection.select( nodes )
+    finished = []
+    nodes[-1].push_handlers( drag_finished = lambda dx, dy: finished.append( ( dx, dy ) ) )
+    # drag frames re-index in bulk, not handle by handle
+    updated = []
+    monkeypatch.setattr( manager, "update", updated.append )
+
+    for _ in range(5):
+        selection.drag( 20.0, 20.0 )
+    # the handles follow on release, the renderer rows and the index every frame
+    assert nodes[-1].position == ( 99 * 40.0, 0.0 )
+    assert np.allclose( selection.positions()[-1], ( 99 * 40.0 + 100.0, 100.0 ) )
+    assert nodes[-1].renderer.get_row( nodes[-1]._slot )["center"] == ( 99 * 40.0 + 100.0, 100.0 )
+    index = manager._indices[handles.Handle.SPACE_WORLD]
+    assert nodes[-1] in index.query_point( 99 * 40.0 + 100.0, 100.0 )
+    assert nodes[-1] not in index.query_point( 99 * 40.0, -5.0 )
+    assert updated == []
+
+    selection.finish_drag()
+    assert nodes[-1].position == ( 99 * 40.0 + 100.0, 100.0 )
+    assert finished == [ ( 100.0, 100.0 ) ]
+
+
+class _ZoomedMouse:
+    """a mouse at the window origin, with a camera zoomed in 2x"""
+    camera_zoom = 2.0
+    captured_by_ui = False
+    position = pyglet.math.Vec2( 0.0, 0.0 )
+    world_position = pyglet.math.Vec2( 0.0, 0.0 )
+
+
+def test_HandleManager_group_drag_of_mixed_spaces() -> None:
+    manager = handles.HandleManager( mouse = _ZoomedMouse() )
+    screen = manager.add( handles.PointHandle( position = pyglet.math.Vec2( 0.0, 0.0 ), space = handles.Handle.SPACE_SCREEN ) )
+    world = manager.add( handles.PointHandle( position = pyglet.math.Vec2( 200.0, 200.0 ) ) )
+    finished = {}
+    for handle in ( screen, world ):
+        handle.push_handlers( drag_finished = lambda dx, dy, handle = handle: finished.setdefault( handle.space, ( dx, dy ) ) )
+    manager.selection.select( [ screen, world ] )
+    left = pyglet.window.mouse.LEFT
+
+    manager.on_mouse_motion( 0.0, 0.0, 0, 0 )
+    manager.on_mouse_press( 0.0, 0.0, left, 0 )
+    manager.on_mouse_drag( 10.0, 20.0, 10, 20, left, 0 )
+    manager.on_mouse_release( 10.0, 20.0, left, 0 )
+    # the screen space handle follows the mouse, the world space one the zoomed move
+    assert screen.position == ( 10.0, 20.0 )
+    assert world.position == ( 205.0, 210.0 )
+    assert finished == { handles.Handle.SPACE_SCREEN : ( 10.0, 20.0 ), handles.Handle.SPACE_WORLD : ( 5.0, 10.0 ) }
+
+
+def test_HandleManager_click_band_and_group_drag() -> None:
+    manager = handles.HandleManager( band_select = True )
+    a, b, c, d = _grid_of_point_handles( manager, 4, spacing = 100.0 )
+    left = pyglet.window.mouse.LEFT
+
+    # band select a and b, then shift click d in
+    manager.on_mouse_motion( -50.0, -50.0, 0, 0 )
+    manager.on_mouse_press( -50.0, -50.0, left, 0 )
+    manager.on_mouse_drag( 150.0, 50.0, 200, 100, left, 0 )
+    assert manager.band == ( -50.0, -50.0, 150.0, 50.0 )
+    manager.on_mouse_release( 150.0, 50.0, left, 0 )
+    assert manager.selection.handles == [ a, b ] and manager.band is None
+    manager.on_mouse_motion( 100.0, 100.0, 0, 0 )
+    manager.on_mouse_press( 100.0, 100.0, left, pyglet.window.key.MOD_SHIFT )
+    manager.on_mouse_release( 100.0, 100.0, left, 0 )
+    assert manager.selection.handles == [ a, b, d ]
+
+    # dragging a selected handle moves the group, not just the handle
+    finished = []
+    d.push_handlers( drag_finished = lambda dx, dy: finished.append( ( dx, dy ) ) )
+    manager.on_mouse_motion( 0.0, 0.0, 0, 0 )
+    manager.on_mouse_press( 0.0, 0.0, left, 0 )
+    for _ in range(10):
+        manager.on_mouse_drag( 0.0, 0.0, 1, 2, left, 0 )
+    manager.on_mouse_release( 10.0, 20.0, left, 0 )
+    assert [ h.position for h in ( a, b, c, d ) ] == [ ( 10.0, 20.0 ), ( 110.0, 20.0 ), ( 0.0, 100.0 ), ( 110.0, 120.0 ) ]
+    assert finished == [ ( 10.0, 20.0 ) ]
+
+    # a click in empty space clears the selection (no band without a drag)
+    manager.on_mouse_motion( 500.0, 500.0, 0, 0 )
+    manager.on_mouse_press( 500.0, 500.0, left, 0 )
+    manager.on_mouse_release( 500.0, 500.0, left, 0 )
+    assert len( manager.selection ) == 0 and not a.in_selection
+
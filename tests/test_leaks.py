@@ -0,0 +1,104 @@
+import pyglet
+import pytest
+
+import boxer.background
+import boxer.leaks
+from boxer import containers
+
+
+class LeakTestView( containers.ContainerView ):
+    string_name = "leak test view"
+    def __init__( self ):
+        self.batch = pyglet.graphics.Batch()
+        self.rect = pyglet.shapes.Rectangle( 0, 0, 10, 10, batch=self.batch )
+    def update_geometries(self, container):
+        ...
+    def dispose(self) -> None:
+        if getattr( self, "_disposed", False ):
+            return
+        self.rect.delete()
+        super().dispose()
+
+
+_view_type = [ "leak test view", LeakTestView ]
+
+
+# tracking
+
+def test_track_counts_live_objects() -> None:
+    class Tracked:
+        ...
+    a = Tracked()
+    boxer.leaks.track( a )
+    assert boxer.leaks.live_counts()["Tracked"] == 1
+    del a
+    assert boxer.leaks.snapshot().get( "Tracked", 0 ) == 0
+
+
+def test_assert_no_growth_fails_on_leak() -> None:
+    kept = []
+    class Leaked:
+        ...
+    def leak():
+        obj = Leaked()
+        boxer.leaks.track( obj )
+        kept.append( obj )
+    with pytest.raises( AssertionError, match="Leaked" ):
+        boxer.leaks.assert_no_growth( leak, cycles=3 )
+
+
+# dispose
+
+def test_dispose_on_close() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    containers.Container.change_container_view( leaves[1], _view_type )
+    view = root.container_views[ leaves[1] ]
+    split = leaves[1].parent
+    containers.Container.change_container( leaves[1], containers.Container.ACTION_CLOSE )
+    assert view._disposed
+    assert leaves[1]._disposed
+    assert split._disposed
+    assert split.split_handle._shapes == {}
+    assert not leaves[0]._disposed
+    assert leaves[1] not in root.container_views
+
+
+def test_split_close_cycles_dont_leak() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+
+    def cycle():
+        new_leaves = containers.Container.change_container( leaves[1], containers.Container.ACTION_SPLIT_VERTICAL )
+        for leaf in new_leaves:
+            containers.Container.change_container_view( leaf, _view_type )
+        more_leaves = containers.Container.change_container( new_leaves[0], containers.Container.ACTION_SPLIT_HORIZONTAL )
+        containers.Container.change_container( more_leaves[1], containers.Container.ACTION_CLOSE_OTHERS )
+        remaining = root.leaves[0]
+        leaves[1] = containers.Container.change_container( remaining, containers.Container.ACTION_SPLIT_HORIZONTAL )[1]
+
+    boxer.leaks.assert_no_growth( cycle, cycles=4, warmup=2 )
+
+
+def test_grid_split_close_cycles_dont_leak() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+
+    def cycle():
+        leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_GRID )
+        containers.Container.change_container_view( leaves[3], _view_type )
+        containers.Container.change_container( leaves[0], containers.Container.ACTION_CLOSE )
+        containers.Container.change_container( root.leaves[0], containers.Container.ACTION_CLOSE_OTHERS )
+
+    boxer.leaks.assert_no_growth( cycle, cycles=4, warmup=2 )
+
+
+def test_undisposed_objects_are_reported( capsys ) -> None:
+    # __del__ doesn't release GL resources (it can run inside a vertex allocation),
+    # it reports the missing dispose()
+    background = boxer.background.Background()
+    del background
+    assert "Background collected without dispose()" in capsys.readouterr().out
+    background = boxer.background.Background()
+    background.dispose()
+    del background
+    assert "without dispose()" not in capsys.readouterr().out
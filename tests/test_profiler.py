@@ -0,0 +1,99 @@
+"""boxer.profiler tests"""
+import json
+
+import imgui
+
+import boxer.events
+import boxer.profiler
+from boxer import containers
+
+
+def _record_frame( profiler, leaves = 3 ) -> None:
+    profiler.begin_frame()
+    with profiler.span( "layout", "container" ):
+        pass
+    with profiler.span( "leaves", "container" ):
+        for i in range( leaves ):
+            with profiler.span( "leaf_%s"%i, "leaf" ):
+                pass
+    profiler.end_frame()
+
+
+def test_FrameProfiler_disabled_records_nothing() -> None:
+    profiler = boxer.profiler.FrameProfiler()
+    _record_frame( profiler )
+    assert len( profiler.frames ) == 0
+    assert profiler.span( "x" ) is boxer.profiler._NULL_SPAN
+
+
+def test_FrameProfiler_nested_spans() -> None:
+    profiler = boxer.profiler.FrameProfiler()
+    profiler.set_enabled( True )
+    _record_frame( profiler )
+    frame = profiler.last_frame()
+    depths = { name : depth for name, _, _, _, depth in frame.spans }
+    assert depths == { "frame" : 0, "layout" : 1, "leaves" : 1, "leaf_0" : 2, "leaf_1" : 2, "leaf_2" : 2 }
+    for name, _, start, end, _ in frame.spans:
+        assert frame.start <= start <= end <= frame.end
+
+
+def test_FrameProfiler_ring_buffer() -> None:
+    profiler = boxer.profiler.FrameProfiler( max_frames = 10 )
+    profiler.set_enabled( True )
+    for _ in range( 25 ):
+        _record_frame( profiler )
+    assert len( profiler.frames ) == 10
+    assert profiler.frames[0].index == 15
+    assert set( profiler.averages() ) == { ("frame", "frame"), ("layout", "container"), ("leaves", "container"),
+                                        ("leaf_0", "leaf"), ("leaf_1", "leaf"), ("leaf_2", "leaf") }
+
+
+def test_FrameProfiler_input_spans_join_next_frame() -> None:
+    profiler = boxer.profiler.FrameProfiler()
+    profiler.set_enabled( True )
+    with profiler.span( "on_mouse_motion", "input" ):
+        pass
+    _record_frame( profiler )
+    frame = profiler.last_frame()
+    assert frame.spans[0][:2] == ( "on_mouse_motion", "input" )
+    assert frame.start == frame.spans[0][2]
+
+
+def test_FrameProfiler_chrome_trace( tmp_path ) -> None:
+    profiler = boxer.profiler.FrameProfiler()
+    profiler.set_enabled( True )
+    for _ in range( 2 ):
+        _record_frame( profiler )
+    path = tmp_path / "trace.json"
+    profiler.export_chrome_trace( str( path ) )
+    trace = json.loads( path.read_text() )
+    events = trace["traceEvents"]
+    assert len( events ) == 2 * 6
+    assert all( e["ph"] == "X" and e["dur"] >= 0 for e in events )
+    assert [ e["ts"] for e in events ] == sorted( e["ts"] for e in events )
+    assert { e["args"]["frame"] for e in events } == { 0, 1 }
+
+
+def test_Container_draw_records_phases( imgui_context ) -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    profiler = boxer.profiler.profiler
+    try:
+        io = imgui.get_io()
+        io.display_size = ( root.window.width, root.window.height )
+        io.fonts.get_tex_data_as_rgba32()
+        profiler.clear()
+        profiler.set_enabled( True )
+        boxer.events.for_window( root.window )._forward( "on_mouse_motion", 10, 10, 0, 0 )
+        profiler.begin_frame()
+        imgui.new_frame()
+        root.draw()
+        imgui.render()
+        profiler.end_frame()
+        names = { ( name, category ) for name, category, _, _, _ in profiler.last_frame().spans }
+        assert { ( "on_mouse_motion", "input" ), ( "layout", "container" ), ( "batch.draw", "container" ),
+                 ( "view caches", "view" ) } <= names
+        assert { ( leaf.name, "leaf" ) for leaf in root.leaves } <= names
+    finally:
+        profiler.set_enabled( False )
+        profiler.clear()
@@ -0,0 +1,146 @@
+import pyglet
+
+import boxer.containers
+import boxer.plugins.graph_view
+import boxer.redraw
+
+
+class _Window( pyglet.event.EventDispatcher ):
+    """stands in for a pyglet Window, counts draws"""
+    def __init__(self):
+        self.draws = 0
+
+    def draw(self, dt):
+        self.draws += 1
+
+for _event in boxer.redraw.RedrawScheduler.WINDOW_EVENTS:
+    _Window.register_event_type( _event )
+
+
+class _Animated:
+    def __init__(self):
+        self.updates = 0
+
+    def on_update(self, dt):
+        self.updates += 1
+
+
+class _Clock( pyglet.clock.Clock ):
+    """a clock on fake time, so the tests don't depend on how fast the machine runs them"""
+    def __init__(self):
+        self.now = 0.0
+        super().__init__( time_function = lambda: self.now )
+
+
+def _scheduler( *args, **kwargs ) -> boxer.redraw.RedrawScheduler:
+    return boxer.redraw.RedrawScheduler( *args, clock = _Clock(), **kwargs )
+
+
+def _run_frames( scheduler, seconds = 0.1 ) -> None:
+    """advance the scheduler's clock by `seconds`, in steps finer than its frame rate"""
+    step = 0.2 / scheduler.active_fps
+    end = scheduler.clock.now + seconds
+    while scheduler.clock.now < end:
+        scheduler.clock.now += step
+        scheduler.clock.tick()
+
+
+# invalidation
+
+def test_draws_only_when_invalidated() -> None:
+    window = _Window()
+    scheduler = _scheduler( window )
+    _run_frames( scheduler )
+    assert window.draws == 1        # attaching draws the first frame
+
+    _run_frames( scheduler )
+    assert window.draws == 1        # idle
+
+    scheduler.invalidate()
+    scheduler.invalidate()
+    _run_frames( scheduler )
+    assert window.draws == 2
+    scheduler.detach()
+
+
+def test_input_invalidates() -> None:
+    window = _Window()
+    scheduler = _scheduler( window, input_frames = 2 )
+    _run_frames( scheduler )
+    draws = window.draws
+    window.dispatch_event( "on_mouse_motion", 10, 10, 1, 1 )
+    _run_frames( scheduler )
+    assert window.draws == draws + 2
+    scheduler.detach()
+    window.dispatch_event( "on_mouse_motion", 10, 10, 1, 1 )
+    _run_frames( scheduler )
+    assert window.draws == draws + 2
+
+
+def test_dirty_rect() -> None:
+    scheduler = _scheduler()
+    scheduler.invalidate( (0, 0, 10, 10) )
+    scheduler.invalidate( (20, 5, 10, 10) )
+    assert scheduler.dirty_rect == (0, 0, 30, 15)
+    scheduler.invalidate()
+    assert scheduler.dirty_rect is None
+
+
+# animations
+
+def test_animation_keeps_drawing() -> None:
+    window = _Window()
+    scheduler = _scheduler( window, active_fps = 100.0 )
+    animated = _Animated()
+    scheduler.add_animation( animated.on_update )
+    _run_frames( scheduler, 0.1 )
+    assert animated.updates >= 9      # 100 fps for 0.1 seconds
+    assert window.draws >= animated.updates
+
+    # animations are held weakly
+    del animated
+    _run_frames( scheduler )
+    draws = window.draws
+    _run_frames( scheduler )
+    assert window.draws == draws
+    scheduler.detach()
+
+
+def test_continuous() -> None:
+    window = _Window()
+    scheduler = _scheduler( window, active_fps = 100.0 )
+    scheduler.set_continuous( True )
+    _run_frames( scheduler, 0.1 )
+    assert window.draws >= 9
+    scheduler.set_continuous( False )
+    _run_frames( scheduler )
+    draws = window.draws
+    _run_frames( scheduler )
+    assert window.draws == draws
+    scheduler.detach()
+
+
+def test_idle_graph_view_stops_drawing() -> None:
+    root = boxer.containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    boxer.containers.Container.change_container_view( root, [ "Graph", boxer.plugins.graph_view.GraphView ] )
+    view = root.container_views[root]
+    assert isinstance( view, boxer.plugins.graph_view.GraphView )
+
+    # backgrounds don't drift unless asked to, so nothing animates
+    window = _Window()
+    boxer.redraw.scheduler.attach( window )
+    try:
+        assert not boxer.redraw.scheduler.animating
+        for _ in range( 4 ):
+            boxer.redraw.scheduler._draw( 0.0 )
+        assert not boxer.redraw.scheduler.dirty
+
+        view.canvas.background.set_drift( True )
+        assert boxer.redraw.scheduler.dirty
+        view.canvas.background.set_drift( False )
+        boxer.redraw.scheduler._draw( 0.0 )
+        assert not boxer.redraw.scheduler.dirty
+    finally:
+        boxer.redraw.scheduler.detach()
+        boxer.containers.Container.change_container_view( root, boxer.containers.Container.container_view_types[0] )
+        root.dispose()
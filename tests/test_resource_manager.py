@@ -0,0 +1,41 @@
+import boxer.resource_manager
+from boxer import containers
+
+# images
+
+def test_load_image_shared() -> None:
+    first = boxer.resource_manager.load_image( "cog_16.png" )
+    load_count = boxer.resource_manager.load_count
+    assert boxer.resource_manager.load_image( "cog_16.png" ) is first
+    assert boxer.resource_manager.load_count == load_count
+
+
+def test_import_loads_no_icons() -> None:
+    assert not hasattr( containers.Container, "textures" )
+    assert "cog" in containers.Container.icons
+
+
+# icon atlas
+
+def test_icon_atlas() -> None:
+    atlas = boxer.resource_manager.get_icon_atlas()
+    assert atlas is boxer.resource_manager.get_icon_atlas()
+    names = boxer.resource_manager.icon_names()
+    assert { "cog", "window", "downarrow", "diamond", "alert", "notification", "object" } <= set( names )
+
+    # one texture for every icon
+    assert { region.id for region in atlas.regions.values() } == { atlas.texture.id }
+    assert boxer.resource_manager.icon_texture_id() == atlas.texture.id
+
+    # icon uv rects don't overlap
+    rects = [ atlas.uv_rects[name] for name in names ]
+    for i, a in enumerate( rects ):
+        for b in rects[i+1:]:
+            assert a[2] <= b[0] or b[2] <= a[0] or a[3] <= b[1] or b[3] <= a[1]
+
+
+def test_icon_uv() -> None:
+    u0, v0, u1, v1 = boxer.resource_manager.get_icon_atlas().uv_rects["cog"]
+    assert boxer.resource_manager.icon_uv( "cog" ) == ( (u0, v0), (u1, v1) )
+    # flipped, as used by the container buttons
+    assert boxer.resource_manager.icon_uv( "cog", (0,1), (1,0) ) == ( (u0, v1), (u1, v0) )
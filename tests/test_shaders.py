@@ -0,0 +1,89 @@
+import pyglet
+import pytest
+
+import boxer.shaders
+from boxer import containers
+
+# program registry
+
+def test_get_program_shared() -> None:
+    assert boxer.shaders.get_marchinglines_shader() is boxer.shaders.get_marchinglines_shader()
+    assert boxer.shaders.get_default_shader() is not boxer.shaders.get_default_textured_shader()
+
+
+def test_container_split_no_compiles() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    compile_count = boxer.shaders.compile_count
+    for _ in range(4):
+        leaves = containers.Container.change_container( leaves[0], containers.Container.ACTION_SPLIT_VERTICAL )
+    assert boxer.shaders.compile_count == compile_count
+
+
+# program binary cache
+
+def test_program_binary_cache_roundtrip( tmp_path, monkeypatch ) -> None:
+    containers.Container( name="root" )     # needs a GL context
+    if not boxer.shaders.program_cache_available():
+        pytest.skip("no program binary support")
+    monkeypatch.setattr( boxer.shaders, "program_cache_dir", str(tmp_path) )
+    vertex_source = boxer.shaders._vertex_source + "\n// test_program_binary_cache_roundtrip\n"
+
+    compile_count = boxer.shaders.compile_count
+    loaded = boxer.shaders.program_cache_stats["loaded"]
+    first = boxer.shaders.compile_program( vertex_source, boxer.shaders._fragment_source )
+    assert boxer.shaders.compile_count == compile_count + 1
+    assert len( list( tmp_path.glob("*.bin") ) ) == 1
+
+    second = boxer.shaders.compile_program( vertex_source, boxer.shaders._fragment_source )
+    assert boxer.shaders.compile_count == compile_count + 1
+    assert boxer.shaders.program_cache_stats["loaded"] == loaded + 1
+    assert second.id != first.id
+    assert set( second.attributes ) == set( first.attributes )
+    assert "WindowBlock" in second.uniform_blocks
+
+
+def test_program_binary_cache_rejected( tmp_path, monkeypatch ) -> None:
+    containers.Container( name="root" )
+    if not boxer.shaders.program_cache_available():
+        pytest.skip("no program binary support")
+    monkeypatch.setattr( boxer.shaders, "program_cache_dir", str(tmp_path) )
+    vertex_source = boxer.shaders._vertex_source + "\n// test_program_binary_cache_rejected\n"
+    key = boxer.shaders.program_cache_key( vertex_source, boxer.shaders._fragment_source )
+    ( tmp_path / (key + ".bin") ).write_bytes( boxer.shaders._PROGRAM_CACHE_HEADER.pack( 1, 0.1 ) + b"not a program" )
+
+    rejected = boxer.shaders.program_cache_stats["rejected"]
+    compile_count = boxer.shaders.compile_count
+    program = boxer.shaders.compile_program( vertex_source, boxer.shaders._fragment_source )
+    assert program.id
+    assert boxer.shaders.program_cache_stats["rejected"] == rejected + 1
+    assert boxer.shaders.compile_count == compile_count + 1
+
+
+def test_program_wrapping_matches_pyglet() -> None:
+    # fails when a pyglet release changes the internals _wrap_program() uses
+    containers.Container( name="root" )
+    assert boxer.shaders.can_wrap_programs()
+    _shader = pyglet.graphics.shader
+    built = _shader.ShaderProgram( _shader.Shader( boxer.shaders._vertex_source, "vertex" ),
+                                   _shader.Shader( boxer.shaders._fragment_source, "fragment" ) )
+    wrapped = boxer.shaders._wrap_program( boxer.shaders._link_retrievable(
+                                   _shader.Shader( boxer.shaders._vertex_source, "vertex" ),
+                                   _shader.Shader( boxer.shaders._fragment_source, "fragment" ) ) )
+    assert set( wrapped.attributes ) == set( built.attributes )
+    assert set( wrapped.uniforms ) == set( built.uniforms )
+    assert set( wrapped.uniform_blocks ) == set( built.uniform_blocks )
+
+
+def test_program_cache_falls_back_without_pyglet_internals( tmp_path, monkeypatch ) -> None:
+    containers.Container( name="root" )
+    monkeypatch.setattr( boxer.shaders, "program_cache_dir", str(tmp_path) )
+    # as if pyglet's ShaderProgram had a slot _wrap_program() doesn't set
+    monkeypatch.setattr( boxer.shaders, "_WRAPPED_SLOTS", boxer.shaders._WRAPPED_SLOTS[:-1] )
+    assert not boxer.shaders.program_cache_available()
+    compile_count = boxer.shaders.compile_count
+    vertex_source = boxer.shaders._vertex_source + "\n// test_program_cache_falls_back_without_pyglet_internals\n"
+    program = boxer.shaders.compile_program( vertex_source, boxer.shaders._fragment_source )
+    assert program.id and "WindowBlock" in program.uniform_blocks
+    assert boxer.shaders.compile_count == compile_count + 1
+    assert list( tmp_path.glob("*.bin") ) == []
@@ -0,0 +1,197 @@
+"""boxer.snapping tests"""
+import numpy as np
+import pyglet.math
+import pytest
+
+from boxer import containers
+from boxer import handles
+from boxer import snapping
+
+# ------------------------------------------------------------------------------
+# SnapIndex
+
+def test_SnapIndex_incremental_points_stay_sorted() -> None:
+    index = snapping.SnapIndex()
+    rng = np.random.default_rng( 3 )
+    keys = [ object() for _ in range( 200 ) ]
+    for key in keys:
+        index.set_point( key, *rng.uniform( -500.0, 500.0, 2 ).tolist() )
+    # move half, remove a quarter
+    for key in keys[:100]:
+        index.set_point( key, *rng.uniform( -500.0, 500.0, 2 ).tolist() )
+    for key in keys[150:]:
+        index.remove_point( key )
+    assert len( index ) == 150
+    for axis in ( index.xs, index.ys ):
+        assert len( axis ) == 150
+        assert np.all( np.diff( axis.values ) >= 0.0 )
+    assert sorted( index.xs.values.tolist() ) == sorted( index._points[key][0] for key in keys[:150] )
+
+
+def test_SnapIndex_set_points_matches_set_point() -> None:
+    rng = np.random.default_rng( 5 )
+    keys = [ object() for _ in range( 300 ) ]
+    one_by_one = snapping.SnapIndex()
+    batched = snapping.SnapIndex()
+    for index in ( one_by_one, batched ):
+        index.set_lines( "edges", xs = ( 0.0, 250.0 ), ys = ( 0.0, ) )
+    for _ in range(3):
+        # a group of the keys moves, the others stay
+        moved = keys[:200]
+        xy = rng.uniform( -500.0, 500.0, ( len( moved ), 2 ) )
+        for key, ( x, y ) in zip( moved, xy.tolist() ):
+            one_by_one.set_point( key, x, y )
+        batched.set_points( moved, xy )
+        keys = keys[100:] + keys[:100]
+    assert batched._points == one_by_one._points
+    for column, ( a, b ) in enumerate( ( ( batched.xs, one_by_one.xs ), ( batched.ys, one_by_one.ys ) ) ):
+        assert np.all( np.diff( a.values ) >= 0.0 )
+        assert a.values.tolist() == b.values.tolist()
+        # each value sorted with its key
+        points = [ ( value, key ) for value, key in zip( a.values.tolist(), a.keys ) if key in batched ]
+        assert len( points ) == 300
+        assert all( batched._points[key][column] == value for value, key in points )
+    batched.remove_lines( "edges" )
+    assert len( batched.xs ) == 300
+
+
+def test_SnapIndex_nearest_excludes_keys() -> None:
+    index = snapping.SnapIndex()
+    a, b, c = object(), object(), object()
+    index.set_point( a, 10.0, 0.0 )
+    index.set_point( b, 12.0, 50.0 )
+    index.set_point( c, 40.0, 100.0 )
+    assert index.nearest_x( 11.5 ) == ( 12.0, b )
+    assert index.nearest_x( 11.5, exclude = { b } ) == ( 10.0, a )
+    assert index.nearest_y( 70.0, exclude = { b } ) == ( 100.0, c )
+    assert index.nearest_x( 0.0, exclude = { a, b, c } ) is None
+
+
+def test_SnapIndex_lines_replace() -> None:
+    index = snapping.SnapIndex()
+    index.set_point( "handle", 5.0, 5.0 )
+    index.set_lines( "edges", xs = ( 0.0, 100.0 ), ys = ( 0.0, ) )
+    assert index.nearest_x( 90.0 )[0] == 100.0
+    index.set_lines( "edges", xs = ( 0.0, 80.0 ) )
+    assert index.nearest_x( 90.0 )[0] == 80.0
+    assert len( index.ys ) == 1
+    index.remove_lines( "edges" )
+    assert index.nearest_x( 90.0 ) == ( 5.0, "handle" )
+
+
+# ------------------------------------------------------------------------------
+# Snapper
+
+class _Mouse:
+    camera_zoom = 4.0
+
+
+def test_Snapper_grid_and_handles() -> None:
+    snapper = snapping.Snapper( tolerance = 5.0, grid_size = 50.0 )
+    manager = handles.HandleManager( snapper = snapper )
+    other = manager.add( handles.PointHandle( position = pyglet.math.Vec2( 73.0, 210.0 ), space = handles.Handle.SPACE_SCREEN ) )
+    moving = manager.add( handles.PointHandle( position = pyglet.math.Vec2( 0.0, 0.0 ), space = handles.Handle.SPACE_SCREEN ) )
+
+    # x to the other handle's x, y to the grid
+    assert snapper.snap( moving, pyglet.math.Vec2( 70.0, 148.0 ) ) == pyglet.math.Vec2( 73.0, 150.0 )
+    assert snapper.guides == ( 73.0, 150.0 )
+    # out of tolerance of both
+    assert snapper.snap( moving, pyglet.math.Vec2( 62.0, 175.0 ) ) == pyglet.math.Vec2( 62.0, 175.0 )
+    assert snapper.guides == ( None, None )
+
+    # the index follows moves and removals
+    other.position = pyglet.math.Vec2( 64.0, 210.0 )
+    other.update_position()
+    assert snapper.snap( moving, pyglet.math.Vec2( 62.0, 175.0 ) ).x == 64.0
+    manager.remove( other )
+    assert snapper.snap( moving, pyglet.math.Vec2( 62.0, 175.0 ) ).x == 62.0
+
+
+def test_Snapper_follows_group_moves() -> None:
+    snapper = snapping.Snapper( tolerance = 5.0 )
+    manager = handles.HandleManager( snapper = snapper )
+    batch = pyglet.graphics.Batch()
+    group = [ manager.add( handles.PointHandle( position = pyglet.math.Vec2( i * 40.0, 0.0 ), batch = batch, instanced = True ) )
+            for i in range(10) ]
+    moving = manager.add( handles.PointHandle( position = pyglet.math.Vec2( 0.0, 500.0 ) ) )
+    manager.selection.select( group )
+    manager.selection.move( 13.0, 0.0 )
+    assert snapper.snap( moving, pyglet.math.Vec2( 95.0, 500.0 ) ).x == 93.0
+    # and group drags, before the handles' positions are synced
+    manager.selection.drag( 0.0, 300.0 )
+    assert snapper.snap( moving, pyglet.math.Vec2( 0.0, 298.0 ) ).y == 300.0
+    manager.selection.finish_drag()
+
+
+def test_Snapper_world_tolerance_scales_with_zoom() -> None:
+    snapper = snapping.Snapper( mouse = _Mouse(), tolerance = 8.0 )
+    manager = handles.HandleManager( snapper = snapper )
+    manager.add( handles.PointHandle( position = pyglet.math.Vec2( 100.0, 100.0 ) ) )
+    moving = manager.add( handles.PointHandle( position = pyglet.math.Vec2( 0.0, 0.0 ) ) )
+    # 8 pixels at zoom 4 is 2 world units
+    assert snapper.snap( moving, pyglet.math.Vec2( 101.5, 0.0 ) ).x == 100.0
+    assert snapper.snap( moving, pyglet.math.Vec2( 103.0, 0.0 ) ).x == 103.0
+    # screen space handles don't snap to world space ones
+    screen = manager.add( handles.PointHandle( position = pyglet.math.Vec2( 0.0, 0.0 ), space = handles.Handle.SPACE_SCREEN ) )
+    assert snapper.snap( screen, pyglet.math.Vec2( 101.0, 0.0 ) ).x == 101.0
+
+
+def test_Snapper_container_edges() -> None:
+    root = containers.Container( name="root", width=400, height=200, use_explicit_dimensions=True )
+    containers.Container.change_container( root, containers.Container.ACTION_SPLIT_HORIZONTAL )
+    root.update_geometries()
+    snapper = snapping.Snapper( tolerance = 6.0 )
+    snapper.track_containers( root )
+    manager = handles.HandleManager( snapper = snapper )
+    moving = manager.add( handles.PointHandle( space = handles.Handle.SPACE_SCREEN ) )
+    xs, ys = snapping.container_lines( root )
+    assert 0.0 in xs and 400.0 in xs and 200.0 in ys
+    assert snapper.snap( moving, pyglet.math.Vec2( 396.0, 197.0 ) ) == pyglet.math.Vec2( 400.0, 200.0 )
+    snapper.untrack_containers( root )
+    assert snapper.snap( moving, pyglet.math.Vec2( 396.0, 197.0 ) ) == pyglet.math.Vec2( 396.0, 197.0 )
+
+
+def test_Handle_drag_snaps_and_leaves_snap_lines() -> None:
+    snapper = snapping.Snapper( tolerance = 5.0 )
+    manager = handles.HandleManager( snapper = snapper )
+    manager.add( handles.PointHandle( position = pyglet.math.Vec2( 100.0, 300.0 ) ) )
+    moving = manager.add( handles.PointHandle( position = pyglet.math.Vec2( 0.0, 0.0 ) ) )
+    finished = []
+    moving.push_handlers( drag_finished = lambda dx, dy: finished.append( ( dx, dy ) ) )
+
+    manager.on_mouse_motion( 0.0, 0.0, 0, 0 )
+    manager.on_mouse_press( 0.0, 0.0, pyglet.window.mouse.LEFT, 0 )
+    # without a window, drags are applied at once
+    manager.on_mouse_drag( 97.0, 0.0, 97, 0, pyglet.window.mouse.LEFT, 0 )
+    assert moving.position == pyglet.math.Vec2( 100.0, 0.0 )
+    # the handle follows the unsnapped drag, so it leaves the line once out of tolerance
+    manager.on_mouse_drag( 101.0, 0.0, 4, 0, pyglet.window.mouse.LEFT, 0 )
+    assert moving.position == pyglet.math.Vec2( 100.0, 0.0 )
+    manager.on_mouse_drag( 110.0, 0.0, 9, 0, pyglet.window.mouse.LEFT, 0 )
+    assert moving.position == pyglet.math.Vec2( 110.0, 0.0 )
+    manager.on_mouse_release( 110.0, 0.0, pyglet.window.mouse.LEFT, 0 )
+    assert finished == [ ( 110.0, 0.0 ) ]
+
+
+# ------------------------------------------------------------------------------
+# split ratios
+
+def test_SplitContainer_drag_snaps_to_ratios( monkeypatch ) -> None:
+    monkeypatch.setattr( containers.Container, "snap_ratios", snapping.DEFAULT_RATIOS )
+    root = containers.Container( name="root", width=400, height=300, use_explicit_dimensions=True )
+    leaves = containers.Container.change_container( root, containers.Container.ACTION_SPLIT_VERTICAL )
+    root.update_geometries()
+    split = leaves[0].parent
+    handle = split.split_handle
+
+    split.on_split_handle_mouse_pressed( 0, 150, pyglet.window.mouse.LEFT, 0 )
+    handle.selected = True
+    try:
+        # 150 + 72 = 222 is 3 pixels from 0.75 * 300
+        handle.on_mouse_drag( 0, 0, 0, 72, pyglet.window.mouse.LEFT, 0 )
+        assert split.ratio == pytest.approx( 0.75 )
+        handle.on_mouse_drag( 0, 0, 0, 20, pyglet.window.mouse.LEFT, 0 )
+        assert split.ratio == pytest.approx( 242.0 / 300.0 )
+    finally:
+        handle.selected = False
+        handle.finish_drag()